@@ -0,0 +1,77 @@
+"""add nao_lidas and ultima_mensagem_preview to conversas
+
+Revision ID: m01_conversas_nao_lidas
+Revises: l01_create_convites_clientes
+Create Date: 2026-02-05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm01_conversas_nao_lidas'
+down_revision: Union[str, None] = 'l01_create_convites_clientes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 1. Colunas desnormalizadas
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = 'conversas' AND column_name = 'nao_lidas')"
+    ))
+    if not result.scalar():
+        op.add_column('conversas',
+            sa.Column('nao_lidas', sa.Integer(), nullable=False, server_default='0')
+        )
+
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = 'conversas' AND column_name = 'ultima_mensagem_preview')"
+    ))
+    if not result.scalar():
+        op.add_column('conversas',
+            sa.Column('ultima_mensagem_preview', sa.String(100), nullable=True)
+        )
+
+    # 2. Backfill a partir das mensagens existentes
+    conn.execute(sa.text("""
+        UPDATE conversas c
+        SET nao_lidas = sub.total
+        FROM (
+            SELECT conversa_id, COUNT(*) AS total
+            FROM mensagens
+            WHERE direcao = 'ENTRADA' AND lida = false
+            GROUP BY conversa_id
+        ) sub
+        WHERE c.id = sub.conversa_id
+    """))
+
+    conn.execute(sa.text("""
+        UPDATE conversas c
+        SET ultima_mensagem_preview = LEFT(sub.conteudo, 100)
+        FROM (
+            SELECT DISTINCT ON (conversa_id) conversa_id, conteudo
+            FROM mensagens
+            ORDER BY conversa_id, timestamp DESC, id DESC
+        ) sub
+        WHERE c.id = sub.conversa_id
+    """))
+
+    # 3. Índice para paginação por cursor da listagem
+    op.create_index(
+        'ix_conversa_cliente_ultima_msg', 'conversas',
+        ['cliente_id', 'ultima_mensagem_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversa_cliente_ultima_msg', table_name='conversas')
+    op.drop_column('conversas', 'ultima_mensagem_preview')
+    op.drop_column('conversas', 'nao_lidas')
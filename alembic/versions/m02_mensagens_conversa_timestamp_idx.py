@@ -0,0 +1,29 @@
+"""add composite index for paginated message history
+
+Revision ID: m02_mensagens_conversa_ts
+Revises: m01_conversas_nao_lidas
+Create Date: 2026-02-05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm02_mensagens_conversa_ts'
+down_revision: Union[str, None] = 'm01_conversas_nao_lidas'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginação por cursor do histórico: WHERE conversa_id = ? AND (timestamp, id) < (?, ?)
+    op.create_index(
+        'ix_mensagens_conversa_timestamp', 'mensagens',
+        ['conversa_id', 'timestamp', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mensagens_conversa_timestamp', table_name='mensagens')
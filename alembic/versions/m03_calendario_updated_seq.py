@@ -0,0 +1,69 @@
+"""add updated_seq change-tracking cursor to agendamentos and bloqueios_agenda
+
+Revision ID: m03_calendario_updated_seq
+Revises: m02_mensagens_conversa_ts
+Create Date: 2026-02-06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm03_calendario_updated_seq'
+down_revision: Union[str, None] = 'm02_mensagens_conversa_ts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABELAS = ('agendamentos', 'bloqueios_agenda')
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 1. Sequência monotônica compartilhada pelas duas tabelas do calendário
+    conn.execute(sa.text("CREATE SEQUENCE IF NOT EXISTS calendario_seq"))
+
+    # 2. Trigger: toda alteração (ORM ou SQL direto) recebe um novo updated_seq
+    conn.execute(sa.text("""
+        CREATE OR REPLACE FUNCTION calendario_set_updated_seq() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_seq := nextval('calendario_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    for tabela in TABELAS:
+        result = conn.execute(sa.text(
+            "SELECT EXISTS (SELECT FROM information_schema.columns "
+            f"WHERE table_name = '{tabela}' AND column_name = 'updated_seq')"
+        ))
+        if not result.scalar():
+            # Linhas existentes recebem valores da sequência no ADD COLUMN
+            op.add_column(tabela, sa.Column(
+                'updated_seq', sa.BigInteger(), nullable=False,
+                server_default=sa.text("nextval('calendario_seq')")
+            ))
+
+        conn.execute(sa.text(f"DROP TRIGGER IF EXISTS trg_{tabela}_updated_seq ON {tabela}"))
+        conn.execute(sa.text(f"""
+            CREATE TRIGGER trg_{tabela}_updated_seq
+            BEFORE UPDATE ON {tabela}
+            FOR EACH ROW EXECUTE FUNCTION calendario_set_updated_seq()
+        """))
+
+        op.create_index(f'ix_{tabela}_medico_updated_seq', tabela, ['medico_id', 'updated_seq'])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for tabela in TABELAS:
+        op.drop_index(f'ix_{tabela}_medico_updated_seq', table_name=tabela)
+        conn.execute(sa.text(f"DROP TRIGGER IF EXISTS trg_{tabela}_updated_seq ON {tabela}"))
+        op.drop_column(tabela, 'updated_seq')
+    conn.execute(sa.text("DROP FUNCTION IF EXISTS calendario_set_updated_seq()"))
+    conn.execute(sa.text("DROP SEQUENCE IF EXISTS calendario_seq"))
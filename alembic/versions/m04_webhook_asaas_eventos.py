@@ -0,0 +1,50 @@
+"""create webhook_asaas_eventos inbox table
+
+Revision ID: m04_webhook_asaas_eventos
+Revises: m03_calendario_updated_seq
+Create Date: 2026-02-09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm04_webhook_asaas_eventos'
+down_revision: Union[str, None] = 'm03_calendario_updated_seq'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables "
+        "WHERE table_name = 'webhook_asaas_eventos')"
+    ))
+    if not result.scalar():
+        op.create_table(
+            'webhook_asaas_eventos',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('evento_id', sa.String(100), nullable=False, unique=True),
+            sa.Column('evento', sa.String(50), nullable=False),
+            sa.Column('asaas_payment_id', sa.String(50), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False, server_default='pendente'),
+            sa.Column('tentativas', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('erro', sa.Text(), nullable=True),
+            sa.Column('recebido_em', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+            sa.Column('processado_em', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_webhook_asaas_eventos_asaas_payment_id', 'webhook_asaas_eventos', ['asaas_payment_id'])
+        op.create_index('ix_webhook_asaas_eventos_status_recebido', 'webhook_asaas_eventos', ['status', 'recebido_em'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_asaas_eventos_status_recebido', table_name='webhook_asaas_eventos')
+    op.drop_index('ix_webhook_asaas_eventos_asaas_payment_id', table_name='webhook_asaas_eventos')
+    op.drop_table('webhook_asaas_eventos')
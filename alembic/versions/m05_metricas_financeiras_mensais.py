@@ -0,0 +1,49 @@
+"""create metricas_financeiras_mensais snapshot table
+
+Revision ID: m05_metricas_financeiras_mensais
+Revises: m04_webhook_asaas_eventos
+Create Date: 2026-02-10
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm05_metricas_financeiras_mensais'
+down_revision: Union[str, None] = 'm04_webhook_asaas_eventos'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables "
+        "WHERE table_name = 'metricas_financeiras_mensais')"
+    ))
+    if not result.scalar():
+        op.create_table(
+            'metricas_financeiras_mensais',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('mes', sa.Date(), nullable=False, unique=True),
+            sa.Column('mrr', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('mrr_base', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('mrr_adicionais', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('mrr_servicos', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('assinaturas_ativas', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('ticket_medio', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('clientes_ativos', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('medicos_ativos', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('custo_total', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('lucro', sa.Numeric(12, 2), nullable=False, server_default='0'),
+            sa.Column('criado_em', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column('atualizado_em', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('metricas_financeiras_mensais')
@@ -0,0 +1,40 @@
+"""create scheduler_lideranca table (leader election fencing token)
+
+Revision ID: m06_scheduler_lideranca
+Revises: m05_metricas_financeiras_mensais
+Create Date: 2026-02-11
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm06_scheduler_lideranca'
+down_revision: Union[str, None] = 'm05_metricas_financeiras_mensais'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables "
+        "WHERE table_name = 'scheduler_lideranca')"
+    ))
+    if not result.scalar():
+        op.create_table(
+            'scheduler_lideranca',
+            sa.Column('nome', sa.String(50), primary_key=True),
+            sa.Column('token', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('no', sa.String(255), nullable=True),
+            sa.Column('adquirido_em', sa.DateTime(), nullable=True),
+            sa.Column('heartbeat_em', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduler_lideranca')
@@ -0,0 +1,50 @@
+"""create scheduler_execucoes job run ledger
+
+Revision ID: m07_scheduler_execucoes
+Revises: m06_scheduler_lideranca
+Create Date: 2026-02-12
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm07_scheduler_execucoes'
+down_revision: Union[str, None] = 'm06_scheduler_lideranca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables "
+        "WHERE table_name = 'scheduler_execucoes')"
+    ))
+    if not result.scalar():
+        op.create_table(
+            'scheduler_execucoes',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('job_id', sa.String(50), nullable=False),
+            sa.Column('no', sa.String(255), nullable=True),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('agendado_para', sa.DateTime(), nullable=True),
+            sa.Column('iniciado_em', sa.DateTime(), nullable=False),
+            sa.Column('finalizado_em', sa.DateTime(), nullable=True),
+            sa.Column('duracao_ms', sa.Integer(), nullable=True),
+            sa.Column('linhas', sa.Integer(), nullable=True),
+            sa.Column('erro', sa.Text(), nullable=True),
+            sa.Column('estourou_intervalo', sa.Boolean(), nullable=False, server_default='false'),
+        )
+        op.create_index('ix_scheduler_execucoes_job_iniciado', 'scheduler_execucoes', ['job_id', 'iniciado_em'])
+        op.create_index('ix_scheduler_execucoes_iniciado_em', 'scheduler_execucoes', ['iniciado_em'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduler_execucoes_iniciado_em', table_name='scheduler_execucoes')
+    op.drop_index('ix_scheduler_execucoes_job_iniciado', table_name='scheduler_execucoes')
+    op.drop_table('scheduler_execucoes')
@@ -0,0 +1,42 @@
+"""partial index on open appointment statuses by data_hora
+
+Revision ID: m08_agendamentos_abertos_idx
+Revises: m07_scheduler_execucoes
+Create Date: 2026-02-13
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm08_agendamentos_abertos_idx'
+down_revision: Union[str, None] = 'm07_scheduler_execucoes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Usado pela transição em lote para 'realizada' (StatusUpdateService):
+    # só as consultas em aberto entram no índice, que fica pequeno
+    result = conn.execute(sa.text(
+        "SELECT EXISTS (SELECT FROM pg_indexes "
+        "WHERE indexname = 'ix_agendamentos_abertos_data_hora')"
+    ))
+    if not result.scalar():
+        op.create_index(
+            'ix_agendamentos_abertos_data_hora',
+            'agendamentos',
+            ['data_hora'],
+            postgresql_where=sa.text(
+                "status IN ('confirmado', 'confirmada', 'agendado', 'agendada', 'pendente', 'em_atendimento')"
+            ),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_agendamentos_abertos_data_hora', table_name='agendamentos')
@@ -0,0 +1,70 @@
+"""add updated_txid commit-safe cursor to agendamentos and bloqueios_agenda
+
+Revision ID: m09_calendario_updated_txid
+Revises: m08_agendamentos_abertos_idx
+Create Date: 2026-02-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm09_calendario_updated_txid'
+down_revision: Union[str, None] = 'm08_agendamentos_abertos_idx'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABELAS = ('agendamentos', 'bloqueios_agenda')
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # updated_seq é tomado no UPDATE mas só aparece no commit: um cursor por
+    # seq pula linhas de transações que comitam fora de ordem. O delta passa
+    # a usar o txid da transação que gravou a linha, comparado ao xmin do
+    # snapshot (toda transação abaixo dele já terminou)
+    for tabela in TABELAS:
+        result = conn.execute(sa.text(
+            "SELECT EXISTS (SELECT FROM information_schema.columns "
+            f"WHERE table_name = '{tabela}' AND column_name = 'updated_txid')"
+        ))
+        if not result.scalar():
+            op.add_column(tabela, sa.Column(
+                'updated_txid', sa.BigInteger(), nullable=False,
+                server_default=sa.text("txid_current()")
+            ))
+
+        op.drop_index(f'ix_{tabela}_medico_updated_seq', table_name=tabela, if_exists=True)
+        op.create_index(f'ix_{tabela}_medico_updated_txid', tabela, ['medico_id', 'updated_txid'])
+
+    # Mesmo trigger de m03 (BEFORE UPDATE): renova os dois campos
+    conn.execute(sa.text("""
+        CREATE OR REPLACE FUNCTION calendario_set_updated_seq() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_seq := nextval('calendario_seq');
+            NEW.updated_txid := txid_current();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    conn.execute(sa.text("""
+        CREATE OR REPLACE FUNCTION calendario_set_updated_seq() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_seq := nextval('calendario_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    for tabela in TABELAS:
+        op.drop_index(f'ix_{tabela}_medico_updated_txid', table_name=tabela)
+        op.create_index(f'ix_{tabela}_medico_updated_seq', tabela, ['medico_id', 'updated_seq'])
+        op.drop_column(tabela, 'updated_txid')
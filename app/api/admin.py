@@ -16,9 +16,7 @@ from app.database import get_db
 from sqlalchemy.orm import Session
 
 # Rate Limiting - proteção contra brute force
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
@@ -368,6 +366,39 @@ async def get_dashboard_stats(
         )
 
 
+# ==================== SCHEDULER ====================
+
+@router.get("/scheduler/execucoes")
+async def get_scheduler_execucoes(
+    horas: int = 24,
+    job_id: Optional[str] = None,
+    limite: int = 50,
+    admin = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Duração p50/p95 por job, execuções perdidas/puladas e histórico recente"""
+    from app.services.scheduler_telemetria_service import scheduler_telemetria
+    from app.services.scheduler_lideranca_service import scheduler_lideranca
+
+    try:
+        horas = min(max(horas, 1), 24 * 30)
+        limite = min(max(limite, 1), 500)
+
+        return {
+            "periodo_horas": horas,
+            "lideranca": scheduler_lideranca.get_status(),
+            "jobs": scheduler_telemetria.resumo(db, horas),
+            "execucoes": scheduler_telemetria.listar(db, job_id, limite)
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar execuções do scheduler: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao buscar execuções do scheduler"
+        )
+
+
 # ==================== CLIENTES ====================
 
 @router.get("/clientes")
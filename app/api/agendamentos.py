@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timedelta, date
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.services.agendamento_service import AgendamentoService
 from app.services.notification_service import get_notification_service
 from app.services.lembrete_service import lembrete_service
@@ -13,6 +15,7 @@ from app.utils.auth_middleware import AuthMiddleware, get_medico_filter_dependen
 from app.utils.phone_utils import normalize_phone
 from app.utils.timezone_helper import parse_datetime_brazil, now_brazil, format_brazil
 from app.services.websocket_manager import websocket_manager
+from app.services.calendario_feed_service import CalendarioFeedService
 
 router = APIRouter()
 
@@ -266,8 +269,12 @@ async def criar_agendamento(
 
 @router.get("/agendamentos/calendario")
 async def listar_calendario(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     medico_id: Optional[int] = None,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    desde: Optional[int] = None,
     current_user: dict = Depends(get_current_user),
     medico_filter: Optional[int] = Depends(get_medico_filter_dependency)
 ):
@@ -275,6 +282,13 @@ async def listar_calendario(
     Lista agendamentos e bloqueios para o calendário
     - Médicos: veem apenas sua própria agenda
     - Secretárias: veem todas as agendas ou filtram por médico específico
+
+    Parâmetros de sincronização:
+    - inicio/fim: janela visível (sem inicio = últimos 30 dias em diante)
+    - desde: cursor da resposta anterior; retorna apenas o que mudou desde então
+      (itens ocultos/desativados vêm em `removidos`; itens já recebidos
+      podem se repetir no delta seguinte e são aplicados de novo pelo id)
+    - If-None-Match: responde 304 se a janela não mudou desde o ETag informado
     """
     try:
         # Determinar filtro de médico
@@ -287,62 +301,41 @@ async def listar_calendario(
             # Usuário é secretária - pode filtrar por médico ou ver todos
             final_medico_id = medico_id if medico_id else 0
 
-        # Buscar agendamentos (filtrado por cliente_id para multi-tenant)
         # IMPORTANTE: Ocultar do calendário: cancelado, remarcado, faltou
         # Esses registros permanecem no banco para estatísticas, mas não devem
         # aparecer no calendário para não confundir o usuário
         cliente_id = current_user.get("cliente_id")
-        result = db.execute(text("""
-            SELECT
-                a.id,
-                a.data_hora,
-                a.duracao_minutos,
-                a.status,
-                a.tipo_atendimento,
-                a.motivo_consulta,
-                a.medico_id,
-                p.nome as paciente_nome,
-                p.telefone as paciente_telefone,
-                m.nome as medico_nome,
-                m.especialidade
-            FROM agendamentos a
-            JOIN pacientes p ON a.paciente_id = p.id
-            JOIN medicos m ON a.medico_id = m.id
-            WHERE (:medico_id = 0 OR a.medico_id = :medico_id)
-            AND m.cliente_id = :cliente_id
-            AND a.data_hora >= CURRENT_DATE - INTERVAL '30 days'
-            AND a.status NOT IN ('cancelado', 'remarcado', 'faltou')
-            ORDER BY a.data_hora
-        """), {"medico_id": final_medico_id, "cliente_id": cliente_id})
-        
-        agendamentos = []
-        for row in result:
-            # Calcular horário final usando duração real do agendamento
-            duracao = row.duracao_minutos or 30  # Fallback para 30 se null
-            horario_final = row.data_hora + timedelta(minutes=duracao)
+        janela_inicio, janela_fim = CalendarioFeedService.normalizar_janela(inicio, fim)
 
-            agendamentos.append({
-                "id": row.id,
-                "title": f"{row.paciente_nome} - {row.tipo_atendimento}",
-                "start": row.data_hora.isoformat(),
-                "end": horario_final.isoformat(),  # Adicionar horário final para visualização diária
-                "medico_id": row.medico_id,  # Adicionar medico_id para filtro por cor
-                "backgroundColor": "#10b981" if row.status == "confirmado" else "#f59e0b",
-                "borderColor": "#10b981" if row.status == "confirmado" else "#f59e0b",
-                "extendedProps": {
-                    "paciente": row.paciente_nome,
-                    "telefone": row.paciente_telefone,
-                    "medico": row.medico_nome,
-                    "especialidade": row.especialidade,
-                    "tipo": row.tipo_atendimento,
-                    "status": row.status,
-                    "motivo": row.motivo_consulta,
-                    "medico_id": row.medico_id,  # Também nos extendedProps para fácil acesso
-                    "duracao_minutos": duracao  # Incluir duração para exibição
-                }
-            })
-        
-        return {"eventos": agendamentos}
+        # Consultas via asyncpg (run_sync: o service síncrono roda sem bloquear o loop)
+        etag, cursor = await db.run_sync(
+            CalendarioFeedService.fingerprint, cliente_id, final_medico_id, janela_inicio, janela_fim
+        )
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        agendamentos, agend_removidos = await db.run_sync(
+            CalendarioFeedService.buscar_agendamentos,
+            cliente_id, final_medico_id, janela_inicio, janela_fim, desde
+        )
+        bloqueios, bloq_removidos = await db.run_sync(
+            CalendarioFeedService.buscar_bloqueios,
+            cliente_id, final_medico_id, janela_inicio, janela_fim, desde
+        )
+
+        conteudo = {
+            "eventos": agendamentos,
+            "bloqueios": bloqueios,
+            "cursor": cursor,
+            "delta": desde is not None
+        }
+        if desde is not None:
+            conteudo["removidos"] = {
+                "agendamentos": agend_removidos,
+                "bloqueios": bloq_removidos
+            }
+
+        return JSONResponse(content=conteudo, headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -394,7 +387,7 @@ async def obter_horarios_disponiveis(
     medico_id: int,
     data: str,
     duracao: int = 30,  # Duração em minutos (padrão 30)
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtém horários disponíveis de um médico em uma data específica.
@@ -409,14 +402,14 @@ async def obter_horarios_disponiveis(
         # Validar duração
         duracao = max(5, min(480, duracao))
 
-        # Criar serviço de agendamento
-        service = AgendamentoService(db)
-
         # Obter horários disponíveis considerando a duração solicitada
-        horarios = service.obter_horarios_disponiveis(
-            medico_id=medico_id,
-            data_consulta=data_consulta,
-            duracao_minutos=duracao
+        # (AgendamentoService síncrono sobre a sessão asyncpg)
+        horarios = await db.run_sync(
+            lambda sessao: AgendamentoService(sessao).obter_horarios_disponiveis(
+                medico_id=medico_id,
+                data_consulta=data_consulta,
+                duracao_minutos=duracao
+            )
         )
 
         return {
@@ -6,7 +6,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy import text, func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional, Union
 from pydantic import BaseModel
 import logging
 import hashlib
@@ -15,11 +16,10 @@ import re
 
 from app.database import get_db
 from app.api.admin import get_current_admin
+from app.services.analytics_buffer import analytics_buffer
 
 # Rate Limiting
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -46,10 +46,34 @@ class TrackingData(BaseModel):
     scroll_depth: Optional[int] = None
 
 
+class TrackingBatch(BaseModel):
+    """Lote de eventos enviados em uma única requisição pelo frontend"""
+    eventos: List[TrackingData]
+
+
+# Máximo de eventos aceitos em uma única requisição (forma em lote)
+MAX_EVENTOS_POR_LOTE = 50
+
+
 # ==================== HELPERS ====================
 
+_RE_HTML_TAGS = re.compile(r'<[^>]+>')
+_RE_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
 def parse_user_agent(user_agent: str) -> dict:
-    """Extrai informações do User-Agent"""
+    """Extrai informações do User-Agent (memoizado - poucos UAs distintos)"""
+    dispositivo, navegador, sistema_operacional = _parse_user_agent_cached(user_agent or "")
+    return {
+        "dispositivo": dispositivo,
+        "navegador": navegador,
+        "sistema_operacional": sistema_operacional
+    }
+
+
+@lru_cache(maxsize=2048)
+def _parse_user_agent_cached(user_agent: str) -> tuple:
+    """Parse do User-Agent em tupla imutável para cache LRU"""
     result = {
         "dispositivo": "desktop",
         "navegador": "Outro",
@@ -57,7 +81,7 @@ def parse_user_agent(user_agent: str) -> dict:
     }
 
     if not user_agent:
-        return result
+        return tuple(result.values())
 
     ua = user_agent.lower()
 
@@ -91,7 +115,7 @@ def parse_user_agent(user_agent: str) -> dict:
     elif "iphone" in ua or "ipad" in ua:
         result["sistema_operacional"] = "iOS"
 
-    return result
+    return tuple(result.values())
 
 
 def sanitize_string(s: str, max_length: int = 500) -> str:
@@ -99,7 +123,7 @@ def sanitize_string(s: str, max_length: int = 500) -> str:
     if not s:
         return None
     # Remove tags HTML
-    s = re.sub(r'<[^>]+>', '', s)
+    s = _RE_HTML_TAGS.sub('', s)
     # Escapa caracteres HTML perigosos
     s = s.replace('&', '&amp;')
     s = s.replace('<', '&lt;')
@@ -107,100 +131,80 @@ def sanitize_string(s: str, max_length: int = 500) -> str:
     s = s.replace('"', '&quot;')
     s = s.replace("'", '&#x27;')
     # Remove caracteres de controle (exceto newline e tab)
-    s = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', s)
+    s = _RE_CONTROL_CHARS.sub('', s)
     # Limita tamanho
     return s[:max_length] if len(s) > max_length else s
 
 
 # ==================== TRACKING (PÚBLICO) ====================
 
+def montar_page_view(data: TrackingData, user_agent: str, ip_address: Optional[str]) -> dict:
+    """Sanitiza um evento de tracking e monta a linha para page_views"""
+    # Parse User-Agent se não fornecido pelo cliente
+    if not data.dispositivo or not data.navegador:
+        ua_info = parse_user_agent(user_agent)
+        if not data.dispositivo:
+            data.dispositivo = ua_info["dispositivo"]
+        if not data.navegador:
+            data.navegador = ua_info["navegador"]
+        if not data.sistema_operacional:
+            data.sistema_operacional = ua_info["sistema_operacional"]
+
+    return {
+        "visitor_id": sanitize_string(data.visitor_id, 64),
+        "session_id": sanitize_string(data.session_id, 64),
+        "pagina": sanitize_string(data.pagina, 50),
+        "url_path": sanitize_string(data.url_path, 500),
+        "referrer": sanitize_string(data.referrer, 1000),
+        "utm_source": sanitize_string(data.utm_source, 100),
+        "utm_medium": sanitize_string(data.utm_medium, 100),
+        "utm_campaign": sanitize_string(data.utm_campaign, 100),
+        "user_agent": sanitize_string(user_agent, 1000) if user_agent else None,
+        "dispositivo": sanitize_string(data.dispositivo, 20) if data.dispositivo else None,
+        "navegador": sanitize_string(data.navegador, 50) if data.navegador else None,
+        "sistema_operacional": sanitize_string(data.sistema_operacional, 50) if data.sistema_operacional else None,
+        "ip_address": ip_address[:45] if ip_address else None,
+        "evento": sanitize_string(data.evento, 50),
+        "evento_dados": sanitize_string(data.evento_dados, 2000),
+        "tempo_na_pagina": data.tempo_na_pagina,
+        "scroll_depth": data.scroll_depth
+    }
+
+
 @router.post("/api/analytics/track", tags=["Analytics"])
-@limiter.limit("60/minute")  # Max 60 eventos por minuto por IP
+@limiter.limit("60/minute")  # Max 60 requisições por minuto por IP
 async def track_pageview(
     request: Request,
-    data: TrackingData,
-    db: Session = Depends(get_db)
+    data: Union[TrackingBatch, List[TrackingData], TrackingData]
 ):
     """
-    Registra um evento de analytics (pageview, click, etc.)
+    Registra um ou mais eventos de analytics (pageview, click, etc.)
     Endpoint público - não requer autenticação
+
+    Aceita um evento único, uma lista de eventos ou {"eventos": [...]}.
+    Os eventos são enfileirados e gravados em lote pelo buffer de analytics.
     """
     try:
-        # Obter IP do visitante
-        ip_address = request.client.host if request.client else None
+        if isinstance(data, TrackingBatch):
+            eventos = data.eventos
+        elif isinstance(data, list):
+            eventos = data
+        else:
+            eventos = [data]
+
+        eventos = eventos[:MAX_EVENTOS_POR_LOTE]
 
-        # Obter User-Agent
+        # Obter IP e User-Agent do visitante
+        ip_address = request.client.host if request.client else None
         user_agent = request.headers.get("User-Agent", "")
 
-        # Parse User-Agent se não fornecido pelo cliente
-        if not data.dispositivo or not data.navegador:
-            ua_info = parse_user_agent(user_agent)
-            if not data.dispositivo:
-                data.dispositivo = ua_info["dispositivo"]
-            if not data.navegador:
-                data.navegador = ua_info["navegador"]
-            if not data.sistema_operacional:
-                data.sistema_operacional = ua_info["sistema_operacional"]
-
-        # Sanitizar todos os dados de entrada
-        referrer = sanitize_string(data.referrer, 1000)
-        url_path = sanitize_string(data.url_path, 500)
-        evento_dados = sanitize_string(data.evento_dados, 2000)
-
-        # Sanitizar campos que podem conter dados maliciosos
-        visitor_id = sanitize_string(data.visitor_id, 64)
-        session_id = sanitize_string(data.session_id, 64)
-        pagina = sanitize_string(data.pagina, 50)
-        dispositivo = sanitize_string(data.dispositivo, 20) if data.dispositivo else None
-        navegador = sanitize_string(data.navegador, 50) if data.navegador else None
-        sistema_operacional = sanitize_string(data.sistema_operacional, 50) if data.sistema_operacional else None
-        evento = sanitize_string(data.evento, 50)
-        user_agent_sanitized = sanitize_string(user_agent, 1000) if user_agent else None
-
-        # Inserir no banco
-        db.execute(
-            text("""
-                INSERT INTO page_views (
-                    visitor_id, session_id, pagina, url_path,
-                    referrer, utm_source, utm_medium, utm_campaign,
-                    user_agent, dispositivo, navegador, sistema_operacional,
-                    ip_address, evento, evento_dados,
-                    tempo_na_pagina, scroll_depth
-                ) VALUES (
-                    :visitor_id, :session_id, :pagina, :url_path,
-                    :referrer, :utm_source, :utm_medium, :utm_campaign,
-                    :user_agent, :dispositivo, :navegador, :sistema_operacional,
-                    :ip_address, :evento, :evento_dados,
-                    :tempo_na_pagina, :scroll_depth
-                )
-            """),
-            {
-                "visitor_id": visitor_id,
-                "session_id": session_id,
-                "pagina": pagina,
-                "url_path": url_path,
-                "referrer": referrer,
-                "utm_source": sanitize_string(data.utm_source, 100),
-                "utm_medium": sanitize_string(data.utm_medium, 100),
-                "utm_campaign": sanitize_string(data.utm_campaign, 100),
-                "user_agent": user_agent_sanitized,
-                "dispositivo": dispositivo,
-                "navegador": navegador,
-                "sistema_operacional": sistema_operacional,
-                "ip_address": ip_address[:45] if ip_address else None,
-                "evento": evento,
-                "evento_dados": evento_dados,
-                "tempo_na_pagina": data.tempo_na_pagina,
-                "scroll_depth": data.scroll_depth
-            }
-        )
-        db.commit()
+        linhas = [montar_page_view(evento, user_agent, ip_address) for evento in eventos]
+        analytics_buffer.enqueue(linhas)
 
         return {"status": "ok"}
 
     except Exception as e:
         logger.error(f"Erro ao registrar analytics: {e}")
-        db.rollback()
         # Retorna sucesso mesmo com erro para não afetar UX
         return {"status": "ok"}
 
@@ -12,18 +12,13 @@ from typing import Optional
 
 from app.database import get_db
 
-# Rate Limiting - importar do main
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+# Rate Limiting - limitador compartilhado (Redis)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter()
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
-# Rate Limiter para endpoints de autenticação
-# 5 tentativas por minuto por IP (proteção contra brute force)
-limiter = Limiter(key_func=get_remote_address)
-
 # Configurações JWT
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
@@ -17,9 +17,7 @@ from app.services.onboarding_service import gerar_subdomain_unico
 from app.services.email_service import get_email_service
 
 # Rate Limiting
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter(prefix="/api/registro-cliente", tags=["Registro Cliente"])
 logger = logging.getLogger(__name__)
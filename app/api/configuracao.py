@@ -7,6 +7,7 @@ from app.models.configuracoes import ConfiguracoesMedico, BloqueioAgenda
 from app.models.medico import Medico
 from app.models.calendario import HorarioAtendimento
 from app.api.auth import get_current_user
+from app.services.agenda_compilada_service import agenda_compilada_service
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import time, datetime
@@ -172,6 +173,7 @@ async def salvar_configuracao_intervalos(config_request: ConfiguracaoIntervalosR
     try:
         db.commit()
         db.refresh(config)
+        agenda_compilada_service.invalidar(config_request.medico_id)
         
         return {
             "success": True,
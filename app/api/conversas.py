@@ -5,15 +5,16 @@ Horário Inteligente SaaS
 Endpoints para gerenciar conversas e mensagens do painel de atendimento.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import Optional, List
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import pytz
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.utils.phone_utils import format_phone_display
 
 # Timezone Brasil
@@ -76,6 +77,14 @@ class ConversaResponse(BaseModel):
 
 class ConversaDetailResponse(ConversaResponse):
     mensagens: List[MensagemResponse] = []
+    tem_mais_antigas: bool = False
+
+
+class MensagensPaginaResponse(BaseModel):
+    """Página de mensagens (paginação por cursor antes_de/depois_de)"""
+    mensagens: List[MensagemResponse] = []
+    tem_mais: bool = False
+    nao_lidas: int = 0
 
 
 class EnviarMensagemRequest(BaseModel):
@@ -105,14 +114,22 @@ class JanelaStatusResponse(BaseModel):
 
 @router.get("", response_model=List[ConversaResponse])
 async def listar_conversas(
+    response: Response,
     status: Optional[str] = None,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user),
     medico_filter: Optional[int] = Depends(get_medico_filter_dependency)
 ):
-    """Lista todas as conversas do cliente (tenant)"""
+    """
+    Lista as conversas do cliente (tenant), mais recentes primeiro.
+
+    Paginação por cursor: quando há mais conversas, o header `X-Next-Cursor`
+    traz o valor a ser enviado em `?cursor=` para buscar a próxima página.
+    """
     cliente_id = current_user["cliente_id"]
+    limit = max(1, min(limit, 100))
 
     status_enum = None
     if status:
@@ -121,44 +138,38 @@ async def listar_conversas(
         except ValueError:
             pass
 
-    conversas = ConversaService.listar_conversas(db, cliente_id, status_enum, limit, medico_id=medico_filter)
+    cursor_decodificado = None
+    if cursor:
+        cursor_decodificado = ConversaService.decode_cursor(cursor)
+        if cursor_decodificado is None:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
 
-    # Buscar nomes de pacientes para conversas sem paciente_nome
-    telefones_sem_nome = [c.paciente_telefone for c in conversas if not c.paciente_nome]
-    mapa_nomes = {}
-    if telefones_sem_nome:
-        pacientes_encontrados = db.execute(text(
-            "SELECT telefone, nome FROM pacientes "
-            "WHERE telefone IN :telefones AND cliente_id = :cli_id"
-        ), {"telefones": tuple(telefones_sem_nome), "cli_id": cliente_id}).fetchall()
-        mapa_nomes = {p.telefone: p.nome for p in pacientes_encontrados}
+    linhas = await db.run_sync(
+        ConversaService.listar_conversas, cliente_id, status_enum, limit,
+        medico_id=medico_filter, cursor=cursor_decodificado
+    )
 
-    # Enriquecer com contagem de não lidas e última mensagem
-    result = []
-    for conv in conversas:
-        # Contar não lidas desta conversa
-        nao_lidas = db.query(Mensagem).filter(
-            Mensagem.conversa_id == conv.id,
-            Mensagem.direcao == DirecaoMensagem.ENTRADA,
-            Mensagem.lida == False
-        ).count()
-
-        # Pegar última mensagem
-        ultima = db.query(Mensagem).filter(
-            Mensagem.conversa_id == conv.id
-        ).order_by(Mensagem.timestamp.desc()).first()
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        ultima_conv = linhas[-1][0]
+        response.headers["X-Next-Cursor"] = ConversaService.encode_cursor(
+            ultima_conv.ultima_mensagem_at, ultima_conv.id
+        )
 
+    result = []
+    for conv, nome_cadastro in linhas:
+        preview = conv.ultima_mensagem_preview
         conv_dict = {
             "id": conv.id,
             "paciente_telefone": conv.paciente_telefone,
             "paciente_telefone_formatado": format_phone_display(conv.paciente_telefone),
-            "paciente_nome": conv.paciente_nome or mapa_nomes.get(conv.paciente_telefone),
+            "paciente_nome": conv.paciente_nome or nome_cadastro,
             "status": conv.status.value,
             "atendente_id": conv.atendente_id,
             "ultima_mensagem_at": conv.ultima_mensagem_at,
             "criado_em": conv.criado_em,
-            "nao_lidas": nao_lidas,
-            "ultima_mensagem": ultima.conteudo[:50] + "..." if ultima and len(ultima.conteudo) > 50 else (ultima.conteudo if ultima else None),
+            "nao_lidas": conv.nao_lidas or 0,
+            "ultima_mensagem": preview[:50] + "..." if preview and len(preview) > 50 else preview,
             # Campos de urgência
             "urgencia_nivel": conv.urgencia_nivel.value if conv.urgencia_nivel else "normal",
             "urgencia_motivo": conv.urgencia_motivo,
@@ -169,14 +180,8 @@ async def listar_conversas(
     return result
 
 
-@router.get("/stats", response_model=StatsResponse)
-async def get_stats(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
-):
-    """Estatísticas das conversas"""
-    cliente_id = current_user["cliente_id"]
-
+def _contar_stats(db: Session, cliente_id: int) -> dict:
+    """Contadores do painel de conversas (ativas, assumidas, não lidas)"""
     total_ativas = db.query(Conversa).filter(
         Conversa.cliente_id == cliente_id,
         Conversa.status == StatusConversa.IA_ATIVA
@@ -196,6 +201,15 @@ async def get_stats(
     }
 
 
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Estatísticas das conversas"""
+    return await db.run_sync(_contar_stats, current_user["cliente_id"])
+
+
 @router.get("/{conversa_id}/janela-status", response_model=JanelaStatusResponse)
 async def verificar_janela_24h(
     conversa_id: int,
@@ -251,13 +265,43 @@ async def verificar_janela_24h(
     }
 
 
+def _mensagem_to_dict(m: Mensagem) -> dict:
+    """Serializa mensagem para o painel"""
+    return {
+        "id": m.id,
+        "direcao": m.direcao.value,
+        "remetente": m.remetente.value,
+        "tipo": m.tipo.value,
+        "conteudo": m.conteudo,
+        "midia_url": m.midia_url,
+        "timestamp": converter_para_brasil(m.timestamp),
+        "lida": m.lida
+    }
+
+
+def _marcar_pagina_como_lida(db: Session, conversa_id: int, mensagens: List[Mensagem]) -> None:
+    """Marca como lidas apenas as mensagens de entrada da página exibida"""
+    ids_nao_lidas = [
+        m.id for m in mensagens
+        if m.direcao == DirecaoMensagem.ENTRADA and not m.lida
+    ]
+    if ids_nao_lidas:
+        ConversaService.marcar_mensagens_como_lidas(db, conversa_id, ids_nao_lidas)
+
+
 @router.get("/{conversa_id}", response_model=ConversaDetailResponse)
 async def get_conversa(
     conversa_id: int,
+    limit: int = 50,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Detalhes de uma conversa com mensagens"""
+    """
+    Detalhes de uma conversa com as mensagens mais recentes.
+
+    Mensagens mais antigas são carregadas sob demanda em
+    GET /api/conversas/{id}/mensagens?antes_de={id_da_mais_antiga}.
+    """
     conversa = db.query(Conversa).filter(
         Conversa.id == conversa_id,
         Conversa.cliente_id == current_user["cliente_id"]
@@ -266,11 +310,16 @@ async def get_conversa(
     if not conversa:
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
 
-    # Marcar mensagens como lidas
-    ConversaService.marcar_mensagens_como_lidas(db, conversa_id)
+    # Buscar página mais recente de mensagens
+    limit = max(1, min(limit, 200))
+    mensagens, tem_mais_antigas = ConversaService.buscar_mensagens(db, conversa_id, limit=limit)
+
+    # Serializar antes de marcar como lidas (estado visto pelo atendente)
+    mensagens_dict = [_mensagem_to_dict(m) for m in mensagens]
 
-    # Buscar mensagens
-    mensagens = ConversaService.buscar_mensagens(db, conversa_id)
+    # Marcar como lidas apenas as mensagens visíveis
+    _marcar_pagina_como_lida(db, conversa_id, mensagens)
+    db.refresh(conversa)
 
     # Enriquecer paciente_nome se NULL
     paciente_nome = conversa.paciente_nome
@@ -291,24 +340,58 @@ async def get_conversa(
         "atendente_id": conversa.atendente_id,
         "ultima_mensagem_at": conversa.ultima_mensagem_at,
         "criado_em": conversa.criado_em,
-        "nao_lidas": 0,  # Acabamos de marcar como lidas
+        "nao_lidas": conversa.nao_lidas or 0,  # Restantes fora da página exibida
         # Campos de urgência
         "urgencia_nivel": conversa.urgencia_nivel.value if conversa.urgencia_nivel else "normal",
         "urgencia_motivo": conversa.urgencia_motivo,
         "urgencia_resolvida": conversa.urgencia_resolvida if conversa.urgencia_resolvida is not None else True,
-        "mensagens": [
-            {
-                "id": m.id,
-                "direcao": m.direcao.value,
-                "remetente": m.remetente.value,
-                "tipo": m.tipo.value,
-                "conteudo": m.conteudo,
-                "midia_url": m.midia_url,
-                "timestamp": converter_para_brasil(m.timestamp),
-                "lida": m.lida
-            }
-            for m in mensagens
-        ]
+        "mensagens": mensagens_dict,
+        "tem_mais_antigas": tem_mais_antigas
+    }
+
+
+@router.get("/{conversa_id}/mensagens", response_model=MensagensPaginaResponse)
+async def listar_mensagens(
+    conversa_id: int,
+    antes_de: Optional[int] = None,
+    depois_de: Optional[int] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Página de mensagens de uma conversa (paginação por cursor).
+
+    - antes_de={id}: mensagens anteriores (histórico, rolagem para cima)
+    - depois_de={id}: mensagens posteriores (sincronização)
+    - sem parâmetros: mensagens mais recentes
+
+    Apenas as mensagens retornadas são marcadas como lidas.
+    """
+    if antes_de and depois_de:
+        raise HTTPException(status_code=400, detail="Informe apenas antes_de ou depois_de")
+
+    conversa = db.query(Conversa).filter(
+        Conversa.id == conversa_id,
+        Conversa.cliente_id == current_user["cliente_id"]
+    ).first()
+
+    if not conversa:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+
+    limit = max(1, min(limit, 200))
+    mensagens, tem_mais = ConversaService.buscar_mensagens(
+        db, conversa_id, limit=limit, antes_de=antes_de, depois_de=depois_de
+    )
+
+    mensagens_dict = [_mensagem_to_dict(m) for m in mensagens]
+    _marcar_pagina_como_lida(db, conversa_id, mensagens)
+    db.refresh(conversa)
+
+    return {
+        "mensagens": mensagens_dict,
+        "tem_mais": tem_mais,
+        "nao_lidas": conversa.nao_lidas or 0
     }
 
 
@@ -359,8 +442,8 @@ async def enviar_mensagem(
         pass
 
     # Enviar via WhatsApp (API Oficial Meta)
-    from app.services.whatsapp_official_service import WhatsAppOfficialService
-    whatsapp = WhatsAppOfficialService()
+    from app.services.registry import get_whatsapp_service
+    whatsapp = get_whatsapp_service()
 
     try:
         if request.template_name:
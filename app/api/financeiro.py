@@ -7,7 +7,6 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import text
 from datetime import datetime, timedelta, date
 from typing import Optional, List, Dict, Any
-from decimal import Decimal
 import logging
 import bcrypt
 import jwt
@@ -15,6 +14,13 @@ import os
 
 from app.database import get_db
 from sqlalchemy.orm import Session
+from app.services import metricas_financeiras_service
+from app.services.metricas_financeiras_service import (
+    CUSTO_VPS, CUSTO_DOMINIO, CUSTO_EMAIL, CUSTO_INFRAESTRUTURA,
+    CUSTO_WHATSAPP_API, CUSTO_CLAUDE_HAIKU, CUSTO_GATEWAY_PAGAMENTO,
+    CUSTO_SIMPLES_NACIONAL, CUSTO_VARIAVEL_CLIENTE,
+)
+from app.services import simulador_tributario_service as simulador
 
 router = APIRouter(prefix="/api/financeiro", tags=["Financeiro"])
 logger = logging.getLogger(__name__)
@@ -213,121 +219,28 @@ async def get_metricas_gerais(
     - Base do plano + profissionais adicionais + serviços extras
     """
     try:
-        # Total de clientes ativos (excluir demo)
-        result_clientes_ativos = db.execute(
-            text("SELECT COUNT(*) FROM clientes WHERE ativo = true AND is_demo = false")
-        ).scalar()
-
-        # Total de clientes inativos (excluir demo)
-        result_clientes_inativos = db.execute(
-            text("SELECT COUNT(*) FROM clientes WHERE ativo = false AND is_demo = false")
-        ).scalar()
-
-        # Total de médicos ativos (excluir demo)
-        result_medicos = db.execute(
-            text("""
-                SELECT COUNT(*) FROM medicos m
-                JOIN clientes c ON m.cliente_id = c.id
-                WHERE m.ativo = true AND c.is_demo = false
-            """)
-        ).scalar()
-
-        # Total de agendamentos este mês - excluir cancelado, remarcado, faltou e demo
-        result_agendamentos_mes = db.execute(
-            text("""
-                SELECT COUNT(*) FROM agendamentos a
-                WHERE EXTRACT(MONTH FROM a.data_hora) = EXTRACT(MONTH FROM CURRENT_DATE)
-                AND EXTRACT(YEAR FROM a.data_hora) = EXTRACT(YEAR FROM CURRENT_DATE)
-                AND a.status NOT IN ('cancelado', 'remarcado', 'faltou')
-                AND a.medico_id NOT IN (
-                    SELECT m.id FROM medicos m
-                    JOIN clientes c ON m.cliente_id = c.id
-                    WHERE c.is_demo = true
-                )
-            """)
-        ).scalar()
-
-        # Novos clientes últimos 7 dias (excluir demo)
-        result_novos_clientes = db.execute(
-            text("""
-                SELECT COUNT(*) FROM clientes
-                WHERE criado_em >= CURRENT_DATE - INTERVAL '7 days'
-                AND is_demo = false
-            """)
-        ).scalar()
-
-        clientes_ativos = result_clientes_ativos or 0
-        medicos_ativos = result_medicos or 0
-
-        # ============ MRR BASEADO EM ASSINATURAS ============
-        # Buscar assinaturas ativas com dados do plano (excluir demo)
-        result_assinaturas = db.execute(
-            text("""
-                SELECT
-                    a.id,
-                    a.valor_mensal,
-                    a.valor_profissional_adicional,
-                    a.profissionais_contratados,
-                    a.numero_virtual_salvy,
-                    a.valor_numero_virtual,
-                    p.profissionais_inclusos
-                FROM assinaturas a
-                JOIN planos p ON p.id = a.plano_id
-                WHERE a.status = 'ativa'
-                AND a.data_fim IS NULL
-                AND a.cliente_id NOT IN (SELECT id FROM clientes WHERE is_demo = true)
-            """)
-        ).fetchall()
-
-        mrr_base = Decimal('0')
-        mrr_adicionais = Decimal('0')
-        mrr_servicos = Decimal('0')
-        total_profissionais_adicionais = 0
-
-        for assinatura in result_assinaturas:
-            valor_mensal = Decimal(str(assinatura[1] or 0))
-            valor_prof_adicional = Decimal(str(assinatura[2] or 50))
-            profissionais_contratados = assinatura[3] or 1
-            numero_virtual = assinatura[4] or False
-            valor_numero_virtual = Decimal(str(assinatura[5] or 40))
-            profissionais_inclusos = assinatura[6] or 1
-
-            # Base do plano
-            mrr_base += valor_mensal
-
-            # Profissionais adicionais
-            adicionais = max(0, profissionais_contratados - profissionais_inclusos)
-            mrr_adicionais += adicionais * valor_prof_adicional
-            total_profissionais_adicionais += adicionais
-
-            # Serviços extras (número virtual)
-            if numero_virtual:
-                mrr_servicos += valor_numero_virtual
-
-        mrr = mrr_base + mrr_adicionais + mrr_servicos
-        assinaturas_ativas = len(result_assinaturas)
-
-        # Ticket médio por assinatura
-        ticket_medio = float(mrr) / assinaturas_ativas if assinaturas_ativas > 0 else 0
+        resumo = metricas_financeiras_service.obter_resumo(db)
+        clientes_ativos = resumo["clientes_ativos"]
+        clientes_inativos = resumo["clientes_inativos"]
 
         return {
             "success": True,
             "data": {
                 "clientes_ativos": clientes_ativos,
-                "clientes_inativos": result_clientes_inativos or 0,
-                "total_clientes": clientes_ativos + (result_clientes_inativos or 0),
-                "total_medicos": medicos_ativos,
-                "agendamentos_mes": result_agendamentos_mes or 0,
-                "novos_clientes_7dias": result_novos_clientes or 0,
-                "assinaturas_ativas": assinaturas_ativas,
-                "mrr": round(float(mrr), 2),
+                "clientes_inativos": clientes_inativos,
+                "total_clientes": clientes_ativos + clientes_inativos,
+                "total_medicos": resumo["medicos_ativos"],
+                "agendamentos_mes": resumo["agendamentos_mes"],
+                "novos_clientes_7dias": resumo["novos_clientes_7dias"],
+                "assinaturas_ativas": resumo["assinaturas_ativas"],
+                "mrr": round(resumo["mrr"], 2),
                 "mrr_detalhes": {
-                    "base": round(float(mrr_base), 2),
-                    "adicionais": round(float(mrr_adicionais), 2),
-                    "servicos": round(float(mrr_servicos), 2),
-                    "profissionais_adicionais": total_profissionais_adicionais
+                    "base": round(resumo["mrr_base"], 2),
+                    "adicionais": round(resumo["mrr_adicionais"], 2),
+                    "servicos": round(resumo["mrr_servicos"], 2),
+                    "profissionais_adicionais": resumo["profissionais_adicionais"]
                 },
-                "ticket_medio": round(ticket_medio, 2)
+                "ticket_medio": round(resumo["ticket_medio"], 2)
             }
         }
 
@@ -417,134 +330,24 @@ async def get_custos_operacionais(
     - Custos variáveis por cliente: R$ 19,49
     """
     try:
-        # Total de clientes ativos (base para cálculo de custos, excluir demo)
-        result_clientes = db.execute(
-            text("SELECT COUNT(*) FROM clientes WHERE ativo = true AND is_demo = false")
-        ).scalar()
-        total_clientes = result_clientes or 0
-
-        # Total de médicos ativos (excluir demo)
-        result_medicos = db.execute(
-            text("""
-                SELECT COUNT(*) FROM medicos m
-                JOIN clientes c ON m.cliente_id = c.id
-                WHERE m.ativo = true AND c.is_demo = false
-            """)
-        ).scalar()
-        total_medicos = result_medicos or 0
-
-        # ============ CUSTOS FIXOS (Plano de Negócios) ============
-        # Infraestrutura mensal
-        CUSTO_VPS = 160.00          # VPS Hostinger
-        CUSTO_DOMINIO = 5.42        # Domínio .com.br (R$ 65/ano ÷ 12)
-        CUSTO_EMAIL = 7.99          # E-mail profissional Hostinger
-        CUSTO_INFRAESTRUTURA = CUSTO_VPS + CUSTO_DOMINIO + CUSTO_EMAIL  # R$ 173,41
-
-        # ============ CUSTOS VARIÁVEIS POR CLIENTE ============
-        # Conforme Plano de Negócios v1.1
-        CUSTO_WHATSAPP_API = 4.00       # ~80 lembretes utility × R$ 0,05
-        CUSTO_CLAUDE_HAIKU = 0.50       # ~385 chamadas × R$ 0,0012
-        CUSTO_GATEWAY_PAGAMENTO = 5.99  # PagSeguro 3,99% sobre R$ 150
-        CUSTO_SIMPLES_NACIONAL = 9.00   # 6% sobre R$ 150
-        CUSTO_VARIAVEL_CLIENTE = CUSTO_WHATSAPP_API + CUSTO_CLAUDE_HAIKU + CUSTO_GATEWAY_PAGAMENTO + CUSTO_SIMPLES_NACIONAL  # R$ 19,49
-
-        # Total de custos variáveis
-        custo_variaveis_total = total_clientes * CUSTO_VARIAVEL_CLIENTE
-        custo_ia_total = total_clientes * CUSTO_CLAUDE_HAIKU
-
-        # ============ DESPESAS CADASTRADAS ============
-        # Buscar despesas cadastradas (fixas recorrentes)
-        # Considera periodicidade: anuais são divididas por 12
-        result_despesas_fixas = db.execute(
-            text("""
-                SELECT
-                    COALESCE(SUM(
-                        CASE
-                            WHEN periodicidade = 'anual' THEN valor / 12
-                            ELSE valor
-                        END
-                    ), 0) as total
-                FROM despesas
-                WHERE categoria = 'fixa'
-                AND recorrente = true
-                AND status != 'cancelado'
-            """)
-        ).scalar()
-
-        # Buscar despesas variáveis do mês atual
-        result_despesas_variaveis = db.execute(
-            text("""
-                SELECT COALESCE(SUM(valor), 0) as total
-                FROM despesas
-                WHERE categoria = 'variavel'
-                AND status != 'cancelado'
-                AND EXTRACT(MONTH FROM data_vencimento) = EXTRACT(MONTH FROM CURRENT_DATE)
-                AND EXTRACT(YEAR FROM data_vencimento) = EXTRACT(YEAR FROM CURRENT_DATE)
-            """)
-        ).scalar()
-
-        despesas_fixas_cadastradas = float(result_despesas_fixas or 0)
-        despesas_variaveis_cadastradas = float(result_despesas_variaveis or 0)
-        despesas_total = despesas_fixas_cadastradas + despesas_variaveis_cadastradas
-
-        # ============ CUSTO TOTAL ============
-        custo_fixo_total = CUSTO_INFRAESTRUTURA + despesas_fixas_cadastradas
-        custo_total = custo_fixo_total + custo_variaveis_total + despesas_variaveis_cadastradas
-
-        # ============ RECEITA BASEADA EM ASSINATURAS ============
-        # Buscar assinaturas ativas e calcular MRR real (excluir demo)
-        result_assinaturas = db.execute(
-            text("""
-                SELECT
-                    a.valor_mensal,
-                    a.valor_profissional_adicional,
-                    a.profissionais_contratados,
-                    a.numero_virtual_salvy,
-                    a.valor_numero_virtual,
-                    p.profissionais_inclusos
-                FROM assinaturas a
-                JOIN planos p ON p.id = a.plano_id
-                WHERE a.status = 'ativa'
-                AND a.data_fim IS NULL
-                AND a.cliente_id NOT IN (SELECT id FROM clientes WHERE is_demo = true)
-            """)
-        ).fetchall()
-
-        receita = Decimal('0')
-        for assinatura in result_assinaturas:
-            valor_mensal = Decimal(str(assinatura[0] or 0))
-            valor_prof_adicional = Decimal(str(assinatura[1] or 50))
-            profissionais_contratados = assinatura[2] or 1
-            numero_virtual = assinatura[3] or False
-            valor_numero_virtual = Decimal(str(assinatura[4] or 40))
-            profissionais_inclusos = assinatura[5] or 1
-
-            receita += valor_mensal
-            adicionais = max(0, profissionais_contratados - profissionais_inclusos)
-            receita += adicionais * valor_prof_adicional
-            if numero_virtual:
-                receita += valor_numero_virtual
+        resumo = metricas_financeiras_service.obter_resumo(db)
+        custos = metricas_financeiras_service.calcular_custos(resumo)
 
-        assinaturas_ativas = len(result_assinaturas)
-        receita_por_assinatura = float(receita) / assinaturas_ativas if assinaturas_ativas > 0 else 0
-
-        # ============ MARGEM E LUCRO ============
-        margem_por_cliente = receita_por_assinatura - CUSTO_VARIAVEL_CLIENTE
-        lucro = float(receita) - custo_total
-        margem_percentual = (margem_por_cliente / receita_por_assinatura * 100) if receita_por_assinatura > 0 else 0
-
-        # Break-even: quantos clientes para cobrir custos fixos
-        break_even = int((custo_fixo_total / margem_por_cliente) + 1) if margem_por_cliente > 0 else 0
+        total_clientes = resumo["clientes_ativos"]
+        despesas_fixas_cadastradas = resumo["despesas_fixas"]
+        despesas_variaveis_cadastradas = resumo["despesas_variaveis"]
+        assinaturas_ativas = resumo["assinaturas_ativas"]
+        break_even = custos["break_even"]
 
         return {
             "success": True,
             "data": {
                 "total_clientes": total_clientes,
-                "total_medicos": total_medicos,
+                "total_medicos": resumo["medicos_ativos"],
                 "custos": {
                     "ia_claude": {
                         "por_cliente": CUSTO_CLAUDE_HAIKU,
-                        "total": round(custo_ia_total, 2),
+                        "total": round(custos["custo_ia_total"], 2),
                         "modelo": "Claude Haiku",
                         "chamadas_estimadas": 385
                     },
@@ -560,26 +363,26 @@ async def get_custos_operacionais(
                         "gateway_pagamento": CUSTO_GATEWAY_PAGAMENTO,
                         "simples_nacional": CUSTO_SIMPLES_NACIONAL,
                         "total_por_cliente": CUSTO_VARIAVEL_CLIENTE,
-                        "total": round(custo_variaveis_total, 2)
+                        "total": round(custos["custo_variaveis_total"], 2)
                     },
                     "despesas_cadastradas": {
                         "fixas": despesas_fixas_cadastradas,
                         "variaveis": despesas_variaveis_cadastradas,
-                        "total": despesas_total
+                        "total": despesas_fixas_cadastradas + despesas_variaveis_cadastradas
                     },
-                    "custos_fixos_total": round(custo_fixo_total, 2),
-                    "custos_variaveis_total": round(custo_variaveis_total + despesas_variaveis_cadastradas, 2),
-                    "total_mensal": round(custo_total, 2)
+                    "custos_fixos_total": round(custos["custo_fixo_total"], 2),
+                    "custos_variaveis_total": round(custos["custo_variaveis_total"] + despesas_variaveis_cadastradas, 2),
+                    "total_mensal": round(custos["custo_total"], 2)
                 },
                 "receita": {
-                    "mrr": round(float(receita), 2),
-                    "por_assinatura": round(receita_por_assinatura, 2),
+                    "mrr": round(resumo["mrr"], 2),
+                    "por_assinatura": round(resumo["ticket_medio"], 2),
                     "assinaturas_ativas": assinaturas_ativas
                 },
                 "lucro": {
-                    "mensal": round(lucro, 2),
-                    "margem_por_cliente": round(margem_por_cliente, 2),
-                    "margem_percentual": round(margem_percentual, 2)
+                    "mensal": round(custos["lucro"], 2),
+                    "margem_por_cliente": round(custos["margem_por_cliente"], 2),
+                    "margem_percentual": round(custos["margem_percentual"], 2)
                 },
                 "analise": {
                     "break_even_assinaturas": break_even,
@@ -597,6 +400,31 @@ async def get_custos_operacionais(
         )
 
 
+@router.get("/dashboard/historico")
+async def get_historico_metricas(
+    meses: int = 12,
+    current_user: Dict = Depends(get_current_financeiro),
+    db: Session = Depends(get_db)
+):
+    """Retorna a série mensal de MRR, assinaturas, custos e lucro (snapshots gravados pelo scheduler)"""
+    try:
+        meses = min(max(meses, 1), 60)
+        historico = metricas_financeiras_service.listar_historico(db, meses)
+
+        return {
+            "success": True,
+            "data": historico,
+            "total": len(historico)
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar histórico de métricas: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao buscar histórico de métricas"
+        )
+
+
 @router.get("/relatorios/faturamento")
 async def get_relatorio_faturamento(
     mes: Optional[int] = None,
@@ -810,6 +638,7 @@ async def criar_despesa(
 
         despesa_id = result.fetchone()[0]
         db.commit()
+        simulador.invalidar_custos_fixos()
 
         logger.info(f"Despesa criada: ID {despesa_id} por {current_user['email']}")
 
@@ -870,6 +699,7 @@ async def atualizar_despesa(
         query = f"UPDATE despesas SET {', '.join(updates)} WHERE id = :id"
         db.execute(text(query), params)
         db.commit()
+        simulador.invalidar_custos_fixos()
 
         logger.info(f"Despesa {despesa_id} atualizada por {current_user['email']}")
 
@@ -908,6 +738,7 @@ async def deletar_despesa(
 
         db.execute(text("DELETE FROM despesas WHERE id = :id"), {"id": despesa_id})
         db.commit()
+        simulador.invalidar_custos_fixos()
 
         logger.info(f"Despesa {despesa_id} deletada por {current_user['email']}")
 
@@ -1069,33 +900,15 @@ def calcular_irrf(base: float) -> dict:
     - De R$ 3.751,06 até R$ 4.664,68: 22,5% - R$ 675,49
     - Acima de R$ 4.664,68: 27,5% - R$ 908,73
     """
-    faixas = [
-        (2428.80, 0, 0, "Isento"),
-        (2826.65, 0.075, 182.16, "7,5%"),
-        (3751.05, 0.15, 394.16, "15%"),
-        (4664.68, 0.225, 675.49, "22,5%"),
-        (float('inf'), 0.275, 908.73, "27,5%")
-    ]
-
-    for limite, aliquota, deducao, faixa_nome in faixas:
-        if base <= limite:
-            if aliquota == 0:
-                return {
-                    "valor": 0,
-                    "aliquota_efetiva": 0,
-                    "faixa": faixa_nome,
-                    "base_calculo": round(base, 2)
-                }
-            valor = (base * aliquota) - deducao
-            aliquota_efetiva = (valor / base) * 100 if base > 0 else 0
-            return {
-                "valor": round(max(0, valor), 2),
-                "aliquota_efetiva": round(aliquota_efetiva, 2),
-                "faixa": faixa_nome,
-                "base_calculo": round(base, 2)
-            }
+    return simulador.calcular_irrf(base)
 
-    return {"valor": 0, "aliquota_efetiva": 0, "faixa": "Erro", "base_calculo": base}
+
+def _validar_pontos(total: int):
+    if total > simulador.MAX_PONTOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Simulação com {total} pontos excede o limite de {simulador.MAX_PONTOS}"
+        )
 
 
 @router.get("/simulador/fator-r")
@@ -1118,57 +931,41 @@ async def simular_fator_r(
     - pro_labore: Valor do pró-labore (opcional - se não informado, calcula ideal)
     """
     try:
-        SALARIO_MINIMO = 1518.00
-        ALIQUOTA_INSS = 0.11
-
-        # Se não informou pró-labore, sugerir o mínimo para Anexo III
-        if pro_labore is None:
-            pro_labore_sugerido = receita_mensal * 0.28
-            pro_labore = max(pro_labore_sugerido, SALARIO_MINIMO)
-
-        # Garantir mínimo de 1 SM
-        pro_labore = max(pro_labore, SALARIO_MINIMO)
-
-        # Calcular Fator R
-        fator_r = (pro_labore / receita_mensal) * 100 if receita_mensal > 0 else 0
+        SALARIO_MINIMO = simulador.SALARIO_MINIMO
+
+        # Um único ponto: 1 "cliente" com ticket = receita informada
+        r = simulador.avaliar([1], [receita_mensal], [pro_labore])
+        pro_labore = r["pro_labore"][0]
+        fator_r = r["fator_r"][0]
+        anexo = r["anexo"][0]
+        aliquota_simples = r["aliquota_das"][0] * 100
+        inss = r["inss"][0]
+        base_irrf = r["base_irrf"][0]
+        irrf_calculo = calcular_irrf(base_irrf)
+        das = r["das"][0]
 
-        # Determinar anexo
-        if fator_r >= 28:
-            anexo = "III"
-            aliquota_simples = 6.0
+        if anexo == "III":
             descricao = "Tributação favorável - Serviços tributados como indústria"
         else:
-            anexo = "V"
-            aliquota_simples = 15.5
             descricao = "Tributação desfavorável - Serviços profissionais"
 
-        # Calcular INSS
-        inss = pro_labore * ALIQUOTA_INSS
-
-        # Calcular IRRF (base = pró-labore - INSS)
-        base_irrf = pro_labore - inss
-        irrf_calculo = calcular_irrf(base_irrf)
-
-        # Calcular DAS (Simples Nacional)
-        das = receita_mensal * (aliquota_simples / 100)
-
         # Totais
         total_tributos = inss + irrf_calculo['valor'] + das
         liquido_socio = pro_labore - inss - irrf_calculo['valor']
 
         # Comparativo com outro anexo
         if anexo == "III":
-            das_outro = receita_mensal * 0.155
+            das_outro = receita_mensal * simulador.ALIQUOTA_DAS_V
             economia = das_outro - das
             mensagem_economia = f"Você está economizando R$ {economia:.2f}/mês com Anexo III"
         else:
             pro_labore_ideal = receita_mensal * 0.28
-            das_anexo_iii = receita_mensal * 0.06
+            das_anexo_iii = receita_mensal * simulador.ALIQUOTA_DAS_III
             economia_potencial = das - das_anexo_iii
             mensagem_economia = f"Aumente pró-labore para R$ {pro_labore_ideal:.2f} para economizar R$ {economia_potencial:.2f}/mês"
 
         # Pro-labore ideal para Anexo III
-        pro_labore_ideal_anexo_iii = max(receita_mensal * 0.28, SALARIO_MINIMO)
+        pro_labore_ideal_anexo_iii = simulador.pro_labore_anexo_iii([receita_mensal])[0]
 
         return {
             "success": True,
@@ -1178,8 +975,8 @@ async def simular_fator_r(
             },
             "fator_r": {
                 "valor": round(fator_r, 2),
-                "minimo_anexo_iii": 28.0,
-                "status": "OK" if fator_r >= 28 else "ATENÇÃO"
+                "minimo_anexo_iii": simulador.FATOR_R_MINIMO,
+                "status": "OK" if fator_r >= simulador.FATOR_R_MINIMO else "ATENÇÃO"
             },
             "enquadramento": {
                 "anexo": anexo,
@@ -1242,54 +1039,32 @@ async def simular_cenarios_crescimento(
     - Pró-labore ideal para Anexo III
     - Tributos em cada cenário
     - Lucro líquido
+
+    Todos os cenários são avaliados em uma passada (aceita passo = 1).
     """
     try:
-        SALARIO_MINIMO = 1518.00
-        ALIQUOTA_INSS = 0.11
-        CUSTO_VARIAVEL_CLIENTE = 19.49
+        clientes = list(range(clientes_inicial, clientes_final + 1, max(passo, 1)))
+        _validar_pontos(len(clientes))
 
-        # Buscar custos fixos
-        result_despesas = db.execute(
-            text("""
-                SELECT COALESCE(SUM(
-                    CASE WHEN periodicidade = 'anual' THEN valor / 12 ELSE valor END
-                ), 0)
-                FROM despesas
-                WHERE categoria = 'fixa' AND recorrente = true AND status != 'cancelado'
-            """)
-        ).scalar()
+        custos_fixos_total = simulador.obter_custos_fixos(db)
 
-        custos_fixos_cadastrados = float(result_despesas or 0)
-        custos_infra = 173.41  # VPS + Domínio + Email
-        custos_fixos_total = custos_infra + custos_fixos_cadastrados
+        # Pro-labore ideal para Anexo III (DAS 6%) em todos os cenários
+        r = simulador.avaliar(clientes, [ticket_medio] * len(clientes), [None] * len(clientes), anexo="III")
 
         cenarios = []
+        break_even = None
 
-        for num_clientes in range(clientes_inicial, clientes_final + 1, passo):
-            mrr = num_clientes * ticket_medio
-            custos_variaveis = num_clientes * CUSTO_VARIAVEL_CLIENTE
-
-            # Pro-labore ideal para Anexo III
-            pro_labore_ideal = max(mrr * 0.28, SALARIO_MINIMO)
-
-            # INSS
-            inss = pro_labore_ideal * ALIQUOTA_INSS
-
-            # IRRF
-            base_irrf = pro_labore_ideal - inss
-            irrf_calc = calcular_irrf(base_irrf)
-
-            # DAS (Anexo III = 6%)
-            das = mrr * 0.06
-
-            # Totais
-            total_tributos = inss + irrf_calc['valor'] + das
+        for i, num_clientes in enumerate(clientes):
+            mrr = r["receita"][i]
+            custos_variaveis = r["custos_variaveis"][i]
+            total_tributos = r["tributos"][i]
             custo_total = custos_fixos_total + custos_variaveis + total_tributos
             lucro_liquido = mrr - custo_total
-
-            # Margem líquida
             margem_liquida = (lucro_liquido / mrr) * 100 if mrr > 0 else 0
 
+            if break_even is None and round(lucro_liquido, 2) > 0:
+                break_even = num_clientes
+
             cenarios.append({
                 "clientes": num_clientes,
                 "mrr": round(mrr, 2),
@@ -1300,10 +1075,10 @@ async def simular_cenarios_crescimento(
                     "total": round(custo_total, 2)
                 },
                 "tributacao": {
-                    "pro_labore_ideal": round(pro_labore_ideal, 2),
-                    "inss": round(inss, 2),
-                    "irrf": round(irrf_calc['valor'], 2),
-                    "das": round(das, 2),
+                    "pro_labore_ideal": round(r["pro_labore"][i], 2),
+                    "inss": round(r["inss"][i], 2),
+                    "irrf": round(r["irrf"][i], 2),
+                    "das": round(r["das"][i], 2),
                     "anexo": "III"
                 },
                 "resultado": {
@@ -1312,13 +1087,6 @@ async def simular_cenarios_crescimento(
                 }
             })
 
-        # Encontrar break-even
-        break_even = None
-        for c in cenarios:
-            if c['resultado']['lucro_liquido'] > 0:
-                break_even = c['clientes']
-                break
-
         return {
             "success": True,
             "parametros": {
@@ -1333,6 +1101,8 @@ async def simular_cenarios_crescimento(
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao simular cenários: {str(e)}")
         raise HTTPException(
@@ -1345,6 +1115,7 @@ async def simular_cenarios_crescimento(
 async def simular_equilibrio_tributario(
     ticket_medio: float = 150.00,
     clientes_max: int = 200,
+    passo: int = 5,
     current_user: Dict = Depends(get_current_financeiro),
     db: Session = Depends(get_db)
 ):
@@ -1356,66 +1127,44 @@ async def simular_equilibrio_tributario(
     - Anexo V: Pró-labore = Salário Mínimo (Fator R baixo, DAS 15,5%)
 
     Identifica o ponto de equilíbrio onde um se torna mais vantajoso que o outro.
+    Com passo = 1 o ponto de equilíbrio é exato (cliente a cliente).
     """
     try:
-        SALARIO_MINIMO = 1518.00
-        ALIQUOTA_INSS = 0.11
-        ALIQUOTA_DAS_III = 0.06
-        ALIQUOTA_DAS_V = 0.155
-        CUSTO_VARIAVEL_CLIENTE = 19.49
-
-        # Buscar custos fixos
-        result_despesas = db.execute(
-            text("""
-                SELECT COALESCE(SUM(
-                    CASE WHEN periodicidade = 'anual' THEN valor / 12 ELSE valor END
-                ), 0)
-                FROM despesas
-                WHERE categoria = 'fixa' AND recorrente = true AND status != 'cancelado'
-            """)
-        ).scalar()
+        SALARIO_MINIMO = simulador.SALARIO_MINIMO
+
+        passo = max(passo, 1)
+        clientes = list(range(passo, clientes_max + 1, passo))
+        _validar_pontos(2 * len(clientes))
 
-        custos_fixos_cadastrados = float(result_despesas or 0)
-        custos_infra = 173.41
-        custos_fixos_total = custos_infra + custos_fixos_cadastrados
+        custos_fixos_total = simulador.obter_custos_fixos(db)
+
+        n = len(clientes)
+        tickets = [ticket_medio] * n
+        r3 = simulador.avaliar(clientes, tickets, [None] * n, anexo="III")
+        r5 = simulador.avaliar(clientes, tickets, [SALARIO_MINIMO] * n, anexo="V")
 
         comparativos = []
         ponto_equilibrio = None
         ponto_equilibrio_lucro = None
 
-        for n_clientes in range(5, clientes_max + 1, 5):
-            receita = n_clientes * ticket_medio
-            custos_variaveis = n_clientes * CUSTO_VARIAVEL_CLIENTE
+        for i, n_clientes in enumerate(clientes):
+            receita = r3["receita"][i]
+            custos_variaveis = r3["custos_variaveis"][i]
 
             # ============ CENÁRIO ANEXO III ============
             # Pró-labore = 28% da receita (mínimo 1 SM)
-            pro_labore_iii = max(receita * 0.28, SALARIO_MINIMO)
-            fator_r_iii = (pro_labore_iii / receita) * 100
-
-            inss_iii = pro_labore_iii * ALIQUOTA_INSS
-            irrf_iii = calcular_irrf(pro_labore_iii - inss_iii)['valor']
-            das_iii = receita * ALIQUOTA_DAS_III
-
+            pro_labore_iii, inss_iii, das_iii = r3["pro_labore"][i], r3["inss"][i], r3["das"][i]
             custo_total_iii = custos_fixos_total + custos_variaveis + inss_iii + das_iii + pro_labore_iii
             lucro_iii = receita - custo_total_iii
-            liquido_socio_iii = pro_labore_iii - inss_iii - irrf_iii
 
             # ============ CENÁRIO ANEXO V ============
             # Pró-labore = Salário Mínimo
-            pro_labore_v = SALARIO_MINIMO
-            fator_r_v = (pro_labore_v / receita) * 100
-
-            inss_v = pro_labore_v * ALIQUOTA_INSS
-            irrf_v = calcular_irrf(pro_labore_v - inss_v)['valor']
-            das_v = receita * ALIQUOTA_DAS_V
-
+            pro_labore_v, inss_v, das_v = r5["pro_labore"][i], r5["inss"][i], r5["das"][i]
             custo_total_v = custos_fixos_total + custos_variaveis + inss_v + das_v + pro_labore_v
             lucro_v = receita - custo_total_v
-            liquido_socio_v = pro_labore_v - inss_v - irrf_v
 
             # ============ COMPARAÇÃO ============
             diferenca_lucro = lucro_v - lucro_iii
-            diferenca_liquido_socio = liquido_socio_iii - liquido_socio_v
             melhor_opcao = "Anexo III" if lucro_iii >= lucro_v else "Anexo V"
 
             # Identificar ponto de equilíbrio (quando Anexo V passa a ser melhor)
@@ -1434,23 +1183,23 @@ async def simular_equilibrio_tributario(
                 "receita": round(receita, 2),
                 "anexo_iii": {
                     "pro_labore": round(pro_labore_iii, 2),
-                    "fator_r": round(fator_r_iii, 1),
+                    "fator_r": round(r3["fator_r"][i], 1),
                     "inss": round(inss_iii, 2),
-                    "irrf": round(irrf_iii, 2),
+                    "irrf": round(r3["irrf"][i], 2),
                     "das": round(das_iii, 2),
                     "custo_total": round(custo_total_iii, 2),
                     "lucro": round(lucro_iii, 2),
-                    "liquido_socio": round(liquido_socio_iii, 2)
+                    "liquido_socio": round(r3["liquido_socio"][i], 2)
                 },
                 "anexo_v": {
                     "pro_labore": round(pro_labore_v, 2),
-                    "fator_r": round(fator_r_v, 1),
+                    "fator_r": round(r5["fator_r"][i], 1),
                     "inss": round(inss_v, 2),
-                    "irrf": round(irrf_v, 2),
+                    "irrf": round(r5["irrf"][i], 2),
                     "das": round(das_v, 2),
                     "custo_total": round(custo_total_v, 2),
                     "lucro": round(lucro_v, 2),
-                    "liquido_socio": round(liquido_socio_v, 2)
+                    "liquido_socio": round(r5["liquido_socio"][i], 2)
                 },
                 "comparacao": {
                     "melhor_opcao": melhor_opcao,
@@ -1469,16 +1218,6 @@ async def simular_equilibrio_tributario(
                 "ponto_equilibrio": None
             }
         else:
-            # Calcular economia anual se usar estratégia correta
-            economia_anual = 0
-            for c in comparativos:
-                if c['clientes'] < ponto_equilibrio:
-                    # Antes do equilíbrio, Anexo III é melhor
-                    pass
-                else:
-                    # Após equilíbrio, Anexo V é melhor
-                    economia_anual += c['comparacao']['diferenca_lucro']
-
             analise = {
                 "conclusao": f"A partir de {ponto_equilibrio} clientes (R$ {ponto_equilibrio * ticket_medio:,.0f}/mês), o Anexo V se torna mais vantajoso",
                 "recomendacao": f"Com menos de {ponto_equilibrio} clientes: use Anexo III (pró-labore 28%). Com {ponto_equilibrio}+ clientes: considere pró-labore mínimo.",
@@ -1507,6 +1246,8 @@ async def simular_equilibrio_tributario(
             ]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao simular equilíbrio tributário: {str(e)}")
         raise HTTPException(
@@ -1515,6 +1256,69 @@ async def simular_equilibrio_tributario(
         )
 
 
+@router.get("/simulador/grade")
+async def simular_grade(
+    clientes_inicial: int = 1,
+    clientes_final: int = 200,
+    passo_clientes: int = 1,
+    ticket_min: float = 150.00,
+    ticket_max: float = 150.00,
+    passo_ticket: float = 10.00,
+    pro_labore_min: Optional[float] = None,
+    pro_labore_max: Optional[float] = None,
+    passo_pro_labore: float = 500.00,
+    current_user: Dict = Depends(get_current_financeiro),
+    db: Session = Depends(get_db)
+):
+    """
+    Superfície de sensibilidade: clientes × ticket médio × pró-labore.
+
+    Sem pro_labore_min/max, cada ponto usa o pró-labore ideal para o Anexo III.
+    O enquadramento (III ou V) segue o Fator R de cada ponto.
+
+    Resposta em colunas (listas alinhadas por ponto), pronta para gráficos.
+    Lucro = receita - custos fixos - variáveis - pró-labore - INSS - DAS.
+    """
+    try:
+        clientes = list(range(clientes_inicial, clientes_final + 1, max(passo_clientes, 1)))
+        tickets = simulador.faixa(ticket_min, ticket_max, passo_ticket)
+        pro_labores = None
+        if pro_labore_min is not None:
+            pro_labores = simulador.faixa(
+                pro_labore_min,
+                pro_labore_max if pro_labore_max is not None else pro_labore_min,
+                passo_pro_labore
+            )
+        _validar_pontos(len(clientes) * len(tickets) * len(pro_labores or [None]))
+
+        custos_fixos_total = simulador.obter_custos_fixos(db)
+        pontos = simulador.grade(clientes, tickets, pro_labores, custos_fixos_total)
+
+        return {
+            "success": True,
+            "parametros": {
+                "custos_fixos": round(custos_fixos_total, 2),
+                "custo_variavel_cliente": CUSTO_VARIAVEL_CLIENTE,
+                "eixos": {
+                    "clientes": len(clientes),
+                    "tickets": len(tickets),
+                    "pro_labores": len(pro_labores) if pro_labores else "ideal_anexo_iii"
+                }
+            },
+            "total_pontos": len(pontos["clientes"]),
+            "pontos": pontos
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao simular grade: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao simular grade de cenários"
+        )
+
+
 @router.get("/alertas/fator-r")
 async def verificar_alerta_fator_r(
     current_user: Dict = Depends(get_current_financeiro),
@@ -1529,42 +1333,10 @@ async def verificar_alerta_fator_r(
     - CRÍTICO: Fator R < 25% (tributação desfavorável)
     """
     try:
-        SALARIO_MINIMO = 1518.00
-
-        # Calcular MRR atual das assinaturas (excluir demo)
-        result_assinaturas = db.execute(
-            text("""
-                SELECT
-                    a.valor_mensal,
-                    a.valor_profissional_adicional,
-                    a.profissionais_contratados,
-                    a.numero_virtual_salvy,
-                    a.valor_numero_virtual,
-                    p.profissionais_inclusos
-                FROM assinaturas a
-                JOIN planos p ON p.id = a.plano_id
-                WHERE a.status = 'ativa'
-                AND a.data_fim IS NULL
-                AND a.cliente_id NOT IN (SELECT id FROM clientes WHERE is_demo = true)
-            """)
-        ).fetchall()
+        SALARIO_MINIMO = simulador.SALARIO_MINIMO
 
-        mrr = Decimal('0')
-        for assinatura in result_assinaturas:
-            valor_mensal = Decimal(str(assinatura[0] or 0))
-            valor_prof_adicional = Decimal(str(assinatura[1] or 50))
-            profissionais_contratados = assinatura[2] or 1
-            numero_virtual = assinatura[3] or False
-            valor_numero_virtual = Decimal(str(assinatura[4] or 40))
-            profissionais_inclusos = assinatura[5] or 1
-
-            mrr += valor_mensal
-            adicionais = max(0, profissionais_contratados - profissionais_inclusos)
-            mrr += adicionais * valor_prof_adicional
-            if numero_virtual:
-                mrr += valor_numero_virtual
-
-        mrr = float(mrr)
+        # MRR atual das assinaturas (mesma regra do painel, sem demo)
+        mrr = metricas_financeiras_service.obter_mrr(db)
 
         # Se MRR = 0, não há o que calcular
         if mrr == 0:
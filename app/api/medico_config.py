@@ -11,6 +11,7 @@ from datetime import time, datetime
 from app.database import get_db
 from app.api.auth import get_current_user
 from app.utils.auth_middleware import AuthMiddleware
+from app.services.agenda_compilada_service import agenda_compilada_service
 
 router = APIRouter()
 
@@ -207,6 +208,7 @@ async def atualizar_configuracoes(
             db.execute(text(query), params)
 
         db.commit()
+        agenda_compilada_service.invalidar(medico_id)
 
         return {
             "sucesso": True,
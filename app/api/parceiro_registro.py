@@ -16,9 +16,7 @@ from app.database import get_db
 from app.services.email_service import get_email_service
 
 # Rate Limiting
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter(prefix="/api/parceiro", tags=["Registro Parceiro"])
 logger = logging.getLogger(__name__)
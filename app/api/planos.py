@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.database import get_db
 from app.api.admin import get_current_admin
+from app.services import metricas_financeiras_service
 from pydantic import BaseModel
 from typing import Optional, List
 from decimal import Decimal
@@ -444,38 +445,17 @@ def simular_assinatura(
 
 @router.get("/metricas/mrr")
 def calcular_mrr(admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    """Calcula MRR baseado em assinaturas ativas"""
+    """Calcula MRR baseado em assinaturas ativas (mesma regra do painel financeiro)"""
 
-    result = db.execute(text("""
-        SELECT a.cliente_id, p.codigo, a.valor_mensal, a.profissionais_contratados,
-               p.profissionais_inclusos, a.valor_profissional_adicional, a.numero_virtual_salvy
-        FROM assinaturas a
-        JOIN planos p ON a.plano_id = p.id
-        WHERE a.status = 'ativa'
-    """)).fetchall()
-
-    mrr_total = 0.0
-    detalhes = []
-
-    for a in result:
-        valor_total = calcular_valor_total_assinatura(
-            float(a[2]), a[3], a[4], float(a[5]), a[6]
-        )
-        mrr_total += valor_total
-        detalhes.append({
-            "cliente_id": a[0],
-            "plano": a[1],
-            "valor_mensal": valor_total,
-            "profissionais": a[3],
-            "numero_virtual": a[6]
-        })
+    detalhes = metricas_financeiras_service.listar_mrr_por_assinatura(db)
+    mrr_total = sum(d["valor_mensal"] for d in detalhes)
 
     return {
         "success": True,
         "data": {
             "mrr_total": round(mrr_total, 2),
-            "total_assinaturas_ativas": len(result),
-            "ticket_medio": round(mrr_total / len(result), 2) if result else 0,
+            "total_assinaturas_ativas": len(detalhes),
+            "ticket_medio": round(mrr_total / len(detalhes), 2) if detalhes else 0,
             "detalhes": detalhes
         }
     }
@@ -21,9 +21,7 @@ from app.services.email_service import get_email_service
 from app.api.admin import get_current_admin
 
 # Rate Limiting
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter(prefix="/api/v1", tags=["Pre-Cadastro"])
 logger = logging.getLogger(__name__)
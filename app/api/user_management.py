@@ -20,9 +20,7 @@ from app.api.auth import get_current_user
 from app.services.email_service import get_email_service
 
 # Rate Limiting - proteção contra abuso
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,9 +16,7 @@ from app.api.admin import get_current_admin
 from app.services.auditoria_service import get_auditoria_service
 from app.api.auth import _unified_login_logic
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from app.services.limite_taxa_service import limiter
 
 router = APIRouter(prefix="/api/interno/usuarios", tags=["Usuarios Internos"])
 logger = logging.getLogger(__name__)
@@ -4,27 +4,28 @@ Endpoint separado para facilitar migração gradual
 """
 
 import logging
+import os
 from fastapi import APIRouter, Request, HTTPException, Query, Depends
 from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.services.whatsapp_official_service import WhatsAppOfficialService
-from app.services.webhook.message_processor import process_message
+from app.database import get_db, get_async_db
+from app.services.registry import get_whatsapp_service
+from app.services.webhook.caixa_conversa import caixa_conversas
+from app.services.webhook.message_processor import registrar_entrada
+from app.services.webhook.tenant_resolver import resolver_cliente_id
+from app.services.limite_taxa_service import limiter
+from app.metricas import EtapasMensagem
 
 logger = logging.getLogger(__name__)
 
-# Rate Limiter para webhooks
-limiter = Limiter(key_func=get_remote_address)
+# Por IP de origem, somado entre os workers (IPs da Meta são isentos);
+# o teste de carga (scripts/carga_cenarios.py) envia tudo de um IP só
+WEBHOOK_RATE_LIMIT = os.getenv("WEBHOOK_RATE_LIMIT", "200/minute")
 
 router = APIRouter()
 
-# Instância do serviço (para endpoints de teste)
-whatsapp_service = WhatsAppOfficialService()
-
-
 @router.get("/webhook/whatsapp-official")
 async def verify_webhook(
     hub_mode: str = Query(None, alias="hub.mode"),
@@ -41,55 +42,82 @@ async def verify_webhook(
     """
 
     if hub_mode and hub_token:
-        result = whatsapp_service.verify_webhook_token(hub_mode, hub_token, hub_challenge)
+        result = get_whatsapp_service().verify_webhook_token(hub_mode, hub_token, hub_challenge)
 
         if result:
             # Log sem expor dados sensíveis
-            print(f"[Webhook Official] Verificação bem-sucedida!")
+            logger.info("[Webhook Official] Verificação bem-sucedida!")
             return PlainTextResponse(content=result)
         else:
             # SEGURANÇA: Não logar tokens - apenas indicar falha
-            print(f"[Webhook Official] Token de verificação inválido")
+            logger.warning("[Webhook Official] Token de verificação inválido")
             raise HTTPException(status_code=403, detail="Token de verificação inválido")
 
     raise HTTPException(status_code=400, detail="Parâmetros de verificação ausentes")
 
 
 @router.post("/webhook/whatsapp-official")
-@limiter.limit("200/minute")
-async def receive_webhook(request: Request, db: Session = Depends(get_db)):
+@limiter.limit(WEBHOOK_RATE_LIMIT)
+async def receive_webhook(
+    request: Request,
+    db: Session = Depends(get_db),
+    db_async: AsyncSession = Depends(get_async_db),
+):
     """
     Recebe webhooks de mensagens da Meta.
 
     Este endpoint processa mensagens recebidas do WhatsApp Business API Oficial.
     """
 
+    # Cronômetro da mensagem: recebimento -> resposta enviada (métricas por etapa)
+    etapas = EtapasMensagem()
+
     try:
         # Parse do body
-        webhook_data = await request.json()
+        with etapas.etapa("parse"):
+            webhook_data = await request.json()
 
-        print(f"[Webhook Official] Recebido: {webhook_data.get('object', 'unknown')}")
+        logger.debug("[Webhook Official] Recebido: %s", webhook_data.get('object', 'unknown'))
 
         # Verifica se é webhook válido
-        if not whatsapp_service.is_valid_webhook(webhook_data):
+        if not get_whatsapp_service().is_valid_webhook(webhook_data):
             # Retorna 200 mesmo para webhooks inválidos (exigência da Meta)
             return {"status": "ignored"}
 
         # Parse para formato padronizado
-        message = whatsapp_service.parse_webhook(webhook_data)
+        with etapas.etapa("parse"):
+            message = get_whatsapp_service().parse_webhook(webhook_data)
 
         if not message:
             return {"status": "no_message"}
 
-        print(f"[Webhook Official] Mensagem de {message.sender}: {message.text[:50]}...")
+        logger.info("[Webhook Official] Mensagem de %s: %s...", message.sender, (message.text or "")[:50])
+
+        # Tenant resolvido via asyncpg: mensagens de números desconhecidos
+        # são descartadas sem ocupar conexão do pool síncrono
+        with etapas.etapa("db"):
+            cliente_id = await resolver_cliente_id(message.phone_number_id, db_async)
+        if cliente_id is None:
+            logger.error(
+                "[Webhook Official] MENSAGEM IGNORADA: phone_number_id '%s' não pertence a nenhum cliente. "
+                "Remetente: %s.", message.phone_number_id, message.sender
+            )
+            return {"status": "ignored"}
+
+        # Mensagem do paciente salva antes do 200: se o processo cair antes do
+        # turno da IA, ela continua no PostgreSQL e no painel
+        conversa, foi_audio = await registrar_entrada(
+            message, db, cliente_id, etapas, get_whatsapp_service()
+        )
 
-        # Processa a mensagem
-        await process_message(message, db)
+        # Caixa da conversa: mensagens seguidas do mesmo paciente viram um só
+        # turno da IA, processado em segundo plano
+        caixa_conversas.entregar(message, cliente_id, etapas, conversa_id=conversa.id, foi_audio=foi_audio)
 
-        return {"status": "processed"}
+        return {"status": "queued"}
 
     except Exception as e:
-        print(f"[Webhook Official] Erro: {e}")
+        logger.exception("[Webhook Official] Erro: %s", e)
         # Sempre retorna 200 para a Meta não reenviar
         return {"status": "error", "message": str(e)}
 
@@ -100,7 +128,7 @@ async def receive_webhook(request: Request, db: Session = Depends(get_db)):
 async def get_status():
     """Verifica status da conexão com a API oficial."""
 
-    status = await whatsapp_service.get_connection_status()
+    status = await get_whatsapp_service().get_connection_status()
     return status
 
 
@@ -108,7 +136,7 @@ async def get_status():
 async def get_templates():
     """Lista templates disponíveis."""
 
-    templates = await whatsapp_service.get_templates()
+    templates = await get_whatsapp_service().get_templates()
     return {"templates": templates}
 
 
@@ -116,7 +144,7 @@ async def get_templates():
 async def send_test_message(to: str, message: str):
     """Envia mensagem de teste."""
 
-    result = await whatsapp_service.send_text(to=to, message=message)
+    result = await get_whatsapp_service().send_text(to=to, message=message)
     return {
         "success": result.success,
         "message_id": result.message_id,
@@ -131,7 +159,7 @@ async def test_template(to: str):
     Valida que a infraestrutura de templates está funcionando.
     """
 
-    result = await whatsapp_service.send_template(
+    result = await get_whatsapp_service().send_template(
         to=to,
         template_name="hello_world",
         language_code="en_US",
@@ -172,7 +200,7 @@ async def test_lembrete_24h(
         }
     ]
 
-    result = await whatsapp_service.send_template(
+    result = await get_whatsapp_service().send_template(
         to=to,
         template_name="lembrete_24h",
         language_code="pt_BR",
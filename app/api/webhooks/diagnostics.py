@@ -9,7 +9,7 @@ import os
 
 from app.database import get_db
 from app.services.anthropic_service import AnthropicService
-from app.services.conversation_manager import conversation_manager
+from app.services.registry import get_conversation_manager
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +72,7 @@ async def clear_conversation(phone: str, request: Request):
     """Limpa histórico de conversa de um número"""
     if not verify_webhook_auth(request):
         raise HTTPException(status_code=401, detail="Nao autorizado")
+    conversation_manager = get_conversation_manager()
     success = conversation_manager.clear_context(phone)
     if success:
         return {"status": "cleared", "phone": phone, "storage": "redis" if conversation_manager.redis_client else "memory"}
@@ -83,6 +84,7 @@ async def list_conversations(request: Request):
     """Lista todas as conversas ativas"""
     if not verify_webhook_auth(request):
         raise HTTPException(status_code=401, detail="Nao autorizado")
+    conversation_manager = get_conversation_manager()
     phones = conversation_manager.get_all_active_conversations()
     return {
         "status": "success",
@@ -24,6 +24,7 @@ from sqlalchemy import text
 
 from app.database import get_db
 from app.services.asaas_service import AsaasService
+from app.services.asaas_webhook_worker import asaas_webhook_worker
 
 logger = logging.getLogger(__name__)
 
@@ -42,60 +43,88 @@ async def webhook_asaas(
     """
     Recebe notificações do ASAAS sobre eventos de pagamento.
 
+    O evento é gravado na inbox (webhook_asaas_eventos) e confirmado na hora;
+    o processamento acontece no worker assíncrono. Reentregas do mesmo
+    evento são reconhecidas pelo id e não são processadas de novo.
+
     O ASAAS envia um POST com os dados do evento.
     Documentação: https://docs.asaas.com/reference/webhook
     """
+    # 1. Validar token de webhook (se configurado)
+    if ASAAS_WEBHOOK_TOKEN:
+        asaas_service = AsaasService()
+        if asaas_access_token and not asaas_service.validar_webhook_token(asaas_access_token):
+            logger.warning(f"Webhook ASAAS com token inválido: {asaas_access_token}")
+            raise HTTPException(status_code=401, detail="Token inválido")
+
+    # 2. Extrair dados do evento
     try:
-        # 1. Validar token de webhook (se configurado)
-        if ASAAS_WEBHOOK_TOKEN:
-            asaas_service = AsaasService()
-            if asaas_access_token and not asaas_service.validar_webhook_token(asaas_access_token):
-                logger.warning(f"Webhook ASAAS com token inválido: {asaas_access_token}")
-                raise HTTPException(status_code=401, detail="Token inválido")
-
-        # 2. Extrair dados do evento
         data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Payload inválido")
+    if not isinstance(data, dict):
+        # JSON válido mas não é objeto (lista, string): 400, sem reenvio útil
+        raise HTTPException(status_code=400, detail="Payload inválido")
 
-        event = data.get("event")
-        payment_data = data.get("payment", {})
+    event = data.get("event")
+    payment_data = data.get("payment") or {}
 
-        logger.info(f"Webhook ASAAS recebido: {event} - Payment ID: {payment_data.get('id')}")
+    # 3. Gravar na inbox (se falhar, 500 faz o ASAAS reenviar - nada foi perdido)
+    try:
+        inbox_id, duplicado = asaas_webhook_worker.registrar(db, data)
+    except Exception as e:
+        logger.error(f"Erro ao gravar webhook ASAAS na inbox: {e}")
+        db.rollback()
+        return JSONResponse(
+            content={"status": "error", "message": "Falha ao registrar evento"},
+            status_code=500
+        )
 
-        # 3. Processar evento
-        if event in ["PAYMENT_CONFIRMED", "PAYMENT_RECEIVED", "PAYMENT_RECEIVED_IN_CASH"]:
-            await processar_pagamento_confirmado(db, payment_data)
+    if duplicado:
+        logger.info(f"Webhook ASAAS duplicado ignorado: {event} - Payment ID: {payment_data.get('id')}")
+        return JSONResponse(content={"status": "duplicate", "event": event}, status_code=200)
 
-        elif event == "PAYMENT_OVERDUE":
-            await processar_pagamento_vencido(db, payment_data)
+    logger.info(f"Webhook ASAAS recebido: {event} - Payment ID: {payment_data.get('id')} (inbox {inbox_id})")
 
-        elif event in ["PAYMENT_DELETED", "PAYMENT_REFUNDED", "PAYMENT_REFUND_IN_PROGRESS"]:
-            await processar_pagamento_cancelado(db, payment_data, event)
+    # 4. Processamento assíncrono, em ordem por pagamento
+    asaas_webhook_worker.enfileirar(inbox_id, payment_data.get("id"))
 
-        elif event == "PAYMENT_CREATED":
-            await processar_pagamento_criado(db, payment_data)
+    return JSONResponse(
+        content={"status": "received", "event": event},
+        status_code=200
+    )
 
-        elif event == "PAYMENT_UPDATED":
-            await processar_pagamento_atualizado(db, payment_data)
 
-        else:
-            logger.info(f"Evento ASAAS não tratado: {event}")
+async def processar_evento(db, event: str, payment_data: dict):
+    """
+    Aplica um evento ASAAS no banco (chamado pelo worker da inbox).
 
-        db.commit()
+    Os handlers são idempotentes (reprocessar o mesmo evento não duplica
+    histórico), mas gravam o estado do evento sem compará-lo ao atual: quem
+    impede um replay de desfazer um estado mais recente é o worker, que não
+    reivindica evento com evento posterior do mesmo pagamento já processado.
+    O commit fica a cargo de quem chama.
+    """
+    # Cobrança mudou de estado: QR Code/linha digitável em cache deixam de valer
+    await AsaasService.invalidar_artefatos(payment_data.get("id"))
 
-        return JSONResponse(
-            content={"status": "success", "event": event},
-            status_code=200
-        )
+    if event in ["PAYMENT_CONFIRMED", "PAYMENT_RECEIVED", "PAYMENT_RECEIVED_IN_CASH"]:
+        await processar_pagamento_confirmado(db, payment_data)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erro ao processar webhook ASAAS: {e}")
-        db.rollback()
-        return JSONResponse(
-            content={"status": "error", "message": str(e)},
-            status_code=500
-        )
+    elif event == "PAYMENT_OVERDUE":
+        await processar_pagamento_vencido(db, payment_data)
+
+    elif event in ["PAYMENT_DELETED", "PAYMENT_REFUNDED", "PAYMENT_REFUND_IN_PROGRESS"]:
+        await processar_pagamento_cancelado(db, payment_data, event)
+
+    elif event == "PAYMENT_CREATED":
+        await processar_pagamento_criado(db, payment_data)
+
+    elif event == "PAYMENT_UPDATED":
+        await processar_pagamento_atualizado(db, payment_data)
+
+    else:
+        logger.info(f"Evento ASAAS não tratado: {event}")
 
 
 async def processar_pagamento_confirmado(db, payment_data: dict):
@@ -203,6 +232,19 @@ async def processar_pagamento_vencido(db, payment_data: dict):
 
     logger.info(f"Processando pagamento vencido: {asaas_payment_id}")
 
+    # Pagamento já quitado (evento antigo reprocessado): não aplicar a régua
+    ja_pago = db.execute(
+        text("""
+            SELECT 1 FROM pagamentos
+            WHERE asaas_payment_id = :asaas_id
+            AND status IN ('CONFIRMED', 'RECEIVED')
+        """),
+        {"asaas_id": asaas_payment_id}
+    ).fetchone()
+    if ja_pago:
+        logger.info(f"Pagamento {asaas_payment_id} já confirmado - evento de vencimento ignorado")
+        return
+
     # Atualizar status do pagamento
     result = db.execute(
         text("""
@@ -263,14 +305,18 @@ async def processar_pagamento_vencido(db, payment_data: dict):
             )
             logger.warning(f"[RÉGUA] Todas assinaturas do cliente {cliente_id} SUSPENSAS")
 
-        # Registrar evento de inadimplência no histórico
+        # Registrar evento de inadimplência no histórico (uma vez por pagamento)
         db.execute(
             text("""
                 INSERT INTO historico_inadimplencia (
                     cliente_id, asaas_payment_id, evento, data_evento, observacoes
-                ) VALUES (
-                    :cliente_id, :asaas_payment_id, 'SUSPENSAO', NOW(),
-                    :observacoes
+                )
+                SELECT :cliente_id, :asaas_payment_id, 'SUSPENSAO', NOW(), :observacoes
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM historico_inadimplencia
+                    WHERE cliente_id = :cliente_id
+                    AND asaas_payment_id = :asaas_payment_id
+                    AND evento = 'SUSPENSAO'
                 )
             """),
             {
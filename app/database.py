@@ -5,85 +5,113 @@ Desenvolvido por Marco
 """
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metricas import DB_CONEXOES_EM_USO, DB_ESPERA_CONEXAO
+from app.sql_metricas import instrumentar_engine
 
 # URL do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL nao configurada. Defina no arquivo .env")
 
+
+# ==================== POOL DE CONEXÕES ====================
+# O orçamento de conexões do Postgres (DB_MAX_CONEXOES) é dividido entre os
+# workers do Uvicorn (WEB_CONCURRENCY - a mesma variável que o uvicorn usa
+# como padrão de --workers) e, em cada worker, metade para o engine síncrono
+# (psycopg2) e metade para o assíncrono (asyncpg).
+# Antes: 30 conexões fixas por worker × 4 workers = 120 > max_connections.
+
+def _dimensionar_pool(total: int):
+    """(pool_size, max_overflow) para um engine com `total` conexões no máximo"""
+    pool_size = max(1, total // 2)
+    return pool_size, max(0, total - pool_size)
+
+
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DB_MAX_CONEXOES = int(os.getenv("DB_MAX_CONEXOES", "80"))
+CONEXOES_POR_WORKER = max(4, DB_MAX_CONEXOES // WORKERS)
+
+SYNC_POOL_SIZE, SYNC_MAX_OVERFLOW = _dimensionar_pool(CONEXOES_POR_WORKER // 2)
+ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW = _dimensionar_pool(CONEXOES_POR_WORKER - CONEXOES_POR_WORKER // 2)
+
+
+def _pool_medido(base, nome: str):
+    """Pool que registra a espera por conexão (pool esgotado aparece em /metrics)"""
+
+    class PoolMedido(base):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_ESPERA_CONEXAO.labels(nome).observe(time.perf_counter() - inicio)
+
+    PoolMedido.__name__ = f"{base.__name__}Medido"
+    return PoolMedido
+
+
+def _medir_conexoes_em_uso(sync_engine, nome: str):
+    gauge = DB_CONEXOES_EM_USO.labels(nome)
+    event.listen(sync_engine, "checkout", lambda *args: gauge.inc())
+    event.listen(sync_engine, "checkin", lambda *args: gauge.dec())
+
+
 # Configurar engine do SQLAlchemy
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     echo=False,
-    pool_size=10,
-    max_overflow=20
+    poolclass=_pool_medido(QueuePool, "sync"),
+    pool_size=SYNC_POOL_SIZE,
+    max_overflow=SYNC_MAX_OVERFLOW
 )
 
 # Configurar session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Base para modelos
-Base = declarative_base()
 
+# ==================== ENGINE ASSÍNCRONO (asyncpg) ====================
 
-def get_db():
+def _url_async(url: str) -> URL:
     """
-    Dependency para obter sessão do banco de dados.
-    Usado com FastAPI Depends.
+    Mesma base, driver asyncpg. O asyncpg não entende `sslmode` (libpq);
+    o equivalente é `ssl`.
     """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    u = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(u.query)
+    sslmode = query.pop("sslmode", None)
+    if sslmode:
+        query["ssl"] = sslmode
+    return u.set(query=query)
 
 
-def test_connection():
-    """Testa a conexão com o banco de dados."""
-    try:
-        db = SessionLocal()
-        db.execute("SELECT 1")
-        db.close()
-        print("✅ Conexão com banco de dados OK")
-        return True
-    except Exception as e:
-        print(f"❌ Erro na conexão com banco: {e}")
-        return False
-
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _url_async(DATABASE_URL)
 
-if __name__ == "__main__":
-    print("🔧 Testando configuração do banco de dados...")
-    test_connection()
-"""
-Configuração do Banco de Dados
-Sistema de agendamento médico SaaS
-Desenvolvido por Marco
-"""
-
-import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import declarative_base, sessionmaker
-
-# URL do banco de dados
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL nao configurada. Defina no arquivo .env")
-
-# Configurar engine do SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
     pool_pre_ping=True,
     echo=False,
-    pool_size=10,
-    max_overflow=20
+    poolclass=_pool_medido(AsyncAdaptedQueuePool, "async"),
+    pool_size=ASYNC_POOL_SIZE,
+    max_overflow=ASYNC_MAX_OVERFLOW
 )
 
-# Configurar session maker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Contagem de consultas por requisição/job (app/sql_metricas.py)
+instrumentar_engine(engine)
+instrumentar_engine(async_engine.sync_engine)
+_medir_conexoes_em_uso(engine, "sync")
+_medir_conexoes_em_uso(async_engine.sync_engine, "async")
+
+# expire_on_commit=False: objetos continuam legíveis depois do commit sem
+# novo SELECT implícito (que exigiria await)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
 
 # Base para modelos
 Base = declarative_base()
@@ -101,6 +129,35 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependency para obter AsyncSession (asyncpg) - endpoints de alto volume.
+
+    Código síncrono existente (services que recebem Session) roda sem
+    bloquear o event loop via `await db.run_sync(funcao, *args)`: a função
+    recebe uma Session síncrona cujo I/O é feito pelo asyncpg.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_status() -> dict:
+    """Uso dos pools (exposto em /sistema/status)"""
+    def _status(pool) -> dict:
+        return {
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
+    return {
+        "workers": WORKERS,
+        "conexoes_por_worker": CONEXOES_POR_WORKER,
+        "sync": {**_status(engine.pool), "max_overflow": SYNC_MAX_OVERFLOW},
+        "async": {**_status(async_engine.pool), "max_overflow": ASYNC_MAX_OVERFLOW},
+    }
+
+
 def test_connection():
     """Testa a conexão com o banco de dados."""
     try:
@@ -0,0 +1,251 @@
+"""
+Configuração de logging
+Horário Inteligente SaaS
+
+O logging sai do caminho da requisição:
+- os handlers de verdade (stdout e arquivo) rodam numa thread própria
+  (QueueListener); no event loop, um logger.info() só coloca o registro
+  numa fila - sem serialização, sem write() e sem lock de arquivo
+- registros barrados pelos filtros (nível, amostragem) nunca são formatados;
+  os que passam têm a mensagem resolvida (getMessage) no produtor, ao entrar
+  na fila, e só a serialização JSON/texto roda no listener
+- amostragem por módulo (LOG_SAMPLING) para logs de alto volume em INFO/DEBUG;
+  WARNING e acima nunca são descartados
+- cada requisição recebe um request_id (header X-Request-ID, se vier do
+  proxy) que acompanha todos os logs emitidos durante ela
+- LOG_FORMAT=json gera uma linha JSON por registro (para o coletor de logs)
+
+Uso: configurar_logging() uma vez no startup, antes dos demais imports da app.
+"""
+
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Request atual (preenchido pelo RequestIdMiddleware)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+LOG_FILE_PADRAO = "/root/sistema_agendamento/logs/sistema.log"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# ==================== FILTROS ====================
+
+class SamplingFilter(logging.Filter):
+    """
+    Amostragem determinística 1-em-N por prefixo de logger.
+
+    Ex.: {"app.middleware.tenant_middleware": 0.01} mantém 1 de cada 100
+    registros INFO/DEBUG desse módulo. WARNING e acima passam sempre.
+    """
+
+    def __init__(self, taxas: Dict[str, float]):
+        super().__init__()
+        # Prefixos mais longos primeiro (regra mais específica vence)
+        self._regras = sorted(
+            ((prefixo, max(1, round(1 / taxa)) if taxa > 0 else 0) for prefixo, taxa in taxas.items()),
+            key=lambda r: len(r[0]),
+            reverse=True,
+        )
+        self._contadores: Dict[str, itertools.count] = {}
+        self._cache: Dict[str, Optional[tuple]] = {}
+
+    def _regra(self, nome: str) -> Optional[tuple]:
+        if nome not in self._cache:
+            self._cache[nome] = next(
+                (r for r in self._regras if nome == r[0] or nome.startswith(r[0] + ".")),
+                None,
+            )
+        return self._cache[nome]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        regra = self._regra(record.name)
+        if regra is None:
+            return True
+        prefixo, a_cada = regra
+        if a_cada == 0:
+            return False
+        contador = self._contadores.setdefault(prefixo, itertools.count())
+        return next(contador) % a_cada == 0
+
+
+def parse_sampling(valor: str) -> Dict[str, float]:
+    """'app.a=0.1,app.b=0.01' -> {'app.a': 0.1, 'app.b': 0.01}"""
+    taxas = {}
+    for item in filter(None, (p.strip() for p in valor.split(","))):
+        prefixo, _, taxa = item.partition("=")
+        try:
+            taxas[prefixo.strip()] = min(1.0, max(0.0, float(taxa)))
+        except ValueError:
+            continue
+    return taxas
+
+
+# ==================== FILA (lado do produtor) ====================
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que NÃO formata no produtor.
+
+    O QueueHandler padrão chama self.format() em prepare() (formatador
+    completo na thread que logou). Aqui, como no padrão, só `msg % args` é
+    resolvido já no produtor - args podem ser objetos mutáveis que mudam
+    antes do listener formatar -, e anexamos o request_id e convertemos
+    exc_info em texto (a traceback não pode ser serializada depois que o
+    frame morre). A serialização (JSON/texto) fica para o listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id_var.get()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# ==================== FORMATADORES (lado do listener) ====================
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+        }
+        if record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class TextoFormatter(logging.Formatter):
+    """Formato texto histórico + request_id"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        return super().format(record)
+
+
+# ==================== CONFIGURAÇÃO ====================
+
+def configurar_logging(
+    nivel: Optional[str] = None,
+    formato: Optional[str] = None,
+    arquivo: Optional[str] = None,
+    sampling: Optional[str] = None,
+) -> logging.handlers.QueueListener:
+    """
+    Liga o pipeline fila -> listener no logger raiz (idempotente).
+
+    Parâmetros não informados vêm de LOG_LEVEL, LOG_FORMAT (texto|json),
+    LOG_FILE e LOG_SAMPLING.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    nivel = (nivel or os.getenv("LOG_LEVEL", "INFO")).upper()
+    formato = (formato or os.getenv("LOG_FORMAT", "texto")).lower()
+    arquivo = arquivo if arquivo is not None else os.getenv("LOG_FILE", LOG_FILE_PADRAO)
+    sampling = sampling if sampling is not None else os.getenv("LOG_SAMPLING", "")
+
+    formatter = JsonFormatter() if formato == "json" else TextoFormatter(FORMATO_TEXTO)
+
+    handlers = []
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+    handlers.append(stream)
+
+    if arquivo:
+        diretorio = os.path.dirname(arquivo) or "."
+        if os.path.isdir(diretorio):
+            # WatchedFileHandler reabre o arquivo após logrotate
+            arquivo_handler = logging.handlers.WatchedFileHandler(arquivo, encoding="utf-8")
+            arquivo_handler.setFormatter(formatter)
+            handlers.append(arquivo_handler)
+
+    fila: queue.SimpleQueue = queue.SimpleQueue()
+    produtor = LazyQueueHandler(fila)
+    taxas = parse_sampling(sampling)
+    if taxas:
+        # Filtra antes de enfileirar: registro descartado não custa nada além do filtro
+        produtor.addFilter(SamplingFilter(taxas))
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(produtor)
+    raiz.setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(fila, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Esvazia a fila no encerramento do processo
+    atexit.register(parar_logging)
+    return _listener
+
+
+def parar_logging():
+    """Para o listener (drena a fila) - seguro chamar mais de uma vez"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# ==================== REQUEST ID ====================
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI puro: define request_id_var para a requisição e devolve
+    o valor no header X-Request-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for nome, valor in scope.get("headers", ()):
+            if nome == b"x-request-id":
+                request_id = valor.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex[:16]
+
+        token = request_id_var.set(request_id)
+
+        async def send_com_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_id)
+        finally:
+            request_id_var.reset(token)
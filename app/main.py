@@ -2,13 +2,15 @@
 Sistema Horário Inteligente SaaS - API Principal
 Arquivo: app/main.py
 """
-# Versão dos assets estáticos - incrementar para forçar atualização do cache nos navegadores
+# Versão dos assets estáticos - sem build de estáticos, incrementar para forçar atualização
+# do cache nos navegadores (com build, vem do asset-manifest.json - ver static_files abaixo)
 STATIC_VERSION = "20260119"
 
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, FileResponse, JSONResponse
+from fastapi.responses import RedirectResponse, FileResponse, JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
 import logging
 import sys
 from pathlib import Path
@@ -16,11 +18,6 @@ import datetime
 from dotenv import load_dotenv
 import os
 
-# Rate Limiting - Proteção contra brute force
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-
 # CSRF Protection
 from fastapi_csrf_protect import CsrfProtect
 from fastapi_csrf_protect.exceptions import CsrfProtectError
@@ -99,14 +96,12 @@ env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
 # Configurar logging ANTES de qualquer import
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/root/sistema_agendamento/logs/sistema.log'),
-        logging.StreamHandler()
-    ]
-)
+# (fila + listener em thread própria - ver app/logging_config.py)
+from app.logging_config import configurar_logging, RequestIdMiddleware
+from app.sql_metricas import SQLMetricasMiddleware
+from app.metricas import MetricasMiddleware, gerar_exposicao, processo_encerrado, CONTENT_TYPE_LATEST
+from app.services.limite_taxa_service import limiter, LimiteExcedido, LimiteTaxaMiddleware, resposta_429
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 # Adicionar o diretório raiz ao path se necessário
@@ -114,11 +109,6 @@ root_dir = Path(__file__).parent.parent
 if str(root_dir) not in sys.path:
     sys.path.insert(0, str(root_dir))
 
-# Configurar Rate Limiter (proteção contra brute force e abuso)
-# Usa IP do cliente como identificador
-# Limite global: 120 requisições/minuto por IP para todos os endpoints
-limiter = Limiter(key_func=get_remote_address, default_limits=["120/minute"])
-
 # Criar instância do FastAPI
 app = FastAPI(
     title="Horário Inteligente SaaS",
@@ -126,21 +116,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Registrar rate limiter no estado da app (para uso nos routers)
+# Rate Limiting (proteção contra brute force e abuso)
+# Limitador único para todos os routers, compartilhado entre os workers via
+# Redis (GCRA) - ver app/services/limite_taxa_service.py
 app.state.limiter = limiter
 
 # Handler customizado para rate limit exceeded
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    """Handler para quando o rate limit é excedido"""
-    logger.warning(f"⚠️ Rate limit excedido: IP={request.client.host}, path={request.url.path}")
-    return JSONResponse(
-        status_code=429,
-        content={
-            "detail": "Muitas tentativas. Aguarde alguns minutos antes de tentar novamente.",
-            "retry_after": "60 segundos"
-        }
-    )
+@app.exception_handler(LimiteExcedido)
+async def rate_limit_handler(request: Request, exc: LimiteExcedido):
+    """Handler para quando o rate limit é excedido (log feito no limitador)"""
+    return resposta_429(exc.espera)
 
 # ==================== CSRF PROTECTION ====================
 class CsrfSettings(BaseModel):
@@ -204,13 +189,44 @@ from app.middleware.billing_middleware import BillingMiddleware
 app.add_middleware(BillingMiddleware)
 logger.info("💰 BillingMiddleware ativado - Bloqueio de inadimplentes ATIVO")
 
+# Limite de taxa por tenant (roda DEPOIS do TenantMiddleware, que resolve o
+# cliente_id, e ANTES do BillingMiddleware, que consulta o banco)
+app.add_middleware(LimiteTaxaMiddleware)
+
 # Multi-Tenant Middleware (roda ANTES do BillingMiddleware pois foi adicionado DEPOIS)
 from app.middleware.tenant_middleware import TenantMiddleware
 app.add_middleware(TenantMiddleware)
 logger.info("🏢 TenantMiddleware ativado - Sistema Multi-Tenant ATIVO")
 
+# Consultas SQL por requisição (por fora do Tenant/Billing, que rodam em tasks próprias)
+app.add_middleware(SQLMetricasMiddleware)
+
+# Métricas Prometheus por rota (expostas em /metrics)
+app.add_middleware(MetricasMiddleware)
+
+# Request ID (adicionado por último = roda primeiro: todos os logs da requisição levam o id)
+app.add_middleware(RequestIdMiddleware)
+
+# Buffer de ingestão de analytics (exposto em /sistema/status)
+from app.services.analytics_buffer import analytics_buffer
+from app.services.agenda_compilada_service import agenda_compilada_service
+from app.services.asaas_webhook_worker import asaas_webhook_worker
+from app.services.scheduler_lideranca_service import scheduler_lideranca
+from app.services.whatsapp_envio_scheduler import whatsapp_envio_scheduler
+from app.services.webhook.caixa_conversa import caixa_conversas
+from app.services.registry import registry, AQUECER_NO_STARTUP
+from app.database import async_engine, get_pool_status
+
 from fastapi.staticfiles import StaticFiles
-app.mount("/static", StaticFiles(directory="static"), name="static")
+from app.utils.static_files import StaticPrecomprimido
+# Build de estáticos (scripts/build_static.py): assets com hash, .br/.gz e manifest
+static_files = StaticPrecomprimido(
+    directory="static",
+    build_directory=os.getenv("STATIC_BUILD_DIR", "build/static"),
+)
+app.mount("/static", static_files, name="static")
+# Com build, a versão dos estáticos acompanha o manifest (sem bump manual)
+STATIC_VERSION = static_files.versao or STATIC_VERSION
 app.mount("/docs-internos", StaticFiles(directory="docs"), name="docs")
 
 # ========================================
@@ -506,8 +522,8 @@ async def root(request: Request):
 
     # Se for o domínio principal (sem subdomínio ou www) ou IP direto, mostrar site comercial
     if not subdomain or subdomain == 'www' or host.startswith('horariointeligente.com.br') or is_ip_access:
-        # Servir o site comercial (landing page)
-        return FileResponse("static/index.html")
+        # Servir o site comercial (landing page) - versão do build, pré-comprimida
+        return await static_files.get_response("index.html", request.scope)
     elif is_admin or subdomain == 'admin':
         # Redirecionar para login admin dedicado
         return RedirectResponse(url=f"/static/admin/login.html?v={STATIC_VERSION}", status_code=302)
@@ -521,6 +537,18 @@ async def root(request: Request):
         # Redirecionar para login do cliente (com versão para cache bust)
         return RedirectResponse(url=f"/static/login.html?v={STATIC_VERSION}", status_code=302)
 
+async def _verificar_postgresql() -> str:
+    """SELECT 1 pelo pool assíncrono (não ocupa thread do threadpool)"""
+    from sqlalchemy import text
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=2.0)
+        return "connected"
+    except Exception as e:
+        logger.error(f"❌ PostgreSQL indisponível no /sistema/status: {e}")
+        return "error"
+
+
 @app.get("/sistema/status", tags=["Status"])
 async def status_sistema():
     """Status detalhado do sistema"""
@@ -528,6 +556,7 @@ async def status_sistema():
     # Verificar se webhook está registrado
     webhook_registrado = any('/webhook' in str(route.path) for route in app.routes)
     agendamentos_registrado = any('/api/agendamentos' in str(route.path) for route in app.routes)
+    postgresql = await _verificar_postgresql()
     
     return {
         "status": "online",
@@ -542,11 +571,34 @@ async def status_sistema():
         },
         "servicos": {
             "fastapi": "running",
-            "postgresql": "connected",
+            "postgresql": postgresql,
             "whatsapp": "meta_cloud_api"
-        }
+        },
+        "analytics_buffer": analytics_buffer.get_status(),
+        "agenda_cache": agenda_compilada_service.get_status(),
+        "webhooks_asaas": asaas_webhook_worker.get_status(),
+        "scheduler": scheduler_lideranca.get_status(),
+        "whatsapp_envios": whatsapp_envio_scheduler.get_status(),
+        "caixa_conversas": caixa_conversas.get_status(),
+        "servicos_compartilhados": registry.get_status(),
+        "limite_taxa": limiter.get_status(),
+        "db_pool": get_pool_status()
     }
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metricas_prometheus(request: Request):
+    """Exposição Prometheus (agregada entre os workers em modo multiprocess)"""
+    if not METRICS_TOKEN and os.getenv("ENVIRONMENT") == "production":
+        # Em produção só com token: sem METRICS_TOKEN o endpoint não existe
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        return JSONResponse(status_code=401, content={"detail": "Não autorizado"})
+    conteudo = await asyncio.to_thread(gerar_exposicao)
+    return Response(content=conteudo, media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/sistema/rotas", tags=["Status"])
 async def listar_rotas():
     """Lista todas as rotas registradas no sistema"""
@@ -608,22 +660,34 @@ async def startup_event():
     logger.info("🚀 Sistema Horário Inteligente SaaS iniciando...")
     logger.info("=" * 50)
 
-    # Iniciar scheduler de lembretes em APENAS UM worker
-    # Com --workers 4 (Uvicorn), cada worker executa startup_event().
-    # Sem lock, teríamos 4 schedulers enviando o mesmo lembrete 4 vezes.
-    import fcntl
+    # Buffer de analytics (flush em lote para page_views) - um por worker
+    try:
+        analytics_buffer.start()
+    except Exception as e:
+        logger.error(f"❌ Erro ao iniciar buffer de analytics: {e}")
+
+    # Worker da inbox de webhooks ASAAS - um por worker (reivindicação no banco evita duplicidade)
+    try:
+        asaas_webhook_worker.start()
+    except Exception as e:
+        logger.error(f"❌ Erro ao iniciar worker de webhooks ASAAS: {e}")
+
+    # Scheduler de lembretes em APENAS UM processo do cluster
+    # Cada worker (e cada servidor) disputa a liderança via advisory lock do
+    # Postgres; só o líder roda o ReminderScheduler. Se o líder cair, outro
+    # nó assume automaticamente.
     try:
-        lock_file = open("/tmp/horariointeligente_scheduler.lock", "w")
-        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        # Obteve o lock — este worker é o dono do scheduler
         from app.scheduler import reminder_scheduler
-        reminder_scheduler.start()
-        app.state.scheduler_lock = lock_file  # Manter referência para não liberar via GC
-        logger.info("✅ Scheduler de lembretes iniciado (este worker é o scheduler owner)")
-    except (IOError, OSError):
-        logger.info("ℹ️ Scheduler já rodando em outro worker — este worker apenas serve requests")
+        scheduler_lideranca.start(
+            ao_assumir=reminder_scheduler.start,
+            ao_perder=reminder_scheduler.stop,
+        )
     except Exception as e:
-        logger.error(f"❌ Erro ao iniciar scheduler de lembretes: {e}")
+        logger.error(f"❌ Erro ao iniciar eleição do scheduler: {e}")
+
+    # Serviços compartilhados (Redis, clientes da Meta/Anthropic) criados em
+    # thread, em segundo plano: o worker já aceita requisições enquanto isso
+    app.state.aquecimento = asyncio.create_task(registry.aquecer(AQUECER_NO_STARTUP))
     
     # Listar todas as rotas registradas
     rotas_registradas = []
@@ -663,18 +727,67 @@ async def shutdown_event():
     """Evento executado ao desligar o servidor"""
     logger.info("🔴 Sistema Horário Inteligente SaaS encerrando...")
 
-    # Parar scheduler de lembretes (só o worker que possui o lock)
-    import fcntl
+    # Gravar eventos de analytics pendentes antes de encerrar
+    try:
+        await analytics_buffer.stop()
+    except Exception as e:
+        logger.error(f"❌ Erro ao encerrar buffer de analytics: {e}")
+
+    try:
+        await asaas_webhook_worker.stop()
+    except Exception as e:
+        logger.error(f"❌ Erro ao encerrar worker de webhooks ASAAS: {e}")
+
+    # Fechar pool de conexões com o ASAAS
     try:
-        if hasattr(app.state, 'scheduler_lock') and app.state.scheduler_lock:
-            from app.scheduler import reminder_scheduler
-            reminder_scheduler.stop()
-            fcntl.flock(app.state.scheduler_lock, fcntl.LOCK_UN)
-            app.state.scheduler_lock.close()
-            logger.info("✅ Scheduler de lembretes parado e lock liberado")
+        from app.services.asaas_service import fechar_cliente_http
+        await fechar_cliente_http()
+    except Exception as e:
+        logger.error(f"❌ Erro ao fechar cliente ASAAS: {e}")
+
+    # Parar scheduler de lembretes e liberar a liderança (se este nó for o líder)
+    try:
+        await scheduler_lideranca.stop()
     except Exception as e:
         logger.error(f"❌ Erro ao parar scheduler de lembretes: {e}")
 
+    # Terminar os turnos das conversas com mensagens já aceitas (antes de
+    # drenar as filas de envio, que recebem as respostas desses turnos)
+    try:
+        await caixa_conversas.stop()
+    except Exception as e:
+        logger.error(f"❌ Erro ao encerrar caixas de conversa: {e}")
+
+    # Drenar filas de envio do WhatsApp (mensagens já aceitas)
+    try:
+        await whatsapp_envio_scheduler.stop()
+    except Exception as e:
+        logger.error(f"❌ Erro ao drenar filas de envio do WhatsApp: {e}")
+
+    # Conexão Redis do limitador de taxa
+    try:
+        await limiter.fechar()
+    except Exception as e:
+        logger.error(f"❌ Erro ao fechar Redis do limitador de taxa: {e}")
+
+    # Fechar conexões dos serviços compartilhados (Redis, clientes HTTP)
+    try:
+        await registry.encerrar()
+    except Exception as e:
+        logger.error(f"❌ Erro ao encerrar serviços compartilhados: {e}")
+
+    # Fechar conexões asyncpg (o pool síncrono é descartado com o processo)
+    try:
+        await async_engine.dispose()
+    except Exception as e:
+        logger.error(f"❌ Erro ao fechar pool assíncrono do banco: {e}")
+
+    # Gauges multiprocess deste worker deixam de contar no /metrics
+    try:
+        processo_encerrado()
+    except Exception as e:
+        logger.error(f"❌ Erro ao encerrar métricas do worker: {e}")
+
 # ========================================
 # EXECUÇÃO PRINCIPAL
 # ========================================
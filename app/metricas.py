@@ -0,0 +1,228 @@
+"""
+Métricas Prometheus (exposição em /metrics)
+Horário Inteligente SaaS
+
+Histogramas e contadores do pipeline inteiro, registrados aqui e alimentados
+por cada serviço:
+- HTTP: requisições e latência por rota (MetricasMiddleware)
+- chamadas externas: Anthropic, OpenAI (Whisper/TTS), Meta, Asaas
+- banco: espera por conexão do pool e conexões em uso
+- Redis (contexto das conversas), WebSocket (fan-out), lembretes (lote)
+- limite de taxa: requisições recusadas por escopo (rota/tenant) e backend
+- mensagem do paciente: recebida -> resposta enviada, por etapa
+  (parse, db, stt, contexto, llm, envio, tts); mensagens agrupadas por turno
+
+Vários workers do Uvicorn: com PROMETHEUS_MULTIPROC_DIR definido, cada
+processo grava em arquivos mmap nesse diretório e /metrics agrega todos. O
+diretório deve ser esvaziado antes de subir os workers (ExecStartPre do
+systemd). Sem a variável, cada worker expõe só as próprias métricas.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402 - depois do diretório multiprocess
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets (segundos)
+BUCKETS_RAPIDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_EXTERNOS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+# ==================== HTTP ====================
+
+HTTP_REQUISICOES = Counter(
+    "hi_http_requisicoes_total", "Requisições HTTP", ["metodo", "rota", "status"],
+)
+HTTP_LATENCIA = Histogram(
+    "hi_http_requisicao_segundos", "Latência das requisições HTTP", ["metodo", "rota"],
+    buckets=BUCKETS_HTTP,
+)
+
+# ==================== SERVIÇOS EXTERNOS ====================
+
+EXTERNO_LATENCIA = Histogram(
+    "hi_externo_chamada_segundos", "Duração das chamadas a APIs externas",
+    ["servico", "operacao", "resultado"], buckets=BUCKETS_EXTERNOS,
+)
+
+# ==================== BANCO / REDIS ====================
+
+DB_ESPERA_CONEXAO = Histogram(
+    "hi_db_pool_espera_segundos", "Espera para obter conexão do pool", ["engine"],
+    buckets=BUCKETS_RAPIDOS,
+)
+DB_CONEXOES_EM_USO = Gauge(
+    "hi_db_pool_conexoes_em_uso", "Conexões do pool em uso", ["engine"],
+    multiprocess_mode="livesum",
+)
+REDIS_LATENCIA = Histogram(
+    "hi_redis_comando_segundos", "Duração dos comandos Redis", ["operacao"],
+    buckets=BUCKETS_RAPIDOS,
+)
+
+# ==================== WEBSOCKET / LEMBRETES ====================
+
+WEBSOCKET_CONEXOES = Gauge(
+    "hi_websocket_conexoes", "Conexões WebSocket abertas", multiprocess_mode="livesum",
+)
+WEBSOCKET_FANOUT = Histogram(
+    "hi_websocket_fanout_segundos", "Duração do broadcast para as conexões de um tenant", ["tipo"],
+    buckets=BUCKETS_RAPIDOS,
+)
+LEMBRETES_LOTE = Histogram(
+    "hi_lembretes_lote_tamanho", "Agendamentos na janela de cada lote de lembretes", ["tipo"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+# ==================== LIMITE DE TAXA ====================
+
+LIMITE_TAXA_BLOQUEIOS = Counter(
+    "hi_limite_taxa_bloqueios_total", "Requisições recusadas por limite de taxa (HTTP 429)",
+    ["escopo", "backend"],
+)
+
+# ==================== MENSAGEM DO PACIENTE ====================
+
+MENSAGEM_ETAPA = Histogram(
+    "hi_mensagem_etapa_segundos", "Tempo por etapa do processamento da mensagem do paciente",
+    ["etapa"], buckets=BUCKETS_EXTERNOS,
+)
+MENSAGEM_RESPOSTA = Histogram(
+    "hi_mensagem_resposta_segundos", "Mensagem do paciente recebida -> resposta enviada",
+    ["resultado"], buckets=BUCKETS_EXTERNOS,
+)
+TURNO_MENSAGENS = Histogram(
+    "hi_conversa_turno_mensagens", "Mensagens do paciente respondidas em um mesmo turno da IA",
+    buckets=(1, 2, 3, 4, 5, 8, 13, 20),
+)
+TURNOS_POUPADOS = Counter(
+    "hi_conversa_turnos_poupados_total",
+    "Mensagens agrupadas no turno de outra (chamadas à IA e respostas evitadas)",
+)
+
+
+@contextmanager
+def medir_externo(servico: str, operacao: str):
+    """
+    Mede uma chamada externa. Exceção = resultado "erro"; o chamador pode
+    marcar falhas sem exceção com `chamada["resultado"] = "erro"`.
+    """
+    chamada = {"resultado": "ok"}
+    inicio = time.perf_counter()
+    try:
+        yield chamada
+    except Exception:
+        chamada["resultado"] = "erro"
+        raise
+    finally:
+        EXTERNO_LATENCIA.labels(servico, operacao, chamada["resultado"]).observe(
+            time.perf_counter() - inicio
+        )
+
+
+@contextmanager
+def medir_redis(operacao: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        REDIS_LATENCIA.labels(operacao).observe(time.perf_counter() - inicio)
+
+
+class EtapasMensagem:
+    """
+    Cronômetro de uma mensagem do paciente, do webhook à resposta:
+
+        etapas = EtapasMensagem()
+        with etapas.etapa("db"):
+            ...
+        etapas.resposta_enviada()
+        etapas.concluir()
+
+    Etapas repetidas (várias idas ao banco) são somadas e observadas uma vez.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tempos: Dict[str, float] = {}
+        self._respondida: Optional[float] = None
+
+    @contextmanager
+    def etapa(self, nome: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def resposta_enviada(self, resultado: str = "ok"):
+        if self._respondida is None:
+            self._respondida = time.perf_counter()
+            MENSAGEM_RESPOSTA.labels(resultado).observe(self._respondida - self.inicio)
+
+    def concluir(self):
+        for nome, segundos in self.tempos.items():
+            MENSAGEM_ETAPA.labels(nome).observe(segundos)
+        self.tempos = {}
+
+
+# ==================== EXPOSIÇÃO ====================
+
+def gerar_exposicao() -> bytes:
+    """Formato texto do Prometheus (agregado entre workers em modo multiprocess)"""
+    if MULTIPROC_DIR:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro)
+    return generate_latest()
+
+
+def processo_encerrado():
+    """Remove os gauges `live*` do worker que está saindo (shutdown)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricasMiddleware:
+    """Middleware ASGI puro: contagem e latência por rota (template, não path real)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = {"codigo": 500}
+
+        async def send_com_status(message):
+            if message["type"] == "http.response.start":
+                status["codigo"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            route = scope.get("route")
+            # Sem rota casada (404, estáticos): um rótulo só, para não explodir cardinalidade
+            rota = route.path if route is not None and hasattr(route, "path") else "sem_rota"
+            metodo = scope["method"]
+            HTTP_REQUISICOES.labels(metodo, rota, str(status["codigo"])).inc()
+            HTTP_LATENCIA.labels(metodo, rota).observe(time.perf_counter() - inicio)
+
@@ -67,6 +67,9 @@ class BillingMiddleware(BaseHTTPMiddleware):
         '/docs',
         '/redoc',
         '/openapi.json',
+
+        # Métricas (Prometheus)
+        '/metrics',
     ]
 
     async def dispatch(self, request: Request, call_next):
@@ -27,7 +27,7 @@ class TenantMiddleware(BaseHTTPMiddleware):
         try:
             # Rotas que não precisam de tenant (gestão interna)
             path = request.url.path
-            logger.info(f"🔍 TenantMiddleware v2: path={path}")
+            logger.debug("🔍 TenantMiddleware v2: path=%s", path)
             # Rotas autenticadas que usam cliente_id do JWT, não do subdomain
             jwt_auth_paths = [
                 '/api/billing/minha', '/api/billing/minhas',
@@ -42,11 +42,11 @@ class TenantMiddleware(BaseHTTPMiddleware):
                 request.state.is_admin = False
                 response = await call_next(request)
                 return response
-            if path.startswith('/api/financeiro/') or path.startswith('/api/gestao-interna/') or path.startswith('/api/admin/') or path.startswith('/api/interno/') or path.startswith('/api/ativacao/') or path.startswith('/api/parceiro/') or path.startswith('/api/registro-cliente/'):
+            if path.startswith('/api/financeiro/') or path.startswith('/api/gestao-interna/') or path.startswith('/api/admin/') or path.startswith('/api/interno/') or path.startswith('/api/ativacao/') or path.startswith('/api/parceiro/') or path.startswith('/api/registro-cliente/') or path == '/metrics':
                 request.state.cliente_id = None
                 request.state.subdomain = 'admin'
                 request.state.is_admin = True
-                logger.debug(f"🔧 Rota de gestão interna: {path}")
+                logger.debug("🔧 Rota de gestão interna: %s", path)
                 response = await call_next(request)
                 return response
 
@@ -31,6 +31,7 @@ from app.models.pre_cadastro import PreCadastro
 from app.models.historico_aceite import HistoricoAceite
 from app.models.historico_aceite_parceiro import HistoricoAceiteParceiro
 from app.models.historico_inadimplencia import HistoricoInadimplencia
+from app.models.webhook_asaas_evento import WebhookAsaasEvento
 from app.models.comissionamento_parceiro import ComissionamentoParceiro
 from app.models.convite_cliente import ConviteCliente
 
@@ -75,6 +76,7 @@ __all__ = [
     "HistoricoAceiteParceiro",
     # Model de Histórico de Inadimplência
     "HistoricoInadimplencia",
+    "WebhookAsaasEvento",
     # Model de Comissionamento Parceiro
     "ComissionamentoParceiro",
     # Model de Convites de Clientes
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, Boolean, BigInteger, FetchedValue, text
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -36,6 +36,21 @@ class Agendamento(BaseModel):
     lembrete_24h_enviado = Column(Boolean, default=False)
     lembrete_3h_enviado = Column(Boolean, default=False)
     lembrete_1h_enviado = Column(Boolean, default=False)
+
+    # Versão da linha para o ETag do calendário (sequência calendario_seq, atualizada por trigger)
+    updated_seq = Column(
+        BigInteger,
+        server_default=text("nextval('calendario_seq')"),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
+    # Cursor do delta do calendário: txid da transação que gravou a linha (trigger)
+    updated_txid = Column(
+        BigInteger,
+        server_default=text("txid_current()"),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
     
     # Relacionamentos
     paciente = relationship("Paciente", back_populates="agendamentos")
@@ -1,6 +1,6 @@
 # app/models/configuracoes.py
 
-from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, DateTime, BigInteger, FetchedValue, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -71,6 +71,21 @@ class BloqueioAgenda(Base):
     ativo = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
 
+    # Versão da linha para o ETag do calendário (sequência calendario_seq, atualizada por trigger)
+    updated_seq = Column(
+        BigInteger,
+        server_default=text("nextval('calendario_seq')"),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
+    # Cursor do delta do calendário: txid da transação que gravou a linha (trigger)
+    updated_txid = Column(
+        BigInteger,
+        server_default=text("txid_current()"),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
+
     # Relacionamentos
     medico = relationship("Medico", back_populates="bloqueios")
 
@@ -59,6 +59,10 @@ class Conversa(BaseModel):
     urgencia_resolvida = Column(Boolean, default=True, nullable=False)  # Se a urgência foi tratada
     urgencia_motivo = Column(Text, nullable=True)  # Descrição do motivo da urgência
 
+    # Campos desnormalizados para a listagem do painel (mantidos em ConversaService.adicionar_mensagem)
+    nao_lidas = Column(Integer, default=0, server_default="0", nullable=False)
+    ultima_mensagem_preview = Column(String(100), nullable=True)
+
     # Timestamps
     ultima_mensagem_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     ultima_mensagem_paciente_at = Column(DateTime, nullable=True)  # Para controle de janela 24h da Meta
@@ -69,8 +73,10 @@ class Conversa(BaseModel):
     mensagens = relationship("Mensagem", back_populates="conversa", order_by="Mensagem.timestamp", cascade="all, delete-orphan")
 
     # Índice composto para busca rápida por cliente + telefone
+    # e índice para paginação por cursor (keyset) da listagem
     __table_args__ = (
         Index('ix_conversa_cliente_telefone', 'cliente_id', 'paciente_telefone'),
+        Index('ix_conversa_cliente_ultima_msg', 'cliente_id', 'ultima_mensagem_at', 'id'),
     )
 
     def __repr__(self):
@@ -5,7 +5,7 @@ Horário Inteligente SaaS
 Persiste mensagens individuais das conversas do WhatsApp.
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -63,5 +63,10 @@ class Mensagem(BaseModel):
     # Relacionamento
     conversa = relationship("Conversa", back_populates="mensagens")
 
+    # Índice para paginação por cursor do histórico da conversa
+    __table_args__ = (
+        Index('ix_mensagens_conversa_timestamp', 'conversa_id', 'timestamp', 'id'),
+    )
+
     def __repr__(self):
         return f"<Mensagem(id={self.id}, remetente='{self.remetente}', tipo='{self.tipo}')>"
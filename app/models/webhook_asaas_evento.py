@@ -0,0 +1,30 @@
+"""
+Modelo de Inbox de Webhooks ASAAS
+Cada evento recebido é gravado antes de ser processado (idempotência por evento_id)
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class WebhookAsaasEvento(Base):
+    __tablename__ = "webhook_asaas_eventos"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    evento_id = Column(String(100), nullable=False, unique=True)  # id do evento ASAAS (evt_xxx) ou hash do payload
+    evento = Column(String(50), nullable=False)  # PAYMENT_CONFIRMED, PAYMENT_OVERDUE, ...
+    asaas_payment_id = Column(String(50), nullable=True, index=True)
+    payload = Column(Text, nullable=False)  # JSON bruto recebido
+    status = Column(String(20), nullable=False, server_default='pendente')  # pendente, processando, processado, erro
+    tentativas = Column(Integer, nullable=False, server_default='0')
+    erro = Column(Text, nullable=True)
+    recebido_em = Column(DateTime, server_default=func.now(), nullable=False)
+    iniciado_em = Column(DateTime, nullable=True)  # início da tentativa atual (recupera 'processando' órfão)
+    processado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_webhook_asaas_eventos_status_recebido', 'status', 'recebido_em'),
+    )
+
+    def __repr__(self):
+        return f"<WebhookAsaasEvento {self.evento_id} evento={self.evento} status={self.status}>"
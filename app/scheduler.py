@@ -4,12 +4,15 @@ import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
 from datetime import datetime
 
 from app.services.status_update_service import status_update_service
 from app.services.lembrete_service import lembrete_service
 from app.services.billing_service import billing_service
+from app.services import metricas_financeiras_service
 from app.services.conversa_service import ConversaService
+from app.services.scheduler_telemetria_service import scheduler_telemetria
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +21,25 @@ class ReminderScheduler:
     """
     Gerenciador de tarefas agendadas para lembretes de consultas.
 
-    IMPORTANTE: Este scheduler deve rodar em apenas UM worker/processo.
-    O main.py usa file lock para garantir instância única.
+    IMPORTANTE: Este scheduler deve rodar em apenas UM processo do cluster.
+    O main.py só o inicia no nó líder (scheduler_lideranca_service) e os
+    jobs confirmam o token de fencing antes de executar.
+
+    Os jobs retornam a quantidade de linhas processadas e propagam erros;
+    scheduler_telemetria registra cada execução em scheduler_execucoes.
     """
 
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
         self.is_running = False
 
+        # Execuções perdidas (misfire) ou puladas (max_instances) vão para a telemetria.
+        # Registrado uma vez: start() roda de novo a cada liderança recuperada
+        self.scheduler.add_listener(
+            scheduler_telemetria.ao_evento,
+            EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
+
     def start(self):
         """
         Inicia o scheduler de lembretes
@@ -38,7 +52,7 @@ class ReminderScheduler:
         try:
             # Job para atualizar status de consultas passadas a cada 15 minutos
             self.scheduler.add_job(
-                self._run_status_update,
+                scheduler_telemetria.instrumentar('update_status', 15 * 60, self._run_status_update),
                 trigger=IntervalTrigger(minutes=15),
                 id='update_status',
                 name='Atualizar status de consultas passadas',
@@ -50,7 +64,7 @@ class ReminderScheduler:
             # Job único para processar lembretes via API oficial Meta
             # (job legado 'process_reminders' removido — usava Evolution API descontinuada)
             self.scheduler.add_job(
-                self._run_lembretes_inteligentes,
+                scheduler_telemetria.instrumentar('lembretes_inteligentes', 10 * 60, self._run_lembretes_inteligentes),
                 trigger=IntervalTrigger(minutes=10),
                 id='lembretes_inteligentes',
                 name='Processar lembretes inteligentes (API oficial)',
@@ -61,7 +75,7 @@ class ReminderScheduler:
 
             # Job de billing: verificar descontos expirados diariamente às 06:00
             self.scheduler.add_job(
-                self._run_billing_sync,
+                scheduler_telemetria.instrumentar('billing_sync', 24 * 3600, self._run_billing_sync),
                 trigger=CronTrigger(hour=6, minute=0),
                 id='billing_sync',
                 name='Sincronizar billing e verificar descontos expirados',
@@ -72,7 +86,7 @@ class ReminderScheduler:
 
             # Job para devolver conversas inativas (humano assumiu mas esqueceu de devolver)
             self.scheduler.add_job(
-                self._run_devolver_conversas_inativas,
+                scheduler_telemetria.instrumentar('devolver_conversas_inativas', 5 * 60, self._run_devolver_conversas_inativas),
                 trigger=IntervalTrigger(minutes=5),
                 id='devolver_conversas_inativas',
                 name='Devolver conversas inativas para IA',
@@ -92,7 +106,9 @@ class ReminderScheduler:
             logger.info("🔁 Devolução de conversas inativas a cada 5 minutos")
 
             # Executar atualização de status imediatamente (idempotente, sem risco de duplicação)
-            asyncio.create_task(self._run_status_update())
+            asyncio.create_task(
+                scheduler_telemetria.instrumentar('update_status', 15 * 60, self._run_status_update)()
+            )
             # NÃO executar lembretes no startup — aguardar o primeiro ciclo do scheduler
             # para evitar envios duplicados se o serviço reiniciar rapidamente
 
@@ -143,9 +159,11 @@ class ReminderScheduler:
                 f"✅ Atualização de status concluída em {duration:.2f}s - "
                 f"Atualizadas: {stats['atualizadas']}"
             )
+            return stats['atualizadas']
 
         except Exception as e:
             logger.error(f"❌ Erro ao executar atualização de status: {str(e)}")
+            raise
 
     async def _run_lembretes_inteligentes(self):
         """
@@ -192,14 +210,18 @@ class ReminderScheduler:
                     f"3h={stats.get('3h', {})}, 1h={stats.get('1h', {})}"
                 )
 
+            return total_enviados
+
         except Exception as e:
             logger.error(f"❌ Erro ao processar lembretes inteligentes: {str(e)}")
+            raise
 
     async def _run_billing_sync(self):
         """
         Job diário de billing:
         1. Verifica descontos promocionais expirados e atualiza valores
         2. Sincroniza status de assinaturas com ASAAS
+        3. Grava o snapshot mensal das métricas financeiras
 
         Executado diariamente às 06:00.
         """
@@ -215,26 +237,8 @@ class ReminderScheduler:
                 descontos_atualizados = await billing_service.check_expired_discounts(db)
                 logger.info(f"💰 Descontos expirados atualizados: {descontos_atualizados}")
 
-                # 2. Sincronizar assinaturas ativas com ASAAS
-                from sqlalchemy import text
-                assinaturas = db.execute(
-                    text("""
-                        SELECT id FROM assinaturas
-                        WHERE status = 'ativa'
-                        AND asaas_subscription_id IS NOT NULL
-                    """)
-                ).fetchall()
-
-                sync_count = 0
-                sync_errors = 0
-                for row in assinaturas:
-                    try:
-                        status = await billing_service.sync_subscription_status(db, row[0])
-                        if status:
-                            sync_count += 1
-                    except Exception as e:
-                        sync_errors += 1
-                        logger.warning(f"💰 Erro ao sincronizar assinatura {row[0]}: {e}")
+                # 2. Sincronizar assinaturas ativas com ASAAS (em lote)
+                relatorio = await billing_service.sync_all_subscriptions(db)
 
                 end_time = datetime.now()
                 duration = (end_time - start_time).total_seconds()
@@ -242,14 +246,31 @@ class ReminderScheduler:
                 logger.info(
                     f"✅ Billing sync concluído em {duration:.2f}s - "
                     f"Descontos: {descontos_atualizados}, "
-                    f"Sync: {sync_count}/{len(assinaturas)}, "
-                    f"Erros: {sync_errors}"
+                    f"Assinaturas: {relatorio['assinaturas']}, "
+                    f"Alteradas: {relatorio['alteradas']}, "
+                    f"Chamadas ASAAS: {relatorio['chamadas_api']} "
+                    f"({relatorio['paginas']} página(s), {relatorio['buscas_individuais']} individual(is)), "
+                    f"Erros: {relatorio['erros']}, "
+                    f"Sync: {relatorio['duracao_s']:.2f}s"
                 )
+
+                # 3. Snapshot mensal das métricas financeiras (após o sync de status)
+                try:
+                    snapshot = await asyncio.to_thread(
+                        metricas_financeiras_service.registrar_snapshot_mensal, db
+                    )
+                    logger.info(f"📈 Snapshot financeiro {snapshot['mes']} - MRR R$ {snapshot['mrr']:.2f}")
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"❌ Erro ao registrar snapshot financeiro: {str(e)}")
+
+                return descontos_atualizados + relatorio['alteradas']
             finally:
                 db.close()
 
         except Exception as e:
             logger.error(f"❌ Erro ao executar billing sync: {str(e)}")
+            raise
 
     async def _run_devolver_conversas_inativas(self):
         """
@@ -276,11 +297,13 @@ class ReminderScheduler:
                     )
                 else:
                     logger.debug(f"🔁 Nenhuma conversa inativa encontrada ({duration:.2f}s)")
+                return devolvidas
             finally:
                 db.close()
 
         except Exception as e:
             logger.error(f"❌ Erro ao devolver conversas inativas: {str(e)}")
+            raise
 
     def get_status(self):
         """
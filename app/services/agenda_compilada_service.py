@@ -0,0 +1,353 @@
+"""
+Agenda semanal compilada por médico
+Horário Inteligente SaaS
+
+Converte a configuração de horários de configuracoes_medico (horarios_por_dia
+ou, no formato antigo, dias_atendimento + horario_inicio/horario_fim) em uma
+grade semanal pronta para uso:
+- intervalos de atendimento por dia da semana, com o almoço já subtraído
+- grade de slots (início de cada consulta) pré-calculada
+
+A agenda é compilada uma vez e mantida em cache por processo, versionada pelo
+conteúdo da configuração. Quem altera a configuração chama
+`agenda_compilada_service.invalidar(medico_id)`; nos demais workers a entrada
+expira pelo TTL e só é recompilada se a versão mudou.
+
+Convenção de dias: a agenda compilada usa date.weekday() do Python
+(0=Segunda ... 6=Domingo). A conversão das chaves do JSON ("0"=Domingo,
+"1"=Segunda ... "6"=Sábado) existe apenas neste módulo.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time as time_mod
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+ORIGEM_HORARIOS_POR_DIA = "horarios_por_dia"
+ORIGEM_DIAS_ATENDIMENTO = "dias_atendimento"
+
+# Nomes por weekday() do Python
+NOMES_DIAS = {
+    0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta',
+    4: 'Sexta', 5: 'Sábado', 6: 'Domingo'
+}
+
+# Ordem de exibição herdada do JSON (Domingo primeiro)
+ORDEM_EXIBICAO = (6, 0, 1, 2, 3, 4, 5)
+
+
+def weekday_de_json(dia) -> int:
+    """
+    Converte o dia do JSON de configuração para weekday() do Python.
+
+    JSON: 0=Domingo, 1=Segunda ... 6=Sábado (7 também é aceito como Domingo,
+    formato isoweekday usado em registros antigos de dias_atendimento).
+    """
+    return (int(dia) - 1) % 7
+
+
+def _parse_hora(valor) -> Optional[time]:
+    """'08:00' → time(8, 0). Retorna None para valores vazios ou inválidos."""
+    if not valor:
+        return None
+    if isinstance(valor, time):
+        return valor
+    try:
+        hora, minuto = map(int, str(valor).split(':')[:2])
+        return time(hora, minuto)
+    except (ValueError, TypeError):
+        return None
+
+
+def _minutos(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _hora(minutos: int) -> time:
+    return time(minutos // 60, minutos % 60)
+
+
+@dataclass(frozen=True)
+class DiaAgenda:
+    """Um dia da semana já compilado"""
+    weekday: int
+    inicio: time
+    fim: time
+    almoco: Optional[Tuple[time, time]]
+    intervalos: Tuple[Tuple[time, time], ...]
+    slots: Tuple[time, ...]
+
+    @property
+    def nome(self) -> str:
+        return NOMES_DIAS[self.weekday]
+
+    def descricao(self) -> str:
+        """Texto usado no prompt da IA: '08:00 às 18:00 (almoço 12:00-13:00)'"""
+        texto = f"{self.inicio:%H:%M} às {self.fim:%H:%M}"
+        if self.almoco:
+            texto += f" (almoço {self.almoco[0]:%H:%M}-{self.almoco[1]:%H:%M})"
+        return texto
+
+    def atende(self, horario: time) -> bool:
+        """Horário está dentro de algum intervalo de atendimento (fora do almoço)"""
+        return any(inicio <= horario < fim for inicio, fim in self.intervalos)
+
+
+@dataclass(frozen=True)
+class AgendaCompilada:
+    """Grade semanal de um médico, indexada por weekday() do Python"""
+    medico_id: int
+    versao: str
+    origem: str
+    ativa: bool
+    intervalo_consulta: int
+    dias: Dict[int, DiaAgenda] = field(default_factory=dict)
+
+    def dia(self, data: date) -> Optional[DiaAgenda]:
+        return self.dias.get(data.weekday())
+
+    def slots(self, data: date) -> List[datetime]:
+        """Inícios de consulta do dia (datetimes sem timezone, horário de Brasília)"""
+        dia = self.dia(data)
+        if not dia:
+            return []
+        return [datetime.combine(data, slot) for slot in dia.slots]
+
+    def atende(self, data_hora: datetime) -> bool:
+        dia = self.dia(data_hora.date())
+        return bool(dia and dia.atende(data_hora.time()))
+
+    def dias_ordenados(self) -> List[DiaAgenda]:
+        """Dias de atendimento na ordem de exibição (Domingo primeiro)"""
+        return [self.dias[wd] for wd in ORDEM_EXIBICAO if wd in self.dias]
+
+
+def _compilar_dia(
+    weekday: int,
+    inicio: Optional[time],
+    fim: Optional[time],
+    almoco: Optional[Tuple[Optional[time], Optional[time]]],
+    intervalo_consulta: int
+) -> Optional[DiaAgenda]:
+    """Subtrai o almoço do expediente e pré-calcula a grade de slots"""
+    if not inicio or not fim or inicio >= fim:
+        return None
+
+    ini_min, fim_min = _minutos(inicio), _minutos(fim)
+
+    almoco_valido = None
+    intervalos = [(ini_min, fim_min)]
+    if almoco and almoco[0] and almoco[1] and almoco[0] < almoco[1]:
+        almoco_valido = (almoco[0], almoco[1])
+        alm_ini = max(_minutos(almoco[0]), ini_min)
+        alm_fim = min(_minutos(almoco[1]), fim_min)
+        if alm_ini < alm_fim:
+            intervalos = [(a, b) for a, b in ((ini_min, alm_ini), (alm_fim, fim_min)) if a < b]
+
+    # Grade a partir do início do expediente; slots que começam no almoço são descartados
+    slots = []
+    passo = max(intervalo_consulta, 1)
+    for minuto in range(ini_min, fim_min, passo):
+        if any(a <= minuto < b for a, b in intervalos):
+            slots.append(_hora(minuto))
+
+    return DiaAgenda(
+        weekday=weekday,
+        inicio=inicio,
+        fim=fim,
+        almoco=almoco_valido,
+        intervalos=tuple((_hora(a), _hora(b)) for a, b in intervalos),
+        slots=tuple(slots),
+    )
+
+
+def _carregar_json(valor):
+    if not valor:
+        return None
+    if isinstance(valor, str):
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return None
+    return valor
+
+
+def compilar_agenda(row, versao: str) -> AgendaCompilada:
+    """Compila uma linha de configuracoes_medico"""
+    intervalo = row.intervalo_consulta or 30
+    inicio_padrao = row.horario_inicio or "08:00"
+    fim_padrao = row.horario_fim or "18:00"
+    almoco_padrao = (row.intervalo_almoco_inicio, row.intervalo_almoco_fim)
+
+    dias: Dict[int, DiaAgenda] = {}
+    horarios_por_dia = _carregar_json(row.horarios_por_dia)
+
+    if isinstance(horarios_por_dia, dict) and horarios_por_dia:
+        origem = ORIGEM_HORARIOS_POR_DIA
+        for chave, config_dia in horarios_por_dia.items():
+            if not isinstance(config_dia, dict) or not config_dia.get('ativo', False):
+                continue
+            try:
+                weekday = weekday_de_json(chave)
+            except (ValueError, TypeError):
+                continue
+
+            almoco = None
+            if not config_dia.get('sem_almoco', False):
+                almoco = (
+                    _parse_hora(config_dia.get('almoco_inicio') or almoco_padrao[0]),
+                    _parse_hora(config_dia.get('almoco_fim') or almoco_padrao[1]),
+                )
+
+            dia = _compilar_dia(
+                weekday,
+                _parse_hora(config_dia.get('inicio') or inicio_padrao),
+                _parse_hora(config_dia.get('fim') or fim_padrao),
+                almoco,
+                intervalo
+            )
+            if dia:
+                dias[weekday] = dia
+    else:
+        # Formato antigo: mesma faixa de horário para todos os dias listados
+        origem = ORIGEM_DIAS_ATENDIMENTO
+        dias_atendimento = _carregar_json(row.dias_atendimento) or []
+        almoco = (_parse_hora(almoco_padrao[0]), _parse_hora(almoco_padrao[1]))
+        for dia_json in dias_atendimento:
+            try:
+                weekday = weekday_de_json(dia_json)
+            except (ValueError, TypeError):
+                continue
+            dia = _compilar_dia(
+                weekday, _parse_hora(inicio_padrao), _parse_hora(fim_padrao), almoco, intervalo
+            )
+            if dia:
+                dias[weekday] = dia
+
+    return AgendaCompilada(
+        medico_id=row.medico_id,
+        versao=versao,
+        origem=origem,
+        ativa=row.ativo is not False,
+        intervalo_consulta=intervalo,
+        dias=dias,
+    )
+
+
+class AgendaCompiladaService:
+    """Cache por processo das agendas compiladas"""
+
+    def __init__(self, ttl_segundos: float = 60.0):
+        self.ttl_segundos = ttl_segundos
+        # medico_id -> (agenda ou None se sem configuração, expira_em)
+        self._cache: Dict[int, Tuple[Optional[AgendaCompilada], float]] = {}
+        self._lock = threading.Lock()
+
+        self.acertos = 0
+        self.revalidacoes = 0
+        self.compilacoes = 0
+
+    @staticmethod
+    def _versao(row) -> str:
+        """Hash do conteúdo da configuração - muda a cada alteração relevante"""
+        conteudo = repr((
+            row.horarios_por_dia, row.dias_atendimento, row.horario_inicio, row.horario_fim,
+            row.intervalo_almoco_inicio, row.intervalo_almoco_fim, row.intervalo_consulta, row.ativo
+        ))
+        return hashlib.sha1(conteudo.encode()).hexdigest()[:12]
+
+    def obter(self, db: Session, medico_id: int) -> Optional[AgendaCompilada]:
+        """Agenda compilada do médico (None se ele não tem configuração)"""
+        return self.obter_varios(db, [medico_id]).get(medico_id)
+
+    def obter_varios(self, db: Session, medico_ids: Iterable[int]) -> Dict[int, AgendaCompilada]:
+        """
+        Agendas de vários médicos com no máximo uma consulta ao banco.
+
+        Médicos sem configuração ficam fora do dicionário retornado.
+        """
+        agora = time_mod.monotonic()
+        resultado: Dict[int, AgendaCompilada] = {}
+        pendentes = []
+
+        with self._lock:
+            for medico_id in set(medico_ids):
+                entrada = self._cache.get(medico_id)
+                if entrada and entrada[1] > agora:
+                    self.acertos += 1
+                    if entrada[0]:
+                        resultado[medico_id] = entrada[0]
+                else:
+                    pendentes.append(medico_id)
+
+        if not pendentes:
+            return resultado
+
+        rows = db.execute(text("""
+            SELECT medico_id, horarios_por_dia, dias_atendimento, horario_inicio, horario_fim,
+                   intervalo_almoco_inicio, intervalo_almoco_fim, intervalo_consulta, ativo
+            FROM configuracoes_medico
+            WHERE medico_id IN :medico_ids
+        """).bindparams(bindparam("medico_ids", expanding=True)), {"medico_ids": list(pendentes)}).fetchall()
+
+        expira_em = agora + self.ttl_segundos
+        encontrados = set()
+
+        with self._lock:
+            for row in rows:
+                encontrados.add(row.medico_id)
+                versao = self._versao(row)
+                anterior = self._cache.get(row.medico_id)
+
+                if anterior and anterior[0] and anterior[0].versao == versao:
+                    agenda = anterior[0]
+                    self.revalidacoes += 1
+                else:
+                    agenda = compilar_agenda(row, versao)
+                    self.compilacoes += 1
+                    logger.debug(
+                        f"🗓️ Agenda do médico {row.medico_id} compilada "
+                        f"(versão {versao}, {len(agenda.dias)} dia(s), origem {agenda.origem})"
+                    )
+
+                self._cache[row.medico_id] = (agenda, expira_em)
+                resultado[row.medico_id] = agenda
+
+            for medico_id in pendentes:
+                if medico_id not in encontrados:
+                    self._cache[medico_id] = (None, expira_em)
+
+        return resultado
+
+    def invalidar(self, medico_id: Optional[int] = None):
+        """Descarta a agenda em cache (de um médico ou de todos) após alteração de configuração"""
+        with self._lock:
+            if medico_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(medico_id, None)
+
+    def get_status(self) -> Dict:
+        return {
+            "em_cache": len(self._cache),
+            "ttl_segundos": self.ttl_segundos,
+            "acertos": self.acertos,
+            "revalidacoes": self.revalidacoes,
+            "compilacoes": self.compilacoes,
+        }
+
+
+# Instância global (singleton)
+agenda_compilada_service = AgendaCompiladaService(
+    ttl_segundos=float(os.getenv("AGENDA_CACHE_TTL", "60"))
+)
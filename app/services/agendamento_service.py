@@ -12,6 +12,7 @@ from sqlalchemy import and_, or_, text
 from app.models.agendamento import Agendamento
 from app.models.medico import Medico
 from app.models.paciente import Paciente
+from app.services.agenda_compilada_service import agenda_compilada_service
 
 
 class AgendamentoService:
@@ -49,16 +50,18 @@ class AgendamentoService:
         # Usar SQL para verificar conflito considerando duração real de cada agendamento
         # Conflito ocorre quando: novo_inicio < existente_fim AND novo_fim > existente_inicio
         # Status que LIBERAM o horário: cancelado, faltou, remarcado
+        # Tipos explícitos (timestamptz / make_interval) para valer igual no psycopg2
+        # e no asyncpg, que não aceita concatenar inteiro com texto em parâmetro
         query = """
             SELECT id FROM agendamentos
             WHERE medico_id = :medico_id
             AND status NOT IN ('cancelado', 'faltou', 'remarcado')
             AND (
                 -- Novo agendamento começa antes do existente terminar
-                :novo_inicio < (data_hora + (COALESCE(duracao_minutos, 30) || ' minutes')::interval)
+                CAST(:novo_inicio AS timestamptz) < (data_hora + make_interval(mins => COALESCE(duracao_minutos, 30)))
                 AND
                 -- Novo agendamento termina depois do existente começar
-                (:novo_inicio + (:duracao || ' minutes')::interval) > data_hora
+                (CAST(:novo_inicio AS timestamptz) + make_interval(mins => CAST(:duracao AS integer))) > data_hora
             )
         """
 
@@ -88,10 +91,9 @@ class AgendamentoService:
     ) -> List[str]:
         """
         Obtém horários disponíveis de um médico em uma data específica.
-        Busca configuração da tabela configuracoes_medico (horarios_por_dia).
+        Usa a agenda compilada da configuração do médico (configuracoes_medico).
         """
         import pytz
-        import json
 
         # Buscar médico
         medico = self.db.query(Medico).filter(
@@ -102,116 +104,48 @@ class AgendamentoService:
         if not medico:
             return []
 
-        # Buscar configuração do médico na tabela configuracoes_medico
-        config_result = self.db.execute(text("""
-            SELECT horarios_por_dia, intervalo_consulta,
-                   intervalo_almoco_inicio, intervalo_almoco_fim
-            FROM configuracoes_medico
-            WHERE medico_id = :medico_id AND ativo = true
-        """), {"medico_id": medico_id}).fetchone()
+        agenda = agenda_compilada_service.obter(self.db, medico_id)
 
-        if not config_result or not config_result[0]:
+        if not agenda or not agenda.ativa or not agenda.dias:
             # Fallback: tentar usar medico.horarios_atendimento se existir
             if medico.horarios_atendimento:
                 return self._obter_horarios_legado(medico, data_consulta, duracao_minutos)
             return []
 
-        horarios_por_dia = config_result[0]
-        intervalo_consulta = config_result[1] or 30
-        almoco_inicio_str = config_result[2]
-        almoco_fim_str = config_result[3]
-
-        # Parse JSON se necessário
-        if isinstance(horarios_por_dia, str):
-            horarios_por_dia = json.loads(horarios_por_dia)
-
-        # Mapear dia da semana Python para chave do JSON
-        # Python weekday(): 0=Segunda, ..., 6=Domingo
-        # JSON horarios_por_dia: "0"=Domingo, "1"=Segunda, ..., "6"=Sábado
-        dia_semana_python = data_consulta.weekday()
-        dia_semana_json = str((dia_semana_python + 1) % 7)  # Converte: 0→1, 1→2, ..., 5→6, 6→0
-
-        # Verificar se há configuração para este dia
-        if dia_semana_json not in horarios_por_dia:
-            return []
-
-        config_dia = horarios_por_dia[dia_semana_json]
-
-        # Verificar se está ativo neste dia
-        if not config_dia.get('ativo', False):
+        # Grade do dia já com o almoço descontado
+        slots = agenda.slots(data_consulta)
+        if not slots:
             return []
 
-        # Obter horários do dia
-        inicio_str = config_dia.get('inicio', '08:00')
-        fim_str = config_dia.get('fim', '18:00')
-
-        # Horário de almoço específico do dia (se configurado)
-        almoco_inicio_dia = config_dia.get('almoco_inicio') or almoco_inicio_str
-        almoco_fim_dia = config_dia.get('almoco_fim') or almoco_fim_str
-        sem_almoco = config_dia.get('sem_almoco', False)
-
-        hora_inicio, min_inicio = map(int, inicio_str.split(':'))
-        hora_fim, min_fim = map(int, fim_str.split(':'))
-
-        # Criar datetime com timezone de Brasília
         tz_brazil = pytz.timezone('America/Sao_Paulo')
 
-        hora_atual = tz_brazil.localize(
-            datetime.combine(data_consulta, datetime.min.time().replace(hour=hora_inicio, minute=min_inicio))
-        )
-        hora_final = tz_brazil.localize(
-            datetime.combine(data_consulta, datetime.min.time().replace(hour=hora_fim, minute=min_fim))
-        )
-
-        # Configurar intervalo de almoço
-        almoco_inicio = None
-        almoco_fim = None
-        if not sem_almoco and almoco_inicio_dia and almoco_fim_dia:
-            try:
-                h_almoco_ini, m_almoco_ini = map(int, almoco_inicio_dia.split(':'))
-                h_almoco_fim, m_almoco_fim = map(int, almoco_fim_dia.split(':'))
-                almoco_inicio = tz_brazil.localize(
-                    datetime.combine(data_consulta, datetime.min.time().replace(hour=h_almoco_ini, minute=m_almoco_ini))
-                )
-                almoco_fim = tz_brazil.localize(
-                    datetime.combine(data_consulta, datetime.min.time().replace(hour=h_almoco_fim, minute=m_almoco_fim))
-                )
-            except (ValueError, AttributeError):
-                pass
-
         # Buscar bloqueios de agenda para o médico nesta data
         bloqueios = self._obter_bloqueios_dia(medico_id, data_consulta, tz_brazil)
 
-        # Gerar slots usando o intervalo configurado do médico
+        # Agendamentos do dia numa consulta só; conflitos verificados em memória
+        ocupados = self._obter_ocupados_dia(medico_id, data_consulta, duracao_minutos, tz_brazil)
+
         horarios_disponiveis = []
 
         # Se for hoje, obter hora atual para filtrar horários que já passaram
         agora = datetime.now(tz_brazil)
         eh_hoje = data_consulta == agora.date()
 
-        while hora_atual < hora_final:
+        for slot in slots:
+            hora_atual = tz_brazil.localize(slot)
+
             # Se for hoje, pular horários que já passaram (com margem de 30 min)
             if eh_hoje and hora_atual <= agora + timedelta(minutes=30):
-                hora_atual += timedelta(minutes=intervalo_consulta)
                 continue
 
-            # Verificar se está no horário de almoço
-            if almoco_inicio and almoco_fim:
-                if almoco_inicio <= hora_atual < almoco_fim:
-                    hora_atual += timedelta(minutes=intervalo_consulta)
-                    continue
-
             # Verificar se está em período bloqueado
             if self._horario_bloqueado(hora_atual, duracao_minutos, bloqueios):
-                hora_atual += timedelta(minutes=intervalo_consulta)
                 continue
 
             # Verificar disponibilidade (sem conflito com outros agendamentos)
-            if self.verificar_disponibilidade_medico(medico_id, hora_atual, duracao_minutos):
+            if not self._horario_bloqueado(hora_atual, duracao_minutos, ocupados):
                 horarios_disponiveis.append(hora_atual.strftime('%H:%M'))
 
-            hora_atual += timedelta(minutes=intervalo_consulta)
-
         return horarios_disponiveis
 
     def _obter_bloqueios_dia(self, medico_id: int, data_consulta: date, tz_brazil) -> List[Dict]:
@@ -246,8 +180,49 @@ class AgendamentoService:
 
         return bloqueios
 
+    def _obter_ocupados_dia(
+        self,
+        medico_id: int,
+        data_consulta: date,
+        duracao_minutos: int,
+        tz_brazil
+    ) -> List[Dict]:
+        """
+        Intervalos ocupados por agendamentos que podem conflitar com slots da data.
+
+        Mesma regra de verificar_disponibilidade_medico (duração real de cada
+        agendamento; cancelado/faltou/remarcado liberam o horário), em uma
+        consulta para o dia inteiro em vez de uma por slot.
+        """
+        inicio_dia = tz_brazil.localize(datetime.combine(data_consulta, datetime.min.time()))
+        # Slots do fim do dia podem terminar depois da meia-noite
+        fim_janela = inicio_dia + timedelta(days=1, minutes=duracao_minutos)
+
+        result = self.db.execute(text("""
+            SELECT data_hora, COALESCE(duracao_minutos, 30)
+            FROM agendamentos
+            WHERE medico_id = :medico_id
+            AND status NOT IN ('cancelado', 'faltou', 'remarcado')
+            AND data_hora < CAST(:fim_janela AS timestamptz)
+            AND (data_hora + make_interval(mins => COALESCE(duracao_minutos, 30))) > CAST(:inicio_dia AS timestamptz)
+        """), {
+            "medico_id": medico_id,
+            "inicio_dia": inicio_dia,
+            "fim_janela": fim_janela
+        }).fetchall()
+
+        ocupados = []
+        for row in result:
+            inicio = tz_brazil.localize(row[0]) if row[0].tzinfo is None else row[0]
+            ocupados.append({
+                "inicio": inicio,
+                "fim": inicio + timedelta(minutes=row[1])
+            })
+
+        return ocupados
+
     def _horario_bloqueado(self, hora_inicio: datetime, duracao_minutos: int, bloqueios: List[Dict]) -> bool:
-        """Verifica se um horário específico está dentro de um período bloqueado."""
+        """Verifica se um horário conflita com algum intervalo (bloqueios ou agendamentos ocupados)."""
         hora_fim = hora_inicio + timedelta(minutes=duracao_minutos)
 
         for bloqueio in bloqueios:
@@ -303,8 +278,10 @@ class AgendamentoService:
             datetime.combine(data_consulta, datetime.min.time().replace(hour=hora_fim, minute=min_fim))
         )
 
+        ocupados = self._obter_ocupados_dia(medico.id, data_consulta, duracao_minutos, tz_brazil)
+
         while hora_atual < hora_final:
-            if self.verificar_disponibilidade_medico(medico.id, hora_atual, duracao_minutos):
+            if not self._horario_bloqueado(hora_atual, duracao_minutos, ocupados):
                 horarios_disponiveis.append(hora_atual.strftime('%H:%M'))
             hora_atual += timedelta(minutes=30)
 
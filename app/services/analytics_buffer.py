@@ -0,0 +1,200 @@
+"""
+Buffer de ingestão de analytics (page_views)
+Horário Inteligente SaaS
+
+O endpoint público /api/analytics/track apenas enfileira os eventos em memória.
+Uma task de background grava os eventos em lote na tabela page_views
+(INSERT multi-linha) quando o buffer atinge o tamanho de lote ou quando o
+intervalo de flush expira. Assim picos de tráfego do site comercial não viram
+carga de escrita direta no mesmo Postgres que atende os agendamentos.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.models.page_view import PageView
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsBuffer:
+    """Fila em memória com flush em lote para a tabela page_views"""
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 5.0,
+        max_size: int = 10000,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+
+        self._fila: Deque[Dict] = deque()
+        self._evento_flush: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        # Contadores expostos em /sistema/status
+        self.recebidos = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.flushes = 0
+        self.erros_flush = 0
+        self.ultimo_flush_em: Optional[float] = None
+        self.ultimo_flush_duracao_ms: Optional[float] = None
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Inicia a task de flush periódico (chamado no startup da aplicação)"""
+        if self._task and not self._task.done():
+            return
+        self._evento_flush = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._loop_flush())
+        logger.info(
+            f"📊 Buffer de analytics iniciado (lote={self.batch_size}, "
+            f"intervalo={self.flush_interval}s, capacidade={self.max_size})"
+        )
+
+    async def stop(self):
+        """Para a task de flush e grava o que restou na fila"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._fila:
+            await self.flush()
+        logger.info("📊 Buffer de analytics encerrado")
+
+    # ==================== INGESTÃO ====================
+
+    def enqueue(self, eventos: List[Dict]) -> int:
+        """
+        Adiciona eventos já sanitizados à fila.
+
+        Quando a fila está cheia os eventos excedentes são descartados
+        (backpressure) e contabilizados em `descartados`.
+
+        Returns:
+            Quantidade de eventos aceitos
+        """
+        if self._task is None or self._task.done():
+            # Fallback: iniciar sob demanda caso o startup não tenha rodado
+            self.start()
+
+        self.recebidos += len(eventos)
+        espaco = self.max_size - len(self._fila)
+        aceitos = eventos[:max(espaco, 0)]
+        descartados = len(eventos) - len(aceitos)
+
+        if descartados:
+            self.descartados += descartados
+            logger.warning(f"📊 Buffer de analytics cheio - {descartados} evento(s) descartado(s)")
+
+        self._fila.extend(aceitos)
+
+        if len(self._fila) >= self.batch_size:
+            self._evento_flush.set()
+
+        return len(aceitos)
+
+    # ==================== FLUSH ====================
+
+    async def _loop_flush(self):
+        """Loop de background: flush por tamanho de lote ou por tempo"""
+        while True:
+            try:
+                await asyncio.wait_for(self._evento_flush.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._evento_flush.clear()
+
+            while self._fila:
+                await self.flush()
+                if len(self._fila) < self.batch_size:
+                    break
+
+    async def flush(self) -> int:
+        """Grava até `batch_size` eventos da fila com um único INSERT multi-linha"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._fila:
+                return 0
+
+            lote = [self._fila.popleft() for _ in range(min(self.batch_size, len(self._fila)))]
+            inicio = time.perf_counter()
+
+            try:
+                # Sessão síncrona fora do event loop
+                await asyncio.to_thread(self._gravar_lote, lote)
+                self.gravados += len(lote)
+                self.flushes += 1
+                return len(lote)
+            except Exception as e:
+                # Dados de analytics não são críticos: contabiliza e descarta
+                self.erros_flush += 1
+                self.descartados += len(lote)
+                logger.error(f"📊 Erro ao gravar lote de analytics ({len(lote)} eventos): {e}")
+                return 0
+            finally:
+                self.ultimo_flush_em = time.time()
+                self.ultimo_flush_duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    @staticmethod
+    def _gravar_lote(lote: List[Dict]):
+        """INSERT multi-linha (executemany com insertmanyvalues do SQLAlchemy 2.0)"""
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(PageView.__table__), lote)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ==================== STATUS ====================
+
+    def get_status(self) -> Dict:
+        """Contadores de ingestão, backpressure e descarte"""
+        ocupacao = len(self._fila) / self.max_size if self.max_size else 0
+        return {
+            "rodando": self._task is not None and not self._task.done(),
+            "na_fila": len(self._fila),
+            "capacidade": self.max_size,
+            "ocupacao_percentual": round(ocupacao * 100, 1),
+            "backpressure": ocupacao >= 0.8,
+            "recebidos": self.recebidos,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "flushes": self.flushes,
+            "erros_flush": self.erros_flush,
+            "ultimo_flush_duracao_ms": self.ultimo_flush_duracao_ms,
+            "ultimo_flush_em": (
+                time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.ultimo_flush_em))
+                if self.ultimo_flush_em else None
+            ),
+        }
+
+
+# Instância global (singleton)
+analytics_buffer = AnalyticsBuffer(
+    batch_size=int(os.getenv("ANALYTICS_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "5")),
+    max_size=int(os.getenv("ANALYTICS_BUFFER_MAX", "10000")),
+)
@@ -5,24 +5,28 @@ Desenvolvido por Marco
 """
 
 import json
+import logging
 import re
 import os
 from datetime import datetime, date, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Callable, Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 
 from app.models.cliente import Cliente
 from app.models.medico import Medico
 from app.models.paciente import Paciente
 from app.models.convenio import Convenio
 from app.services.agendamento_service import AgendamentoService
+from app.services.agenda_compilada_service import agenda_compilada_service
 
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+from app.services.registry import get_anthropic_client, get_anthropic_async_client
+from app.services.resposta_ia_stream import ExtratorResposta
+from app.metricas import medir_externo
+
+logger = logging.getLogger(__name__)
+
+# Streaming da resposta (trecho antes do ⏳ enviado enquanto o resto é gerado)
+STREAMING_ATIVO = os.getenv("ANTHROPIC_STREAMING", "true").lower() != "false"
 
 
 class AnthropicService:
@@ -32,14 +36,9 @@ class AnthropicService:
         self.db = db
         self.cliente_id = cliente_id
         
-        # Configurar cliente Anthropic
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if api_key and ANTHROPIC_AVAILABLE:
-            self.anthropic = Anthropic(api_key=api_key)
-            self.use_real_ai = True
-        else:
-            self.anthropic = None
-            self.use_real_ai = False
+        # Cliente Anthropic compartilhado do processo (None sem API key/SDK)
+        self.anthropic = get_anthropic_client()
+        self.use_real_ai = self.anthropic is not None
     
     def processar_mensagem(self, mensagem: str, telefone: str, contexto_conversa: List[Dict] = None) -> Dict[str, Any]:
         """Processa uma mensagem do usuário e retorna resposta estruturada."""
@@ -55,6 +54,61 @@ class AnthropicService:
         else:
             return self._processar_com_regras(mensagem, contexto_clinica, paciente)
     
+    async def processar_mensagem_stream(
+        self,
+        mensagem: str,
+        telefone: str,
+        contexto_conversa: List[Dict] = None,
+        ao_segmento: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Igual a processar_mensagem, mas com a resposta da IA em streaming:
+        `ao_segmento(texto)` é chamado (uma vez) com o trecho antes do marcador
+        ⏳ assim que ele chega, antes do fim da geração. O retorno traz
+        "segmento_antecipado" com esse trecho (ou None).
+        """
+        anthropic_async = get_anthropic_async_client() if STREAMING_ATIVO and self.use_real_ai else None
+        if anthropic_async is None:
+            return self.processar_mensagem(mensagem, telefone, contexto_conversa)
+
+        contexto_clinica = self._obter_contexto_clinica()
+        paciente = self._obter_paciente_por_telefone(telefone)
+        extrator = ExtratorResposta()
+
+        try:
+            prompt = self._construir_prompt(mensagem, contexto_clinica, paciente, contexto_conversa)
+
+            model = os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229")
+            with medir_externo("anthropic", "messages_stream"):
+                async with anthropic_async.messages.stream(
+                    model=model,
+                    max_tokens=1000,
+                    temperature=0.7,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                ) as stream:
+                    async for delta in stream.text_stream:
+                        segmento = extrator.alimentar(delta)
+                        if segmento and ao_segmento:
+                            ao_segmento(segmento)
+
+            resultado = self._processar_resposta_ia(extrator.bruto)
+
+        except Exception as e:
+            logger.error("Erro na Anthropic IA (streaming): %s", e, exc_info=True)
+            # Fallback para regras simples
+            resultado = self._processar_com_regras(mensagem, contexto_clinica, paciente)
+
+        if extrator.segmento and resultado.get("resposta") != extrator.texto:
+            # O trecho antes do ⏳ já foi ao paciente, mas o JSON não foi interpretado
+            # (stream interrompido, max_tokens, JSON inválido): o resto da resposta
+            # e o histórico vêm do mesmo texto do stream, não de uma resposta genérica
+            resultado = self._resposta_padrao(extrator.texto)
+
+        resultado["segmento_antecipado"] = extrator.segmento
+        return resultado
+
     def _processar_com_anthropic(self, mensagem: str, contexto_clinica: Dict, paciente: Optional, contexto_conversa: List[Dict]) -> Dict[str, Any]:
         """Processa mensagem usando IA real da Anthropic."""
         
@@ -64,14 +118,15 @@ class AnthropicService:
             
             # Chamar Anthropic
             model = os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229")
-            response = self.anthropic.messages.create(
-                model=model,
-                max_tokens=1000,
-                temperature=0.7,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            with medir_externo("anthropic", "messages"):
+                response = self.anthropic.messages.create(
+                    model=model,
+                    max_tokens=1000,
+                    temperature=0.7,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             resposta_ia = response.content[0].text
             
@@ -844,77 +899,29 @@ IMPORTANTE SOBRE medico_id:
             Convenio.ativo == True
         ).all()
 
-        # Buscar configurações de horário de cada médico
+        # Agendas compiladas de todos os médicos (uma única consulta ao banco)
         medicos_com_config = []
-        dias_semana_nomes = {
-            0: 'Domingo', 1: 'Segunda', 2: 'Terça',
-            3: 'Quarta', 4: 'Quinta', 5: 'Sexta', 6: 'Sábado'
-        }
+        agendas = agenda_compilada_service.obter_varios(
+            self.db,
+            [m.id for m in medicos if not getattr(m, 'is_secretaria', False)]
+        )
 
         for m in medicos:
             # Pular secretárias - não são médicos para agendamento
             if hasattr(m, 'is_secretaria') and m.is_secretaria:
                 continue
 
-            # Buscar configuração do médico
-            config_result = self.db.execute(text("""
-                SELECT horarios_por_dia, dias_atendimento, horario_inicio, horario_fim,
-                       intervalo_almoco_inicio, intervalo_almoco_fim
-                FROM configuracoes_medico
-                WHERE medico_id = :medico_id
-            """), {"medico_id": m.id}).fetchone()
-
             # Montar informações de disponibilidade
             disponibilidade = {
                 "dias_atendimento": [],
                 "horarios_por_dia": {}
             }
 
-            if config_result:
-                horarios_por_dia = config_result[0]
-                dias_atendimento = config_result[1]
-                horario_inicio_padrao = config_result[2] or "08:00"
-                horario_fim_padrao = config_result[3] or "18:00"
-                almoco_inicio = config_result[4]
-                almoco_fim = config_result[5]
-
-                # Processar horarios_por_dia (JSON detalhado)
-                if horarios_por_dia:
-                    if isinstance(horarios_por_dia, str):
-                        horarios_por_dia = json.loads(horarios_por_dia)
-
-                    for dia_num_str, config_dia in horarios_por_dia.items():
-                        dia_num = int(dia_num_str)
-                        if config_dia.get('ativo', False):
-                            dia_nome = dias_semana_nomes.get(dia_num, f'Dia {dia_num}')
-                            disponibilidade["dias_atendimento"].append(dia_nome)
-
-                            inicio = config_dia.get('inicio', horario_inicio_padrao)
-                            fim = config_dia.get('fim', horario_fim_padrao)
-                            sem_almoco = config_dia.get('sem_almoco', False)
-                            almoco_i = config_dia.get('almoco_inicio', almoco_inicio)
-                            almoco_f = config_dia.get('almoco_fim', almoco_fim)
-
-                            horario_info = f"{inicio} às {fim}"
-                            if not sem_almoco and almoco_i and almoco_f:
-                                horario_info += f" (almoço {almoco_i}-{almoco_f})"
-
-                            disponibilidade["horarios_por_dia"][dia_nome] = horario_info
-
-                # Fallback: usar dias_atendimento se horarios_por_dia não tiver dados
-                elif dias_atendimento:
-                    if isinstance(dias_atendimento, str):
-                        dias_atendimento = json.loads(dias_atendimento)
-
-                    for dia_num in dias_atendimento:
-                        dia_nome = dias_semana_nomes.get(dia_num, f'Dia {dia_num}')
-                        disponibilidade["dias_atendimento"].append(dia_nome)
-
-                        horario_info = f"{horario_inicio_padrao} às {horario_fim_padrao}"
-                        if almoco_inicio and almoco_fim:
-                            horario_info += f" (almoço {almoco_inicio}-{almoco_fim})"
-
-                        disponibilidade["horarios_por_dia"][dia_nome] = horario_info
+            agenda = agendas.get(m.id)
+            if agenda:
+                for dia in agenda.dias_ordenados():
+                    disponibilidade["dias_atendimento"].append(dia.nome)
+                    disponibilidade["horarios_por_dia"][dia.nome] = dia.descricao()
 
             medicos_com_config.append({
                 "id": m.id,
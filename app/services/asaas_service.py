@@ -4,13 +4,127 @@ Desenvolvido para gerenciar cobranças e assinaturas do SaaS Horário Inteligent
 """
 
 import os
+import time
+import random
+import asyncio
+import json
 import httpx
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import date, datetime
 
+from app.metricas import medir_externo
+
 logger = logging.getLogger(__name__)
 
+# Cliente HTTP compartilhado (keep-alive) e política de retry
+ASAAS_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+ASAAS_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+ASAAS_MAX_RETRIES = int(os.getenv("ASAAS_MAX_RETRIES", "3"))
+ASAAS_RATE_LIMIT = float(os.getenv("ASAAS_RATE_LIMIT", "5"))  # requisições por segundo (por worker)
+ASAAS_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Cache de artefatos da cobrança (QR Code PIX, linha digitável) no Redis,
+# compartilhado entre workers: o webhook que muda o estado da cobrança
+# invalida para todos. Sem Redis, não há cache (sempre consulta o ASAAS)
+CACHE_ARTEFATOS_TTL = 24 * 3600
+CACHE_ARTEFATOS_PREFIXO = "asaas:artefato"
+CACHE_ARTEFATOS_TIMEOUT = float(os.getenv("ASAAS_CACHE_REDIS_TIMEOUT_MS", "100")) / 1000
+CACHE_ARTEFATOS_PAUSA = 30.0
+TIPOS_ARTEFATO = ("pix", "linha_digitavel")
+
+
+class TokenBucket:
+    """
+    Limitador de taxa (token bucket) para chamadas à API do ASAAS.
+
+    `rate` tokens são repostos por segundo até `capacity`; cada chamada
+    consome um token e aguarda quando o balde está vazio.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity or max(int(rate), 1)
+        self._tokens = float(self.capacity)
+        self._atualizado_em = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (agora - self._atualizado_em) * self.rate
+                )
+                self._atualizado_em = agora
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_limitador = TokenBucket(ASAAS_RATE_LIMIT)
+_cliente_http: Optional[httpx.AsyncClient] = None
+_cliente_loop: Optional[asyncio.AbstractEventLoop] = None
+_redis_artefatos = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+_redis_pausado_ate = 0.0
+
+
+def _obter_cliente_http() -> httpx.AsyncClient:
+    """Cliente compartilhado por todas as instâncias de AsaasService no event loop atual"""
+    global _cliente_http, _cliente_loop
+    loop = asyncio.get_running_loop()
+    if _cliente_http is None or _cliente_http.is_closed or _cliente_loop is not loop:
+        _cliente_http = httpx.AsyncClient(timeout=ASAAS_TIMEOUT, limits=ASAAS_LIMITS)
+        _cliente_loop = loop
+    return _cliente_http
+
+
+def _obter_redis_artefatos():
+    """Cliente Redis assíncrono do cache de artefatos (None se indisponível ou em pausa)"""
+    global _redis_artefatos, _redis_loop
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url or time.monotonic() < _redis_pausado_ate:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis_artefatos is None or _redis_loop is not loop:
+        import redis.asyncio as redis_async
+        _redis_artefatos = redis_async.from_url(
+            redis_url,
+            socket_connect_timeout=CACHE_ARTEFATOS_TIMEOUT,
+            socket_timeout=CACHE_ARTEFATOS_TIMEOUT,
+            decode_responses=True,
+        )
+        _redis_loop = loop
+    return _redis_artefatos
+
+
+def _pausar_redis_artefatos(erro: Exception):
+    global _redis_pausado_ate
+    _redis_pausado_ate = time.monotonic() + CACHE_ARTEFATOS_PAUSA
+    logger.warning(
+        f"⚠️ Redis indisponível para o cache de artefatos ASAAS ({erro}); "
+        f"consultando o ASAAS direto por {CACHE_ARTEFATOS_PAUSA:.0f}s"
+    )
+
+
+async def fechar_cliente_http():
+    """Fecha o pool de conexões e o cliente Redis do cache (shutdown da aplicação)"""
+    global _cliente_http, _redis_artefatos
+    if _cliente_http is not None and not _cliente_http.is_closed:
+        await _cliente_http.aclose()
+    _cliente_http = None
+    if _redis_artefatos is not None:
+        await _redis_artefatos.aclose()
+        _redis_artefatos = None
+
 
 class AsaasService:
     """
@@ -29,8 +143,10 @@ class AsaasService:
         self.environment = os.getenv("ASAAS_ENVIRONMENT", "sandbox")
         self.webhook_token = os.getenv("ASAAS_WEBHOOK_TOKEN")
 
-        # Define URL base conforme ambiente
-        if self.environment == "production":
+        # Define URL base conforme ambiente (ASAAS_API_URL sobrescreve: teste de carga)
+        if os.getenv("ASAAS_API_URL"):
+            self.base_url = os.getenv("ASAAS_API_URL").rstrip("/")
+        elif self.environment == "production":
             self.base_url = "https://api.asaas.com/v3"
         else:
             self.base_url = "https://sandbox.asaas.com/api/v3"
@@ -40,6 +156,123 @@ class AsaasService:
             "access_token": self.api_key
         }
 
+    # ==================== HTTP ====================
+
+    async def _request(
+        self,
+        metodo: str,
+        caminho: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None
+    ) -> httpx.Response:
+        """
+        Executa a requisição no cliente compartilhado.
+
+        - Passa pelo limitador de taxa do processo (ASAAS_RATE_LIMIT)
+        - Retry com backoff exponencial + jitter em 429/5xx, respeitando Retry-After
+        - Requisições não idempotentes (POST) só são repetidas em 429 ou falha
+          de conexão, quando o ASAAS com certeza não processou o pedido
+        """
+        idempotente = metodo != "POST"
+        tentativa = 0
+
+        while True:
+            await _limitador.acquire()
+            try:
+                with medir_externo("asaas", metodo) as chamada:
+                    response = await _obter_cliente_http().request(
+                        metodo,
+                        f"{self.base_url}{caminho}",
+                        params=params,
+                        json=json,
+                        headers=self.headers
+                    )
+                    if response.status_code >= 400:
+                        chamada["resultado"] = f"http_{response.status_code}"
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if tentativa >= ASAAS_MAX_RETRIES:
+                    raise
+                espera = self._backoff(tentativa)
+                logger.warning(f"ASAAS {metodo} {caminho}: falha de conexão ({e}), nova tentativa em {espera:.1f}s")
+            except httpx.TransportError as e:
+                if not idempotente or tentativa >= ASAAS_MAX_RETRIES:
+                    raise
+                espera = self._backoff(tentativa)
+                logger.warning(f"ASAAS {metodo} {caminho}: erro de transporte ({e}), nova tentativa em {espera:.1f}s")
+            else:
+                repetir = response.status_code == 429 or (
+                    idempotente and response.status_code in ASAAS_RETRY_STATUS
+                )
+                if not repetir or tentativa >= ASAAS_MAX_RETRIES:
+                    return response
+                espera = self._backoff(tentativa, response.headers.get("Retry-After"))
+                logger.warning(
+                    f"ASAAS {metodo} {caminho}: HTTP {response.status_code}, "
+                    f"nova tentativa em {espera:.1f}s ({tentativa + 1}/{ASAAS_MAX_RETRIES})"
+                )
+
+            tentativa += 1
+            await asyncio.sleep(espera)
+
+    @staticmethod
+    def _backoff(tentativa: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        return min(0.5 * (2 ** tentativa), 10.0) + random.uniform(0, 0.25)
+
+    @staticmethod
+    def _corpo_erro(response: httpx.Response) -> Any:
+        """Corpo de erro do ASAAS (JSON), ou o texto bruto se não for JSON"""
+        try:
+            return response.json()
+        except ValueError:
+            return {"status_code": response.status_code, "body": response.text[:500]}
+
+    # ==================== CACHE DE ARTEFATOS ====================
+
+    @staticmethod
+    def _chave_artefato(payment_id: str, tipo: str) -> str:
+        return f"{CACHE_ARTEFATOS_PREFIXO}:{tipo}:{payment_id}"
+
+    @staticmethod
+    async def _artefato_em_cache(payment_id: str, tipo: str) -> Optional[Dict[str, Any]]:
+        redis_client = _obter_redis_artefatos()
+        if redis_client is None:
+            return None
+        try:
+            valor = await redis_client.get(AsaasService._chave_artefato(payment_id, tipo))
+        except Exception as e:
+            _pausar_redis_artefatos(e)
+            return None
+        return json.loads(valor) if valor else None
+
+    @staticmethod
+    async def _guardar_artefato(payment_id: str, tipo: str, dados: Dict[str, Any], expira_em: Optional[float] = None):
+        ttl = int((expira_em or time.time() + CACHE_ARTEFATOS_TTL) - time.time())
+        redis_client = _obter_redis_artefatos()
+        if redis_client is None or ttl <= 0:
+            return
+        try:
+            await redis_client.set(AsaasService._chave_artefato(payment_id, tipo), json.dumps(dados), ex=ttl)
+        except Exception as e:
+            _pausar_redis_artefatos(e)
+
+    @staticmethod
+    async def invalidar_artefatos(payment_id: Optional[str]):
+        """Descarta QR Code/linha digitável em cache (todos os workers) quando a cobrança muda de estado"""
+        if not payment_id:
+            return
+        redis_client = _obter_redis_artefatos()
+        if redis_client is None:
+            return
+        try:
+            await redis_client.delete(*(AsaasService._chave_artefato(payment_id, tipo) for tipo in TIPOS_ARTEFATO))
+        except Exception as e:
+            _pausar_redis_artefatos(e)
+
     # ==================== CLIENTES ====================
 
     async def criar_cliente(
@@ -76,21 +309,19 @@ class AsaasService:
         if endereco:
             payload.update(endereco)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/customers",
-                json=payload,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "POST",
+            "/customers",
+            json=payload
+        )
 
-            if response.status_code in [200, 201]:
-                data = response.json()
-                logger.info(f"Cliente ASAAS criado: {data.get('id')} - {nome}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Erro ao criar cliente ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code in [200, 201]:
+            data = response.json()
+            logger.info(f"Cliente ASAAS criado: {data.get('id')} - {nome}")
+            return {"success": True, "data": data}
+        else:
+            logger.error(f"Erro ao criar cliente ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def buscar_cliente(self, customer_id: str) -> Dict[str, Any]:
         """
@@ -102,18 +333,16 @@ class AsaasService:
         Returns:
             Dicionário com dados do cliente
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/customers/{customer_id}",
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            f"/customers/{customer_id}"
+        )
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao buscar cliente ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao buscar cliente ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def buscar_cliente_por_cpf(self, cpf_cnpj: str) -> Dict[str, Any]:
         """
@@ -125,20 +354,18 @@ class AsaasService:
         Returns:
             Dicionário com lista de clientes encontrados
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/customers",
-                params={"cpfCnpj": cpf_cnpj},
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            "/customers",
+            params={"cpfCnpj": cpf_cnpj}
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return {"success": True, "data": data.get("data", [])}
-            else:
-                logger.error(f"Erro ao buscar cliente por CPF: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            data = response.json()
+            return {"success": True, "data": data.get("data", [])}
+        else:
+            logger.error(f"Erro ao buscar cliente por CPF: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def atualizar_cliente(
         self,
@@ -155,19 +382,17 @@ class AsaasService:
         Returns:
             Dicionário com dados do cliente atualizado
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{self.base_url}/customers/{customer_id}",
-                json=dados,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "PUT",
+            f"/customers/{customer_id}",
+            json=dados
+        )
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao atualizar cliente ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao atualizar cliente ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     # ==================== COBRANÇAS ====================
 
@@ -206,21 +431,19 @@ class AsaasService:
             payload["installmentCount"] = parcelas
             payload["installmentValue"] = float(valor) / parcelas
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/payments",
-                json=payload,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "POST",
+            "/payments",
+            json=payload
+        )
 
-            if response.status_code in [200, 201]:
-                data = response.json()
-                logger.info(f"Cobranca ASAAS criada: {data.get('id')} - R$ {valor}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Erro ao criar cobranca ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code in [200, 201]:
+            data = response.json()
+            logger.info(f"Cobranca ASAAS criada: {data.get('id')} - R$ {valor}")
+            return {"success": True, "data": data}
+        else:
+            logger.error(f"Erro ao criar cobranca ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def buscar_cobranca(self, payment_id: str) -> Dict[str, Any]:
         """
@@ -232,18 +455,16 @@ class AsaasService:
         Returns:
             Dicionário com dados da cobrança
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/payments/{payment_id}",
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            f"/payments/{payment_id}"
+        )
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao buscar cobranca ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao buscar cobranca ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def listar_cobrancas_cliente(
         self,
@@ -273,20 +494,18 @@ class AsaasService:
         if status:
             params["status"] = status
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/payments",
-                params=params,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            "/payments",
+            params=params
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
-            else:
-                logger.error(f"Erro ao listar cobrancas ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            data = response.json()
+            return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
+        else:
+            logger.error(f"Erro ao listar cobrancas ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def cancelar_cobranca(self, payment_id: str) -> Dict[str, Any]:
         """
@@ -298,19 +517,19 @@ class AsaasService:
         Returns:
             Dicionário com resultado da operação
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{self.base_url}/payments/{payment_id}",
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "DELETE",
+            f"/payments/{payment_id}"
+        )
 
-            if response.status_code == 200:
-                logger.info(f"Cobranca ASAAS cancelada: {payment_id}")
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao cancelar cobranca ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        await self.invalidar_artefatos(payment_id)
+
+        if response.status_code == 200:
+            logger.info(f"Cobranca ASAAS cancelada: {payment_id}")
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao cancelar cobranca ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def obter_linha_digitavel(self, payment_id: str) -> Dict[str, Any]:
         """
@@ -322,18 +541,22 @@ class AsaasService:
         Returns:
             Dicionário com identificationField (linha digitável)
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/payments/{payment_id}/identificationField",
-                headers=self.headers,
-                timeout=30.0
-            )
+        em_cache = await self._artefato_em_cache(payment_id, "linha_digitavel")
+        if em_cache:
+            return {"success": True, "data": em_cache}
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao obter linha digitavel ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        response = await self._request(
+            "GET",
+            f"/payments/{payment_id}/identificationField"
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            await self._guardar_artefato(payment_id, "linha_digitavel", data)
+            return {"success": True, "data": data}
+        else:
+            logger.error(f"Erro ao obter linha digitavel ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def obter_qrcode_pix(self, payment_id: str) -> Dict[str, Any]:
         """
@@ -345,21 +568,39 @@ class AsaasService:
         Returns:
             Dicionário com payload (copia e cola) e encodedImage (base64)
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/payments/{payment_id}/pixQrCode",
-                headers=self.headers,
-                timeout=30.0
-            )
+        em_cache = await self._artefato_em_cache(payment_id, "pix")
+        if em_cache:
+            return {"success": True, "data": em_cache}
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao obter QR Code PIX ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        response = await self._request(
+            "GET",
+            f"/payments/{payment_id}/pixQrCode"
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            await self._guardar_artefato(payment_id, "pix", data, self._expiracao_pix(data))
+            return {"success": True, "data": data}
+        else:
+            logger.error(f"Erro ao obter QR Code PIX ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     # ==================== ASSINATURAS ====================
 
+    @staticmethod
+    def _expiracao_pix(data: Dict[str, Any]) -> Optional[float]:
+        """QR Code PIX dinâmico tem validade própria (expirationDate)"""
+        expiracao = data.get("expirationDate")
+        if not expiracao:
+            return None
+        try:
+            return min(
+                datetime.fromisoformat(expiracao).timestamp(),
+                time.time() + CACHE_ARTEFATOS_TTL
+            )
+        except (TypeError, ValueError):
+            return None
+
     async def criar_assinatura(
         self,
         customer_id: str,
@@ -400,21 +641,19 @@ class AsaasService:
             payload["creditCard"] = dados_cartao.get("creditCard")
             payload["creditCardHolderInfo"] = dados_cartao.get("creditCardHolderInfo")
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/subscriptions",
-                json=payload,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "POST",
+            "/subscriptions",
+            json=payload
+        )
 
-            if response.status_code in [200, 201]:
-                data = response.json()
-                logger.info(f"Assinatura ASAAS criada: {data.get('id')} - R$ {valor}/{ciclo}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Erro ao criar assinatura ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code in [200, 201]:
+            data = response.json()
+            logger.info(f"Assinatura ASAAS criada: {data.get('id')} - R$ {valor}/{ciclo}")
+            return {"success": True, "data": data}
+        else:
+            logger.error(f"Erro ao criar assinatura ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def buscar_assinatura(self, subscription_id: str) -> Dict[str, Any]:
         """
@@ -426,18 +665,16 @@ class AsaasService:
         Returns:
             Dicionário com dados da assinatura
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/subscriptions/{subscription_id}",
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            f"/subscriptions/{subscription_id}"
+        )
 
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao buscar assinatura ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao buscar assinatura ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def listar_assinaturas_cliente(
         self,
@@ -456,20 +693,57 @@ class AsaasService:
         Returns:
             Dicionário com lista de assinaturas
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/subscriptions",
-                params={"customer": customer_id, "offset": offset, "limit": limit},
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            "/subscriptions",
+            params={"customer": customer_id, "offset": offset, "limit": limit}
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
-            else:
-                logger.error(f"Erro ao listar assinaturas ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            data = response.json()
+            return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
+        else:
+            logger.error(f"Erro ao listar assinaturas ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
+
+    async def listar_assinaturas(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Lista todas as assinaturas da conta (paginado).
+
+        Args:
+            offset: Paginação - início
+            limit: Paginação - quantidade (máximo 100 no ASAAS)
+            status: Filtro opcional (ACTIVE, INACTIVE, EXPIRED)
+
+        Returns:
+            Dicionário com lista de assinaturas e flag has_more
+        """
+        params = {"offset": offset, "limit": limit}
+        if status:
+            params["status"] = status
+
+        response = await self._request(
+            "GET",
+            "/subscriptions",
+            params=params
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "success": True,
+                "data": data.get("data", []),
+                "total": data.get("totalCount", 0),
+                "has_more": data.get("hasMore", False)
+            }
+        else:
+            logger.error(f"Erro ao listar assinaturas ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def atualizar_assinatura(
         self,
@@ -486,20 +760,18 @@ class AsaasService:
         Returns:
             Dicionário com dados da assinatura atualizada
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{self.base_url}/subscriptions/{subscription_id}",
-                json=dados,
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "PUT",
+            f"/subscriptions/{subscription_id}",
+            json=dados
+        )
 
-            if response.status_code == 200:
-                logger.info(f"Assinatura ASAAS atualizada: {subscription_id}")
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao atualizar assinatura ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            logger.info(f"Assinatura ASAAS atualizada: {subscription_id}")
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao atualizar assinatura ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def cancelar_assinatura(self, subscription_id: str) -> Dict[str, Any]:
         """
@@ -511,19 +783,17 @@ class AsaasService:
         Returns:
             Dicionário com resultado da operação
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{self.base_url}/subscriptions/{subscription_id}",
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "DELETE",
+            f"/subscriptions/{subscription_id}"
+        )
 
-            if response.status_code == 200:
-                logger.info(f"Assinatura ASAAS cancelada: {subscription_id}")
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Erro ao cancelar assinatura ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            logger.info(f"Assinatura ASAAS cancelada: {subscription_id}")
+            return {"success": True, "data": response.json()}
+        else:
+            logger.error(f"Erro ao cancelar assinatura ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     async def listar_cobrancas_assinatura(
         self,
@@ -542,20 +812,18 @@ class AsaasService:
         Returns:
             Dicionário com lista de cobranças
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/subscriptions/{subscription_id}/payments",
-                params={"offset": offset, "limit": limit},
-                headers=self.headers,
-                timeout=30.0
-            )
+        response = await self._request(
+            "GET",
+            f"/subscriptions/{subscription_id}/payments",
+            params={"offset": offset, "limit": limit}
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
-            else:
-                logger.error(f"Erro ao listar cobrancas da assinatura ASAAS: {response.text}")
-                return {"success": False, "error": response.json()}
+        if response.status_code == 200:
+            data = response.json()
+            return {"success": True, "data": data.get("data", []), "total": data.get("totalCount", 0)}
+        else:
+            logger.error(f"Erro ao listar cobrancas da assinatura ASAAS: {response.text}")
+            return {"success": False, "error": self._corpo_erro(response)}
 
     # ==================== UTILITÁRIOS ====================
 
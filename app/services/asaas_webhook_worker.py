@@ -0,0 +1,310 @@
+"""
+Processamento assíncrono de webhooks ASAAS (inbox)
+Horário Inteligente SaaS
+
+O endpoint /api/webhooks/asaas apenas grava o evento na tabela
+webhook_asaas_eventos (chave única evento_id) e responde 200. Reentregas do
+ASAAS caem no ON CONFLICT e não disparam nada de novo.
+
+O processamento acontece aqui:
+- filas por "raia": todos os eventos de um mesmo asaas_payment_id caem na
+  mesma raia e são processados em ordem; pagamentos diferentes em paralelo
+- antes de processar, o evento é reivindicado no banco (pendente/erro →
+  processando) e só é liberado se não houver evento anterior do mesmo
+  pagamento ainda em aberto - vale também entre workers do Uvicorn
+- replay nunca reaplica um evento se um evento posterior do mesmo pagamento
+  já foi processado (os handlers gravam o estado do evento sem comparar com
+  o atual: um CONFIRMED antigo reativaria um cliente já estornado/vencido)
+- varredura periódica recoloca na fila eventos pendentes, com erro
+  (até ASAAS_WEBHOOK_MAX_TENTATIVAS) ou presos em 'processando'
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Evento em 'processando' há mais que isso é considerado órfão (worker caiu)
+PROCESSANDO_EXPIRA_MINUTOS = 5
+
+
+class AsaasWebhookWorker:
+    """Fila de processamento dos eventos gravados na inbox"""
+
+    def __init__(
+        self,
+        raias: int = 4,
+        max_tentativas: int = 5,
+        intervalo_varredura: float = 60.0,
+    ):
+        self.raias = max(raias, 1)
+        self.max_tentativas = max_tentativas
+        self.intervalo_varredura = intervalo_varredura
+
+        self._filas: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._na_fila: set = set()
+
+        # Contadores expostos em /sistema/status
+        self.recebidos = 0
+        self.duplicados = 0
+        self.processados = 0
+        self.erros = 0
+        self.adiados = 0
+
+    # ==================== INBOX ====================
+
+    @staticmethod
+    def chave_evento(data: Dict[str, Any]) -> str:
+        """
+        Chave de idempotência do evento.
+
+        Usa o id do evento enviado pelo ASAAS (evt_xxx); na ausência dele,
+        um hash do payload (reentregas do mesmo evento são idênticas).
+        """
+        if data.get("id"):
+            return str(data["id"])[:100]
+        bruto = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return "sha1:" + hashlib.sha1(bruto.encode()).hexdigest()
+
+    def registrar(self, db: Session, data: Dict[str, Any]) -> Tuple[Optional[int], bool]:
+        """
+        Grava o evento na inbox.
+
+        Returns:
+            (id do registro, duplicado) - id é None para eventos já recebidos
+        """
+        payment_id = (data.get("payment") or {}).get("id")
+        row = db.execute(text("""
+            INSERT INTO webhook_asaas_eventos (evento_id, evento, asaas_payment_id, payload, status)
+            VALUES (:evento_id, :evento, :payment_id, :payload, 'pendente')
+            ON CONFLICT (evento_id) DO NOTHING
+            RETURNING id
+        """), {
+            "evento_id": self.chave_evento(data),
+            "evento": data.get("event") or "DESCONHECIDO",
+            "payment_id": payment_id,
+            "payload": json.dumps(data),
+        }).fetchone()
+        db.commit()
+
+        self.recebidos += 1
+        if row is None:
+            self.duplicados += 1
+            return None, True
+        return row[0], False
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Inicia as raias de processamento e a varredura (startup da aplicação)"""
+        if self._tasks and not all(t.done() for t in self._tasks):
+            return
+        self._filas = [asyncio.Queue() for _ in range(self.raias)]
+        self._na_fila = set()
+        self._tasks = [asyncio.create_task(self._loop_raia(fila)) for fila in self._filas]
+        self._tasks.append(asyncio.create_task(self._loop_varredura()))
+        logger.info(f"💳 Worker de webhooks ASAAS iniciado ({self.raias} raias)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        logger.info("💳 Worker de webhooks ASAAS encerrado")
+
+    def enfileirar(self, evento_id: int, asaas_payment_id: Optional[str] = None):
+        """Coloca o evento na raia do seu pagamento (ordem preservada por pagamento)"""
+        if not self._filas:
+            self.start()
+        if evento_id in self._na_fila:
+            return
+        chave = asaas_payment_id or str(evento_id)
+        raia = int(hashlib.md5(chave.encode()).hexdigest(), 16) % self.raias
+        self._na_fila.add(evento_id)
+        self._filas[raia].put_nowait(evento_id)
+
+    # ==================== PROCESSAMENTO ====================
+
+    async def _loop_raia(self, fila: asyncio.Queue):
+        while True:
+            evento_id = await fila.get()
+            self._na_fila.discard(evento_id)
+            try:
+                await self.processar(evento_id)
+            except Exception as e:
+                logger.error(f"💳 Erro inesperado no worker de webhooks (evento {evento_id}): {e}")
+            finally:
+                fila.task_done()
+
+    def _reivindicar(self, db: Session, evento_id: int, forcar: bool = False):
+        """
+        pendente/erro → processando, se nenhum evento anterior do mesmo
+        pagamento ainda estiver em aberto e nenhum posterior já tiver sido
+        processado. Com `forcar`, também reprocessa eventos já processados
+        (replay manual) - mas nunca por cima de um estado mais recente.
+        """
+        status_aceitos = ('pendente', 'erro', 'processado') if forcar else ('pendente', 'erro')
+        row = db.execute(text("""
+            UPDATE webhook_asaas_eventos w
+            SET status = 'processando',
+                tentativas = w.tentativas + 1,
+                iniciado_em = NOW()
+            WHERE w.id = :id
+            AND w.status IN :status_aceitos
+            AND NOT EXISTS (
+                SELECT 1 FROM webhook_asaas_eventos anterior
+                WHERE anterior.asaas_payment_id = w.asaas_payment_id
+                AND anterior.id < w.id
+                AND (
+                    anterior.status IN ('pendente', 'processando')
+                    OR (anterior.status = 'erro' AND anterior.tentativas < :max_tentativas)
+                )
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM webhook_asaas_eventos posterior
+                WHERE posterior.asaas_payment_id = w.asaas_payment_id
+                AND posterior.id > w.id
+                AND posterior.status = 'processado'
+            )
+            RETURNING w.evento, w.payload
+        """), {
+            "id": evento_id,
+            "status_aceitos": status_aceitos,
+            "max_tentativas": self.max_tentativas,
+        }).fetchone()
+        db.commit()
+        return row
+
+    @staticmethod
+    def _concluir(db: Session, evento_id: int, erro: Optional[str] = None):
+        """Grava o resultado do evento (processado, ou erro com a mensagem)"""
+        if erro is None:
+            db.execute(text("""
+                UPDATE webhook_asaas_eventos
+                SET status = 'processado', erro = NULL, processado_em = NOW()
+                WHERE id = :id
+            """), {"id": evento_id})
+        else:
+            db.rollback()
+            db.execute(text("""
+                UPDATE webhook_asaas_eventos
+                SET status = 'erro', erro = :erro
+                WHERE id = :id
+            """), {"id": evento_id, "erro": erro[:2000]})
+        db.commit()
+
+    async def processar(self, evento_id: int, forcar: bool = False) -> str:
+        """
+        Processa um evento da inbox.
+
+        Returns:
+            'processado', 'erro' ou 'ignorado' (já processado, em andamento,
+            aguardando evento anterior ou superado por evento posterior do
+            mesmo pagamento)
+        """
+        from app.database import SessionLocal
+        from app.api.webhooks_asaas import processar_evento
+
+        db = SessionLocal()
+        try:
+            # Reivindicação e commits em thread (como a varredura): não bloqueiam o loop
+            row = await asyncio.to_thread(self._reivindicar, db, evento_id, forcar)
+            if row is None:
+                self.adiados += 1
+                return 'ignorado'
+
+            evento, payload = row
+            data = json.loads(payload)
+            inicio = time.perf_counter()
+
+            try:
+                await processar_evento(db, evento, data.get("payment") or {})
+                await asyncio.to_thread(self._concluir, db, evento_id)
+                self.processados += 1
+                logger.info(
+                    f"💳 Webhook ASAAS {evento} processado (inbox {evento_id}, "
+                    f"{(time.perf_counter() - inicio) * 1000:.0f}ms)"
+                )
+                return 'processado'
+            except Exception as e:
+                await asyncio.to_thread(self._concluir, db, evento_id, str(e))
+                self.erros += 1
+                logger.error(f"💳 Erro ao processar webhook ASAAS {evento} (inbox {evento_id}): {e}")
+                return 'erro'
+        finally:
+            db.close()
+
+    # ==================== VARREDURA ====================
+
+    def _pendentes(self, db: Session, limite: int = 500) -> List[Tuple[int, Optional[str]]]:
+        # Libera eventos presos em 'processando' (worker encerrado no meio)
+        db.execute(text(f"""
+            UPDATE webhook_asaas_eventos
+            SET status = 'erro', erro = 'processamento interrompido'
+            WHERE status = 'processando'
+            AND iniciado_em < NOW() - INTERVAL '{PROCESSANDO_EXPIRA_MINUTOS} minutes'
+        """))
+        db.commit()
+
+        return [
+            (row.id, row.asaas_payment_id)
+            for row in db.execute(text("""
+                SELECT id, asaas_payment_id
+                FROM webhook_asaas_eventos
+                WHERE status = 'pendente'
+                OR (status = 'erro' AND tentativas < :max_tentativas)
+                ORDER BY id
+                LIMIT :limite
+            """), {"max_tentativas": self.max_tentativas, "limite": limite})
+        ]
+
+    async def _loop_varredura(self):
+        from app.database import SessionLocal
+
+        while True:
+            try:
+                db = SessionLocal()
+                try:
+                    pendentes = await asyncio.to_thread(self._pendentes, db)
+                finally:
+                    db.close()
+                for evento_id, payment_id in pendentes:
+                    self.enfileirar(evento_id, payment_id)
+            except Exception as e:
+                logger.error(f"💳 Erro na varredura de webhooks ASAAS: {e}")
+            await asyncio.sleep(self.intervalo_varredura)
+
+    # ==================== STATUS ====================
+
+    def get_status(self) -> Dict:
+        return {
+            "rodando": bool(self._tasks) and not all(t.done() for t in self._tasks),
+            "raias": self.raias,
+            "na_fila": sum(f.qsize() for f in self._filas),
+            "recebidos": self.recebidos,
+            "duplicados": self.duplicados,
+            "processados": self.processados,
+            "erros": self.erros,
+            "adiados": self.adiados,
+        }
+
+
+# Instância global (singleton)
+asaas_webhook_worker = AsaasWebhookWorker(
+    raias=int(os.getenv("ASAAS_WEBHOOK_RAIAS", "4")),
+    max_tentativas=int(os.getenv("ASAAS_WEBHOOK_MAX_TENTATIVAS", "5")),
+    intervalo_varredura=float(os.getenv("ASAAS_WEBHOOK_VARREDURA", "60")),
+)
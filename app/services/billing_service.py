@@ -4,10 +4,13 @@ Orquestra criacao de clientes, assinaturas e cobrancas no ASAAS
 apos ativacao da conta pelo cliente.
 """
 
+import asyncio
 import logging
+import os
+import time
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
@@ -16,6 +19,24 @@ from app.services.asaas_service import AsaasService
 
 logger = logging.getLogger(__name__)
 
+# Status de assinatura ASAAS -> status interno
+STATUS_ASSINATURA_ASAAS = {
+    "ACTIVE": "ativa",
+    "INACTIVE": "cancelada",
+    "EXPIRED": "cancelada",
+}
+
+# Sincronização em lote (job diário do scheduler)
+SYNC_PAGE_SIZE = 100
+SYNC_CONCURRENCY = int(os.getenv("ASAAS_SYNC_CONCURRENCY", "5"))
+
+
+def _status_interno(assinatura_asaas: Dict[str, Any]) -> str:
+    """Mapeia o payload de assinatura do ASAAS para o status interno"""
+    if assinatura_asaas.get("deleted"):
+        return "cancelada"
+    return STATUS_ASSINATURA_ASAAS.get(assinatura_asaas.get("status", "ACTIVE"), "ativa")
+
 
 class BillingService:
     """
@@ -377,15 +398,7 @@ class BillingService:
             logger.error(f"[Billing Sync] Erro ao buscar assinatura {asaas_sub_id}: {response.get('error')}")
             return None
 
-        asaas_status = response["data"].get("status", "ACTIVE")
-
-        # Mapear status ASAAS para interno
-        status_map = {
-            "ACTIVE": "ativa",
-            "INACTIVE": "cancelada",
-            "EXPIRED": "cancelada",
-        }
-        status_interno = status_map.get(asaas_status, "ativa")
+        status_interno = _status_interno(response["data"])
 
         db.execute(
             text("UPDATE assinaturas SET status = :status, atualizado_em = NOW() WHERE id = :id"),
@@ -395,6 +408,119 @@ class BillingService:
 
         return status_interno
 
+    async def sync_all_subscriptions(self, db: Session) -> Dict[str, Any]:
+        """
+        Sincroniza em lote o status das assinaturas ativas com o ASAAS.
+
+        1. Pagina a listagem de assinaturas do ASAAS (100 por chamada) até
+           encontrar todas as assinaturas locais
+        2. As que não aparecem na listagem (ex.: removidas) são buscadas
+           individualmente, com concorrência limitada
+        3. Compara com o status local em memória e aplica todas as mudanças
+           em um único UPDATE
+
+        Todas as chamadas passam pelo limitador de taxa do AsaasService (ASAAS_RATE_LIMIT).
+
+        Returns:
+            Relatório da execução (chamadas à API, linhas alteradas, duração)
+        """
+        inicio = time.perf_counter()
+        relatorio = {
+            "assinaturas": 0,
+            "chamadas_api": 0,
+            "paginas": 0,
+            "buscas_individuais": 0,
+            "alteradas": 0,
+            "erros": 0,
+            "duracao_s": 0.0,
+        }
+
+        locais = db.execute(text("""
+            SELECT id, asaas_subscription_id, status
+            FROM assinaturas
+            WHERE status = 'ativa'
+            AND asaas_subscription_id IS NOT NULL
+        """)).fetchall()
+        relatorio["assinaturas"] = len(locais)
+
+        if not locais:
+            return relatorio
+
+        pendentes = {row.asaas_subscription_id for row in locais}
+        status_remoto: Dict[str, str] = {}
+
+        # 1. Listagem paginada
+        offset = 0
+        while pendentes:
+            relatorio["chamadas_api"] += 1
+            try:
+                pagina = await self.asaas.listar_assinaturas(offset=offset, limit=SYNC_PAGE_SIZE)
+            except Exception as e:
+                pagina = {"success": False, "error": str(e)}
+
+            if not pagina.get("success"):
+                relatorio["erros"] += 1
+                logger.warning(f"[Billing Sync] Falha ao listar assinaturas (offset {offset}): {pagina.get('error')}")
+                break
+
+            relatorio["paginas"] += 1
+            for assinatura in pagina["data"]:
+                sub_id = assinatura.get("id")
+                if sub_id in pendentes:
+                    status_remoto[sub_id] = _status_interno(assinatura)
+                    pendentes.discard(sub_id)
+
+            if not pagina.get("has_more"):
+                break
+            offset += SYNC_PAGE_SIZE
+
+        # 2. Busca individual das restantes
+        if pendentes:
+            semaforo = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+            async def buscar(sub_id: str):
+                async with semaforo:
+                    relatorio["chamadas_api"] += 1
+                    relatorio["buscas_individuais"] += 1
+                    try:
+                        response = await self.asaas.buscar_assinatura(sub_id)
+                    except Exception as e:
+                        relatorio["erros"] += 1
+                        logger.warning(f"[Billing Sync] Erro ao buscar assinatura {sub_id}: {e}")
+                        return
+                    if response.get("success"):
+                        status_remoto[sub_id] = _status_interno(response["data"])
+                    else:
+                        relatorio["erros"] += 1
+                        logger.warning(f"[Billing Sync] Erro ao buscar assinatura {sub_id}: {response.get('error')}")
+
+            await asyncio.gather(*(buscar(sub_id) for sub_id in pendentes))
+
+        # 3. Diff em memória + UPDATE único
+        alteracoes: List[tuple] = [
+            (row.id, status_remoto[row.asaas_subscription_id])
+            for row in locais
+            if row.asaas_subscription_id in status_remoto
+            and status_remoto[row.asaas_subscription_id] != row.status
+        ]
+
+        if alteracoes:
+            db.execute(
+                text("""
+                    UPDATE assinaturas AS a
+                    SET status = v.status, atualizado_em = NOW()
+                    FROM unnest(CAST(:ids AS integer[]), CAST(:status AS varchar[])) AS v(id, status)
+                    WHERE a.id = v.id
+                """),
+                {"ids": [a[0] for a in alteracoes], "status": [a[1] for a in alteracoes]}
+            )
+            db.commit()
+            relatorio["alteradas"] = len(alteracoes)
+            logger.info(f"[Billing Sync] Status alterado em {len(alteracoes)} assinatura(s): {alteracoes}")
+
+        relatorio["duracao_s"] = round(time.perf_counter() - inicio, 2)
+        return relatorio
+
     async def check_expired_discounts(self, db: Session) -> int:
         """
         Verifica descontos promocionais expirados e atualiza valores.
@@ -15,7 +15,7 @@ from app.models.cliente import Cliente
 from app.utils.timezone_helper import now_brazil
 from app.models.paciente import Paciente
 from app.models.lembrete import Lembrete, StatusLembrete
-from app.services.whatsapp_official_service import WhatsAppOfficialService
+from app.services.registry import get_whatsapp_service
 from app.services.websocket_manager import websocket_manager
 
 logger = logging.getLogger(__name__)
@@ -57,7 +57,7 @@ class ButtonHandlerService:
     }
 
     def __init__(self):
-        self.whatsapp = WhatsAppOfficialService()
+        self.whatsapp = get_whatsapp_service()
 
     async def processar_botao(
         self,
@@ -0,0 +1,267 @@
+"""
+Feed incremental do calendário
+Horário Inteligente SaaS
+
+Alimenta GET /api/agendamentos/calendario com:
+- janela de datas (inicio/fim do período visível)
+- sincronização incremental por cursor (updated_txid >= desde)
+- ETag forte calculado por agregados baratos da janela (304 se nada mudou)
+
+O cursor é seguro contra commits fora de ordem. Cada linha guarda em
+updated_txid o txid da transação que a gravou (default e trigger, migration
+m09). O cursor devolvido é o xmin do snapshot, tirado antes das consultas:
+toda transação com txid menor já tinha terminado, então suas linhas já
+estavam visíveis nesta resposta. O próximo delta traz tudo com updated_txid
+>= cursor, inclusive linhas de transações ainda abertas quando o cursor foi
+tirado. Linhas já recebidas podem se repetir e o cliente as aplica de novo
+pelo id. updated_seq (sequência calendario_seq, m03) segue só para o ETag.
+
+Observação: alterações apenas no cadastro do paciente/médico (nome,
+telefone) não mudam o updated_seq; elas aparecem no próximo carregamento
+completo do calendário.
+"""
+
+import hashlib
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+# Status que não aparecem no calendário (permanecem no banco para estatísticas)
+STATUS_OCULTOS = ('cancelado', 'remarcado', 'faltou')
+
+# IN com tupla expandida pelo SQLAlchemy (psycopg2 e asyncpg; o asyncpg não
+# adapta tupla em parâmetro único)
+_OCULTOS = bindparam("ocultos", expanding=True)
+
+COR_CONFIRMADO = "#10b981"
+COR_PENDENTE = "#f59e0b"
+
+
+class CalendarioFeedService:
+
+    @staticmethod
+    def normalizar_janela(
+        inicio: Optional[date],
+        fim: Optional[date]
+    ) -> Tuple[datetime, Optional[datetime]]:
+        """
+        Converte a janela de datas em limites [inicio, fim).
+
+        Sem `inicio`, mantém o comportamento histórico: últimos 30 dias em diante.
+        """
+        if inicio is None:
+            inicio = date.today() - timedelta(days=30)
+        inicio_dt = datetime.combine(inicio, time.min)
+        fim_dt = datetime.combine(fim + timedelta(days=1), time.min) if fim else None
+        return inicio_dt, fim_dt
+
+    @staticmethod
+    def _filtro_janela(coluna_inicio: str, coluna_fim: str, fim: Optional[datetime]) -> str:
+        """Condição SQL de sobreposição com a janela"""
+        cond = f"{coluna_fim} >= :inicio"
+        if fim is not None:
+            cond += f" AND {coluna_inicio} < :fim"
+        return cond
+
+    @staticmethod
+    def fingerprint(
+        db: Session,
+        cliente_id: int,
+        medico_id: int,
+        inicio: datetime,
+        fim: Optional[datetime]
+    ) -> Tuple[str, int]:
+        """
+        Calcula o ETag forte da janela e o cursor atual.
+
+        COUNT/MAX/SUM de updated_seq mudam sempre que uma linha é criada,
+        alterada, ou entra/sai da janela - sem materializar os eventos.
+
+        O cursor (xmin do snapshot) é lido antes de qualquer consulta da
+        resposta: toda linha com updated_txid menor já está visível nelas.
+
+        Returns:
+            (etag, cursor)
+        """
+        cursor = db.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+
+        params = {"cliente_id": cliente_id, "medico_id": medico_id, "inicio": inicio, "fim": fim}
+
+        filtro_agend = CalendarioFeedService._filtro_janela("a.data_hora", "a.data_hora", fim)
+        agend = db.execute(text(f"""
+            SELECT COUNT(*), COALESCE(MAX(a.updated_seq), 0), COALESCE(SUM(a.updated_seq), 0)
+            FROM agendamentos a
+            JOIN medicos m ON a.medico_id = m.id
+            WHERE (:medico_id = 0 OR a.medico_id = :medico_id)
+            AND m.cliente_id = :cliente_id
+            AND {filtro_agend}
+            AND a.status NOT IN :ocultos
+        """).bindparams(_OCULTOS), {**params, "ocultos": STATUS_OCULTOS}).fetchone()
+
+        filtro_bloq = CalendarioFeedService._filtro_janela("b.data_inicio", "b.data_fim", fim)
+        bloq = db.execute(text(f"""
+            SELECT COUNT(*), COALESCE(MAX(b.updated_seq), 0), COALESCE(SUM(b.updated_seq), 0)
+            FROM bloqueios_agenda b
+            JOIN medicos m ON b.medico_id = m.id
+            WHERE (:medico_id = 0 OR b.medico_id = :medico_id)
+            AND m.cliente_id = :cliente_id
+            AND {filtro_bloq}
+            AND b.ativo = true
+        """), params).fetchone()
+
+        chave = f"{cliente_id}:{medico_id}:{inicio.isoformat()}:{fim.isoformat() if fim else ''}:{tuple(agend)}:{tuple(bloq)}"
+        etag = '"cal-' + hashlib.sha1(chave.encode()).hexdigest() + '"'
+        return etag, cursor
+
+    @staticmethod
+    def buscar_agendamentos(
+        db: Session,
+        cliente_id: int,
+        medico_id: int,
+        inicio: datetime,
+        fim: Optional[datetime],
+        desde: Optional[int] = None
+    ) -> Tuple[List[Dict], List[int]]:
+        """
+        Eventos de agendamento da janela. Cor e horário final são calculados no SQL.
+
+        Com `desde`, retorna apenas linhas gravadas por transações a
+        partir do cursor (índice medico_id/updated_txid); agendamentos que passaram
+        para um status oculto são devolvidos em `removidos`.
+
+        Returns:
+            (eventos, removidos)
+        """
+        if desde is not None:
+            # Delta ignora a janela: um agendamento movido para fora dela também
+            # precisa chegar ao cliente para sair da posição antiga
+            filtro = "a.updated_txid >= :desde"
+        else:
+            filtro = CalendarioFeedService._filtro_janela("a.data_hora", "a.data_hora", fim)
+            filtro += " AND a.status NOT IN :ocultos"
+
+        sql = text(f"""
+            SELECT
+                a.id,
+                a.data_hora,
+                a.data_hora + make_interval(mins => COALESCE(a.duracao_minutos, 30)) AS data_fim,
+                COALESCE(a.duracao_minutos, 30) AS duracao,
+                a.status,
+                a.tipo_atendimento,
+                a.motivo_consulta,
+                a.medico_id,
+                CASE WHEN a.status = 'confirmado' THEN :cor_confirmado ELSE :cor_pendente END AS cor,
+                p.nome as paciente_nome,
+                p.telefone as paciente_telefone,
+                m.nome as medico_nome,
+                m.especialidade
+            FROM agendamentos a
+            JOIN pacientes p ON a.paciente_id = p.id
+            JOIN medicos m ON a.medico_id = m.id
+            WHERE (:medico_id = 0 OR a.medico_id = :medico_id)
+            AND m.cliente_id = :cliente_id
+            AND {filtro}
+            ORDER BY a.data_hora
+        """)
+        if desde is None:
+            sql = sql.bindparams(_OCULTOS)
+
+        result = db.execute(sql, {
+            "cliente_id": cliente_id,
+            "medico_id": medico_id,
+            "inicio": inicio,
+            "fim": fim,
+            "desde": desde,
+            "ocultos": STATUS_OCULTOS,
+            "cor_confirmado": COR_CONFIRMADO,
+            "cor_pendente": COR_PENDENTE,
+        })
+
+        eventos = []
+        removidos = []
+        for row in result:
+            if row.status in STATUS_OCULTOS:
+                removidos.append(row.id)
+                continue
+
+            eventos.append({
+                "id": row.id,
+                "title": f"{row.paciente_nome} - {row.tipo_atendimento}",
+                "start": row.data_hora.isoformat(),
+                "end": row.data_fim.isoformat(),
+                "medico_id": row.medico_id,
+                "backgroundColor": row.cor,
+                "borderColor": row.cor,
+                "extendedProps": {
+                    "paciente": row.paciente_nome,
+                    "telefone": row.paciente_telefone,
+                    "medico": row.medico_nome,
+                    "especialidade": row.especialidade,
+                    "tipo": row.tipo_atendimento,
+                    "status": row.status,
+                    "motivo": row.motivo_consulta,
+                    "medico_id": row.medico_id,
+                    "duracao_minutos": row.duracao
+                }
+            })
+
+        return eventos, removidos
+
+    @staticmethod
+    def buscar_bloqueios(
+        db: Session,
+        cliente_id: int,
+        medico_id: int,
+        inicio: datetime,
+        fim: Optional[datetime],
+        desde: Optional[int] = None
+    ) -> Tuple[List[Dict], List[int]]:
+        """
+        Bloqueios de agenda que se sobrepõem à janela.
+
+        Com `desde`, bloqueios desativados são devolvidos em `removidos`.
+
+        Returns:
+            (bloqueios, removidos)
+        """
+        if desde is not None:
+            filtro = "b.updated_txid >= :desde"
+        else:
+            filtro = CalendarioFeedService._filtro_janela("b.data_inicio", "b.data_fim", fim)
+            filtro += " AND b.ativo = true"
+
+        result = db.execute(text(f"""
+            SELECT b.id, b.medico_id, b.data_inicio, b.data_fim, b.tipo, b.motivo, b.ativo
+            FROM bloqueios_agenda b
+            JOIN medicos m ON b.medico_id = m.id
+            WHERE (:medico_id = 0 OR b.medico_id = :medico_id)
+            AND m.cliente_id = :cliente_id
+            AND {filtro}
+            ORDER BY b.data_inicio
+        """), {
+            "cliente_id": cliente_id,
+            "medico_id": medico_id,
+            "inicio": inicio,
+            "fim": fim,
+            "desde": desde,
+        })
+
+        bloqueios = []
+        removidos = []
+        for row in result:
+            if not row.ativo:
+                removidos.append(row.id)
+                continue
+
+            bloqueios.append({
+                "id": row.id,
+                "medico_id": row.medico_id,
+                "data_inicio": row.data_inicio.isoformat(),
+                "data_fim": row.data_fim.isoformat(),
+                "tipo": row.tipo,
+                "motivo": row.motivo
+            })
+
+        return bloqueios, removidos
@@ -10,6 +10,7 @@ import logging
 
 from ..database import get_db
 from ..models.medico import Medico
+from .agenda_compilada_service import agenda_compilada_service
 
 logger = logging.getLogger(__name__)
 
@@ -29,28 +30,34 @@ class CalendarioService:
         try:
             db = next(get_db())
             
-            # 1. Verificar se é dia de atendimento
-            dia_semana = data_consulta.weekday() + 1  # Python: 0=Segunda, SQL: 1=Segunda
-            
-            horario_atendimento = db.execute(text("""
-                SELECT hora_inicio, hora_fim 
-                FROM horarios_atendimento 
-                WHERE medico_id = :medico_id 
-                AND dia_semana = :dia_semana 
-                AND ativo = true
-                AND :hora_consulta BETWEEN hora_inicio AND hora_fim
-            """), {
-                'medico_id': medico_id,
-                'dia_semana': dia_semana,
-                'hora_consulta': data_consulta.time()
-            }).fetchone()
-            
-            if not horario_atendimento:
+            # 1. Verificar se é dia de atendimento (agenda compilada; tabela
+            #    horarios_atendimento apenas para médicos sem configuração)
+            agenda = agenda_compilada_service.obter(db, medico_id)
+
+            if agenda and agenda.dias:
+                atende = agenda.atende(data_consulta)
+            else:
+                dia_semana = data_consulta.weekday() + 1  # Python: 0=Segunda, SQL: 1=Segunda
+
+                atende = db.execute(text("""
+                    SELECT hora_inicio, hora_fim
+                    FROM horarios_atendimento
+                    WHERE medico_id = :medico_id
+                    AND dia_semana = :dia_semana
+                    AND ativo = true
+                    AND :hora_consulta BETWEEN hora_inicio AND hora_fim
+                """), {
+                    'medico_id': medico_id,
+                    'dia_semana': dia_semana,
+                    'hora_consulta': data_consulta.time()
+                }).fetchone() is not None
+
+            if not atende:
                 return {
                     'disponivel': False,
                     'motivo': 'Médico não atende neste dia/horário'
                 }
-            
+
             # 2. Verificar bloqueios
             data_fim_consulta = data_consulta + timedelta(minutes=duracao_minutos)
             
@@ -151,7 +158,24 @@ class CalendarioService:
         try:
             db = next(get_db())
             
-            # Buscar configurações do médico
+            horarios_disponiveis = []
+            agenda = agenda_compilada_service.obter(db, medico_id)
+
+            if agenda and agenda.dias:
+                # Grade pré-calculada (almoço já descontado)
+                duracao_consulta = agenda.intervalo_consulta
+                data_atual = data_inicio.date()
+
+                while data_atual <= data_fim.date():
+                    for hora_atual in agenda.slots(data_atual):
+                        self._adicionar_se_disponivel(
+                            horarios_disponiveis, medico_id, hora_atual, duracao_consulta
+                        )
+                    data_atual += timedelta(days=1)
+
+                return horarios_disponiveis
+
+            # Fallback: tabela horarios_atendimento (formato antigo)
             config = db.execute(text("""
                 SELECT intervalo_consulta, tempo_antes_consulta
                 FROM configuracoes_medico
@@ -163,7 +187,7 @@ class CalendarioService:
 
             # Para horários de hora em hora, não usamos intervalo entre consultas
             intervalo = 0
-            
+
             # Buscar horários de atendimento
             horarios_base = db.execute(text("""
                 SELECT dia_semana, hora_inicio, hora_fim
@@ -171,47 +195,57 @@ class CalendarioService:
                 WHERE medico_id = :medico_id AND ativo = true
                 ORDER BY dia_semana, hora_inicio
             """), {'medico_id': medico_id}).fetchall()
-            
-            horarios_disponiveis = []
+
             data_atual = data_inicio.date()
-            
+
             while data_atual <= data_fim.date():
                 dia_semana = data_atual.weekday() + 1
-                
+
                 # Verificar se médico atende neste dia
                 horarios_dia = [h for h in horarios_base if h.dia_semana == dia_semana]
-                
+
                 for horario in horarios_dia:
                     # Gerar slots de horário
                     hora_atual = datetime.combine(data_atual, horario.hora_inicio)
                     hora_fim_periodo = datetime.combine(data_atual, horario.hora_fim)
-                    
+
                     while hora_atual + timedelta(minutes=duracao_consulta) <= hora_fim_periodo:
-                        # Verificar se este slot está disponível
-                        disponibilidade = self.verificar_disponibilidade_medico(
-                            medico_id, hora_atual, duracao_consulta
+                        self._adicionar_se_disponivel(
+                            horarios_disponiveis, medico_id, hora_atual, duracao_consulta
                         )
-                        
-                        if disponibilidade['disponivel']:
-                            horarios_disponiveis.append({
-                                'data_hora': hora_atual,
-                                'data_formatada': hora_atual.strftime('%d/%m/%Y'),
-                                'hora_formatada': hora_atual.strftime('%H:%M'),
-                                'dia_semana': self._get_nome_dia_semana(hora_atual.weekday()),
-                                'duracao_minutos': duracao_consulta
-                            })
-                        
+
                         # Próximo slot
                         hora_atual += timedelta(minutes=duracao_consulta + intervalo)
-                
+
                 data_atual += timedelta(days=1)
-            
+
             return horarios_disponiveis
             
         except Exception as e:
             logger.error(f"Erro ao listar horários disponíveis: {str(e)}")
             return []
     
+    def _adicionar_se_disponivel(
+        self,
+        horarios_disponiveis: List[Dict[str, Any]],
+        medico_id: int,
+        hora_atual: datetime,
+        duracao_consulta: int
+    ):
+        """Verifica o slot e, se livre, adiciona à lista de horários disponíveis"""
+        disponibilidade = self.verificar_disponibilidade_medico(
+            medico_id, hora_atual, duracao_consulta
+        )
+
+        if disponibilidade['disponivel']:
+            horarios_disponiveis.append({
+                'data_hora': hora_atual,
+                'data_formatada': hora_atual.strftime('%d/%m/%Y'),
+                'hora_formatada': hora_atual.strftime('%H:%M'),
+                'dia_semana': self._get_nome_dia_semana(hora_atual.weekday()),
+                'duracao_minutos': duracao_consulta
+            })
+
     def criar_agendamento(
         self, 
         medico_id: int,
@@ -6,9 +6,10 @@ Gerencia operações de CRUD e lógica de negócio para conversas e mensagens.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, select, tuple_
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Tuple
+import base64
 from app.models.conversa import Conversa, StatusConversa
 from app.models.mensagem import Mensagem, DirecaoMensagem, RemetenteMensagem, TipoMensagem
 from app.models.paciente import Paciente
@@ -79,6 +80,11 @@ class ConversaService:
         if conversa:
             conversa.ultima_mensagem_at = datetime.utcnow()
 
+            # Campos desnormalizados da listagem (prévia e contador de não lidas)
+            conversa.ultima_mensagem_preview = (conteudo or "")[:100]
+            if direcao == DirecaoMensagem.ENTRADA:
+                conversa.nao_lidas = Conversa.nao_lidas + 1
+
             # Se for mensagem do paciente, atualizar timestamp para controle de janela 24h
             if remetente == RemetenteMensagem.PACIENTE:
                 conversa.ultima_mensagem_paciente_at = datetime.utcnow()
@@ -123,16 +129,52 @@ class ConversaService:
             db.refresh(conversa)
         return conversa
 
+    @staticmethod
+    def encode_cursor(ultima_mensagem_at: datetime, conversa_id: int) -> str:
+        """Codifica o cursor de paginação (última mensagem + id) da listagem"""
+        raw = f"{ultima_mensagem_at.isoformat()}|{conversa_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+        """Decodifica o cursor de paginação. Retorna None se inválido."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            ts, conversa_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(ts), int(conversa_id)
+        except (ValueError, UnicodeDecodeError):
+            return None
+
     @staticmethod
     def listar_conversas(
         db: Session,
         cliente_id: int,
         status: Optional[StatusConversa] = None,
         limit: int = 50,
-        medico_id: Optional[int] = None
-    ) -> List[Conversa]:
-        """Lista conversas do cliente, ordenadas por última mensagem"""
-        query = db.query(Conversa).filter(Conversa.cliente_id == cliente_id)
+        medico_id: Optional[int] = None,
+        cursor: Optional[Tuple[datetime, int]] = None
+    ) -> List[tuple]:
+        """
+        Lista conversas do cliente, ordenadas por última mensagem (mais recentes primeiro).
+
+        Consulta única: contador de não lidas e prévia vêm das colunas
+        desnormalizadas de `conversas` e o nome do paciente cadastrado
+        vem de uma subconsulta correlacionada.
+
+        Paginação por cursor (keyset) em (ultima_mensagem_at, id): retorna até
+        `limit + 1` linhas para o chamador saber se existe próxima página.
+
+        Returns:
+            Lista de tuplas (Conversa, nome_paciente_cadastrado)
+        """
+        nome_cadastro = select(Paciente.nome).where(
+            Paciente.telefone == Conversa.paciente_telefone,
+            Paciente.cliente_id == Conversa.cliente_id
+        ).limit(1).scalar_subquery()
+
+        query = db.query(Conversa, nome_cadastro.label("paciente_nome_cadastro")).filter(
+            Conversa.cliente_id == cliente_id
+        )
 
         if status:
             query = query.filter(Conversa.status == status)
@@ -151,39 +193,110 @@ class ConversaService:
 
             query = query.filter(Conversa.paciente_telefone.in_(paciente_phones))
 
-        return query.order_by(desc(Conversa.ultima_mensagem_at)).limit(limit).all()
+        if cursor:
+            query = query.filter(tuple_(Conversa.ultima_mensagem_at, Conversa.id) < cursor)
+
+        return query.order_by(
+            desc(Conversa.ultima_mensagem_at), desc(Conversa.id)
+        ).limit(limit + 1).all()
 
     @staticmethod
     def buscar_mensagens(
         db: Session,
         conversa_id: int,
-        limit: int = 100
-    ) -> List[Mensagem]:
-        """Busca mensagens de uma conversa"""
-        return db.query(Mensagem).filter(
-            Mensagem.conversa_id == conversa_id
-        ).order_by(Mensagem.timestamp).limit(limit).all()
+        limit: int = 50,
+        antes_de: Optional[int] = None,
+        depois_de: Optional[int] = None
+    ) -> Tuple[List[Mensagem], bool]:
+        """
+        Busca uma página de mensagens de uma conversa (paginação por cursor).
+
+        - Sem cursor: as `limit` mensagens mais recentes
+        - antes_de: mensagens anteriores à mensagem informada (carregar histórico)
+        - depois_de: mensagens posteriores à mensagem informada (sincronizar)
+
+        Usa o índice (conversa_id, timestamp, id). As mensagens são sempre
+        retornadas em ordem cronológica para exibição.
+
+        Returns:
+            (mensagens, tem_mais) - tem_mais indica se há mais mensagens
+            na direção da paginação
+        """
+        query = db.query(Mensagem).filter(Mensagem.conversa_id == conversa_id)
+        chave = tuple_(Mensagem.timestamp, Mensagem.id)
+
+        ancora_id = antes_de or depois_de
+        if ancora_id:
+            ancora = db.query(Mensagem.timestamp, Mensagem.id).filter(
+                Mensagem.id == ancora_id,
+                Mensagem.conversa_id == conversa_id
+            ).first()
+            if not ancora:
+                return [], False
+            ancora = (ancora.timestamp, ancora.id)
+
+        if depois_de:
+            mensagens = query.filter(chave > ancora).order_by(
+                Mensagem.timestamp, Mensagem.id
+            ).limit(limit + 1).all()
+            tem_mais = len(mensagens) > limit
+            return mensagens[:limit], tem_mais
+
+        if antes_de:
+            query = query.filter(chave < ancora)
+
+        mensagens = query.order_by(
+            desc(Mensagem.timestamp), desc(Mensagem.id)
+        ).limit(limit + 1).all()
+        tem_mais = len(mensagens) > limit
+        return list(reversed(mensagens[:limit])), tem_mais
 
     @staticmethod
-    def marcar_mensagens_como_lidas(db: Session, conversa_id: int) -> int:
-        """Marca todas as mensagens de entrada como lidas"""
-        result = db.query(Mensagem).filter(
+    def marcar_mensagens_como_lidas(
+        db: Session,
+        conversa_id: int,
+        mensagem_ids: Optional[List[int]] = None
+    ) -> int:
+        """
+        Marca mensagens de entrada como lidas.
+
+        Se `mensagem_ids` for informado, marca apenas esse intervalo
+        (as mensagens visíveis no painel); caso contrário, marca todas.
+        O contador desnormalizado `conversas.nao_lidas` é decrementado
+        na mesma transação.
+        """
+        if mensagem_ids is not None and not mensagem_ids:
+            return 0
+
+        query = db.query(Mensagem).filter(
             Mensagem.conversa_id == conversa_id,
             Mensagem.direcao == DirecaoMensagem.ENTRADA,
             Mensagem.lida == False
-        ).update({"lida": True})
+        )
+        if mensagem_ids is not None:
+            query = query.filter(Mensagem.id.in_(mensagem_ids))
+
+        result = query.update({"lida": True}, synchronize_session=False)
+
+        if mensagem_ids is None:
+            novo_total = 0
+        else:
+            novo_total = func.greatest(Conversa.nao_lidas - result, 0)
+
+        if result or mensagem_ids is None:
+            db.query(Conversa).filter(Conversa.id == conversa_id).update(
+                {"nao_lidas": novo_total}, synchronize_session=False
+            )
         db.commit()
         return result
 
     @staticmethod
     def contar_nao_lidas(db: Session, cliente_id: int) -> int:
-        """Conta mensagens não lidas do cliente"""
-        return db.query(Mensagem).join(Conversa).filter(
+        """Conta mensagens não lidas do cliente (soma do contador desnormalizado)"""
+        return db.query(func.coalesce(func.sum(Conversa.nao_lidas), 0)).filter(
             Conversa.cliente_id == cliente_id,
-            Conversa.status != StatusConversa.ENCERRADA,
-            Mensagem.direcao == DirecaoMensagem.ENTRADA,
-            Mensagem.lida == False
-        ).count()
+            Conversa.status != StatusConversa.ENCERRADA
+        ).scalar()
 
     @staticmethod
     def buscar_por_telefone(db: Session, cliente_id: int, telefone: str) -> Optional[Conversa]:
@@ -10,6 +10,8 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
 
+from app.metricas import medir_redis
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -77,7 +79,8 @@ class ConversationManager:
         if self.redis_client:
             try:
                 key = self._get_key(phone, cliente_id)
-                data = self.redis_client.get(key)
+                with medir_redis("get"):
+                    data = self.redis_client.get(key)
 
                 if data:
                     messages = json.loads(data)
@@ -126,7 +129,8 @@ class ConversationManager:
                 key = self._get_key(phone, cliente_id)
 
                 # Obter contexto atual
-                data = self.redis_client.get(key)
+                with medir_redis("get"):
+                    data = self.redis_client.get(key)
                 messages = json.loads(data) if data else []
 
                 # Adicionar nova mensagem
@@ -137,11 +141,12 @@ class ConversationManager:
                     messages = messages[-20:]
 
                 # Salvar no Redis com expiração de 24 horas
-                self.redis_client.setex(
-                    key,
-                    timedelta(hours=24),
-                    json.dumps(messages, ensure_ascii=False)
-                )
+                with medir_redis("setex"):
+                    self.redis_client.setex(
+                        key,
+                        timedelta(hours=24),
+                        json.dumps(messages, ensure_ascii=False)
+                    )
 
                 tenant_info = f" (cliente_{cliente_id})" if cliente_id else ""
                 logger.info(f"💾 Mensagem salva no Redis para {phone}{tenant_info} (total: {len(messages)})")
@@ -212,5 +217,13 @@ class ConversationManager:
             return list(self.memory_storage.keys())
 
 
-# Instância global do gerenciador
-conversation_manager = ConversationManager()
+def __getattr__(nome: str):
+    """
+    `from app.services.conversation_manager import conversation_manager`
+    continua funcionando: devolve a instância do registro de serviços,
+    criada no primeiro uso (não mais no import, com ping no Redis).
+    """
+    if nome == "conversation_manager":
+        from app.services.registry import get_conversation_manager
+        return get_conversation_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -8,6 +8,7 @@ from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text, and_
 from app.utils.timezone_helper import now_brazil, format_brazil
+from app.services.agenda_compilada_service import agenda_compilada_service, NOMES_DIAS
 
 logger = logging.getLogger(__name__)
 
@@ -119,74 +120,37 @@ class FaltaService:
             Lista de horários disponíveis
         """
         try:
-            # Buscar configuração do médico
-            config = self.db.execute(text("""
-                SELECT
-                    intervalo_consulta,
-                    horario_inicio,
-                    horario_fim,
-                    dias_atendimento,
-                    intervalo_almoco_inicio,
-                    intervalo_almoco_fim
-                FROM configuracoes_medico
-                WHERE medico_id = :medico_id
-                  AND cliente_id = :cliente_id
-            """), {
-                "medico_id": medico_id,
-                "cliente_id": cliente_id
-            }).fetchone()
-
-            if not config:
+            agenda = agenda_compilada_service.obter(self.db, medico_id)
+
+            if not agenda or not agenda.dias:
                 logger.warning(f"Configuração não encontrada para médico {medico_id}")
                 return []
 
-            intervalo_minutos = config[0]
-            horario_inicio = config[1]
-            horario_fim = config[2]
-            dias_atendimento = config[3] if config[3] else [1, 2, 3, 4, 5]
-            almoco_inicio = config[4]
-            almoco_fim = config[5]
-
             # Gerar próximos horários disponíveis
             horarios_disponiveis = []
-            data_atual = now_brazil().date()
+            agora = now_brazil().replace(tzinfo=None)
+            data_atual = agora.date()
             dias_checados = 0
             max_dias = 30  # Buscar nos próximos 30 dias
 
             while len(horarios_disponiveis) < quantidade and dias_checados < max_dias:
                 data_check = data_atual + timedelta(days=dias_checados)
-                dia_semana = data_check.isoweekday()  # 1=Monday, 7=Sunday
-
-                # Verificar se é dia de atendimento
-                if dia_semana in dias_atendimento:
-                    # Gerar horários do dia
-                    horarios_dia = self._gerar_horarios_dia(
-                        data_check,
-                        horario_inicio,
-                        horario_fim,
-                        intervalo_minutos,
-                        almoco_inicio,
-                        almoco_fim
-                    )
-
-                    # Filtrar apenas futuros
-                    horarios_futuros = [
-                        h for h in horarios_dia
-                        if h > now_brazil()
-                    ]
-
-                    # Verificar disponibilidade
-                    for horario in horarios_futuros:
-                        if self._horario_disponivel(horario, medico_id, cliente_id):
-                            horarios_disponiveis.append({
-                                "data_hora": horario.strftime("%Y-%m-%d %H:%M:%S"),
-                                "data_formatada": horario.strftime("%d/%m/%Y"),
-                                "hora_formatada": horario.strftime("%H:%M"),
-                                "dia_semana": self._nome_dia_semana(horario.weekday())
-                            })
-
-                            if len(horarios_disponiveis) >= quantidade:
-                                break
+
+                # Grade do dia (vazia se o médico não atende neste dia)
+                for horario in agenda.slots(data_check):
+                    if horario <= agora:
+                        continue
+
+                    if self._horario_disponivel(horario, medico_id, cliente_id):
+                        horarios_disponiveis.append({
+                            "data_hora": horario.strftime("%Y-%m-%d %H:%M:%S"),
+                            "data_formatada": horario.strftime("%d/%m/%Y"),
+                            "hora_formatada": horario.strftime("%H:%M"),
+                            "dia_semana": NOMES_DIAS[horario.weekday()]
+                        })
+
+                        if len(horarios_disponiveis) >= quantidade:
+                            break
 
                 dias_checados += 1
 
@@ -196,36 +160,6 @@ class FaltaService:
             logger.error(f"Erro ao buscar próximos horários: {e}", exc_info=True)
             return []
 
-    def _gerar_horarios_dia(
-        self,
-        data: datetime.date,
-        hora_inicio: datetime.time,
-        hora_fim: datetime.time,
-        intervalo_minutos: int,
-        almoco_inicio: Optional[datetime.time],
-        almoco_fim: Optional[datetime.time]
-    ) -> List[datetime]:
-        """Gera lista de horários para um dia específico"""
-        horarios = []
-
-        hora_atual = datetime.combine(data, hora_inicio)
-        hora_final = datetime.combine(data, hora_fim)
-
-        while hora_atual < hora_final:
-            # Verificar se não está no horário de almoço
-            if almoco_inicio and almoco_fim:
-                almoco_inicio_dt = datetime.combine(data, almoco_inicio)
-                almoco_fim_dt = datetime.combine(data, almoco_fim)
-
-                if not (almoco_inicio_dt <= hora_atual < almoco_fim_dt):
-                    horarios.append(hora_atual)
-            else:
-                horarios.append(hora_atual)
-
-            hora_atual += timedelta(minutes=intervalo_minutos)
-
-        return horarios
-
     def _horario_disponivel(
         self,
         data_hora: datetime,
@@ -237,12 +171,10 @@ class FaltaService:
         agendamento = self.db.execute(text("""
             SELECT id FROM agendamentos
             WHERE medico_id = :medico_id
-              AND cliente_id = :cliente_id
               AND data_hora = :data_hora
               AND status IN ('confirmado', 'agendado')
         """), {
             "medico_id": medico_id,
-            "cliente_id": cliente_id,
             "data_hora": data_hora
         }).fetchone()
 
@@ -253,6 +185,7 @@ class FaltaService:
         bloqueio = self.db.execute(text("""
             SELECT id FROM bloqueios_agenda
             WHERE medico_id = :medico_id
+              AND ativo = true
               AND :data_hora >= data_inicio
               AND :data_hora < data_fim
         """), {
@@ -262,19 +195,6 @@ class FaltaService:
 
         return bloqueio is None
 
-    def _nome_dia_semana(self, dia: int) -> str:
-        """Retorna nome do dia da semana (0=Monday)"""
-        dias = {
-            0: "Segunda",
-            1: "Terça",
-            2: "Quarta",
-            3: "Quinta",
-            4: "Sexta",
-            5: "Sábado",
-            6: "Domingo"
-        }
-        return dias.get(dia, "")
-
     async def _enviar_mensagem_falta(
         self,
         paciente_nome: str,
@@ -323,9 +243,10 @@ class FaltaService:
             mensagem += "Estamos aqui para cuidar de você! 💙"
 
             # Enviar via WhatsApp API Oficial (Meta)
-            from app.services.whatsapp_official_service import WhatsAppOfficialService
+            from app.services.registry import get_whatsapp_service
+            from app.services.whatsapp_envio_scheduler import prioridade_envio, PRIORIDADE_LEMBRETE
 
-            whatsapp_service = WhatsAppOfficialService()
+            whatsapp_service = get_whatsapp_service()
 
             # Buscar phone_number_id do cliente
             config = self.db.execute(text("""
@@ -336,11 +257,13 @@ class FaltaService:
 
             phone_number_id = config[0] if config else None
 
-            resultado = await whatsapp_service.send_text(
-                to=paciente_telefone,
-                message=mensagem,
-                phone_number_id=phone_number_id
-            )
+            # Mensagem automática: mesma raia dos lembretes
+            with prioridade_envio(PRIORIDADE_LEMBRETE):
+                resultado = await whatsapp_service.send_text(
+                    to=paciente_telefone,
+                    message=mensagem,
+                    phone_number_id=phone_number_id
+                )
 
             if resultado.success:
                 logger.info(f"Mensagem de falta enviada para {paciente_nome} ({paciente_telefone})")
@@ -18,11 +18,12 @@ from sqlalchemy import and_, or_
 
 from app.models import Agendamento, Paciente, Medico, Cliente
 from app.models.lembrete import Lembrete, TipoLembrete, StatusLembrete
-from app.services.whatsapp_official_service import WhatsAppOfficialService
+from app.services.registry import get_whatsapp_service
 from app.services.whatsapp_template_service import get_template_service
 from app.services.anthropic_service import AnthropicService
 from app.services.websocket_manager import websocket_manager
 from app.utils.timezone_helper import now_brazil, format_brazil
+from app.metricas import LEMBRETES_LOTE
 import pytz
 
 TZ_BRAZIL = pytz.timezone('America/Sao_Paulo')
@@ -49,9 +50,14 @@ class LembreteService:
     - Interpretar intenções naturalmente
     """
 
-    def __init__(self):
-        self.whatsapp = WhatsAppOfficialService()
-        self.template_service = get_template_service()
+    # Resolvidos no primeiro uso: a instância global é criada no import
+    @property
+    def whatsapp(self):
+        return get_whatsapp_service()
+
+    @property
+    def template_service(self):
+        return get_template_service()
 
     # ==================== CRIAÇÃO DE LEMBRETES ====================
 
@@ -685,6 +691,7 @@ Sempre termine perguntando se confirma a presença na consulta."""
                 Agendamento.status.in_(["agendado", "confirmado"])
             )
         ).all()
+        LEMBRETES_LOTE.labels(tipo).observe(len(agendamentos))
 
         for agendamento in agendamentos:
             try:
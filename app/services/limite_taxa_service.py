@@ -0,0 +1,391 @@
+"""
+Limite de taxa compartilhado entre workers (GCRA no Redis)
+Horário Inteligente SaaS
+
+Substitui os `slowapi.Limiter` que cada router criava com armazenamento em
+memória: com 4 workers cada limite valia 4x (e de forma desigual, conforme o
+balanceamento). Aqui um único limitador atende todos os routers:
+
+    from app.services.limite_taxa_service import limiter
+
+    @router.post("/login")
+    @limiter.limit("5/minute")
+    async def login(request: Request, ...):
+
+- algoritmo GCRA (generic cell rate algorithm): uma chave por cliente guarda
+  só o "theoretical arrival time"; rajada de até `limite` requisições e
+  depois uma a cada `periodo / limite`
+- uma ida ao Redis por verificação (script Lua via EVALSHA, relógio do
+  próprio Redis - workers com relógios diferentes não importam)
+- Redis fora do ar: GCRA em memória no processo (limite por worker) e nova
+  tentativa no Redis após RATE_LIMIT_REDIS_PAUSA segundos
+- políticas por rota (RATE_LIMIT_ROTAS sobrescreve o limite do decorator) e
+  por tenant (LimiteTaxaMiddleware, orçamento de todas as requisições do
+  cliente_id resolvido pelo TenantMiddleware)
+- IPs de origem dos webhooks da Meta e do Asaas ficam isentos
+"""
+
+import functools
+import ipaddress
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.metricas import LIMITE_TAXA_BLOQUEIOS
+
+logger = logging.getLogger(__name__)
+
+# Prefixos anunciados pela Meta (AS32934) de onde partem os webhooks da Cloud API
+# Conferir com: whois -h whois.radb.net -- '-i origin AS32934' | grep ^route
+IPS_META_PADRAO = (
+    "31.13.24.0/21,31.13.64.0/18,66.220.144.0/20,69.63.176.0/20,69.171.224.0/19,"
+    "74.119.76.0/22,102.132.96.0/20,103.4.96.0/22,129.134.0.0/16,157.240.0.0/16,"
+    "173.252.64.0/18,179.60.192.0/22,185.60.216.0/22,204.15.20.0/22"
+)
+
+UNIDADES = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# GCRA: KEYS[1] = chave | ARGV[1] = intervalo entre requisições (ms) | ARGV[2] = período (ms)
+# Retorna {permitida, restantes, espera_ms}
+LUA_GCRA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local intervalo = tonumber(ARGV[1])
+local periodo = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < agora then tat = agora end
+local novo_tat = tat + intervalo
+local excesso = novo_tat - agora - periodo
+if excesso > 0 then
+    return {0, 0, excesso}
+end
+redis.call('SET', KEYS[1], novo_tat, 'PX', novo_tat - agora)
+return {1, math.floor((periodo - (novo_tat - agora)) / intervalo), 0}
+"""
+
+
+@dataclass(frozen=True)
+class Politica:
+    limite: int
+    periodo: int  # segundos
+
+    @property
+    def intervalo_ms(self) -> int:
+        return max(1, round(self.periodo * 1000 / self.limite))
+
+    def __str__(self) -> str:
+        return f"{self.limite}/{self.periodo}s"
+
+
+@dataclass
+class Resultado:
+    permitida: bool
+    restantes: int
+    espera: float  # segundos até a próxima requisição ser aceita
+
+
+def parse_politica(regra: str) -> Politica:
+    """'5/minute', '200/minute', '10 per second', '1000/hour' -> Politica"""
+    m = re.match(r"^\s*(\d+)\s*(?:/|per)\s*(\d*)\s*(second|minute|hour|day)s?\s*$", regra or "")
+    if not m:
+        raise ValueError(f"Regra de limite inválida: {regra!r}")
+    multiplicador = int(m.group(2) or 1)
+    return Politica(limite=int(m.group(1)), periodo=multiplicador * UNIDADES[m.group(3)])
+
+
+def parse_mapa_politicas(valor: str) -> Dict[str, Politica]:
+    """'POST /api/auth/login=10/minute,12=600/minute' -> {'POST /api/auth/login': Politica, '12': Politica}"""
+    mapa = {}
+    for item in filter(None, (p.strip() for p in (valor or "").split(","))):
+        chave, _, regra = item.rpartition("=")
+        mapa[chave.strip()] = parse_politica(regra)
+    return mapa
+
+
+def parse_redes(valor: str) -> List:
+    redes = []
+    for item in filter(None, (p.strip() for p in (valor or "").split(","))):
+        try:
+            redes.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"⚠️ Rede inválida em RATE_LIMIT_IPS_*: {item}")
+    return redes
+
+
+class LimiteExcedido(Exception):
+    """Tratado em app/main.py (HTTP 429 com Retry-After)"""
+
+    def __init__(self, politica: Politica, espera: float):
+        self.politica = politica
+        self.espera = espera
+        super().__init__(f"Limite {politica} excedido")
+
+
+def resposta_429(espera: float) -> JSONResponse:
+    segundos = max(1, int(espera + 0.999))
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(segundos)},
+        content={
+            "detail": "Muitas tentativas. Aguarde alguns minutos antes de tentar novamente.",
+            "retry_after": f"{segundos} segundos",
+        },
+    )
+
+
+def ip_cliente(request: Request) -> str:
+    """Mesmo critério do slowapi (get_remote_address): IP do socket / proxy headers do Uvicorn"""
+    return request.client.host if request.client else "127.0.0.1"
+
+
+class GCRAMemoria:
+    """Fallback por processo com o mesmo algoritmo do script Lua"""
+
+    MAX_CHAVES = 50000
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def verificar(self, chave: str, politica: Politica) -> Resultado:
+        intervalo = politica.intervalo_ms
+        periodo = politica.periodo * 1000
+        agora = time.monotonic() * 1000
+        with self._lock:
+            tat = max(self._tat.get(chave, agora), agora)
+            novo_tat = tat + intervalo
+            excesso = novo_tat - agora - periodo
+            if excesso > 0:
+                return Resultado(False, 0, excesso / 1000)
+            if len(self._tat) >= self.MAX_CHAVES:
+                self._podar(agora)
+            self._tat[chave] = novo_tat
+        return Resultado(True, int((periodo - (novo_tat - agora)) // intervalo), 0.0)
+
+    def _podar(self, agora: float):
+        # Chaves com TAT no passado equivalem a "sem histórico"
+        for chave in [c for c, tat in self._tat.items() if tat <= agora]:
+            del self._tat[chave]
+        if len(self._tat) >= self.MAX_CHAVES:
+            self._tat.clear()
+
+
+class LimitadorTaxa:
+    """Verificação GCRA no Redis (compartilhada) com fallback em memória"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        prefixo: str = "limite",
+        politicas_rota: Optional[Dict[str, Politica]] = None,
+        politicas_tenant: Optional[Dict[str, Politica]] = None,
+        politica_tenant_padrao: Optional[Politica] = None,
+        ips_isentos: Optional[List] = None,
+        timeout: float = 0.05,
+        pausa_redis: float = 30.0,
+        habilitado: bool = True,
+    ):
+        self.redis_url = redis_url
+        self.prefixo = prefixo
+        self.politicas_rota = politicas_rota or {}
+        self.politicas_tenant = politicas_tenant or {}
+        self.politica_tenant_padrao = politica_tenant_padrao
+        self.ips_isentos = ips_isentos or []
+        self.timeout = timeout
+        self.pausa_redis = pausa_redis
+        self.habilitado = habilitado
+
+        self.memoria = GCRAMemoria()
+        self._redis = None
+        self._script = None
+        self._redis_pausado_ate = 0.0
+        self._cache_isencao: Dict[str, bool] = {}
+
+        self.permitidas = 0
+        self.bloqueadas = 0
+        self.isentas = 0
+        self.falhas_redis = 0
+
+    # ==================== BACKEND ====================
+
+    def _cliente_redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis_async
+            self._redis = redis_async.from_url(
+                self.redis_url,
+                socket_connect_timeout=self.timeout,
+                socket_timeout=self.timeout,
+            )
+            self._script = self._redis.register_script(LUA_GCRA)
+        return self._script
+
+    async def verificar(self, chave: str, politica: Politica) -> Tuple[Resultado, str]:
+        """Consome uma requisição da chave; devolve o resultado e o backend usado"""
+        chave = f"{self.prefixo}:{chave}"
+        if self.redis_url and time.monotonic() >= self._redis_pausado_ate:
+            try:
+                script = self._cliente_redis()
+                permitida, restantes, espera_ms = await script(
+                    keys=[chave], args=[politica.intervalo_ms, politica.periodo * 1000]
+                )
+                return Resultado(bool(permitida), int(restantes), int(espera_ms) / 1000), "redis"
+            except Exception as e:
+                self.falhas_redis += 1
+                self._redis_pausado_ate = time.monotonic() + self.pausa_redis
+                logger.warning(
+                    f"⚠️ Redis indisponível para limite de taxa ({e}); "
+                    f"usando memória local por {self.pausa_redis:.0f}s"
+                )
+        return self.memoria.verificar(chave, politica), "memoria"
+
+    async def fechar(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+            self._script = None
+
+    # ==================== POLÍTICAS ====================
+
+    def isento(self, ip: str) -> bool:
+        if not self.ips_isentos:
+            return False
+        if ip not in self._cache_isencao:
+            if len(self._cache_isencao) > 10000:
+                self._cache_isencao.clear()
+            try:
+                endereco = ipaddress.ip_address(ip)
+                self._cache_isencao[ip] = any(endereco in rede for rede in self.ips_isentos)
+            except ValueError:
+                self._cache_isencao[ip] = False
+        return self._cache_isencao[ip]
+
+    def politica_da_rota(self, request: Request, padrao: Politica) -> Tuple[str, Politica]:
+        route = request.scope.get("route")
+        caminho = route.path if route is not None and hasattr(route, "path") else request.url.path
+        rota = f"{request.method} {caminho}"
+        return rota, self.politicas_rota.get(rota, padrao)
+
+    def politica_do_tenant(self, cliente_id) -> Optional[Politica]:
+        return self.politicas_tenant.get(str(cliente_id), self.politica_tenant_padrao)
+
+    def _contabilizar(self, resultado: Resultado, escopo: str, backend: str):
+        if resultado.permitida:
+            self.permitidas += 1
+        else:
+            self.bloqueadas += 1
+            LIMITE_TAXA_BLOQUEIOS.labels(escopo, backend).inc()
+
+    # ==================== DECORATOR DE ROTA ====================
+
+    def limit(self, regra: str):
+        """
+        Limite por IP e rota (mesma assinatura do slowapi). O endpoint precisa
+        receber `request: Request`. RATE_LIMIT_ROTAS="POST /caminho=N/minute"
+        sobrescreve a regra do código sem novo deploy.
+        """
+        padrao = parse_politica(regra)
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if request is None:
+                    request = next((a for a in args if isinstance(a, Request)), None)
+                if request is not None and self.habilitado:
+                    await self._verificar_rota(request, padrao)
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def _verificar_rota(self, request: Request, padrao: Politica):
+        ip = ip_cliente(request)
+        if self.isento(ip):
+            self.isentas += 1
+            return
+        rota, politica = self.politica_da_rota(request, padrao)
+        resultado, backend = await self.verificar(f"rota:{rota}:{ip}", politica)
+        self._contabilizar(resultado, "rota", backend)
+        if not resultado.permitida:
+            logger.warning(f"⚠️ Rate limit excedido: IP={ip}, rota={rota}, limite={politica}")
+            raise LimiteExcedido(politica, resultado.espera)
+
+    def get_status(self) -> Dict:
+        return {
+            "habilitado": self.habilitado,
+            "backend": "redis" if self.redis_url and time.monotonic() >= self._redis_pausado_ate else "memoria",
+            "permitidas": self.permitidas,
+            "bloqueadas": self.bloqueadas,
+            "isentas": self.isentas,
+            "falhas_redis": self.falhas_redis,
+            "redes_isentas": len(self.ips_isentos),
+            "politicas_rota": {rota: str(p) for rota, p in self.politicas_rota.items()},
+            "tenant_padrao": str(self.politica_tenant_padrao) if self.politica_tenant_padrao else None,
+            "politicas_tenant": {tenant: str(p) for tenant, p in self.politicas_tenant.items()},
+        }
+
+
+class LimiteTaxaMiddleware:
+    """
+    Middleware ASGI puro: orçamento por tenant (todas as requisições do
+    cliente_id). Deve rodar DEPOIS do TenantMiddleware (que preenche
+    request.state.cliente_id), ou seja, ser adicionado ANTES dele.
+    """
+
+    def __init__(self, app, limitador: Optional["LimitadorTaxa"] = None):
+        self.app = app
+        self.limitador = limitador or limiter
+
+    async def __call__(self, scope, receive, send):
+        limitador = self.limitador
+        if (
+            scope["type"] != "http"
+            or not limitador.habilitado
+            or scope["path"].startswith("/static/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        cliente_id = scope.get("state", {}).get("cliente_id")
+        politica = limitador.politica_do_tenant(cliente_id) if cliente_id else None
+        if politica is not None:
+            request = Request(scope)
+            if limitador.isento(ip_cliente(request)):
+                limitador.isentas += 1
+            else:
+                resultado, backend = await limitador.verificar(f"tenant:{cliente_id}", politica)
+                limitador._contabilizar(resultado, "tenant", backend)
+                if not resultado.permitida:
+                    logger.warning(f"⚠️ Limite do tenant excedido: cliente_id={cliente_id}, limite={politica}")
+                    await resposta_429(resultado.espera)(scope, receive, send)
+                    return
+
+        await self.app(scope, receive, send)
+
+
+def _politica_opcional(valor: str) -> Optional[Politica]:
+    return parse_politica(valor) if valor and valor.strip() else None
+
+
+# Instância global (singleton) - compartilhada por todos os routers
+limiter = LimitadorTaxa(
+    redis_url=os.getenv("REDIS_URL"),
+    prefixo=os.getenv("RATE_LIMIT_PREFIXO", "limite"),
+    politicas_rota=parse_mapa_politicas(os.getenv("RATE_LIMIT_ROTAS", "")),
+    politicas_tenant=parse_mapa_politicas(os.getenv("RATE_LIMIT_TENANTS", "")),
+    politica_tenant_padrao=_politica_opcional(os.getenv("RATE_LIMIT_TENANT_PADRAO", "1200/minute")),
+    ips_isentos=parse_redes(os.getenv("RATE_LIMIT_IPS_META", IPS_META_PADRAO))
+    + parse_redes(os.getenv("RATE_LIMIT_IPS_ASAAS", "")),
+    timeout=float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT_MS", "50")) / 1000,
+    pausa_redis=float(os.getenv("RATE_LIMIT_REDIS_PAUSA", "30")),
+    habilitado=os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false",
+)
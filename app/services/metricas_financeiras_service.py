@@ -0,0 +1,275 @@
+"""
+Métricas financeiras do SaaS (MRR, adicionais, ticket médio, custos)
+Horário Inteligente SaaS
+
+Fonte única para o painel financeiro e para o painel interno de planos:
+- o valor mensal de cada assinatura é calculado em SQL (VALOR_ASSINATURA_SQL)
+- MRR, adicionais, ticket médio, contagens e despesas saem de UMA consulta agregada
+- clientes demo são excluídos por JOIN (c.is_demo = false), sem subconsultas NOT IN
+
+Histórico: registrar_snapshot_mensal() grava o fechamento do mês corrente em
+metricas_financeiras_mensais (job diário do scheduler). Meses anteriores ficam
+congelados e os gráficos de tendência leem a tabela em vez de recalcular.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# ============ CUSTOS FIXOS (Plano de Negócios v1.1) ============
+CUSTO_VPS = 160.00          # VPS Hostinger
+CUSTO_DOMINIO = 5.42        # Domínio .com.br (R$ 65/ano ÷ 12)
+CUSTO_EMAIL = 7.99          # E-mail profissional Hostinger
+CUSTO_INFRAESTRUTURA = CUSTO_VPS + CUSTO_DOMINIO + CUSTO_EMAIL  # R$ 173,41
+
+# ============ CUSTOS VARIÁVEIS POR CLIENTE ============
+CUSTO_WHATSAPP_API = 4.00       # ~80 lembretes utility × R$ 0,05
+CUSTO_CLAUDE_HAIKU = 0.50       # ~385 chamadas × R$ 0,0012
+CUSTO_GATEWAY_PAGAMENTO = 5.99  # PagSeguro 3,99% sobre R$ 150
+CUSTO_SIMPLES_NACIONAL = 9.00   # 6% sobre R$ 150
+CUSTO_VARIAVEL_CLIENTE = CUSTO_WHATSAPP_API + CUSTO_CLAUDE_HAIKU + CUSTO_GATEWAY_PAGAMENTO + CUSTO_SIMPLES_NACIONAL  # R$ 19,49
+
+# Componentes do valor mensal de uma assinatura (aliases: a = assinaturas, p = planos)
+ADICIONAIS_SQL = (
+    "GREATEST(COALESCE(a.profissionais_contratados, 1) - COALESCE(p.profissionais_inclusos, 1), 0)"
+)
+VALOR_ADICIONAIS_SQL = f"({ADICIONAIS_SQL} * COALESCE(a.valor_profissional_adicional, 50))"
+VALOR_SERVICOS_SQL = (
+    "(CASE WHEN a.numero_virtual_salvy THEN COALESCE(a.valor_numero_virtual, 40) ELSE 0 END)"
+)
+VALOR_ASSINATURA_SQL = f"(COALESCE(a.valor_mensal, 0) + {VALOR_ADICIONAIS_SQL} + {VALOR_SERVICOS_SQL})"
+
+# Assinaturas que compõem o MRR (alias c = clientes)
+FILTRO_ASSINATURAS_MRR = "a.status = 'ativa' AND a.data_fim IS NULL AND c.is_demo = false"
+
+
+def obter_resumo(db: Session) -> Dict[str, Any]:
+    """
+    Resumo financeiro do momento em uma única consulta.
+
+    Returns:
+        Dicionário com MRR (total e por componente), ticket médio, contagens
+        de clientes/médicos/agendamentos e despesas cadastradas do mês
+    """
+    row = db.execute(text(f"""
+        WITH mrr AS (
+            SELECT
+                COUNT(*) AS assinaturas_ativas,
+                COALESCE(SUM(COALESCE(a.valor_mensal, 0)), 0) AS mrr_base,
+                COALESCE(SUM({VALOR_ADICIONAIS_SQL}), 0) AS mrr_adicionais,
+                COALESCE(SUM({VALOR_SERVICOS_SQL}), 0) AS mrr_servicos,
+                COALESCE(SUM({ADICIONAIS_SQL}), 0) AS profissionais_adicionais
+            FROM assinaturas a
+            JOIN planos p ON p.id = a.plano_id
+            JOIN clientes c ON c.id = a.cliente_id
+            WHERE {FILTRO_ASSINATURAS_MRR}
+        ),
+        cli AS (
+            SELECT
+                COUNT(*) FILTER (WHERE ativo = true) AS clientes_ativos,
+                COUNT(*) FILTER (WHERE ativo = false) AS clientes_inativos,
+                COUNT(*) FILTER (WHERE criado_em >= CURRENT_DATE - INTERVAL '7 days') AS novos_clientes_7dias
+            FROM clientes
+            WHERE is_demo = false
+        ),
+        med AS (
+            SELECT COUNT(*) AS medicos_ativos
+            FROM medicos m
+            JOIN clientes c ON c.id = m.cliente_id
+            WHERE m.ativo = true AND c.is_demo = false
+        ),
+        agend AS (
+            SELECT COUNT(*) AS agendamentos_mes
+            FROM agendamentos ag
+            JOIN medicos m ON m.id = ag.medico_id
+            JOIN clientes c ON c.id = m.cliente_id
+            WHERE ag.data_hora >= date_trunc('month', CURRENT_DATE)
+            AND ag.data_hora < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month'
+            AND ag.status NOT IN ('cancelado', 'remarcado', 'faltou')
+            AND c.is_demo = false
+        ),
+        desp AS (
+            SELECT
+                COALESCE(SUM(
+                    CASE WHEN periodicidade = 'anual' THEN valor / 12 ELSE valor END
+                ) FILTER (WHERE categoria = 'fixa' AND recorrente = true), 0) AS despesas_fixas,
+                COALESCE(SUM(valor) FILTER (
+                    WHERE categoria = 'variavel'
+                    AND data_vencimento >= date_trunc('month', CURRENT_DATE)
+                    AND data_vencimento < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month'
+                ), 0) AS despesas_variaveis
+            FROM despesas
+            WHERE status != 'cancelado'
+        )
+        SELECT * FROM mrr, cli, med, agend, desp
+    """)).mappings().fetchone()
+
+    mrr_base = float(row["mrr_base"])
+    mrr_adicionais = float(row["mrr_adicionais"])
+    mrr_servicos = float(row["mrr_servicos"])
+    mrr = mrr_base + mrr_adicionais + mrr_servicos
+    assinaturas_ativas = row["assinaturas_ativas"] or 0
+
+    return {
+        "assinaturas_ativas": assinaturas_ativas,
+        "mrr": mrr,
+        "mrr_base": mrr_base,
+        "mrr_adicionais": mrr_adicionais,
+        "mrr_servicos": mrr_servicos,
+        "profissionais_adicionais": int(row["profissionais_adicionais"]),
+        "ticket_medio": mrr / assinaturas_ativas if assinaturas_ativas > 0 else 0,
+        "clientes_ativos": row["clientes_ativos"] or 0,
+        "clientes_inativos": row["clientes_inativos"] or 0,
+        "novos_clientes_7dias": row["novos_clientes_7dias"] or 0,
+        "medicos_ativos": row["medicos_ativos"] or 0,
+        "agendamentos_mes": row["agendamentos_mes"] or 0,
+        "despesas_fixas": float(row["despesas_fixas"]),
+        "despesas_variaveis": float(row["despesas_variaveis"]),
+    }
+
+
+def obter_mrr(db: Session) -> float:
+    """Somente o MRR total (para quem não precisa do resumo completo)"""
+    valor = db.execute(text(f"""
+        SELECT COALESCE(SUM({VALOR_ASSINATURA_SQL}), 0)
+        FROM assinaturas a
+        JOIN planos p ON p.id = a.plano_id
+        JOIN clientes c ON c.id = a.cliente_id
+        WHERE {FILTRO_ASSINATURAS_MRR}
+    """)).scalar()
+    return float(valor or 0)
+
+
+def calcular_custos(resumo: Dict[str, Any]) -> Dict[str, Any]:
+    """Custos fixos/variáveis, lucro e break-even a partir do resumo"""
+    total_clientes = resumo["clientes_ativos"]
+    custo_variaveis_total = total_clientes * CUSTO_VARIAVEL_CLIENTE
+    custo_fixo_total = CUSTO_INFRAESTRUTURA + resumo["despesas_fixas"]
+    custo_total = custo_fixo_total + custo_variaveis_total + resumo["despesas_variaveis"]
+
+    receita = resumo["mrr"]
+    receita_por_assinatura = resumo["ticket_medio"]
+    margem_por_cliente = receita_por_assinatura - CUSTO_VARIAVEL_CLIENTE
+    margem_percentual = (margem_por_cliente / receita_por_assinatura * 100) if receita_por_assinatura > 0 else 0
+
+    # Break-even: quantos clientes para cobrir custos fixos
+    break_even = int((custo_fixo_total / margem_por_cliente) + 1) if margem_por_cliente > 0 else 0
+
+    return {
+        "custo_ia_total": total_clientes * CUSTO_CLAUDE_HAIKU,
+        "custo_variaveis_total": custo_variaveis_total,
+        "custo_fixo_total": custo_fixo_total,
+        "custo_total": custo_total,
+        "lucro": receita - custo_total,
+        "margem_por_cliente": margem_por_cliente,
+        "margem_percentual": margem_percentual,
+        "break_even": break_even,
+    }
+
+
+def listar_mrr_por_assinatura(db: Session) -> List[Dict[str, Any]]:
+    """Valor mensal de cada assinatura que compõe o MRR (mesma regra do resumo)"""
+    result = db.execute(text(f"""
+        SELECT a.cliente_id, p.codigo, a.profissionais_contratados, a.numero_virtual_salvy,
+               {VALOR_ASSINATURA_SQL} AS valor_total
+        FROM assinaturas a
+        JOIN planos p ON p.id = a.plano_id
+        JOIN clientes c ON c.id = a.cliente_id
+        WHERE {FILTRO_ASSINATURAS_MRR}
+        ORDER BY a.cliente_id
+    """)).fetchall()
+
+    return [
+        {
+            "cliente_id": row.cliente_id,
+            "plano": row.codigo,
+            "valor_mensal": float(row.valor_total),
+            "profissionais": row.profissionais_contratados,
+            "numero_virtual": row.numero_virtual_salvy
+        }
+        for row in result
+    ]
+
+
+# ============ HISTÓRICO MENSAL ============
+
+def registrar_snapshot_mensal(db: Session, mes: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Grava (ou atualiza) o snapshot do mês em metricas_financeiras_mensais.
+
+    Chamado diariamente: o mês corrente é sobrescrito até virar, e o último
+    valor gravado passa a ser o fechamento daquele mês.
+    """
+    mes = (mes or date.today()).replace(day=1)
+    resumo = obter_resumo(db)
+    custos = calcular_custos(resumo)
+
+    db.execute(text("""
+        INSERT INTO metricas_financeiras_mensais (
+            mes, mrr, mrr_base, mrr_adicionais, mrr_servicos, assinaturas_ativas,
+            ticket_medio, clientes_ativos, medicos_ativos, custo_total, lucro, atualizado_em
+        ) VALUES (
+            :mes, :mrr, :mrr_base, :mrr_adicionais, :mrr_servicos, :assinaturas_ativas,
+            :ticket_medio, :clientes_ativos, :medicos_ativos, :custo_total, :lucro, NOW()
+        )
+        ON CONFLICT (mes) DO UPDATE SET
+            mrr = EXCLUDED.mrr,
+            mrr_base = EXCLUDED.mrr_base,
+            mrr_adicionais = EXCLUDED.mrr_adicionais,
+            mrr_servicos = EXCLUDED.mrr_servicos,
+            assinaturas_ativas = EXCLUDED.assinaturas_ativas,
+            ticket_medio = EXCLUDED.ticket_medio,
+            clientes_ativos = EXCLUDED.clientes_ativos,
+            medicos_ativos = EXCLUDED.medicos_ativos,
+            custo_total = EXCLUDED.custo_total,
+            lucro = EXCLUDED.lucro,
+            atualizado_em = NOW()
+    """), {
+        "mes": mes,
+        "mrr": round(resumo["mrr"], 2),
+        "mrr_base": round(resumo["mrr_base"], 2),
+        "mrr_adicionais": round(resumo["mrr_adicionais"], 2),
+        "mrr_servicos": round(resumo["mrr_servicos"], 2),
+        "assinaturas_ativas": resumo["assinaturas_ativas"],
+        "ticket_medio": round(resumo["ticket_medio"], 2),
+        "clientes_ativos": resumo["clientes_ativos"],
+        "medicos_ativos": resumo["medicos_ativos"],
+        "custo_total": round(custos["custo_total"], 2),
+        "lucro": round(custos["lucro"], 2),
+    })
+    db.commit()
+
+    return {"mes": mes.isoformat(), "mrr": round(resumo["mrr"], 2)}
+
+
+def listar_historico(db: Session, meses: int = 12) -> List[Dict[str, Any]]:
+    """Snapshots mensais mais recentes, em ordem cronológica"""
+    result = db.execute(text("""
+        SELECT mes, mrr, mrr_base, mrr_adicionais, mrr_servicos, assinaturas_ativas,
+               ticket_medio, clientes_ativos, medicos_ativos, custo_total, lucro
+        FROM metricas_financeiras_mensais
+        ORDER BY mes DESC
+        LIMIT :meses
+    """), {"meses": meses}).fetchall()
+
+    return [
+        {
+            "mes": row.mes.strftime("%Y-%m"),
+            "mrr": float(row.mrr),
+            "mrr_base": float(row.mrr_base),
+            "mrr_adicionais": float(row.mrr_adicionais),
+            "mrr_servicos": float(row.mrr_servicos),
+            "assinaturas_ativas": row.assinaturas_ativas,
+            "ticket_medio": float(row.ticket_medio),
+            "clientes_ativos": row.clientes_ativos,
+            "medicos_ativos": row.medicos_ativos,
+            "custo_total": float(row.custo_total),
+            "lucro": float(row.lucro),
+        }
+        for row in reversed(result)
+    ]
@@ -12,7 +12,8 @@ from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.services.whatsapp_official_service import WhatsAppOfficialService
+from app.services.registry import get_whatsapp_service
+from app.services.whatsapp_envio_scheduler import prioridade_envio, PRIORIDADE_ALERTA
 from app.services.push_notification_service import push_service
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,7 @@ class NotificationService:
 
     def __init__(self, db: Session):
         self.db = db
-        self.whatsapp_service = WhatsAppOfficialService()
+        self.whatsapp_service = get_whatsapp_service()
 
     async def notificar_medico(
         self,
@@ -291,11 +292,13 @@ O paciente confirmou presença."""
 
             phone_number_id = config[0] if config else None
 
-            resultado = await self.whatsapp_service.send_text(
-                to=numero,
-                message=mensagem,
-                phone_number_id=phone_number_id
-            )
+            # Aviso ao médico: raia de alerta (à frente de lembretes em massa)
+            with prioridade_envio(PRIORIDADE_ALERTA):
+                resultado = await self.whatsapp_service.send_text(
+                    to=numero,
+                    message=mensagem,
+                    phone_number_id=phone_number_id
+                )
 
             if resultado.success:
                 logger.info(f"Notificação WhatsApp enviada para {numero}")
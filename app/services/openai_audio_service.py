@@ -3,7 +3,6 @@ Serviço de Áudio OpenAI - Whisper + TTS
 Arquivo: app/services/openai_audio_service.py
 Sistema Horário Inteligente - Integração de áudio WhatsApp
 """
-from openai import OpenAI
 import tempfile
 import os
 import logging
@@ -11,6 +10,8 @@ import re
 from pathlib import Path
 from typing import Optional
 
+from app.metricas import medir_externo
+
 logger = logging.getLogger(__name__)
 
 class OpenAIAudioService:
@@ -25,6 +26,8 @@ class OpenAIAudioService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY não configurada no .env")
 
+        # Import adiado: o SDK só é carregado quando o áudio é usado
+        from openai import OpenAI
         self.client = OpenAI(api_key=api_key)
 
         # Configurações Whisper (Speech-to-Text)
@@ -63,12 +66,13 @@ class OpenAIAudioService:
             # Abrir arquivo de áudio
             with open(audio_path, "rb") as audio_file:
                 # Chamar Whisper API
-                transcript = self.client.audio.transcriptions.create(
-                    model=self.whisper_model,
-                    file=audio_file,
-                    language=language,  # Força português para melhor precisão
-                    response_format="text"
-                )
+                with medir_externo("openai", "whisper"):
+                    transcript = self.client.audio.transcriptions.create(
+                        model=self.whisper_model,
+                        file=audio_file,
+                        language=language,  # Força português para melhor precisão
+                        response_format="text"
+                    )
 
             logger.info(f"✅ Áudio transcrito com sucesso")
             logger.info(f"   📝 Texto: {transcript[:100]}...")
@@ -176,13 +180,14 @@ class OpenAIAudioService:
                 speed = self.tts_speed
 
             # Gerar áudio
-            response = self.client.audio.speech.create(
-                model=self.tts_model,
-                voice=voice,
-                input=texto_normalizado,  # Usar texto normalizado
-                speed=speed,
-                response_format="mp3"  # WhatsApp suporta MP3
-            )
+            with medir_externo("openai", "tts"):
+                response = self.client.audio.speech.create(
+                    model=self.tts_model,
+                    voice=voice,
+                    input=texto_normalizado,  # Usar texto normalizado
+                    speed=speed,
+                    response_format="mp3"  # WhatsApp suporta MP3
+                )
 
             # Salvar em arquivo temporário
             temp_file = tempfile.NamedTemporaryFile(
@@ -0,0 +1,178 @@
+"""
+Registro de serviços compartilhados (singletons preguiçosos por processo)
+Horário Inteligente SaaS
+
+Serviços caros de construir (conexão Redis com ping, clientes HTTP das APIs
+de IA, cliente da Meta) eram criados no import dos módulos - várias vezes,
+em cada worker, antes do Uvicorn aceitar conexões. Aqui cada um é criado uma
+única vez por processo, no primeiro uso:
+
+    from app.services.registry import get_whatsapp_service
+    whatsapp = get_whatsapp_service()
+
+Ciclo de vida (app/main.py):
+- startup: `aquecer()` cria os serviços em uma thread, em segundo plano,
+  depois que o servidor já está aceitando requisições
+- shutdown: `encerrar()` fecha conexões na ordem inversa da criação
+
+Os imports pesados (anthropic, openai, redis) ficam dentro das fábricas.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Fábricas registradas por nome; instância criada no primeiro `obter`"""
+
+    def __init__(self):
+        self._fabricas: Dict[str, Callable[[], Any]] = {}
+        self._fechar: Dict[str, Optional[Callable[[Any], Any]]] = {}
+        self._instancias: Dict[str, Any] = {}
+        self._ordem: List[str] = []
+        self._tempos_ms: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def registrar(
+        self,
+        nome: str,
+        fabrica: Callable[[], Any],
+        fechar: Optional[Callable[[Any], Any]] = None,
+    ):
+        self._fabricas[nome] = fabrica
+        self._fechar[nome] = fechar
+
+    def obter(self, nome: str) -> Any:
+        if nome in self._instancias:
+            return self._instancias[nome]
+
+        with self._lock:
+            # Outra thread pode ter criado enquanto esperávamos o lock
+            if nome in self._instancias:
+                return self._instancias[nome]
+
+            inicio = time.perf_counter()
+            instancia = self._fabricas[nome]()
+            self._tempos_ms[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+            self._instancias[nome] = instancia
+            self._ordem.append(nome)
+            logger.debug("🧩 Serviço %s criado em %sms", nome, self._tempos_ms[nome])
+            return instancia
+
+    def criado(self, nome: str) -> bool:
+        return nome in self._instancias
+
+    async def aquecer(self, nomes: Optional[List[str]] = None):
+        """Cria os serviços em thread, fora do event loop (startup)"""
+        for nome in nomes or list(self._fabricas):
+            try:
+                await asyncio.to_thread(self.obter, nome)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao aquecer serviço {nome}: {e}")
+
+    async def encerrar(self):
+        """Fecha os serviços criados, na ordem inversa (shutdown)"""
+        for nome in reversed(self._ordem):
+            fechar = self._fechar.get(nome)
+            instancia = self._instancias.get(nome)
+            if fechar is None or instancia is None:
+                continue
+            try:
+                resultado = fechar(instancia)
+                if inspect.isawaitable(resultado):
+                    await resultado
+            except Exception as e:
+                logger.error(f"❌ Erro ao encerrar serviço {nome}: {e}")
+        self._instancias.clear()
+        self._ordem.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            "registrados": sorted(self._fabricas),
+            "criados": {nome: self._tempos_ms.get(nome) for nome in self._ordem},
+        }
+
+
+registry = ServiceRegistry()
+
+
+# ==================== FÁBRICAS ====================
+
+def _criar_whatsapp():
+    from app.services.whatsapp_official_service import WhatsAppOfficialService
+    return WhatsAppOfficialService()
+
+
+def _criar_conversation_manager():
+    from app.services.conversation_manager import ConversationManager
+    return ConversationManager()
+
+
+def _fechar_conversation_manager(manager):
+    if manager.redis_client is not None:
+        manager.redis_client.close()
+
+
+def _criar_anthropic():
+    """Cliente Anthropic compartilhado (pool HTTP reaproveitado entre mensagens)"""
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        return None
+    try:
+        from anthropic import Anthropic
+    except ImportError:
+        return None
+    return Anthropic(api_key=api_key)
+
+
+def _criar_anthropic_async():
+    """Cliente assíncrono (streaming da resposta sem bloquear o event loop)"""
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        return None
+    try:
+        from anthropic import AsyncAnthropic
+    except ImportError:
+        return None
+    return AsyncAnthropic(api_key=api_key)
+
+
+def _fechar_cliente(cliente):
+    if cliente is not None:
+        return cliente.close()
+
+
+registry.registrar("whatsapp", _criar_whatsapp)
+registry.registrar("conversation_manager", _criar_conversation_manager, _fechar_conversation_manager)
+registry.registrar("anthropic", _criar_anthropic, _fechar_cliente)
+registry.registrar("anthropic_async", _criar_anthropic_async, _fechar_cliente)
+
+# Aquecidos no startup (o primeiro webhook não paga conexão Redis nem import do SDK)
+AQUECER_NO_STARTUP = ["whatsapp", "conversation_manager", "anthropic", "anthropic_async"]
+
+
+def get_whatsapp_service():
+    """WhatsAppOfficialService compartilhado do processo"""
+    return registry.obter("whatsapp")
+
+
+def get_conversation_manager():
+    """ConversationManager compartilhado do processo (uma conexão Redis)"""
+    return registry.obter("conversation_manager")
+
+
+def get_anthropic_client():
+    """Cliente Anthropic compartilhado (None sem ANTHROPIC_API_KEY ou sem SDK)"""
+    return registry.obter("anthropic")
+
+
+def get_anthropic_async_client():
+    """AsyncAnthropic compartilhado (None sem ANTHROPIC_API_KEY ou sem SDK)"""
+    return registry.obter("anthropic_async")
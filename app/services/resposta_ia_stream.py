@@ -0,0 +1,128 @@
+"""
+Leitura incremental da resposta da IA (streaming)
+Horário Inteligente SaaS
+
+A IA responde em JSON ({"resposta": "...", "intencao": ...}). No streaming,
+o campo "resposta" é decodificado conforme os tokens chegam, sem esperar o
+JSON completo. Quando aparece o marcador de pausa (⏳, definido no prompt:
+"Um momentinho, vou verificar...⏳Você está com sorte!..."), o primeiro
+trecho já pode ser enviado ao paciente enquanto o resto ainda é gerado.
+
+O JSON completo continua sendo interpretado no fim por
+AnthropicService._processar_resposta_ia (intenção, dados coletados etc.).
+"""
+
+import re
+from typing import Optional, Tuple
+
+MARCADOR_PAUSA = "⏳"
+
+ESCAPES_JSON = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def dividir_pausa(texto: str) -> Tuple[Optional[str], str]:
+    """
+    "Um momentinho...⏳Você está com sorte!" -> ("Um momentinho...", "Você está com sorte!")
+    Sem marcador (ou com um dos lados vazio): (None, texto sem o marcador).
+    Marcadores extras no resto viram quebra de linha.
+    """
+    if not texto or MARCADOR_PAUSA not in texto:
+        return None, texto
+    primeiro, resto = texto.split(MARCADOR_PAUSA, 1)
+    primeiro, resto = primeiro.strip(), resto.replace(MARCADOR_PAUSA, "\n").strip()
+    if not primeiro or not resto:
+        return None, (primeiro or resto)
+    return primeiro, resto
+
+
+class ExtratorResposta:
+    """
+    Recebe o texto da IA em pedaços (deltas do stream) e decodifica a string
+    do campo "resposta" à medida que chega, tratando escapes cortados no meio
+    de um delta (\\n, \\", \\uXXXX e pares surrogate).
+
+        extrator = ExtratorResposta()
+        for delta in stream:
+            segmento = extrator.alimentar(delta)
+            if segmento:
+                enviar(segmento)          # trecho antes do ⏳, uma única vez
+        extrator.bruto                    # texto completo da IA
+    """
+
+    _CHAVE = re.compile(r'"resposta"\s*:\s*"')
+
+    def __init__(self):
+        self.bruto = ""
+        self.texto = ""
+        self.completo = False
+        self.segmento: Optional[str] = None
+        self._pos: Optional[int] = None
+
+    def alimentar(self, delta: str) -> Optional[str]:
+        """Devolve o primeiro segmento na chamada em que o marcador aparece; senão None"""
+        self.bruto += delta
+        if self.completo:
+            return None
+        if self._pos is None:
+            m = self._CHAVE.search(self.bruto)
+            if not m:
+                return None
+            self._pos = m.end()
+
+        self.texto += self._decodificar()
+
+        if self.segmento is None and MARCADOR_PAUSA in self.texto:
+            segmento, resto = self.texto.split(MARCADOR_PAUSA, 1)
+            # Espera o início do resto: resposta que termina no marcador não é dividida
+            if segmento.strip() and resto.strip():
+                self.segmento = segmento.strip()
+                return self.segmento
+        return None
+
+    def _decodificar(self) -> str:
+        """Consome o bruto a partir de _pos até o fim da string ou até um escape incompleto"""
+        b = self.bruto
+        i = self._pos
+        novo = []
+        while i < len(b):
+            c = b[i]
+            if c == '"':
+                self.completo = True
+                i += 1
+                break
+            if c != "\\":
+                novo.append(c)
+                i += 1
+                continue
+            if i + 1 >= len(b):
+                break  # escape cortado: espera o próximo delta
+            e = b[i + 1]
+            if e != "u":
+                novo.append(ESCAPES_JSON.get(e, e))
+                i += 2
+                continue
+            if i + 6 > len(b):
+                break
+            try:
+                codigo = int(b[i + 2:i + 6], 16)
+            except ValueError:
+                novo.append(b[i:i + 6])
+                i += 6
+                continue
+            if 0xD800 <= codigo < 0xDC00:
+                # Emoji fora do BMP vem como par surrogate (\ud83d\ude0a)
+                if i + 12 > len(b):
+                    break
+                try:
+                    baixo = int(b[i + 8:i + 12], 16) if b[i + 6:i + 8] == "\\u" else -1
+                except ValueError:
+                    baixo = -1
+                if 0xDC00 <= baixo < 0xE000:
+                    novo.append(chr(0x10000 + ((codigo - 0xD800) << 10) + (baixo - 0xDC00)))
+                    i += 12
+                    continue
+            # Surrogate solto não é codificável em UTF-8
+            novo.append("\ufffd" if 0xD800 <= codigo < 0xE000 else chr(codigo))
+            i += 6
+        self._pos = i
+        return "".join(novo)
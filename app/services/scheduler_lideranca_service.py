@@ -0,0 +1,261 @@
+"""
+Eleição de líder do scheduler (válida entre hosts)
+Horário Inteligente SaaS
+
+Apenas um processo em todo o cluster pode rodar o ReminderScheduler - dois
+schedulers enviariam o mesmo lembrete duas vezes. O lock de arquivo em /tmp
+só protegia workers do mesmo host.
+
+Funcionamento:
+- cada processo tenta pg_try_advisory_lock() numa conexão dedicada, fora
+  do pool (NullPool): quem consegue é o líder e mantém a conexão aberta.
+  Fechar essa conexão encerra a sessão no Postgres e solta o lock - nunca
+  volta ao pool segurando a liderança, qualquer que seja a falha
+- se o processo morre (ou a conexão cai), o Postgres libera o lock e outro
+  nó assume na próxima tentativa (failover automático)
+- ao assumir, o líder incrementa o token de fencing em scheduler_lideranca;
+  os jobs confirmam o token antes de rodar, então um ex-líder que ainda
+  tenha um job agendado não executa nada depois de perder a liderança
+- o líder grava heartbeat periodicamente; se o heartbeat falhar ele deixa
+  de ser líder e para o scheduler
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+_engine_lideranca = None
+
+
+def _engine_dedicado():
+    """Engine sem pool para a conexão que segura o advisory lock (criado no primeiro uso)"""
+    global _engine_lideranca
+    if _engine_lideranca is None:
+        from app.database import DATABASE_URL
+        _engine_lideranca = create_engine(DATABASE_URL, poolclass=NullPool, pool_pre_ping=True)
+    return _engine_lideranca
+
+
+class LiderancaScheduler:
+    """Liderança via advisory lock do Postgres + token de fencing"""
+
+    def __init__(self, nome: str = "reminder_scheduler", intervalo: float = 15.0):
+        self.nome = nome
+        self.intervalo = intervalo
+        # Chave do advisory lock derivada do nome (estável entre processos)
+        self.chave = zlib.crc32(f"horariointeligente:{nome}".encode())
+        self.no = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.token: Optional[int] = None
+        self.lider_desde: Optional[datetime] = None
+        self.ultimo_heartbeat: Optional[datetime] = None
+        self.lider_atual: Optional[Dict] = None
+
+        self._conexao = None
+        self._trava = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._ao_assumir: Optional[Callable[[], None]] = None
+        self._ao_perder: Optional[Callable[[], None]] = None
+
+    @property
+    def e_lider(self) -> bool:
+        return self.token is not None
+
+    # ==================== OPERAÇÕES NO BANCO (síncronas) ====================
+
+    def _tentar_adquirir(self) -> Optional[int]:
+        conexao = _engine_dedicado().connect()
+        try:
+            obtido = conexao.execute(
+                text("SELECT pg_try_advisory_lock(:chave)"), {"chave": self.chave}
+            ).scalar()
+            conexao.commit()
+            if not obtido:
+                conexao.close()
+                return None
+
+            token = conexao.execute(text("""
+                INSERT INTO scheduler_lideranca (nome, token, no, adquirido_em, heartbeat_em)
+                VALUES (:nome, 1, :no, NOW(), NOW())
+                ON CONFLICT (nome) DO UPDATE SET
+                    token = scheduler_lideranca.token + 1,
+                    no = EXCLUDED.no,
+                    adquirido_em = NOW(),
+                    heartbeat_em = NOW()
+                RETURNING token
+            """), {"nome": self.nome, "no": self.no}).scalar()
+            conexao.commit()
+        except Exception:
+            # Sem pool: fechar encerra a sessão e solta o lock obtido acima
+            conexao.close()
+            raise
+
+        self._conexao = conexao
+        return token
+
+    def _heartbeat(self) -> bool:
+        """Renova o heartbeat; False se o token não é mais o vigente"""
+        with self._trava:
+            if self._conexao is None:
+                return False
+            row = self._conexao.execute(text("""
+                UPDATE scheduler_lideranca
+                SET heartbeat_em = NOW()
+                WHERE nome = :nome AND token = :token
+                RETURNING token
+            """), {"nome": self.nome, "token": self.token}).fetchone()
+            self._conexao.commit()
+            return row is not None
+
+    def _liberar(self):
+        with self._trava:
+            conexao, self._conexao = self._conexao, None
+            if conexao is None:
+                return
+            try:
+                # Heartbeat que falhou deixa a transação abortada
+                conexao.rollback()
+                conexao.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": self.chave})
+                conexao.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao liberar advisory lock do scheduler: {e}")
+            finally:
+                # Fecha a conexão física: o lock sai junto mesmo se o unlock falhou
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+
+    def _ler_lider(self) -> Optional[Dict]:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            row = db.execute(text("""
+                SELECT token, no, adquirido_em, heartbeat_em
+                FROM scheduler_lideranca
+                WHERE nome = :nome
+            """), {"nome": self.nome}).fetchone()
+            if row is None:
+                return None
+            return {
+                "token": row.token,
+                "no": row.no,
+                "adquirido_em": row.adquirido_em.isoformat() if row.adquirido_em else None,
+                "heartbeat_em": row.heartbeat_em.isoformat() if row.heartbeat_em else None,
+            }
+        finally:
+            db.close()
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self, ao_assumir: Callable[[], None], ao_perder: Callable[[], None]):
+        """Começa a disputar a liderança (startup da aplicação)"""
+        if self._task and not self._task.done():
+            return
+        self._ao_assumir = ao_assumir
+        self._ao_perder = ao_perder
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"👑 Eleição do scheduler iniciada (nó {self.no})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.e_lider:
+            self._renunciar("encerramento")
+            await asyncio.to_thread(self._liberar)
+            logger.info("👑 Liderança do scheduler liberada")
+
+    def _renunciar(self, motivo: str):
+        logger.warning(f"👑 Nó {self.no} deixou de ser líder do scheduler ({motivo})")
+        self.token = None
+        self.lider_desde = None
+        try:
+            if self._ao_perder:
+                self._ao_perder()
+        except Exception as e:
+            logger.error(f"❌ Erro ao parar scheduler após perder liderança: {e}")
+
+    async def _loop(self):
+        while True:
+            try:
+                if not self.e_lider:
+                    token = await asyncio.to_thread(self._tentar_adquirir)
+                    if token is not None:
+                        self.token = token
+                        self.lider_desde = datetime.now()
+                        self.ultimo_heartbeat = self.lider_desde
+                        logger.info(f"👑 Nó {self.no} assumiu o scheduler (token {token})")
+                        try:
+                            self._ao_assumir()
+                        except Exception as e:
+                            logger.error(f"❌ Erro ao iniciar scheduler como líder: {e}")
+                            self._renunciar("falha ao iniciar")
+                            await asyncio.to_thread(self._liberar)
+                else:
+                    try:
+                        vigente = await asyncio.to_thread(self._heartbeat)
+                    except Exception as e:
+                        logger.error(f"❌ Heartbeat do scheduler falhou: {e}")
+                        vigente = False
+                    if vigente:
+                        self.ultimo_heartbeat = datetime.now()
+                    else:
+                        self._renunciar("heartbeat")
+                        await asyncio.to_thread(self._liberar)
+
+                self.lider_atual = await asyncio.to_thread(self._ler_lider)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro na eleição do scheduler: {e}")
+            await asyncio.sleep(self.intervalo)
+
+    # ==================== FENCING ====================
+
+    async def confirmar(self) -> bool:
+        """
+        Confirma, no banco, que o token deste nó ainda é o vigente.
+        Chamado pelos jobs antes de qualquer efeito colateral.
+        """
+        if not self.e_lider:
+            return False
+        try:
+            atual = await asyncio.to_thread(self._ler_lider)
+        except Exception as e:
+            logger.error(f"❌ Não foi possível confirmar liderança do scheduler: {e}")
+            return False
+        return bool(atual) and atual["token"] == self.token
+
+    # ==================== STATUS ====================
+
+    def get_status(self) -> Dict:
+        return {
+            "no": self.no,
+            "lider": self.e_lider,
+            "token": self.token,
+            "lider_desde": self.lider_desde.isoformat() if self.lider_desde else None,
+            "ultimo_heartbeat": self.ultimo_heartbeat.isoformat() if self.ultimo_heartbeat else None,
+            "lider_atual": self.lider_atual,
+        }
+
+
+# Instância global (singleton)
+scheduler_lideranca = LiderancaScheduler(
+    intervalo=float(os.getenv("SCHEDULER_LIDERANCA_INTERVALO", "15")),
+)
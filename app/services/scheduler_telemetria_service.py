@@ -0,0 +1,253 @@
+"""
+Telemetria dos jobs do ReminderScheduler
+Horário Inteligente SaaS
+
+Cada execução de job vira uma linha em scheduler_execucoes:
+- sucesso/erro: início, fim, duração, linhas processadas e erro
+- ignorado: o nó perdeu a liderança (token de fencing não confere)
+- misfire / max_instances: eventos do APScheduler (execução perdida por
+  atraso do loop, ou pulada porque a anterior ainda estava rodando)
+
+Quando uma execução dura mais que o intervalo do próprio job, a linha é
+marcada com estourou_intervalo e um alerta é enviado (log + Telegram, no
+máximo um por job a cada SCHEDULER_ALERTA_INTERVALO segundos).
+
+O resumo com p50/p95 por job é servido em /api/admin/scheduler/execucoes.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.sql_metricas import escopo_sql
+
+logger = logging.getLogger(__name__)
+
+RETENCAO_DIAS = 30
+
+
+class SchedulerTelemetria:
+    """Registro de execuções dos jobs e resumo de duração por job"""
+
+    def __init__(self, alerta_intervalo: float = 3600.0):
+        self.alerta_intervalo = alerta_intervalo
+        self._ultimo_alerta: Dict[str, float] = {}
+        self._ultima_limpeza = 0.0
+
+    # ==================== REGISTRO ====================
+
+    def registrar(
+        self,
+        job_id: str,
+        status: str,
+        iniciado_em: datetime,
+        finalizado_em: Optional[datetime] = None,
+        linhas: Optional[int] = None,
+        erro: Optional[str] = None,
+        agendado_para: Optional[datetime] = None,
+        estourou_intervalo: bool = False,
+    ):
+        """Grava uma execução (síncrono - chamar via asyncio.to_thread)"""
+        from app.database import SessionLocal
+        from app.services.scheduler_lideranca_service import scheduler_lideranca
+
+        duracao_ms = None
+        if finalizado_em is not None:
+            duracao_ms = int((finalizado_em - iniciado_em).total_seconds() * 1000)
+
+        db = SessionLocal()
+        try:
+            db.execute(text("""
+                INSERT INTO scheduler_execucoes (
+                    job_id, no, status, agendado_para, iniciado_em, finalizado_em,
+                    duracao_ms, linhas, erro, estourou_intervalo
+                ) VALUES (
+                    :job_id, :no, :status, :agendado_para, :iniciado_em, :finalizado_em,
+                    :duracao_ms, :linhas, :erro, :estourou_intervalo
+                )
+            """), {
+                "job_id": job_id,
+                "no": scheduler_lideranca.no,
+                "status": status,
+                "agendado_para": agendado_para,
+                "iniciado_em": iniciado_em,
+                "finalizado_em": finalizado_em,
+                "duracao_ms": duracao_ms,
+                "linhas": linhas,
+                "erro": erro[:2000] if erro else None,
+                "estourou_intervalo": estourou_intervalo,
+            })
+
+            # Retenção: no máximo uma limpeza por dia
+            agora = time.monotonic()
+            if agora - self._ultima_limpeza > 86400:
+                db.execute(text(f"""
+                    DELETE FROM scheduler_execucoes
+                    WHERE iniciado_em < NOW() - INTERVAL '{RETENCAO_DIAS} days'
+                """))
+                self._ultima_limpeza = agora
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao registrar execução do job {job_id}: {e}")
+        finally:
+            db.close()
+
+    def instrumentar(
+        self,
+        job_id: str,
+        intervalo_s: float,
+        job: Callable[[], Awaitable[Optional[int]]],
+    ) -> Callable[[], Awaitable[None]]:
+        """
+        Envolve um job do scheduler: confirma a liderança (fencing), mede a
+        execução e grava o resultado. O job retorna a quantidade de linhas
+        processadas (ou None) e propaga exceções.
+        """
+        from app.services.scheduler_lideranca_service import scheduler_lideranca
+
+        async def executar():
+            iniciado_em = datetime.now()
+
+            if not await scheduler_lideranca.confirmar():
+                logger.warning(f"⛔ Job {job_id} ignorado: nó {scheduler_lideranca.no} não é o líder vigente")
+                await asyncio.to_thread(self.registrar, job_id, "ignorado", iniciado_em, datetime.now())
+                return
+
+            status, linhas, erro = "sucesso", None, None
+            try:
+                # Consultas SQL do job (N+1 e excesso vão para o log)
+                with escopo_sql(f"job:{job_id}"):
+                    linhas = await job()
+            except Exception as e:
+                status, erro = "erro", str(e)
+
+            finalizado_em = datetime.now()
+            duracao = (finalizado_em - iniciado_em).total_seconds()
+            estourou = duracao > intervalo_s
+
+            await asyncio.to_thread(
+                self.registrar, job_id, status, iniciado_em, finalizado_em,
+                linhas, erro, None, estourou,
+            )
+            if estourou:
+                await self._alertar_estouro(job_id, duracao, intervalo_s)
+
+        executar.__name__ = job.__name__
+        return executar
+
+    def ao_evento(self, evento):
+        """Listener do APScheduler para EVENT_JOB_MISSED e EVENT_JOB_MAX_INSTANCES"""
+        from apscheduler.events import EVENT_JOB_MISSED
+
+        status = "misfire" if evento.code == EVENT_JOB_MISSED else "max_instances"
+        agendado_para = getattr(evento, "scheduled_run_time", None)
+        if agendado_para is None:
+            horarios = getattr(evento, "scheduled_run_times", None) or [None]
+            agendado_para = horarios[0]
+        if agendado_para is not None and agendado_para.tzinfo is not None:
+            agendado_para = agendado_para.astimezone().replace(tzinfo=None)
+
+        logger.warning(f"⏭️ Job {evento.job_id} não executado ({status}) - agendado para {agendado_para}")
+        asyncio.get_running_loop().create_task(asyncio.to_thread(
+            self.registrar, evento.job_id, status, datetime.now(), None, None, None, agendado_para,
+        ))
+
+    async def _alertar_estouro(self, job_id: str, duracao: float, intervalo_s: float):
+        logger.error(
+            f"⏰ Job {job_id} levou {duracao:.1f}s, acima do intervalo de {intervalo_s:.0f}s "
+            f"- a próxima execução será pulada ou atrasada"
+        )
+        agora = time.monotonic()
+        if agora - self._ultimo_alerta.get(job_id, -self.alerta_intervalo) < self.alerta_intervalo:
+            return
+        self._ultimo_alerta[job_id] = agora
+        try:
+            from app.services.telegram_service import alerta_job_scheduler
+            await alerta_job_scheduler(job_id, duracao, intervalo_s)
+        except Exception as e:
+            logger.error(f"❌ Erro ao enviar alerta de job do scheduler: {e}")
+
+    # ==================== CONSULTA ====================
+
+    def resumo(self, db: Session, horas: int = 24) -> List[Dict]:
+        """Duração p50/p95/máx e contadores por job na janela informada"""
+        result = db.execute(text("""
+            SELECT
+                job_id,
+                COUNT(*) FILTER (WHERE status IN ('sucesso', 'erro')) AS execucoes,
+                COUNT(*) FILTER (WHERE status = 'erro') AS erros,
+                COUNT(*) FILTER (WHERE status = 'ignorado') AS ignoradas,
+                COUNT(*) FILTER (WHERE status = 'misfire') AS misfires,
+                COUNT(*) FILTER (WHERE status = 'max_instances') AS max_instances,
+                COUNT(*) FILTER (WHERE estourou_intervalo) AS estouros,
+                percentile_cont(0.5) WITHIN GROUP (ORDER BY duracao_ms) AS p50_ms,
+                percentile_cont(0.95) WITHIN GROUP (ORDER BY duracao_ms) AS p95_ms,
+                MAX(duracao_ms) AS max_ms,
+                COALESCE(SUM(linhas), 0) AS linhas,
+                MAX(iniciado_em) FILTER (WHERE status IN ('sucesso', 'erro')) AS ultima_execucao
+            FROM scheduler_execucoes
+            WHERE iniciado_em >= NOW() - make_interval(hours => :horas)
+            GROUP BY job_id
+            ORDER BY job_id
+        """), {"horas": horas}).fetchall()
+
+        return [
+            {
+                "job_id": row.job_id,
+                "execucoes": row.execucoes,
+                "erros": row.erros,
+                "ignoradas": row.ignoradas,
+                "misfires": row.misfires,
+                "max_instances": row.max_instances,
+                "estouros_intervalo": row.estouros,
+                "p50_ms": round(row.p50_ms) if row.p50_ms is not None else None,
+                "p95_ms": round(row.p95_ms) if row.p95_ms is not None else None,
+                "max_ms": row.max_ms,
+                "linhas_processadas": int(row.linhas),
+                "ultima_execucao": row.ultima_execucao.isoformat() if row.ultima_execucao else None,
+            }
+            for row in result
+        ]
+
+    def listar(self, db: Session, job_id: Optional[str] = None, limite: int = 50) -> List[Dict]:
+        """Execuções mais recentes (opcionalmente de um job)"""
+        filtro = "WHERE job_id = :job_id" if job_id else ""
+        result = db.execute(text(f"""
+            SELECT id, job_id, no, status, agendado_para, iniciado_em, finalizado_em,
+                   duracao_ms, linhas, erro, estourou_intervalo
+            FROM scheduler_execucoes
+            {filtro}
+            ORDER BY iniciado_em DESC
+            LIMIT :limite
+        """), {"job_id": job_id, "limite": limite}).fetchall()
+
+        return [
+            {
+                "id": row.id,
+                "job_id": row.job_id,
+                "no": row.no,
+                "status": row.status,
+                "agendado_para": row.agendado_para.isoformat() if row.agendado_para else None,
+                "iniciado_em": row.iniciado_em.isoformat() if row.iniciado_em else None,
+                "finalizado_em": row.finalizado_em.isoformat() if row.finalizado_em else None,
+                "duracao_ms": row.duracao_ms,
+                "linhas": row.linhas,
+                "erro": row.erro,
+                "estourou_intervalo": row.estourou_intervalo,
+            }
+            for row in result
+        ]
+
+
+# Instância global (singleton)
+scheduler_telemetria = SchedulerTelemetria(
+    alerta_intervalo=float(os.getenv("SCHEDULER_ALERTA_INTERVALO", "3600")),
+)
@@ -0,0 +1,244 @@
+"""
+Núcleo do simulador tributário/crescimento (Simples Nacional + pró-labore)
+Horário Inteligente SaaS
+
+Os endpoints /api/financeiro/simulador/* avaliam faixas inteiras de cenários
+de uma vez, em colunas (listas alinhadas por ponto):
+- a tabela progressiva do IRRF é compilada uma única vez (limites ordenados +
+  bisect), sem percorrer as faixas a cada cenário
+- cada grandeza (receita, INSS, IRRF, DAS, lucro...) é calculada em uma
+  passada sobre todos os pontos
+- custos fixos (infraestrutura + despesas fixas cadastradas) ficam em cache
+  por SIMULADOR_CUSTOS_TTL segundos e são invalidados quando despesas mudam
+
+Isso permite grades finas (milhares de pontos, superfícies de sensibilidade
+clientes × ticket × pró-labore) em tempo interativo.
+"""
+
+import itertools
+import logging
+import os
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.metricas_financeiras_service import CUSTO_INFRAESTRUTURA, CUSTO_VARIAVEL_CLIENTE
+
+logger = logging.getLogger(__name__)
+
+SALARIO_MINIMO = 1518.00
+ALIQUOTA_INSS = 0.11
+ALIQUOTA_DAS_III = 0.06
+ALIQUOTA_DAS_V = 0.155
+FATOR_R_MINIMO = 28.0  # % - a partir daqui o serviço é tributado no Anexo III
+
+# Limite de pontos por requisição (grades muito grandes viram DoS no worker)
+MAX_PONTOS = int(os.getenv("SIMULADOR_MAX_PONTOS", "20000"))
+CUSTOS_FIXOS_TTL = float(os.getenv("SIMULADOR_CUSTOS_TTL", "300"))
+
+
+# ==================== TABELA PROGRESSIVA ====================
+
+@dataclass(frozen=True)
+class TabelaProgressiva:
+    """Tabela progressiva compilada: faixa i vale para base <= limites[i]"""
+    limites: Tuple[float, ...]
+    aliquotas: Tuple[float, ...]
+    deducoes: Tuple[float, ...]
+    nomes: Tuple[str, ...]
+
+    @classmethod
+    def compilar(cls, faixas: Sequence[Tuple[float, float, float, str]]) -> "TabelaProgressiva":
+        faixas = sorted(faixas, key=lambda f: f[0])
+        return cls(
+            limites=tuple(f[0] for f in faixas),
+            aliquotas=tuple(f[1] for f in faixas),
+            deducoes=tuple(f[2] for f in faixas),
+            nomes=tuple(f[3] for f in faixas),
+        )
+
+    def faixas(self, bases: Sequence[float]) -> List[int]:
+        """Índice da faixa de cada base"""
+        limites = self.limites
+        ultima = len(limites) - 1
+        return [min(bisect_left(limites, b), ultima) for b in bases]
+
+    def calcular(self, bases: Sequence[float]) -> Tuple[List[float], List[int]]:
+        """Imposto de cada base e o índice da faixa aplicada"""
+        idx = self.faixas(bases)
+        aliquotas, deducoes = self.aliquotas, self.deducoes
+        valores = [
+            max(0.0, b * aliquotas[i] - deducoes[i]) if aliquotas[i] else 0.0
+            for b, i in zip(bases, idx)
+        ]
+        return valores, idx
+
+
+# Tabela IRRF 2025 (base = pró-labore - INSS)
+TABELA_IRRF = TabelaProgressiva.compilar([
+    (2428.80, 0, 0, "Isento"),
+    (2826.65, 0.075, 182.16, "7,5%"),
+    (3751.05, 0.15, 394.16, "15%"),
+    (4664.68, 0.225, 675.49, "22,5%"),
+    (float('inf'), 0.275, 908.73, "27,5%"),
+])
+
+
+def calcular_irrf(base: float) -> dict:
+    """IRRF de uma única base (formato usado nas respostas da API)"""
+    valores, idx = TABELA_IRRF.calcular([base])
+    valor = round(valores[0], 2)
+    return {
+        "valor": valor,
+        "aliquota_efetiva": round((valores[0] / base) * 100, 2) if base > 0 and valor else 0,
+        "faixa": TABELA_IRRF.nomes[idx[0]],
+        "base_calculo": round(base, 2)
+    }
+
+
+# ==================== CUSTOS FIXOS (CACHE) ====================
+
+_custos_fixos_cache: Optional[Tuple[float, float]] = None  # (valor, expira_em)
+
+
+def obter_custos_fixos(db: Session) -> float:
+    """Infraestrutura + despesas fixas recorrentes (anuais ÷ 12), com cache"""
+    global _custos_fixos_cache
+    agora = time.monotonic()
+    if _custos_fixos_cache and _custos_fixos_cache[1] > agora:
+        return _custos_fixos_cache[0]
+
+    despesas = db.execute(text("""
+        SELECT COALESCE(SUM(
+            CASE WHEN periodicidade = 'anual' THEN valor / 12 ELSE valor END
+        ), 0)
+        FROM despesas
+        WHERE categoria = 'fixa' AND recorrente = true AND status != 'cancelado'
+    """)).scalar()
+
+    valor = CUSTO_INFRAESTRUTURA + float(despesas or 0)
+    _custos_fixos_cache = (valor, agora + CUSTOS_FIXOS_TTL)
+    return valor
+
+
+def invalidar_custos_fixos():
+    """Chamado quando despesas são criadas/alteradas/removidas"""
+    global _custos_fixos_cache
+    _custos_fixos_cache = None
+
+
+# ==================== AVALIAÇÃO EM COLUNAS ====================
+
+def faixa(inicial: float, final: float, passo: float) -> List[float]:
+    """Valores de inicial a final (inclusive) com o passo dado"""
+    if passo <= 0 or final < inicial:
+        return [inicial]
+    n = int(round((final - inicial) / passo, 9)) + 1
+    return [round(inicial + i * passo, 6) for i in range(n)]
+
+
+def pro_labore_anexo_iii(receitas: Sequence[float]) -> List[float]:
+    """Pró-labore mínimo para Fator R >= 28% (nunca abaixo de 1 SM)"""
+    fator = FATOR_R_MINIMO / 100
+    return [max(r * fator, SALARIO_MINIMO) for r in receitas]
+
+
+def avaliar(
+    clientes: Sequence[int],
+    tickets: Sequence[float],
+    pro_labores: Sequence[Optional[float]],
+    anexo: Optional[str] = None,
+) -> Dict[str, list]:
+    """
+    Avalia N cenários de uma vez (listas alinhadas por ponto).
+
+    Args:
+        clientes, tickets: quantidade de clientes e ticket médio de cada ponto
+        pro_labores: pró-labore de cada ponto (None = mínimo para o Anexo III)
+        anexo: força 'III' ou 'V'; None = enquadramento pelo Fator R
+
+    Returns:
+        Colunas: receita, custos_variaveis, pro_labore, fator_r, anexo,
+        aliquota_das, inss, base_irrf, irrf, faixa_irrf, das, tributos,
+        liquido_socio
+    """
+    receita = [c * t for c, t in zip(clientes, tickets)]
+    custos_variaveis = [c * CUSTO_VARIAVEL_CLIENTE for c in clientes]
+
+    fator = FATOR_R_MINIMO / 100
+    pro_labore = [
+        max(p if p is not None else r * fator, SALARIO_MINIMO)
+        for p, r in zip(pro_labores, receita)
+    ]
+    fator_r = [(p / r) * 100 if r > 0 else 0 for p, r in zip(pro_labore, receita)]
+
+    if anexo:
+        anexos = [anexo] * len(receita)
+    else:
+        anexos = ["III" if f >= FATOR_R_MINIMO else "V" for f in fator_r]
+    aliquota_das = [ALIQUOTA_DAS_III if a == "III" else ALIQUOTA_DAS_V for a in anexos]
+
+    inss = [p * ALIQUOTA_INSS for p in pro_labore]
+    base_irrf = [p - i for p, i in zip(pro_labore, inss)]
+    irrf, faixa_irrf = TABELA_IRRF.calcular(base_irrf)
+    das = [r * a for r, a in zip(receita, aliquota_das)]
+
+    return {
+        "receita": receita,
+        "custos_variaveis": custos_variaveis,
+        "pro_labore": pro_labore,
+        "fator_r": fator_r,
+        "anexo": anexos,
+        "aliquota_das": aliquota_das,
+        "inss": inss,
+        "base_irrf": base_irrf,
+        "irrf": irrf,
+        "faixa_irrf": faixa_irrf,
+        "das": das,
+        "tributos": [i + ir + d for i, ir, d in zip(inss, irrf, das)],
+        "liquido_socio": [p - i - ir for p, i, ir in zip(pro_labore, inss, irrf)],
+    }
+
+
+def grade(
+    clientes: Sequence[int],
+    tickets: Sequence[float],
+    pro_labores: Optional[Sequence[float]],
+    custos_fixos: float,
+) -> Dict[str, list]:
+    """
+    Superfície clientes × ticket × pró-labore (produto cartesiano).
+
+    pro_labores None = pró-labore ideal para o Anexo III em cada ponto.
+    Lucro da empresa = receita - fixos - variáveis - pró-labore - INSS - DAS.
+    """
+    eixos_pl = list(pro_labores) if pro_labores else [None]
+    total = len(clientes) * len(tickets) * len(eixos_pl)
+    if total > MAX_PONTOS:
+        raise ValueError(f"Grade com {total} pontos excede o limite de {MAX_PONTOS}")
+    pontos = list(itertools.product(clientes, tickets, eixos_pl))
+
+    col_clientes = [p[0] for p in pontos]
+    col_tickets = [p[1] for p in pontos]
+    r = avaliar(col_clientes, col_tickets, [p[2] for p in pontos])
+
+    lucro = [
+        rec - custos_fixos - cv - pl - i - d
+        for rec, cv, pl, i, d in zip(r["receita"], r["custos_variaveis"], r["pro_labore"], r["inss"], r["das"])
+    ]
+
+    return {
+        "clientes": col_clientes,
+        "ticket": col_tickets,
+        "receita": [round(v, 2) for v in r["receita"]],
+        "pro_labore": [round(v, 2) for v in r["pro_labore"]],
+        "fator_r": [round(v, 2) for v in r["fator_r"]],
+        "anexo": r["anexo"],
+        "tributos": [round(v, 2) for v in r["tributos"]],
+        "lucro": [round(v, 2) for v in lucro],
+        "liquido_socio": [round(v, 2) for v in r["liquido_socio"]],
+    }
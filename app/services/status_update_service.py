@@ -4,23 +4,83 @@ Serviço para atualização automática de status de agendamentos.
 Consultas confirmadas/agendadas cujas datas já passaram são
 automaticamente marcadas como "realizada" (concluída).
 """
+import asyncio
 import logging
+import os
+from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Status "em aberto" - cobertos pelo índice parcial ix_agendamentos_abertos_data_hora
+STATUS_ABERTOS = ('confirmado', 'confirmada', 'agendado', 'agendada', 'pendente', 'em_atendimento')
+
+# Consumidor de transições: recebe (cliente_id, lista de agendamentos alterados)
+ConsumidorTransicoes = Callable[[int, List[Dict]], Awaitable[None]]
+
 
 class StatusUpdateService:
     """
     Serviço que atualiza automaticamente o status de consultas passadas.
     Consultas confirmadas ou agendadas cujas datas já passaram (com margem
     de tolerância) são marcadas como "realizada".
+
+    A transição é feita em lotes (UPDATE ... RETURNING de até `tamanho_lote`
+    linhas, cada lote na sua transação), para não travar milhares de linhas
+    nem gerar um único WAL gigante após uma parada. Os agendamentos
+    alterados são repassados, agrupados por cliente, aos consumidores
+    registrados (WebSocket dos painéis; o feed do calendário já recebe o novo
+    updated_seq e updated_txid via trigger).
     """
 
-    def __init__(self):
+    def __init__(self, tamanho_lote: int = 500, max_lotes: int = 200):
         self.margem_tolerancia_minutos = 60  # 1 hora após o horário da consulta
+        self.tamanho_lote = tamanho_lote
+        self.max_lotes = max_lotes
+        self._consumidores: List[ConsumidorTransicoes] = []
+
+    def registrar_consumidor(self, consumidor: ConsumidorTransicoes):
+        """Registra um consumidor das transições (chamado uma vez por lote de execução)"""
+        self._consumidores.append(consumidor)
+
+    def _transicionar_lote(self, db: Session, limite: datetime) -> List[Dict]:
+        """Marca um lote de consultas passadas como 'realizada' e retorna as linhas alteradas"""
+        rows = db.execute(text("""
+            WITH alvo AS (
+                SELECT id
+                FROM agendamentos
+                WHERE status IN :abertos
+                AND data_hora < :limite
+                ORDER BY data_hora
+                LIMIT :lote
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE agendamentos a
+            SET status = 'realizada'
+            FROM alvo, medicos m
+            WHERE a.id = alvo.id
+            AND m.id = a.medico_id
+            RETURNING a.id, a.medico_id, m.cliente_id, a.data_hora, a.updated_seq
+        """), {
+            "abertos": STATUS_ABERTOS,
+            "limite": limite,
+            "lote": self.tamanho_lote,
+        }).fetchall()
+        db.commit()
+
+        return [
+            {
+                "id": row.id,
+                "medico_id": row.medico_id,
+                "cliente_id": row.cliente_id,
+                "data_hora": row.data_hora,
+                "updated_seq": row.updated_seq,
+            }
+            for row in rows
+        ]
 
     async def atualizar_status_consultas_passadas(self, db: Session) -> dict:
         """
@@ -31,6 +91,9 @@ class StatusUpdateService:
         - Data/hora já passou (com margem de tolerância)
         - Não foi cancelado, remarcado ou marcado como faltou
 
+        Processa no máximo `max_lotes` lotes por execução; o restante fica
+        para o próximo ciclo (retorno com truncado=True).
+
         Args:
             db: Sessão do banco de dados
 
@@ -42,39 +105,40 @@ class StatusUpdateService:
             # Consultas antes deste horário são consideradas concluídas
             limite = datetime.now() - timedelta(minutes=self.margem_tolerancia_minutos)
 
-            # Conta quantas consultas serão atualizadas
-            result_count = db.execute(text("""
-                SELECT COUNT(*)
-                FROM agendamentos
-                WHERE status IN ('confirmado', 'confirmada', 'agendado', 'agendada', 'pendente', 'em_atendimento')
-                AND data_hora < :limite
-            """), {"limite": limite})
-
-            total_pendentes = result_count.scalar() or 0
-
-            if total_pendentes == 0:
+            por_cliente: Dict[int, List[Dict]] = defaultdict(list)
+            atualizadas = 0
+            lotes = 0
+            truncado = False
+
+            while True:
+                if lotes >= self.max_lotes:
+                    truncado = True
+                    break
+                alteradas = await asyncio.to_thread(self._transicionar_lote, db, limite)
+                if not alteradas:
+                    break
+                lotes += 1
+                atualizadas += len(alteradas)
+                for ag in alteradas:
+                    por_cliente[ag["cliente_id"]].append(ag)
+                if len(alteradas) < self.tamanho_lote:
+                    break
+
+            if atualizadas == 0:
                 logger.info("✅ Nenhuma consulta passada para atualizar")
-                return {
-                    "atualizadas": 0,
-                    "timestamp": datetime.now().isoformat()
-                }
-
-            # Atualiza o status para 'realizada'
-            result_update = db.execute(text("""
-                UPDATE agendamentos
-                SET status = 'realizada'
-                WHERE status IN ('confirmado', 'confirmada', 'agendado', 'agendada', 'pendente', 'em_atendimento')
-                AND data_hora < :limite
-            """), {"limite": limite})
-
-            db.commit()
-
-            atualizadas = result_update.rowcount
-
-            logger.info(f"✅ {atualizadas} consultas atualizadas para status 'realizada'")
+            else:
+                logger.info(
+                    f"✅ {atualizadas} consultas atualizadas para status 'realizada' "
+                    f"({lotes} lote(s), {len(por_cliente)} cliente(s))"
+                    + (" - restante fica para o próximo ciclo" if truncado else "")
+                )
+                await self._notificar(por_cliente)
 
             return {
                 "atualizadas": atualizadas,
+                "lotes": lotes,
+                "por_cliente": {cliente_id: len(ags) for cliente_id, ags in por_cliente.items()},
+                "truncado": truncado,
                 "timestamp": datetime.now().isoformat()
             }
 
@@ -83,6 +147,14 @@ class StatusUpdateService:
             logger.error(f"❌ Erro ao atualizar status de consultas: {str(e)}")
             raise
 
+    async def _notificar(self, por_cliente: Dict[int, List[Dict]]):
+        for cliente_id, agendamentos in por_cliente.items():
+            for consumidor in self._consumidores:
+                try:
+                    await consumidor(cliente_id, agendamentos)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao notificar transições do cliente {cliente_id}: {e}")
+
     async def get_estatisticas(self, db: Session) -> dict:
         """
         Retorna estatísticas sobre consultas que precisam de atualização.
@@ -97,10 +169,10 @@ class StatusUpdateService:
                 status,
                 COUNT(*) as total
             FROM agendamentos
-            WHERE status IN ('confirmado', 'confirmada', 'agendado', 'agendada', 'pendente', 'em_atendimento')
+            WHERE status IN :abertos
             AND data_hora < :limite
             GROUP BY status
-        """), {"limite": limite})
+        """), {"abertos": STATUS_ABERTOS, "limite": limite})
 
         pendentes = {row[0]: row[1] for row in result.fetchall()}
 
@@ -112,5 +184,21 @@ class StatusUpdateService:
         }
 
 
+async def _notificar_paineis(cliente_id: int, agendamentos: List[Dict]):
+    """Avisa os painéis do cliente (WebSocket) quais agendamentos viraram 'realizada'"""
+    from app.services.websocket_manager import websocket_manager
+
+    await websocket_manager.send_agendamentos_atualizados(
+        cliente_id,
+        [ag["id"] for ag in agendamentos],
+        "realizada",
+        max(ag["updated_seq"] for ag in agendamentos),
+    )
+
+
 # Instância global do serviço
-status_update_service = StatusUpdateService()
+status_update_service = StatusUpdateService(
+    tamanho_lote=int(os.getenv("STATUS_UPDATE_LOTE", "500")),
+    max_lotes=int(os.getenv("STATUS_UPDATE_MAX_LOTES", "200")),
+)
+status_update_service.registrar_consumidor(_notificar_paineis)
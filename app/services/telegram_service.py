@@ -223,6 +223,22 @@ async def alerta_erro_sistema(erro: str, contexto: str = ""):
     return await enviar_mensagem_telegram(mensagem.strip())
 
 
+async def alerta_job_scheduler(job_id: str, duracao: float, intervalo: float):
+    """Notifica quando um job do scheduler dura mais que o próprio intervalo"""
+
+    mensagem = f"""
+⏰ <b>JOB DO SCHEDULER ATRASADO</b>
+
+📍 Job: <code>{job_id}</code>
+⌛ Duração: {duracao:.1f}s (intervalo: {intervalo:.0f}s)
+A próxima execução será pulada ou atrasada.
+
+⏰ {datetime.now().strftime('%d/%m/%Y %H:%M')}
+"""
+
+    return await enviar_mensagem_telegram(mensagem.strip())
+
+
 async def alerta_backup(status: str, detalhes: str = ""):
     """Notifica sobre status de backups"""
 
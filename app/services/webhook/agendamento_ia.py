@@ -42,7 +42,7 @@ async def criar_agendamento_from_ia(
 
         # Validar dados mínimos
         if not nome or not medico_id or not data_str:
-            logger.warning(f"[Agendamento] Dados insuficientes: nome={nome}, medico_id={medico_id}, data={data_str}")
+            logger.warning("[Agendamento] Dados insuficientes: nome=%s, medico_id=%s, data=%s", nome, medico_id, data_str)
             return None
 
         # Parsear data/hora
@@ -74,7 +74,7 @@ async def criar_agendamento_from_ia(
                     data_hora = data_hora.replace(hour=hora, minute=minuto)
 
         if not data_hora:
-            logger.warning(f"[Agendamento] Não foi possível parsear data: {data_str}")
+            logger.warning("[Agendamento] Não foi possível parsear data: %s", data_str)
             return None
 
         # Se não tem hora, definir 9h como padrão
@@ -83,7 +83,7 @@ async def criar_agendamento_from_ia(
 
         # Converter para timezone de Brasília (UTC-3)
         data_hora = make_aware_brazil(data_hora)
-        logger.info(f"[Agendamento] Data/hora com timezone: {data_hora}")
+        logger.info("[Agendamento] Data/hora com timezone: %s", data_hora)
 
         # Verificar se médico existe
         medico = db.query(Medico).filter(
@@ -92,7 +92,7 @@ async def criar_agendamento_from_ia(
         ).first()
 
         if not medico:
-            logger.warning(f"[Agendamento] Médico {medico_id} não encontrado para cliente {cliente_id}")
+            logger.warning("[Agendamento] Médico %s não encontrado para cliente %s", medico_id, cliente_id)
             return None
 
         # ========== VERIFICAR DISPONIBILIDADE DO HORÁRIO ==========
@@ -104,11 +104,11 @@ async def criar_agendamento_from_ia(
         )
 
         if not disponivel:
-            logger.warning(f"[Agendamento] ❌ Horário INDISPONÍVEL: {data_hora} para médico {medico_id}")
+            logger.warning("[Agendamento] ❌ Horário INDISPONÍVEL: %s para médico %s", data_hora, medico_id)
             # Retornar dict com erro para que a IA possa informar o paciente
             return {"erro": "horario_indisponivel", "data_hora": data_hora, "medico_nome": medico.nome}
 
-        logger.info(f"[Agendamento] ✅ Horário disponível: {data_hora} para médico {medico_id}")
+        logger.info("[Agendamento] ✅ Horário disponível: %s para médico %s", data_hora, medico_id)
         # ==========================================================
 
         # Buscar ou criar paciente
@@ -128,7 +128,7 @@ async def criar_agendamento_from_ia(
             )
             db.add(paciente)
             db.flush()  # Para obter o ID
-            logger.info(f"[Agendamento] Novo paciente criado: {paciente.id} - {nome}")
+            logger.info("[Agendamento] Novo paciente criado: %s - %s", paciente.id, nome)
         else:
             # Atualizar nome se necessário
             if paciente.nome != nome:
@@ -155,7 +155,7 @@ async def criar_agendamento_from_ia(
                 # "cancelado" = paciente desistiu, PERDA de receita
                 ag_anterior.status = 'remarcado'
                 ag_anterior.observacoes = (ag_anterior.observacoes or '') + f' | Remarcado para nova data via WhatsApp em {agora.strftime("%d/%m/%Y %H:%M")}'
-                logger.info(f"[Agendamento] 🔄 Remarcação: Marcando como 'remarcado' o agendamento anterior ID={ag_anterior.id} ({ag_anterior.data_hora.strftime('%d/%m/%Y %H:%M')})")
+                logger.info("[Agendamento] 🔄 Remarcação: Marcando como 'remarcado' o agendamento anterior ID=%s (%s)", ag_anterior.id, ag_anterior.data_hora.strftime('%d/%m/%Y %H:%M'))
 
             # Notificar via WebSocket sobre remarcações
             try:
@@ -166,7 +166,7 @@ async def criar_agendamento_from_ia(
                         "motivo": "Paciente remarcou para nova data"
                     })
             except Exception as ws_error:
-                logger.warning(f"[WebSocket] Erro ao notificar remarcação: {ws_error}")
+                logger.warning("[WebSocket] Erro ao notificar remarcação: %s", ws_error)
         # ======================================================================
 
         # Determinar valor e forma de pagamento
@@ -185,12 +185,12 @@ async def criar_agendamento_from_ia(
                 if conv_nome == convenio_lower or convenio_lower in conv_nome or conv_nome in convenio_lower:
                     forma_pagamento = f'convenio_{i}'
                     valor = conv.get('valor')
-                    logger.info(f"[Agendamento] Convênio encontrado: {conv.get('nome')} (index={i}, valor={valor})")
+                    logger.info("[Agendamento] Convênio encontrado: %s (index=%s, valor=%s)", conv.get('nome'), i, valor)
                     break
             else:
                 # Convênio não encontrado no cadastro, salvar como genérico
                 forma_pagamento = 'convenio_0'
-                logger.warning(f"[Agendamento] Convênio '{convenio}' não encontrado no cadastro do médico")
+                logger.warning("[Agendamento] Convênio '%s' não encontrado no cadastro do médico", convenio)
 
         # Criar agendamento (cliente_id é inferido pelo medico/paciente)
         # Indicar se é reagendamento na observação
@@ -213,7 +213,7 @@ async def criar_agendamento_from_ia(
         db.commit()
         db.refresh(agendamento)
 
-        logger.info(f"[Agendamento] ✅ Criado: ID={agendamento.id}, Paciente={nome}, Médico={medico.nome}, Data={data_hora}")
+        logger.info("[Agendamento] ✅ Criado: ID=%s, Paciente=%s, Médico=%s, Data=%s", agendamento.id, nome, medico.nome, data_hora)
 
         # Notificar via WebSocket para atualizar calendários em tempo real
         try:
@@ -227,7 +227,7 @@ async def criar_agendamento_from_ia(
                 "tipo_atendimento": agendamento.tipo_atendimento
             })
         except Exception as ws_error:
-            logger.warning(f"[WebSocket] Erro ao notificar novo agendamento: {ws_error}")
+            logger.warning("[WebSocket] Erro ao notificar novo agendamento: %s", ws_error)
 
         return agendamento
 
@@ -26,7 +26,7 @@ async def transcribe_incoming_audio(message: WhatsAppMessage, whatsapp_service)
         return True
 
     try:
-        logger.info(f"[Webhook Official] 🎤 Processando áudio recebido (media_id: {message.audio_url})")
+        logger.info("[Webhook Official] 🎤 Processando áudio recebido (media_id: %s)", message.audio_url)
 
         # Baixar áudio da API oficial (media_id → bytes)
         audio_bytes = await whatsapp_service.download_media(message.audio_url)
@@ -37,14 +37,14 @@ async def transcribe_incoming_audio(message: WhatsAppMessage, whatsapp_service)
                 f.write(audio_bytes)
                 audio_path = f.name
 
-            logger.info(f"[Webhook Official] 📁 Áudio salvo: {audio_path} ({len(audio_bytes)} bytes)")
+            logger.info("[Webhook Official] 📁 Áudio salvo: %s (%s bytes)", audio_path, len(audio_bytes))
 
             # Transcrever com Whisper
             audio_service = get_audio_service()
             if audio_service:
                 texto_transcrito = await audio_service.transcrever_audio(audio_path)
                 message.text = texto_transcrito
-                logger.info(f"[Webhook Official] ✅ Áudio transcrito: {texto_transcrito[:100]}...")
+                logger.info("[Webhook Official] ✅ Áudio transcrito: %s...", texto_transcrito[:100])
 
                 # Limpar arquivo temporário
                 audio_service.limpar_audio(audio_path)
@@ -78,14 +78,14 @@ async def handle_audio_response(
             mensagem_foi_audio=mensagem_foi_audio,
             mensagem_texto=message.text
         )
-        logger.info(f"[Webhook Official] 🔊 Enviar áudio: {enviar_audio} (modo: {AUDIO_OUTPUT_MODE})")
+        logger.info("[Webhook Official] 🔊 Enviar áudio: %s (modo: %s)", enviar_audio, AUDIO_OUTPUT_MODE)
 
     # Enviar áudio se habilitado e preferência permitir
     if enviar_audio and AUDIO_OUTPUT_MODE in ["audio", "hybrid"]:
         try:
             audio_service = get_audio_service()
             if audio_service:
-                logger.info(f"[Webhook Official] 🎤 Gerando áudio TTS para resposta...")
+                logger.info("[Webhook Official] 🎤 Gerando áudio TTS para resposta...")
 
                 # Gerar áudio com TTS
                 audio_path = await audio_service.texto_para_audio(texto_resposta)
@@ -103,7 +103,7 @@ async def handle_audio_response(
                     )
 
                     if result.success:
-                        logger.info(f"[Webhook Official] ✅ Áudio enviado com sucesso")
+                        logger.info("[Webhook Official] ✅ Áudio enviado com sucesso")
 
                         # Salvar mensagem de áudio no PostgreSQL
                         ConversaService.adicionar_mensagem(
@@ -115,7 +115,7 @@ async def handle_audio_response(
                             tipo=TipoMensagem.AUDIO
                         )
                     else:
-                        logger.warning(f"[Webhook Official] ⚠️ Falha ao enviar áudio: {result.error}")
+                        logger.warning("[Webhook Official] ⚠️ Falha ao enviar áudio: %s", result.error)
 
                     # Limpar arquivo temporário
                     audio_service.limpar_audio(audio_path)
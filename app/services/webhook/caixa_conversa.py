@@ -0,0 +1,314 @@
+"""
+Caixa de mensagens por conversa (tenant + telefone do paciente)
+Horário Inteligente SaaS
+
+Paciente que manda três mensagens seguidas ("oi", "quero marcar", "com o
+cardiologista") gerava três webhooks processados em paralelo: três leituras
+do mesmo contexto no Redis, três chamadas à IA e três respostas sobrepostas.
+Agora o webhook registra a mensagem do paciente (PostgreSQL e painel), entrega
+na caixa da conversa e responde 200; só o turno da IA é agrupado:
+
+- debounce: o turno espera CONVERSA_DEBOUNCE_MS sem mensagem nova (no
+  máximo CONVERSA_DEBOUNCE_MAX_MS desde a primeira) e responde todas juntas
+  em uma chamada à IA; o que chega durante um turno entra no próximo
+- turnos da mesma conversa rodam em ordem, um de cada vez; conversas
+  diferentes seguem em paralelo
+- botões e respostas de lista nunca são agrupados (respondidos sozinhos,
+  sem debounce)
+- entre workers do Uvicorn: trava por conversa no Redis (SET NX com TTL,
+  renovada enquanto o turno roda) para dois processos não responderem ao
+  mesmo paciente ao mesmo tempo. Sem Redis, vale só a ordem dentro do
+  processo. As chamadas ao Redis (cliente síncrono do ConversationManager)
+  rodam em thread, fora do event loop
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.metricas import EtapasMensagem, TURNO_MENSAGENS, TURNOS_POUPADOS
+from app.sql_metricas import escopo_sql
+from app.services.whatsapp_interface import WhatsAppMessage
+
+logger = logging.getLogger(__name__)
+
+# Libera a trava só se ainda for nossa (o TTL pode ter expirado e outro worker assumido)
+LUA_LIBERAR_TURNO = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Renova o TTL só se a trava ainda for nossa
+LUA_RENOVAR_TURNO = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+Chave = Tuple[int, str]
+
+
+@dataclass
+class MensagemPendente:
+    message: WhatsAppMessage
+    cliente_id: int
+    etapas: EtapasMensagem
+    conversa_id: Optional[int] = None
+    foi_audio: bool = False
+    chegada: float = field(default_factory=time.monotonic)
+
+
+def eh_interativa(message: WhatsAppMessage) -> bool:
+    """Clique em botão / item de lista: tem tratamento próprio e não se junta a texto"""
+    return message.message_type == "button" or bool(message.button_reply_id or message.list_reply_id)
+
+
+class CaixaConversas:
+    """Uma fila e uma task por conversa ativa; a task some quando a fila esvazia"""
+
+    def __init__(
+        self,
+        debounce: float = 1.0,
+        debounce_max: float = 4.0,
+        max_lote: int = 10,
+        ttl_turno: float = 60.0,
+        espera_trava: float = 300.0,
+        processar: Optional[Callable[..., Awaitable]] = None,
+        obter_redis: Optional[Callable[[], object]] = None,
+        abrir_sessao: Optional[Callable[[], object]] = None,
+    ):
+        self.debounce = debounce
+        self.debounce_max = max(debounce, debounce_max)
+        self.max_lote = max(1, max_lote)
+        self.ttl_turno = ttl_turno
+        self.espera_trava = espera_trava
+        self._processar = processar
+        self._obter_redis = obter_redis
+        self._abrir_sessao = abrir_sessao
+
+        self._filas: Dict[Chave, Deque[MensagemPendente]] = {}
+        self._chegou: Dict[Chave, asyncio.Event] = {}
+        self._tasks: Dict[Chave, asyncio.Task] = {}
+
+        self.recebidas = 0
+        self.turnos = 0
+        self.poupadas = 0
+        self.esperas_trava = 0
+        self.turnos_sem_trava = 0
+
+    # ==================== ENTRADA ====================
+
+    def entregar(
+        self,
+        message: WhatsAppMessage,
+        cliente_id: int,
+        etapas: Optional[EtapasMensagem] = None,
+        conversa_id: Optional[int] = None,
+        foi_audio: bool = False,
+    ):
+        """
+        Enfileira a mensagem na conversa e garante a task que atende a caixa.
+        `conversa_id`: mensagem já salva pelo webhook (o turno só responde).
+        """
+        chave = (cliente_id, message.sender)
+        self._filas.setdefault(chave, deque()).append(
+            MensagemPendente(message, cliente_id, etapas or EtapasMensagem(), conversa_id, foi_audio)
+        )
+        self.recebidas += 1
+        self._chegou.setdefault(chave, asyncio.Event()).set()
+        if chave not in self._tasks:
+            self._tasks[chave] = asyncio.create_task(self._atender(chave))
+
+    # ==================== ATENDIMENTO ====================
+
+    async def _atender(self, chave: Chave):
+        fila = self._filas[chave]
+        try:
+            while fila:
+                lote = await self._coletar(chave, fila)
+                await self._turno(chave, lote)
+        finally:
+            # Sem await entre o último `while fila` e aqui: nenhuma entrega se perde
+            self._tasks.pop(chave, None)
+            self._chegou.pop(chave, None)
+            if not fila:
+                self._filas.pop(chave, None)
+
+    async def _coletar(self, chave: Chave, fila: Deque[MensagemPendente]) -> List[MensagemPendente]:
+        """Espera o debounce e retira o lote do próximo turno"""
+        if eh_interativa(fila[0].message):
+            return [fila.popleft()]
+
+        inicio = fila[0].chegada
+        chegou = self._chegou[chave]
+        while True:
+            agrupaveis = 0
+            for pendente in fila:
+                if eh_interativa(pendente.message) or agrupaveis >= self.max_lote:
+                    break
+                agrupaveis += 1
+            # Interativa na fila ou lote cheio: responde o que já tem
+            if agrupaveis < len(fila) or agrupaveis >= self.max_lote:
+                break
+            espera = min(fila[-1].chegada + self.debounce, inicio + self.debounce_max) - time.monotonic()
+            if espera <= 0:
+                break
+            chegou.clear()
+            try:
+                await asyncio.wait_for(chegou.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+        return [fila.popleft() for _ in range(agrupaveis)]
+
+    async def _turno(self, chave: Chave, lote: List[MensagemPendente]):
+        cliente_id, telefone = chave
+        self.turnos += 1
+        TURNO_MENSAGENS.observe(len(lote))
+        if len(lote) > 1:
+            self.poupadas += len(lote) - 1
+            TURNOS_POUPADOS.inc(len(lote) - 1)
+            logger.info(f"📨 {len(lote)} mensagens de ...{telefone[-4:]} (cliente {cliente_id}) em um só turno")
+
+        async with self._turno_exclusivo(chave):
+            db = self._abrir_sessao()
+            try:
+                # Consultas SQL contadas por turno (a requisição do webhook já terminou)
+                with escopo_sql("turno:conversa", cliente_id):
+                    await self._processar(
+                        [p.message for p in lote], db, cliente_id=cliente_id, etapas=lote[0].etapas,
+                        conversa_id=lote[-1].conversa_id,
+                        mensagem_foi_audio=any(p.foi_audio for p in lote),
+                    )
+            except Exception as e:
+                logger.error(f"❌ Erro no turno da conversa (cliente {cliente_id}): {e}")
+            finally:
+                db.close()
+
+        # Respondidas no turno da primeira: só as etapas próprias (parse, db) são observadas
+        for pendente in lote[1:]:
+            pendente.etapas.concluir()
+
+    @asynccontextmanager
+    async def _turno_exclusivo(self, chave: Chave):
+        """Trava da conversa no Redis, compartilhada entre os workers"""
+        cliente = self._obter_redis() if self._obter_redis else None
+        if cliente is None:
+            yield
+            return
+
+        nome = f"turno:cliente_{chave[0]}:{chave[1]}"
+        token = uuid.uuid4().hex
+        ttl_ms = int(self.ttl_turno * 1000)
+        limite = time.monotonic() + self.espera_trava
+        obtida = False
+        while True:
+            try:
+                obtida = bool(await asyncio.to_thread(cliente.set, nome, token, nx=True, px=ttl_ms))
+            except Exception as e:
+                logger.warning(f"⚠️ Trava de turno sem Redis, seguindo só com a ordem local: {e}")
+                break
+            if obtida:
+                break
+            if time.monotonic() >= limite:
+                # Trava de worker que caiu expira em um TTL; aqui o turno do outro worker
+                # segue renovando há CONVERSA_TURNO_ESPERA: responde mesmo assim, em ERROR
+                self.turnos_sem_trava += 1
+                logger.error(
+                    f"🔒 Trava do turno de ...{chave[1][-4:]} (cliente {chave[0]}) não obtida em "
+                    f"{self.espera_trava:.0f}s; processando sem exclusividade entre workers"
+                )
+                break
+            self.esperas_trava += 1
+            await asyncio.sleep(0.05)
+
+        renovacao = asyncio.create_task(self._renovar_trava(cliente, nome, token, ttl_ms)) if obtida else None
+        try:
+            yield
+        finally:
+            if renovacao is not None:
+                renovacao.cancel()
+                try:
+                    await asyncio.to_thread(cliente.eval, LUA_LIBERAR_TURNO, 1, nome, token)
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro ao liberar trava de turno (expira pelo TTL): {e}")
+
+    async def _renovar_trava(self, cliente, nome: str, token: str, ttl_ms: int):
+        """Estende o TTL a cada terço dele enquanto o turno roda"""
+        while True:
+            await asyncio.sleep(self.ttl_turno / 3)
+            try:
+                renovada = await asyncio.to_thread(cliente.eval, LUA_RENOVAR_TURNO, 1, nome, token, ttl_ms)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao renovar trava de turno: {e}")
+                continue
+            if not renovada:
+                logger.error(f"🔒 Trava de turno {nome} perdida durante o turno (expirou ou foi tomada)")
+                return
+
+    # ==================== CICLO DE VIDA ====================
+
+    async def stop(self, timeout: float = 30.0):
+        """Shutdown: termina os turnos pendentes (mensagens já aceitas com 200)"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        logger.info(f"📨 Aguardando {len(tasks)} conversas com mensagens pendentes...")
+        _, pendentes = await asyncio.wait(tasks, timeout=timeout)
+        for task in pendentes:
+            task.cancel()
+        if pendentes:
+            logger.warning(f"⚠️ {len(pendentes)} conversas não concluídas no shutdown")
+
+    def get_status(self) -> Dict:
+        return {
+            "conversas_ativas": len(self._tasks),
+            "na_fila": sum(len(fila) for fila in self._filas.values()),
+            "recebidas": self.recebidas,
+            "turnos": self.turnos,
+            "chamadas_ia_poupadas": self.poupadas,
+            "esperas_trava": self.esperas_trava,
+            "turnos_sem_trava": self.turnos_sem_trava,
+            "debounce_ms": int(self.debounce * 1000),
+        }
+
+
+def _processar_turno(mensagens, db, cliente_id=None, etapas=None, conversa_id=None, mensagem_foi_audio=False):
+    # Import tardio: message_processor importa os serviços de IA e WhatsApp
+    from app.services.webhook.message_processor import process_messages
+    return process_messages(
+        mensagens, db, cliente_id=cliente_id, etapas=etapas,
+        conversa_id=conversa_id, mensagem_foi_audio=mensagem_foi_audio,
+    )
+
+
+def _abrir_sessao():
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+def _redis_da_conversa():
+    from app.services.registry import get_conversation_manager
+    return get_conversation_manager().redis_client
+
+
+# Instância global (singleton)
+caixa_conversas = CaixaConversas(
+    debounce=float(os.getenv("CONVERSA_DEBOUNCE_MS", "1000")) / 1000,
+    debounce_max=float(os.getenv("CONVERSA_DEBOUNCE_MAX_MS", "4000")) / 1000,
+    max_lote=int(os.getenv("CONVERSA_MAX_LOTE", "10")),
+    ttl_turno=float(os.getenv("CONVERSA_TURNO_TTL", "60")),
+    espera_trava=float(os.getenv("CONVERSA_TURNO_ESPERA", "300")),
+    processar=_processar_turno,
+    obter_redis=_redis_da_conversa,
+    abrir_sessao=_abrir_sessao,
+)
@@ -1,15 +1,19 @@
+import asyncio
 import logging
+from typing import List, Optional
+
 import pytz
 from sqlalchemy.orm import Session
 
-from app.services.whatsapp_official_service import WhatsAppOfficialService
 from app.services.whatsapp_interface import WhatsAppMessage
 from app.services.anthropic_service import AnthropicService
-from app.services.conversation_manager import ConversationManager
+from app.services.resposta_ia_stream import dividir_pausa
+from app.services.registry import get_whatsapp_service, get_conversation_manager
+from app.metricas import EtapasMensagem
 
 # Imports para persistência de conversas no PostgreSQL
 from app.services.conversa_service import ConversaService
-from app.models.conversa import StatusConversa
+from app.models.conversa import Conversa, StatusConversa
 from app.models.mensagem import DirecaoMensagem, RemetenteMensagem, TipoMensagem
 from app.models.agendamento import Agendamento
 
@@ -35,11 +39,6 @@ logger = logging.getLogger(__name__)
 # Timezone Brasil
 TZ_BRAZIL = pytz.timezone('America/Sao_Paulo')
 
-# Singletons
-whatsapp_service = WhatsAppOfficialService()
-conversation_manager = ConversationManager()
-
-
 def converter_para_brasil(dt):
     """Converte datetime UTC para horário de Brasília."""
     if dt is None:
@@ -49,7 +48,12 @@ def converter_para_brasil(dt):
     return dt.astimezone(TZ_BRAZIL).isoformat()
 
 
-async def process_message(message: WhatsAppMessage, db: Session):
+async def process_message(
+    message: WhatsAppMessage,
+    db: Session,
+    cliente_id: Optional[int] = None,
+    etapas: Optional[EtapasMensagem] = None,
+):
     """
     Processa mensagem recebida usando IA.
     Persiste conversas no PostgreSQL e mantém contexto no Redis.
@@ -57,65 +61,61 @@ async def process_message(message: WhatsAppMessage, db: Session):
     Args:
         message: Mensagem do WhatsApp
         db: Sessão do banco de dados
+        cliente_id: tenant já resolvido pelo chamador (None = resolver aqui)
+        etapas: cronômetro iniciado no recebimento do webhook (métricas por etapa)
     """
+    await process_messages([message], db, cliente_id=cliente_id, etapas=etapas)
 
-    try:
-        # 1. Determina o cliente_id (tenant) baseado no phone_number_id
-        cliente_id = get_cliente_id_from_phone_number_id(message.phone_number_id, db)
 
-        if cliente_id is None:
-            logger.error(
-                f"[Webhook Official] MENSAGEM IGNORADA: phone_number_id '{message.phone_number_id}' "
-                f"não pertence a nenhum cliente. Remetente: {message.sender}. "
-                f"Verifique a configuração do WhatsApp no painel admin."
-            )
-            return
-
-        # 1.1 Definir contexto de billing para logging de mensagens WhatsApp
-        try:
-            from app.services.whatsapp_billing_service import set_billing_context
-            set_billing_context(cliente_id)
-        except Exception:
-            pass
+async def registrar_entrada(message: WhatsAppMessage, db: Session, cliente_id: int, etapas: EtapasMensagem, whatsapp_service):
+    """
+    Registra uma mensagem do paciente: conversa, transcrição de áudio,
+    PostgreSQL e WebSocket. Retorna (conversa, mensagem_foi_audio).
 
-        # 2. Criar ou recuperar conversa no PostgreSQL
+    O webhook chama antes de responder 200 à Meta, para a mensagem não se
+    perder se o processo cair antes do turno da IA.
+    """
+    # 2. Criar ou recuperar conversa no PostgreSQL
+    with etapas.etapa("db"):
         conversa, is_nova_conversa = ConversaService.criar_ou_recuperar_conversa(
             db=db,
             cliente_id=cliente_id,
             telefone=message.sender
         )
-        logger.info(f"[Webhook Official] Conversa {conversa.id} - Status: {conversa.status.value} - Nova: {is_nova_conversa}")
-
-        # 2.1 Se for nova conversa, notificar via WebSocket para atualizar lista lateral
-        if is_nova_conversa:
-            try:
-                await websocket_manager.send_nova_conversa(cliente_id, {
-                    "id": conversa.id,
-                    "paciente_telefone": conversa.paciente_telefone,
-                    "paciente_nome": conversa.paciente_nome,
-                    "status": conversa.status.value,
-                    "ultima_mensagem": message.text[:50] if message.text else "",
-                    "ultima_mensagem_at": conversa.criado_em.isoformat() if conversa.criado_em else None,
-                    "nao_lidas": 1
-                })
-                logger.info(f"[Webhook Official] 📢 Nova conversa notificada via WebSocket: {conversa.id}")
-            except Exception as ws_error:
-                logger.warning(f"[Webhook Official] Erro ao notificar nova conversa: {ws_error}")
-
-        # 3. Determinar tipo da mensagem e processar áudio se necessário
+    logger.info("[Webhook Official] Conversa %s - Status: %s - Nova: %s", conversa.id, conversa.status.value, is_nova_conversa)
+
+    # 2.1 Se for nova conversa, notificar via WebSocket para atualizar lista lateral
+    if is_nova_conversa:
+        try:
+            await websocket_manager.send_nova_conversa(cliente_id, {
+                "id": conversa.id,
+                "paciente_telefone": conversa.paciente_telefone,
+                "paciente_nome": conversa.paciente_nome,
+                "status": conversa.status.value,
+                "ultima_mensagem": message.text[:50] if message.text else "",
+                "ultima_mensagem_at": conversa.criado_em.isoformat() if conversa.criado_em else None,
+                "nao_lidas": 1
+            })
+            logger.info("[Webhook Official] 📢 Nova conversa notificada via WebSocket: %s", conversa.id)
+        except Exception as ws_error:
+            logger.warning("[Webhook Official] Erro ao notificar nova conversa: %s", ws_error)
+
+    # 3. Determinar tipo da mensagem e processar áudio se necessário
+    with etapas.etapa("stt"):
         mensagem_foi_audio = await transcribe_incoming_audio(message, whatsapp_service)
 
-        tipo_mensagem = TipoMensagem.AUDIO if mensagem_foi_audio else (
-            TipoMensagem.IMAGEM if message.message_type == "image" else (
-            TipoMensagem.DOCUMENTO if message.message_type == "document" else TipoMensagem.TEXTO
-        ))
+    tipo_mensagem = TipoMensagem.AUDIO if mensagem_foi_audio else (
+        TipoMensagem.IMAGEM if message.message_type == "image" else (
+        TipoMensagem.DOCUMENTO if message.message_type == "document" else TipoMensagem.TEXTO
+    ))
 
-        # 4. Salvar mensagem do paciente no PostgreSQL
-        logger.info(f"[Webhook Official] Salvando mensagem: text='{message.text}', type={message.message_type}")
+    # 4. Salvar mensagem do paciente no PostgreSQL
+    logger.debug("[Webhook Official] Salvando mensagem: text='%s', type=%s", message.text, message.message_type)
 
-        # Garantir que temos conteúdo válido
-        conteudo = message.text or "[Mensagem sem texto]"
+    # Garantir que temos conteúdo válido
+    conteudo = message.text or "[Mensagem sem texto]"
 
+    with etapas.etapa("db"):
         mensagem_paciente = ConversaService.adicionar_mensagem(
             db=db,
             conversa_id=conversa.id,
@@ -125,25 +125,148 @@ async def process_message(message: WhatsAppMessage, db: Session):
             tipo=tipo_mensagem,
             midia_url=message.media_url if hasattr(message, 'media_url') else None
         )
-        logger.info(f"[Webhook Official] Mensagem do paciente salva no PostgreSQL (ID: {mensagem_paciente.id})")
+    logger.info("[Webhook Official] Mensagem do paciente salva no PostgreSQL (ID: %s)", mensagem_paciente.id)
+
+    # 4.1 Notificar via WebSocket (nova mensagem do paciente)
+    await websocket_manager.send_nova_mensagem(
+        cliente_id=cliente_id,
+        conversa_id=conversa.id,
+        mensagem={
+            "id": mensagem_paciente.id,
+            "direcao": "entrada",
+            "remetente": "paciente",
+            "tipo": tipo_mensagem.value,
+            "conteudo": message.text,
+            "timestamp": converter_para_brasil(mensagem_paciente.timestamp)
+        }
+    )
+
+    return conversa, mensagem_foi_audio
+
+
+async def _enviar_trecho(
+    texto: str,
+    db: Session,
+    conversa,
+    cliente_id: int,
+    message: WhatsAppMessage,
+    whatsapp_service,
+    etapas: EtapasMensagem,
+) -> bool:
+    """
+    Envia o trecho antes do ⏳ ("Um momentinho, vou verificar...") como
+    mensagem própria: PostgreSQL, painel e WhatsApp. No streaming roda em
+    paralelo à geração do resto, dentro da etapa "llm": por isso não abre
+    etapas próprias (db/envio se sobreporiam ao tempo da IA), só marca a
+    resposta enviada. Retorna True se a Meta aceitou o envio.
+    """
+    try:
+        mensagem_ia = ConversaService.adicionar_mensagem(
+            db=db,
+            conversa_id=conversa.id,
+            direcao=DirecaoMensagem.SAIDA,
+            remetente=RemetenteMensagem.IA,
+            conteudo=texto,
+            tipo=TipoMensagem.TEXTO
+        )
 
-        # 4.1 Notificar via WebSocket (nova mensagem do paciente)
         await websocket_manager.send_nova_mensagem(
             cliente_id=cliente_id,
             conversa_id=conversa.id,
             mensagem={
-                "id": mensagem_paciente.id,
-                "direcao": "entrada",
-                "remetente": "paciente",
-                "tipo": tipo_mensagem.value,
-                "conteudo": message.text,
-                "timestamp": converter_para_brasil(mensagem_paciente.timestamp)
+                "id": mensagem_ia.id,
+                "direcao": "saida",
+                "remetente": "ia",
+                "tipo": "texto",
+                "conteudo": texto,
+                "timestamp": converter_para_brasil(mensagem_ia.timestamp)
             }
         )
 
+        envio = await whatsapp_service.send_text(
+            to=message.sender,
+            message=texto,
+            phone_number_id=message.phone_number_id
+        )
+        # Tempo percebido pelo paciente: até o primeiro trecho
+        etapas.resposta_enviada("ok" if envio.success else "erro_envio")
+        return envio.success
+    except Exception as e:
+        logger.warning("[Webhook Official] Erro ao enviar trecho antes do ⏳: %s", e)
+        return False
+
+
+async def process_messages(
+    mensagens: List[WhatsAppMessage],
+    db: Session,
+    cliente_id: Optional[int] = None,
+    etapas: Optional[EtapasMensagem] = None,
+    conversa_id: Optional[int] = None,
+    mensagem_foi_audio: bool = False,
+):
+    """
+    Um turno da conversa: responde UMA vez às mensagens do paciente, com os
+    textos juntos. Mensagens rápidas em sequência chegam aqui agrupadas pela
+    caixa da conversa (caixa_conversa.py); botões e respostas de lista vêm
+    sempre sozinhos.
+
+    Args:
+        mensagens: Mensagens do mesmo remetente, em ordem de chegada
+        db: Sessão do banco de dados
+        cliente_id: tenant já resolvido pelo chamador (None = resolver aqui)
+        etapas: cronômetro da primeira mensagem do turno (métricas por etapa)
+        conversa_id: mensagens já registradas pelo webhook (registrar_entrada);
+            None = registra aqui, em ordem
+        mensagem_foi_audio: alguma das mensagens já registradas era áudio
+    """
+    etapas = etapas or EtapasMensagem()
+    # Remetente, número da clínica e ids de botão/lista vêm da última mensagem
+    message = mensagens[-1]
+
+    # Singletons do processo (criados no primeiro uso / aquecimento do startup)
+    whatsapp_service = get_whatsapp_service()
+    conversation_manager = get_conversation_manager()
+
+    try:
+        # 1. Determina o cliente_id (tenant) baseado no phone_number_id
+        if cliente_id is None:
+            cliente_id = get_cliente_id_from_phone_number_id(message.phone_number_id, db)
+
+        if cliente_id is None:
+            logger.error(
+                f"[Webhook Official] MENSAGEM IGNORADA: phone_number_id '{message.phone_number_id}' "
+                f"não pertence a nenhum cliente. Remetente: {message.sender}. "
+                f"Verifique a configuração do WhatsApp no painel admin."
+            )
+            return
+
+        # 1.1 Definir contexto de billing para logging de mensagens WhatsApp
+        try:
+            from app.services.whatsapp_billing_service import set_billing_context
+            set_billing_context(cliente_id)
+        except Exception:
+            pass
+
+        # 2-4. Registrar cada mensagem do paciente (PostgreSQL + painel), em ordem,
+        # ou recarregar a conversa já registrada pelo webhook (status atualizado:
+        # um atendente pode ter assumido durante o debounce)
+        if conversa_id is not None:
+            with etapas.etapa("db"):
+                conversa = db.get(Conversa, conversa_id)
+            if conversa is None:
+                logger.error("[Webhook Official] Conversa %s não encontrada para o turno", conversa_id)
+                return
+        else:
+            for entrada in mensagens:
+                conversa, foi_audio = await registrar_entrada(entrada, db, cliente_id, etapas, whatsapp_service)
+                mensagem_foi_audio = mensagem_foi_audio or foi_audio
+
+        # Texto do turno: as mensagens do paciente juntas, uma por linha
+        texto_paciente = "\n".join(m.text for m in mensagens if m.text)
+
         # 5. Verificar se IA está ativa para esta conversa
         if conversa.status == StatusConversa.HUMANO_ASSUMIU:
-            logger.info(f"[Webhook Official] Conversa {conversa.id} está sendo atendida por humano. IA não responderá.")
+            logger.info("[Webhook Official] Conversa %s está sendo atendida por humano. IA não responderá.", conversa.id)
             # Mensagem já foi notificada acima, atendente verá no painel
             return
 
@@ -151,12 +274,12 @@ async def process_message(message: WhatsAppMessage, db: Session):
         resultado_lembrete = await lembrete_service.processar_resposta_lembrete(
             db=db,
             telefone=message.sender,
-            texto_resposta=message.text,
+            texto_resposta=texto_paciente,
             cliente_id=cliente_id
         )
 
         if resultado_lembrete.get("tem_lembrete_pendente"):
-            logger.info(f"[Webhook Official] 🔔 Resposta de lembrete detectada: {resultado_lembrete.get('intencao')}")
+            logger.info("[Webhook Official] 🔔 Resposta de lembrete detectada: %s", resultado_lembrete.get('intencao'))
 
             texto_resposta = resultado_lembrete.get("resposta", "")
 
@@ -196,7 +319,7 @@ async def process_message(message: WhatsAppMessage, db: Session):
                 conversation_manager.add_message(
                     phone=message.sender,
                     message_type="user",
-                    text=message.text,
+                    text=texto_paciente,
                     intencao="resposta_lembrete",
                     dados_coletados={},
                     cliente_id=cliente_id
@@ -216,7 +339,7 @@ async def process_message(message: WhatsAppMessage, db: Session):
 
         # 5.2 Verificar se é clique em botão de template
         if message.message_type == "button":
-            logger.info(f"[Webhook Official] 🔘 Botão clicado: '{message.text}'")
+            logger.info("[Webhook Official] 🔘 Botão clicado: '%s'", message.text)
 
             button_handler = get_button_handler()
             resultado_botao = await button_handler.processar_botao(
@@ -290,39 +413,58 @@ async def process_message(message: WhatsAppMessage, db: Session):
                 return
 
         # 6. Obtém contexto da conversa do Redis
-        contexto = conversation_manager.get_context(
-            phone=message.sender,
-            limit=10,
-            cliente_id=cliente_id
-        )
+        with etapas.etapa("contexto"):
+            contexto = conversation_manager.get_context(
+                phone=message.sender,
+                limit=10,
+                cliente_id=cliente_id
+            )
 
         # 7. Se for resposta de botão/lista, usa o ID como texto
-        texto_para_processar = message.text
+        texto_para_processar = texto_paciente
         if message.button_reply_id:
             texto_para_processar = message.button_reply_id
         elif message.list_reply_id:
             texto_para_processar = message.list_reply_id
 
-        # 8. Processa com IA
-        anthropic_service = AnthropicService(db, cliente_id)
-        resposta = anthropic_service.processar_mensagem(
-            mensagem=texto_para_processar,
-            telefone=message.sender,
-            contexto_conversa=contexto
-        )
+        # 8. Processa com IA (streaming: o trecho antes do ⏳ sai enquanto o resto é gerado)
+        envio_antecipado: List[asyncio.Task] = []
 
-        texto_resposta = resposta.get("resposta", "Desculpe, não entendi.")
+        def ao_segmento(segmento: str):
+            envio_antecipado.append(asyncio.create_task(_enviar_trecho(
+                segmento, db, conversa, cliente_id, message, whatsapp_service, etapas
+            )))
+
+        with etapas.etapa("llm"):
+            anthropic_service = AnthropicService(db, cliente_id)
+            resposta = await anthropic_service.processar_mensagem_stream(
+                mensagem=texto_para_processar,
+                telefone=message.sender,
+                contexto_conversa=contexto,
+                ao_segmento=ao_segmento
+            )
+
+        texto_ia = resposta.get("resposta", "Desculpe, não entendi.")
+
+        # 8.1 Marcador de pausa: primeiro trecho em mensagem própria (o ⏳ nunca vai ao paciente)
+        primeiro_trecho, texto_resposta = dividir_pausa(texto_ia)
+        if envio_antecipado:
+            # Já enviado durante o streaming: só garante a ordem antes do resto
+            await envio_antecipado[0]
+        elif primeiro_trecho:
+            await _enviar_trecho(primeiro_trecho, db, conversa, cliente_id, message, whatsapp_service, etapas)
 
         # 9. Salvar resposta da IA no PostgreSQL
-        mensagem_ia = ConversaService.adicionar_mensagem(
-            db=db,
-            conversa_id=conversa.id,
-            direcao=DirecaoMensagem.SAIDA,
-            remetente=RemetenteMensagem.IA,
-            conteudo=texto_resposta,
-            tipo=TipoMensagem.TEXTO
-        )
-        logger.info(f"[Webhook Official] Resposta da IA salva no PostgreSQL")
+        with etapas.etapa("db"):
+            mensagem_ia = ConversaService.adicionar_mensagem(
+                db=db,
+                conversa_id=conversa.id,
+                direcao=DirecaoMensagem.SAIDA,
+                remetente=RemetenteMensagem.IA,
+                conteudo=texto_resposta,
+                tipo=TipoMensagem.TEXTO
+            )
+        logger.info("[Webhook Official] Resposta da IA salva no PostgreSQL")
 
         # 9.1 Notificar via WebSocket (resposta da IA)
         await websocket_manager.send_nova_mensagem(
@@ -339,29 +481,30 @@ async def process_message(message: WhatsAppMessage, db: Session):
         )
 
         # 10. Salva contexto no Redis (para a IA ter histórico rápido)
-        conversation_manager.add_message(
-            phone=message.sender,
-            message_type="user",
-            text=message.text,
-            intencao="",
-            dados_coletados={},
-            cliente_id=cliente_id
-        )
+        with etapas.etapa("contexto"):
+            conversation_manager.add_message(
+                phone=message.sender,
+                message_type="user",
+                text=texto_paciente,
+                intencao="",
+                dados_coletados={},
+                cliente_id=cliente_id
+            )
 
-        conversation_manager.add_message(
-            phone=message.sender,
-            message_type="assistant",
-            text=texto_resposta,
-            intencao=resposta.get("intencao", ""),
-            dados_coletados=resposta.get("dados_coletados", {}),
-            cliente_id=cliente_id
-        )
+            conversation_manager.add_message(
+                phone=message.sender,
+                message_type="assistant",
+                text=texto_ia,
+                intencao=resposta.get("intencao", ""),
+                dados_coletados=resposta.get("dados_coletados", {}),
+                cliente_id=cliente_id
+            )
 
         # 11. Processar ações especiais baseadas na resposta da IA
         proxima_acao = resposta.get("proxima_acao", "")
         dados_coletados = resposta.get("dados_coletados", {})
 
-        logger.info(f"[Webhook Official] proxima_acao={proxima_acao}, dados_coletados={dados_coletados}")
+        logger.info("[Webhook Official] proxima_acao=%s, dados_coletados=%s", proxima_acao, dados_coletados)
 
         # 11.1 Se a IA sinalizou que deve agendar, criar o agendamento
         if proxima_acao == "agendar":
@@ -399,20 +542,20 @@ async def process_message(message: WhatsAppMessage, db: Session):
                         else:
                             horarios_disponiveis_msg = "\n\n⚠️ Infelizmente não há mais horários disponíveis neste dia."
                     except Exception as e:
-                        logger.warning(f"[Webhook Official] Erro ao buscar horários disponíveis: {e}")
+                        logger.warning("[Webhook Official] Erro ao buscar horários disponíveis: %s", e)
 
                 # Substituir resposta da IA por mensagem de horário indisponível
                 texto_resposta = f"😔 Desculpe, mas o horário de {data_formatada} não está mais disponível para {medico_nome}."
                 texto_resposta += horarios_disponiveis_msg
                 texto_resposta += "\n\nQual horário você prefere?"
 
-                logger.warning(f"[Webhook Official] ⚠️ Horário indisponível: {data_formatada}")
+                logger.warning("[Webhook Official] ⚠️ Horário indisponível: %s", data_formatada)
                 agendamento_criado = None  # Limpar para não confundir
 
             elif agendamento_criado and hasattr(agendamento_criado, 'id'):
-                logger.info(f"[Webhook Official] ✅ Agendamento criado: ID {agendamento_criado.id}")
+                logger.info("[Webhook Official] ✅ Agendamento criado: ID %s", agendamento_criado.id)
             else:
-                logger.warning(f"[Webhook Official] ⚠️ Falha ao criar agendamento com dados: {dados_coletados}")
+                logger.warning("[Webhook Official] ⚠️ Falha ao criar agendamento com dados: %s", dados_coletados)
 
         # 11.2 Envia resposta pelo WhatsApp
         if proxima_acao == "escolher_especialidade":
@@ -425,25 +568,29 @@ async def process_message(message: WhatsAppMessage, db: Session):
                 InteractiveButton(id="clinico", title="Clínico Geral")
             ]
 
-            await whatsapp_service.send_interactive_buttons(
-                to=message.sender,
-                text=texto_resposta,
-                buttons=buttons,
-                phone_number_id=message.phone_number_id
-            )
+            with etapas.etapa("envio"):
+                envio = await whatsapp_service.send_interactive_buttons(
+                    to=message.sender,
+                    text=texto_resposta,
+                    buttons=buttons,
+                    phone_number_id=message.phone_number_id
+                )
         else:
             # Envia texto simples
-            await whatsapp_service.send_text(
-                to=message.sender,
-                message=texto_resposta,
-                phone_number_id=message.phone_number_id
-            )
+            with etapas.etapa("envio"):
+                envio = await whatsapp_service.send_text(
+                    to=message.sender,
+                    message=texto_resposta,
+                    phone_number_id=message.phone_number_id
+                )
+        etapas.resposta_enviada("ok" if envio.success else "erro_envio")
 
         # 11.3 Verificar preferência de áudio e enviar resposta TTS
-        await handle_audio_response(
-            db, conversa.id, cliente_id, message, texto_resposta,
-            mensagem_foi_audio, whatsapp_service
-        )
+        with etapas.etapa("tts"):
+            await handle_audio_response(
+                db, conversa.id, cliente_id, message, texto_resposta,
+                mensagem_foi_audio, whatsapp_service
+            )
 
     except Exception as e:
         import traceback
@@ -456,3 +603,7 @@ async def process_message(message: WhatsAppMessage, db: Session):
             message="Desculpe, estou com dificuldades técnicas no momento. Por favor, tente novamente em alguns instantes.",
             phone_number_id=message.phone_number_id
         )
+        etapas.resposta_enviada("erro")
+
+    finally:
+        etapas.concluir()
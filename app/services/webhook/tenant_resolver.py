@@ -1,6 +1,7 @@
 import logging
 from typing import Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import or_
 
 from app.models.configuracao import Configuracao
@@ -32,7 +33,7 @@ def get_cliente_id_from_phone_number_id(phone_number_id: str, db: Session) -> Op
     if config:
         cliente = db.query(Cliente).filter(Cliente.id == config.cliente_id, filtro_ativo).first()
         if cliente:
-            logger.info(f"[Multi-tenant] Cliente {cliente.id} ({cliente.nome}) identificado via configuracoes pelo phone_number_id {phone_number_id}")
+            logger.info("[Multi-tenant] Cliente %s (%s) identificado via configuracoes pelo phone_number_id %s", cliente.id, cliente.nome, phone_number_id)
             return cliente.id
 
     # 2. Fallback: busca direto na tabela clientes (campo whatsapp_phone_number_id)
@@ -42,9 +43,17 @@ def get_cliente_id_from_phone_number_id(phone_number_id: str, db: Session) -> Op
     ).first()
 
     if cliente:
-        logger.info(f"[Multi-tenant] Cliente {cliente.id} ({cliente.nome}) identificado via tabela clientes pelo phone_number_id {phone_number_id}")
+        logger.info("[Multi-tenant] Cliente %s (%s) identificado via tabela clientes pelo phone_number_id %s", cliente.id, cliente.nome, phone_number_id)
         return cliente.id
 
     # 3. NÃO encontrou — retorna None (sem fallback para demo)
     logger.error(f"[Multi-tenant] FALHA: phone_number_id '{phone_number_id}' não pertence a nenhum cliente ativo. Mensagem será ignorada.")
     return None
+
+
+async def resolver_cliente_id(phone_number_id: str, db: AsyncSession) -> Optional[int]:
+    """
+    Mesma resolução, pela sessão asyncpg (sem bloquear o event loop).
+    Usada no recebimento do webhook, antes de qualquer conexão síncrona.
+    """
+    return await db.run_sync(lambda sessao: get_cliente_id_from_phone_number_id(phone_number_id, sessao))
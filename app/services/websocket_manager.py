@@ -9,6 +9,9 @@ from fastapi import WebSocket
 from typing import Dict, Set
 import json
 import logging
+import time
+
+from app.metricas import WEBSOCKET_CONEXOES, WEBSOCKET_FANOUT
 
 logger = logging.getLogger(__name__)
 
@@ -26,12 +29,14 @@ class WebSocketManager:
         if cliente_id not in self.active_connections:
             self.active_connections[cliente_id] = set()
         self.active_connections[cliente_id].add(websocket)
+        WEBSOCKET_CONEXOES.inc()
         logger.info(f"WebSocket conectado para cliente {cliente_id}. Total: {len(self.active_connections[cliente_id])}")
 
     def disconnect(self, websocket: WebSocket, cliente_id: int):
         """Remove conexão da lista"""
-        if cliente_id in self.active_connections:
+        if cliente_id in self.active_connections and websocket in self.active_connections[cliente_id]:
             self.active_connections[cliente_id].discard(websocket)
+            WEBSOCKET_CONEXOES.dec()
             if not self.active_connections[cliente_id]:
                 del self.active_connections[cliente_id]
         logger.info(f"WebSocket desconectado para cliente {cliente_id}")
@@ -44,6 +49,7 @@ class WebSocketManager:
 
         logger.debug(f"[WebSocket] Broadcast para {len(self.active_connections[cliente_id])} conexões do cliente {cliente_id}")
 
+        inicio = time.perf_counter()
         dead_connections = set()
         message_json = json.dumps(message, default=str)
 
@@ -57,6 +63,10 @@ class WebSocketManager:
         # Remover conexões mortas
         for dead in dead_connections:
             self.active_connections[cliente_id].discard(dead)
+        if dead_connections:
+            WEBSOCKET_CONEXOES.dec(len(dead_connections))
+
+        WEBSOCKET_FANOUT.labels(message.get("tipo", "outro")).observe(time.perf_counter() - inicio)
 
     async def send_nova_mensagem(self, cliente_id: int, conversa_id: int, mensagem: dict):
         """Notifica nova mensagem em uma conversa"""
@@ -105,6 +115,19 @@ class WebSocketManager:
             "agendamento": agendamento
         })
 
+    async def send_agendamentos_atualizados(self, cliente_id: int, ids: list, status: str, updated_seq: int):
+        """
+        Notifica mudança de status em lote (ex: consultas passadas → realizada).
+        `updated_seq` só sinaliza a mudança: o calendário busca o delta com o
+        cursor da sua última resposta (desde).
+        """
+        await self.broadcast_to_tenant(cliente_id, {
+            "tipo": "agendamentos_atualizados",
+            "ids": ids,
+            "status": status,
+            "updated_seq": updated_seq
+        })
+
     def get_connection_count(self, cliente_id: int) -> int:
         """Retorna número de conexões ativas para um tenant"""
         return len(self.active_connections.get(cliente_id, set()))
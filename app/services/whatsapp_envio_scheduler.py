@@ -0,0 +1,330 @@
+"""
+Agendador de envios do WhatsApp (Meta Cloud API)
+Horário Inteligente SaaS
+
+Todo envio de mensagem (WhatsAppOfficialService._send_request) passa por uma
+fila por phone_number_id:
+- balde de tokens por número: WHATSAPP_MPS mensagens/s (limite da Meta por
+  número), dividido entre os workers do Uvicorn (WEB_CONCURRENCY)
+- raias de prioridade: resposta interativa > alerta > lembrete > marketing;
+  uma rajada de lembretes não atrasa a resposta da IA para o paciente
+- backpressure: com a fila do número cheia (WHATSAPP_FILA_MAX), lembretes
+  e marketing esperam vaga; respostas interativas e alertas nunca esperam
+- envios recusados por limite da Meta (códigos 130429, 131056, 80007, 4 e
+  613, que acompanham o HTTP 429) voltam para a fila com backoff exponencial e o número fica
+  pausado durante o backoff
+
+A prioridade vem do contexto (`with prioridade_envio(PRIORIDADE_ALERTA):`);
+sem contexto, templates usam PRIORIDADE_POR_TEMPLATE (padrão: lembrete) e o
+resto é tratado como resposta interativa.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.services.whatsapp_interface import SendResult
+
+logger = logging.getLogger(__name__)
+
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_ALERTA = 1
+PRIORIDADE_LEMBRETE = 2
+PRIORIDADE_MARKETING = 3
+
+NOMES_PRIORIDADE = {
+    PRIORIDADE_INTERATIVA: "interativa",
+    PRIORIDADE_ALERTA: "alerta",
+    PRIORIDADE_LEMBRETE: "lembrete",
+    PRIORIDADE_MARKETING: "marketing",
+}
+
+# Códigos de erro da Graph API que indicam limite de envio
+# 130429: throughput do número | 131056: par remetente/destinatário
+# 80007: limite da WABA | 4 / 613: limite da aplicação
+CODIGOS_LIMITE = {130429, 131056, 80007, 4, 613}
+
+# Templates fora da raia de lembrete (padrão dos templates)
+PRIORIDADE_POR_TEMPLATE = {
+    "consulta_cancelada_clinica": PRIORIDADE_ALERTA,
+    "consulta_reagendada_clinica": PRIORIDADE_ALERTA,
+    "necessidade_reagendamento": PRIORIDADE_ALERTA,
+    "boas_vindas_clinica": PRIORIDADE_MARKETING,
+    "pesquisa_satisfacao": PRIORIDADE_MARKETING,
+    "paciente_inativo": PRIORIDADE_MARKETING,
+}
+
+_prioridade_atual: ContextVar[Optional[int]] = ContextVar("_prioridade_envio", default=None)
+
+
+@contextmanager
+def prioridade_envio(prioridade: int):
+    """Define a raia dos envios feitos dentro do bloco"""
+    token = _prioridade_atual.set(prioridade)
+    try:
+        yield
+    finally:
+        _prioridade_atual.reset(token)
+
+
+def prioridade_do_envio(payload: Dict) -> int:
+    atual = _prioridade_atual.get()
+    if atual is not None:
+        return atual
+    if payload.get("type") == "template":
+        nome = (payload.get("template") or {}).get("name")
+        return PRIORIDADE_POR_TEMPLATE.get(nome, PRIORIDADE_LEMBRETE)
+    return PRIORIDADE_INTERATIVA
+
+
+def limitado_pela_meta(resultado: SendResult) -> bool:
+    erro = (resultado.raw_response or {}).get("error") or {}
+    return erro.get("code") in CODIGOS_LIMITE
+
+
+class BaldeTokens:
+    """Token bucket (taxa por segundo, rajada de `capacidade`) com pausa"""
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado = time.monotonic()
+        self.pausado_ate = 0.0
+
+    def espera(self) -> float:
+        """Segundos até haver um token disponível (0 = pode enviar)"""
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+        if agora < self.pausado_ate:
+            return self.pausado_ate - agora
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.taxa
+
+    def consumir(self):
+        self.tokens -= 1
+
+    def pausar(self, segundos: float):
+        self.pausado_ate = max(self.pausado_ate, time.monotonic() + segundos)
+        self.tokens = 0
+
+
+@dataclass(order=True)
+class _Envio:
+    prioridade: int
+    seq: int
+    enviar: Callable[[], Awaitable[SendResult]] = field(compare=False)
+    futuro: asyncio.Future = field(compare=False)
+    enfileirado_em: float = field(compare=False)
+    tentativas: int = field(default=0, compare=False)
+
+
+class FilaNumero:
+    """Fila com prioridade + balde de tokens de um phone_number_id"""
+
+    def __init__(self, phone_number_id: str, agendador: "WhatsAppEnvioScheduler"):
+        self.phone_number_id = phone_number_id
+        self.agendador = agendador
+        self.balde = BaldeTokens(agendador.taxa, agendador.capacidade)
+        self._heap: List[_Envio] = []
+        self._novo = asyncio.Event()
+        self._vaga = asyncio.Condition()
+        self._em_voo = asyncio.Semaphore(agendador.simultaneos)
+        self._tasks: set = set()
+        self._task = asyncio.create_task(self._loop())
+
+        self.enviados = 0
+        self.limitados = 0
+        self.esperas_backpressure = 0
+        self.espera_max_ms = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def colocar(self, envio: _Envio, bloquear: bool):
+        if bloquear and len(self._heap) >= self.agendador.max_fila:
+            self.esperas_backpressure += 1
+            async with self._vaga:
+                await self._vaga.wait_for(lambda: len(self._heap) < self.agendador.max_fila)
+        heapq.heappush(self._heap, envio)
+        self._novo.set()
+
+    async def _liberar_vaga(self):
+        async with self._vaga:
+            self._vaga.notify_all()
+
+    async def _loop(self):
+        while True:
+            if not self._heap:
+                self._novo.clear()
+                await self._novo.wait()
+                continue
+
+            espera = self.balde.espera()
+            if espera > 0:
+                # Reavalia depois: um envio mais prioritário pode ter chegado
+                await asyncio.sleep(min(espera, 1.0))
+                continue
+
+            await self._em_voo.acquire()
+            envio = heapq.heappop(self._heap)
+            self.balde.consumir()
+            await self._liberar_vaga()
+
+            espera_ms = int((time.monotonic() - envio.enfileirado_em) * 1000)
+            self.espera_max_ms = max(self.espera_max_ms, espera_ms)
+
+            task = asyncio.create_task(self._executar(envio))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _executar(self, envio: _Envio):
+        try:
+            try:
+                resultado = await envio.enviar()
+            except Exception as e:
+                resultado = SendResult(success=False, error=str(e))
+        finally:
+            self._em_voo.release()
+
+        if limitado_pela_meta(resultado) and envio.tentativas < self.agendador.max_tentativas:
+            envio.tentativas += 1
+            self.limitados += 1
+            atraso = min(60.0, self.agendador.backoff_base * 2 ** (envio.tentativas - 1))
+            self.balde.pausar(atraso)
+            logger.warning(
+                "⏳ WhatsApp %s limitado pela Meta (%s); envio %s reenfileirado, "
+                "tentativa %s em %.1fs",
+                self.phone_number_id, resultado.error, NOMES_PRIORIDADE.get(envio.prioridade),
+                envio.tentativas + 1, atraso,
+            )
+            # Mantém o seq original: continua à frente na própria raia
+            heapq.heappush(self._heap, envio)
+            self._novo.set()
+            return
+
+        self.enviados += 1
+        if not envio.futuro.done():
+            envio.futuro.set_result(resultado)
+
+    async def encerrar(self, timeout: float):
+        fim = time.monotonic() + timeout
+        while (self._heap or self._tasks) and time.monotonic() < fim:
+            await asyncio.sleep(0.1)
+        self._task.cancel()
+        for envio in self._heap:
+            if not envio.futuro.done():
+                envio.futuro.set_result(SendResult(success=False, error="Envio cancelado no encerramento"))
+        self._heap.clear()
+
+    def get_status(self) -> Dict:
+        por_raia = {nome: 0 for nome in NOMES_PRIORIDADE.values()}
+        for envio in self._heap:
+            por_raia[NOMES_PRIORIDADE[envio.prioridade]] += 1
+        return {
+            "na_fila": len(self._heap),
+            "por_raia": por_raia,
+            "em_voo": len(self._tasks),
+            "enviados": self.enviados,
+            "limitados_meta": self.limitados,
+            "esperas_backpressure": self.esperas_backpressure,
+            "espera_max_ms": self.espera_max_ms,
+            "pausado": self.balde.pausado_ate > time.monotonic(),
+        }
+
+
+class WhatsAppEnvioScheduler:
+    """Filas de envio por phone_number_id"""
+
+    def __init__(
+        self,
+        taxa: float = 20.0,
+        capacidade: float = 20.0,
+        max_fila: int = 1000,
+        max_tentativas: int = 5,
+        simultaneos: int = 10,
+        backoff_base: float = 2.0,
+    ):
+        self.taxa = taxa
+        self.capacidade = max(1.0, capacidade)
+        self.max_fila = max_fila
+        self.max_tentativas = max_tentativas
+        self.simultaneos = simultaneos
+        self.backoff_base = backoff_base
+        self._filas: Dict[str, FilaNumero] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count()
+
+    @property
+    def ativo(self) -> bool:
+        return self.taxa > 0
+
+    def _fila(self, phone_number_id: str) -> FilaNumero:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Novo event loop (scripts com asyncio.run): filas antigas são descartadas
+            self._filas = {}
+            self._loop = loop
+        fila = self._filas.get(phone_number_id)
+        if fila is None:
+            fila = self._filas[phone_number_id] = FilaNumero(phone_number_id, self)
+        return fila
+
+    async def enviar(
+        self,
+        phone_number_id: str,
+        payload: Dict,
+        enviar: Callable[[], Awaitable[SendResult]],
+    ) -> SendResult:
+        """Enfileira o envio na raia do contexto e aguarda o resultado final"""
+        if not self.ativo:
+            return await enviar()
+
+        prioridade = prioridade_do_envio(payload)
+        fila = self._fila(phone_number_id or "padrao")
+        envio = _Envio(
+            prioridade=prioridade,
+            seq=next(self._seq),
+            enviar=enviar,
+            futuro=asyncio.get_running_loop().create_future(),
+            enfileirado_em=time.monotonic(),
+        )
+        await fila.colocar(envio, bloquear=prioridade >= PRIORIDADE_LEMBRETE)
+        return await envio.futuro
+
+    async def stop(self, timeout: float = 10.0):
+        """Drena as filas (até `timeout` segundos) no desligamento"""
+        for fila in list(self._filas.values()):
+            await fila.encerrar(timeout)
+        self._filas = {}
+
+    def get_status(self) -> Dict:
+        return {
+            "ativo": self.ativo,
+            "mps_por_processo": self.taxa,
+            "max_fila": self.max_fila,
+            "numeros": {pid: fila.get_status() for pid, fila in self._filas.items()},
+        }
+
+
+# Instância global (singleton)
+# Limite da Meta por número (padrão 80 msg/s) dividido entre os workers
+_workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+_mps = float(os.getenv("WHATSAPP_MPS", "80")) / _workers
+
+whatsapp_envio_scheduler = WhatsAppEnvioScheduler(
+    taxa=_mps,
+    capacidade=float(os.getenv("WHATSAPP_RAJADA", str(_mps))),
+    max_fila=int(os.getenv("WHATSAPP_FILA_MAX", "1000")),
+    max_tentativas=int(os.getenv("WHATSAPP_MAX_TENTATIVAS", "5")),
+    simultaneos=int(os.getenv("WHATSAPP_ENVIOS_SIMULTANEOS", "10")),
+)
@@ -266,5 +266,5 @@ def get_whatsapp_provider(provider: WhatsAppProvider = None) -> WhatsAppProvider
     Returns:
         Instância do provedor de WhatsApp
     """
-    from app.services.whatsapp_official_service import WhatsAppOfficialService
-    return WhatsAppOfficialService()
+    from app.services.registry import get_whatsapp_service
+    return get_whatsapp_service()
@@ -9,6 +9,7 @@ import httpx
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from app.metricas import medir_externo
 from app.services.whatsapp_interface import (
     WhatsAppProviderInterface,
     WhatsAppMessage,
@@ -30,6 +31,7 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
         WHATSAPP_BUSINESS_ACCOUNT_ID=987654321098765
         WHATSAPP_WEBHOOK_VERIFY_TOKEN=seu_token_secreto
         WHATSAPP_API_VERSION=v21.0
+        WHATSAPP_API_BASE_URL=https://graph.facebook.com (teste de carga: serviço falso local)
     """
 
     def __init__(self):
@@ -39,7 +41,8 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
         self.verify_token = os.getenv("WHATSAPP_WEBHOOK_VERIFY_TOKEN")
         self.api_version = os.getenv("WHATSAPP_API_VERSION", "v21.0")
 
-        self.base_url = f"https://graph.facebook.com/{self.api_version}"
+        api_base_url = os.getenv("WHATSAPP_API_BASE_URL", "https://graph.facebook.com").rstrip("/")
+        self.base_url = f"{api_base_url}/{self.api_version}"
         self.messages_url = f"{self.base_url}/{self.phone_id}/messages"
 
         self.headers = {
@@ -327,39 +330,62 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
     # ==================== MÉTODOS AUXILIARES ====================
 
     async def _send_request(self, payload: Dict, phone_number_id: Optional[str] = None) -> SendResult:
-        """Envia requisição para a API do WhatsApp."""
+        """
+        Envia requisição para a API do WhatsApp.
+
+        O envio passa pela fila do número (whatsapp_envio_scheduler): limite
+        de mensagens/s por phone_number_id, prioridade por raia e reenvio
+        quando a Meta devolve erro de limite.
+        """
+        from app.services.whatsapp_envio_scheduler import whatsapp_envio_scheduler
 
         # Usar phone_number_id específico ou o padrão do .env
         target_phone_id = phone_number_id or self.phone_id
+
+        result = await whatsapp_envio_scheduler.enviar(
+            target_phone_id,
+            payload,
+            lambda: self._post_mensagem(payload, target_phone_id),
+        )
+
+        # Log billing (fire-and-forget) - no contexto de quem enviou, onde
+        # está o cliente_id do set_billing_context
+        try:
+            from app.services.whatsapp_billing_service import log_whatsapp_message
+            template_name = payload.get("template", {}).get("name") if payload.get("type") == "template" else None
+            log_whatsapp_message(
+                template_name=template_name,
+                message_type=payload.get("type", "text"),
+                phone_to=payload.get("to", ""),
+                success=result.success,
+                message_id=result.message_id,
+            )
+        except Exception:
+            pass
+
+        return result
+
+    async def _post_mensagem(self, payload: Dict, target_phone_id: str) -> SendResult:
+        """POST em /{phone_number_id}/messages (executado pela fila de envio)."""
+
         messages_url = f"{self.base_url}/{target_phone_id}/messages"
 
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    messages_url,
-                    headers=self.headers,
-                    json=payload
-                )
+                with medir_externo("meta", "messages") as chamada:
+                    response = await client.post(
+                        messages_url,
+                        headers=self.headers,
+                        json=payload
+                    )
+                    if response.status_code != 200:
+                        chamada["resultado"] = f"http_{response.status_code}"
 
                 data = response.json()
 
                 if response.status_code == 200:
                     message_id = data.get("messages", [{}])[0].get("id")
 
-                    # Log billing (fire-and-forget)
-                    try:
-                        from app.services.whatsapp_billing_service import log_whatsapp_message
-                        template_name = payload.get("template", {}).get("name") if payload.get("type") == "template" else None
-                        log_whatsapp_message(
-                            template_name=template_name,
-                            message_type=payload.get("type", "text"),
-                            phone_to=payload.get("to", ""),
-                            success=True,
-                            message_id=message_id,
-                        )
-                    except Exception:
-                        pass
-
                     return SendResult(
                         success=True,
                         message_id=message_id,
@@ -369,20 +395,6 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
                     error_msg = data.get("error", {}).get("message", "Erro desconhecido")
                     print(f"[WhatsApp Official] Erro: {error_msg}")
 
-                    # Log billing para falhas também
-                    try:
-                        from app.services.whatsapp_billing_service import log_whatsapp_message
-                        template_name = payload.get("template", {}).get("name") if payload.get("type") == "template" else None
-                        log_whatsapp_message(
-                            template_name=template_name,
-                            message_type=payload.get("type", "text"),
-                            phone_to=payload.get("to", ""),
-                            success=False,
-                            message_id=None,
-                        )
-                    except Exception:
-                        pass
-
                     return SendResult(
                         success=False,
                         error=error_msg,
@@ -648,7 +660,8 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
             url = f"{self.base_url}/{media_id}"
 
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers)
+                with medir_externo("meta", "media_url"):
+                    response = await client.get(url, headers=self.headers)
 
                 if response.status_code != 200:
                     print(f"[WhatsApp Official] Erro ao obter URL da mídia: {response.text}")
@@ -660,10 +673,11 @@ class WhatsAppOfficialService(WhatsAppProviderInterface):
                     return None
 
                 # Agora baixa a mídia
-                media_response = await client.get(
-                    media_url,
-                    headers={"Authorization": f"Bearer {self.access_token}"}
-                )
+                with medir_externo("meta", "media_download"):
+                    media_response = await client.get(
+                        media_url,
+                        headers={"Authorization": f"Bearer {self.access_token}"}
+                    )
 
                 if media_response.status_code == 200:
                     return media_response.content
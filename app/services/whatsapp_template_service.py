@@ -7,6 +7,7 @@ Cada método corresponde a um template específico com suas variáveis na ordem
 
 from typing import List, Dict, Any
 from app.services.whatsapp_official_service import WhatsAppOfficialService
+from app.services.registry import get_whatsapp_service
 from app.services.whatsapp_interface import SendResult
 
 
@@ -24,9 +25,9 @@ class WhatsAppTemplateService:
 
         Args:
             whatsapp_service: Instância do WhatsAppOfficialService.
-                              Se não fornecida, cria uma nova.
+                              Se não fornecida, usa a instância compartilhada.
         """
-        self.whatsapp = whatsapp_service or WhatsAppOfficialService()
+        self.whatsapp = whatsapp_service or get_whatsapp_service()
 
     def _build_body_components(self, variables: List[str]) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,180 @@
+"""
+Instrumentação de consultas SQL por requisição/job
+Horário Inteligente SaaS
+
+Conta statements e tempo de banco dentro de um escopo (requisição HTTP ou
+job do scheduler) via eventos do SQLAlchemy, nos dois engines (psycopg2 e
+asyncpg). O escopo vive num ContextVar, então acompanha o código em threads
+(to_thread, run_in_threadpool) e em AsyncSession.run_sync.
+
+Ao fim de cada escopo:
+- statements repetidos SQL_N1_LIMIAR vezes ou mais (mesmo SQL, parâmetros
+  diferentes) são logados como possível N+1
+- escopos acima de SQL_ORCAMENTO_ALERTA consultas geram WARNING
+
+Com SQL_HEADERS=true (desligado por padrão; só para desenvolvimento), as
+respostas HTTP levam os headers:
+    X-SQL-Consultas    statements executados
+    X-SQL-Tempo-Ms     tempo total no banco
+    X-SQL-Repeticoes   maior número de repetições de um mesmo statement
+
+Uso em jobs e testes:
+    with escopo_sql("job:lembretes") as escopo:
+        ...
+    escopo.consultas, escopo.tempo_ms, escopo.repetidos()
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+N1_LIMIAR = int(os.getenv("SQL_N1_LIMIAR", "5"))
+ORCAMENTO_ALERTA = int(os.getenv("SQL_ORCAMENTO_ALERTA", "50"))
+HEADERS_ATIVOS = os.getenv("SQL_HEADERS", "false").lower() == "true"
+
+# Listas de placeholders (IN expandido) viram "(?)": mesmo padrão p/ qualquer tamanho
+_RE_LISTA = re.compile(r"\((?:\s*(?:%\(\w+\)s|%s|\$\d+|\?)\s*,?)+\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar(statement: str) -> str:
+    return _RE_LISTA.sub("(?)", _RE_ESPACOS.sub(" ", statement).strip())
+
+
+class EscopoSQL:
+    """Acumulador de uma requisição ou job"""
+
+    __slots__ = ("nome", "cliente_id", "consultas", "tempo_ms", "padroes")
+
+    def __init__(self, nome: str, cliente_id: Optional[int] = None):
+        self.nome = nome
+        self.cliente_id = cliente_id
+        self.consultas = 0
+        self.tempo_ms = 0.0
+        self.padroes: Counter = Counter()
+
+    def registrar(self, statement: str, duracao_ms: float):
+        self.consultas += 1
+        self.tempo_ms += duracao_ms
+        self.padroes[statement] += 1
+
+    def repetidos(self, limiar: int = N1_LIMIAR) -> List[Tuple[str, int]]:
+        """Statements executados `limiar` vezes ou mais, do mais repetido ao menos"""
+        return [(sql, n) for sql, n in self.padroes.most_common() if n >= limiar]
+
+    @property
+    def maior_repeticao(self) -> int:
+        return max(self.padroes.values(), default=0)
+
+    def resumo(self, limite: int = 5) -> str:
+        linhas = [f"{self.consultas} consultas, {self.tempo_ms:.1f}ms em {self.nome}"]
+        for sql, n in self.padroes.most_common(limite):
+            linhas.append(f"  {n}x {normalizar(sql)[:200]}")
+        return "\n".join(linhas)
+
+
+_escopo_atual: ContextVar[Optional[EscopoSQL]] = ContextVar("_escopo_sql", default=None)
+
+
+def escopo_atual() -> Optional[EscopoSQL]:
+    return _escopo_atual.get()
+
+
+@contextmanager
+def escopo_sql(nome: str, cliente_id: Optional[int] = None):
+    """Conta as consultas executadas dentro do bloco"""
+    escopo = EscopoSQL(nome, cliente_id)
+    token = _escopo_atual.set(escopo)
+    try:
+        yield escopo
+    finally:
+        _escopo_atual.reset(token)
+        reportar(escopo)
+
+
+def reportar(escopo: EscopoSQL):
+    for sql, n in escopo.repetidos():
+        logger.warning(
+            "🔁 Possível N+1 em %s (cliente %s): %sx %s",
+            escopo.nome, escopo.cliente_id, n, normalizar(sql)[:300],
+        )
+    if escopo.consultas > ORCAMENTO_ALERTA:
+        logger.warning(
+            "🐢 %s (cliente %s): %s consultas SQL, %.1fms no banco",
+            escopo.nome, escopo.cliente_id, escopo.consultas, escopo.tempo_ms,
+        )
+
+
+# ==================== EVENTOS DO SQLALCHEMY ====================
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _escopo_atual.get() is not None:
+        context._sql_inicio = time.perf_counter()
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    escopo = _escopo_atual.get()
+    inicio = getattr(context, "_sql_inicio", None)
+    if escopo is not None and inicio is not None:
+        escopo.registrar(statement, (time.perf_counter() - inicio) * 1000)
+
+
+def instrumentar_engine(engine):
+    """Registra os listeners num Engine síncrono (para async: async_engine.sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _depois)
+
+
+# ==================== MIDDLEWARE ====================
+
+class SQLMetricasMiddleware:
+    """
+    Middleware ASGI puro: um escopo por requisição HTTP, nomeado pela rota
+    (`GET /api/conversas/{conversa_id}`) e marcado com o tenant do
+    TenantMiddleware. Deve ficar por fora dos middlewares que criam tasks
+    (BaseHTTPMiddleware), para o escopo ser herdado por elas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        escopo = EscopoSQL(f"{scope['method']} {scope['path']}")
+        token = _escopo_atual.set(escopo)
+
+        def identificar():
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                escopo.nome = f"{scope['method']} {route.path}"
+            escopo.cliente_id = (scope.get("state") or {}).get("cliente_id")
+
+        async def send_com_metricas(message):
+            if message["type"] == "http.response.start":
+                identificar()
+                if HEADERS_ATIVOS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-sql-consultas", str(escopo.consultas).encode()))
+                    headers.append((b"x-sql-tempo-ms", f"{escopo.tempo_ms:.1f}".encode()))
+                    headers.append((b"x-sql-repeticoes", str(escopo.maior_repeticao).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_metricas)
+        finally:
+            _escopo_atual.reset(token)
+            identificar()
+            reportar(escopo)
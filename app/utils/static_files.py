@@ -0,0 +1,135 @@
+"""
+Servidor de arquivos estáticos com build pré-comprimido
+Horário Inteligente SaaS
+
+Procura primeiro no build (scripts/build_static.py, STATIC_BUILD_DIR) e
+depois em static/:
+- assets com hash no nome (listados no asset-manifest.json) saem com
+  Cache-Control `public, max-age=31536000, immutable`
+- HTML e service worker saem com `no-cache` (revalidação por ETag a cada
+  acesso - 304 barato, e o HTML aponta sempre para os assets atuais)
+- se existir o irmão .br/.gz e o navegador aceitar, ele é enviado com
+  Content-Encoding, sem compressão em tempo de requisição
+
+Sem build, o comportamento é o do StaticFiles comum.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+from typing import Optional, Set
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "asset-manifest.json"
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+# Ordem de preferência quando o navegador aceita as duas
+CODIFICACOES = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _aceita(accept_encoding: str, codificacao: str) -> bool:
+    """True se a codificação aparece no Accept-Encoding com q > 0"""
+    for item in accept_encoding.split(","):
+        nome, *parametros = item.split(";")
+        if nome.strip().lower() != codificacao:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        return q > 0
+    return False
+
+
+class StaticPrecomprimido(StaticFiles):
+    """StaticFiles com camada de build (hash + .br/.gz)"""
+
+    def __init__(self, directory: str, build_directory: Optional[str] = None, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.build_directory = None
+        self.versao: Optional[str] = None
+        self.imutaveis: Set[str] = set()
+
+        if build_directory and os.path.isfile(os.path.join(build_directory, MANIFEST)):
+            self.build_directory = os.path.realpath(build_directory)
+            # Build tem precedência: HTML reescrito e assets com hash
+            self.all_directories = [self.build_directory, *self.all_directories]
+            self._carregar_manifest()
+
+    def _carregar_manifest(self):
+        try:
+            with open(os.path.join(self.build_directory, MANIFEST), encoding="utf-8") as f:
+                dados = json.load(f)
+            self.versao = dados.get("versao")
+            self.imutaveis = set(dados.get("arquivos", {}).values())
+            logger.info(
+                f"📦 Estáticos do build {self.versao}: {len(self.imutaveis)} assets com hash "
+                f"({self.build_directory})"
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ asset-manifest.json inválido, servindo static/ sem build: {e}")
+            self.build_directory = None
+            self.all_directories = self.all_directories[1:]
+
+    def _cache_control(self, full_path: str) -> Optional[str]:
+        if self.build_directory and full_path.startswith(self.build_directory + os.sep):
+            rel = os.path.relpath(full_path, self.build_directory).replace(os.sep, "/")
+            if rel in self.imutaveis:
+                return CACHE_IMUTAVEL
+        if full_path.endswith((".html", ".htm", "service-worker.js", MANIFEST)):
+            return CACHE_REVALIDAR
+        # Demais: SecurityHeadersMiddleware aplica o padrão de 1 dia
+        return None
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        caminho = str(full_path)
+        media_type, _ = mimetypes.guess_type(caminho)
+
+        headers = {"Vary": "Accept-Encoding"}
+        cache_control = self._cache_control(caminho)
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+
+        arquivo, stat = caminho, stat_result
+        accept_encoding = request_headers.get("accept-encoding", "")
+        if accept_encoding:
+            for codificacao, sufixo in CODIFICACOES:
+                if not _aceita(accept_encoding, codificacao):
+                    continue
+                try:
+                    stat = os.stat(caminho + sufixo)
+                except OSError:
+                    continue
+                arquivo = caminho + sufixo
+                headers["Content-Encoding"] = codificacao
+                break
+
+        response = FileResponse(
+            arquivo,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,69 @@
+"""
+Fixtures compartilhadas dos testes (pytest)
+Sistema ProSaude - Horário Inteligente
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+# Adicionar diretório raiz ao path
+root_dir = Path(__file__).parent
+sys.path.insert(0, str(root_dir))
+
+# Headers X-SQL-* ligados nos testes (opt-in; lidos no import de app.sql_metricas)
+os.environ.setdefault("SQL_HEADERS", "true")
+
+
+class OrcamentoSQL:
+    """
+    Verifica o número de consultas SQL de um endpoint ou bloco de código.
+
+    Endpoints (headers X-SQL-* do SQLMetricasMiddleware, com SQL_HEADERS=true):
+        orcamento_sql.resposta(client.get("/api/conversas"), maximo=3)
+
+    Serviços e jobs chamados diretamente:
+        with orcamento_sql.bloco(maximo=2):
+            service._obter_contexto_clinica()
+
+    Além do total, falha se um mesmo statement se repetir SQL_N1_LIMIAR vezes
+    (N+1: cresce com o volume de dados, mesmo com poucos registros no teste).
+    """
+
+    def resposta(self, resposta, maximo: int, max_repeticoes: int = None):
+        from app.sql_metricas import N1_LIMIAR
+
+        assert "x-sql-consultas" in resposta.headers, (
+            "Resposta sem X-SQL-Consultas (SQLMetricasMiddleware ativo e SQL_HEADERS=true?)"
+        )
+        consultas = int(resposta.headers["x-sql-consultas"])
+        repeticoes = int(resposta.headers["x-sql-repeticoes"])
+        limite_repeticoes = max_repeticoes if max_repeticoes is not None else N1_LIMIAR - 1
+        rota = f"{resposta.request.method} {resposta.request.url.path}"
+
+        assert consultas <= maximo, f"{rota}: {consultas} consultas SQL (máximo {maximo})"
+        assert repeticoes <= limite_repeticoes, (
+            f"{rota}: statement repetido {repeticoes}x (possível N+1, máximo {limite_repeticoes})"
+        )
+
+    @contextmanager
+    def bloco(self, maximo: int, max_repeticoes: int = None, nome: str = "teste"):
+        from app.sql_metricas import N1_LIMIAR, escopo_sql
+
+        with escopo_sql(nome) as escopo:
+            yield escopo
+
+        limite_repeticoes = max_repeticoes if max_repeticoes is not None else N1_LIMIAR - 1
+        assert escopo.consultas <= maximo, f"{escopo.resumo()}\n(máximo {maximo})"
+        assert escopo.maior_repeticao <= limite_repeticoes, (
+            f"{escopo.resumo()}\n(possível N+1: máximo {limite_repeticoes} repetições)"
+        )
+
+
+@pytest.fixture
+def orcamento_sql():
+    """Orçamento de consultas SQL por endpoint/bloco (ver OrcamentoSQL)"""
+    return OrcamentoSQL()
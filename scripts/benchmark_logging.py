@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de logging no caminho da requisição
+
+Compara, por requisição simulada (~11 linhas de log, perfil do webhook do
+WhatsApp), o tempo gasto na thread que loga:
+
+- antes:  basicConfig com FileHandler + StreamHandler, f-strings
+- depois: configurar_logging() (fila + QueueListener), mensagens lazy,
+          com e sem amostragem do TenantMiddleware
+
+Uso:
+    python scripts/benchmark_logging.py
+    python scripts/benchmark_logging.py --requisicoes 20000 --json
+
+A saída de log vai para um diretório temporário (o stdout dos handlers é
+redirecionado para /dev/null), então só o custo do produtor é medido.
+"""
+
+import sys
+import os
+import argparse
+import logging
+import tempfile
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import logging_config
+
+
+def requisicao_antes(log_mw, log_wh, i):
+    path = f"/webhook/whatsapp-official"
+    log_mw.info(f"🔍 TenantMiddleware v2: path={path}")
+    log_wh.info(f"[Webhook Official] Recebido: whatsapp_business_account")
+    log_wh.info(f"[Webhook Official] Mensagem de 55219999{i:05d}: Olá, gostaria de marcar uma consulta...")
+    log_wh.info(f"[Multi-tenant] Cliente 3 (Clínica Teste) identificado via tabela clientes pelo phone_number_id 1234")
+    log_wh.info(f"[Webhook Official] Conversa {i} - Status: ia_ativa - Nova: False")
+    log_wh.info(f"[Webhook Official] Salvando mensagem: text='Olá, gostaria de marcar uma consulta', type=text")
+    log_wh.info(f"[Webhook Official] Mensagem do paciente salva no PostgreSQL (ID: {i})")
+    log_wh.info(f"[Webhook Official] Resposta da IA salva no PostgreSQL")
+    log_wh.info(f"[Webhook Official] proxima_acao=coletar_dados, dados_coletados={{'nome': 'Maria', 'medico_id': 2}}")
+    log_wh.info(f"[Webhook Official] 🔊 Enviar áudio: False (modo: hybrid)")
+    log_mw.info(f"🔍 TenantMiddleware v2: path=/api/agendamentos")
+
+
+def requisicao_depois(log_mw, log_wh, i):
+    path = "/webhook/whatsapp-official"
+    dados = {"nome": "Maria", "medico_id": 2}
+    log_mw.debug("🔍 TenantMiddleware v2: path=%s", path)
+    log_wh.debug("[Webhook Official] Recebido: %s", "whatsapp_business_account")
+    log_wh.info("[Webhook Official] Mensagem de %s: %s...", f"55219999{i:05d}", "Olá, gostaria de marcar uma consulta")
+    log_wh.info("[Multi-tenant] Cliente %s (%s) identificado via tabela clientes pelo phone_number_id %s", 3, "Clínica Teste", "1234")
+    log_wh.info("[Webhook Official] Conversa %s - Status: %s - Nova: %s", i, "ia_ativa", False)
+    log_wh.debug("[Webhook Official] Salvando mensagem: text='%s', type=%s", "Olá, gostaria de marcar uma consulta", "text")
+    log_wh.info("[Webhook Official] Mensagem do paciente salva no PostgreSQL (ID: %s)", i)
+    log_wh.info("[Webhook Official] Resposta da IA salva no PostgreSQL")
+    log_wh.info("[Webhook Official] proxima_acao=%s, dados_coletados=%s", "coletar_dados", dados)
+    log_wh.info("[Webhook Official] 🔊 Enviar áudio: %s (modo: %s)", False, "hybrid")
+    log_mw.debug("🔍 TenantMiddleware v2: path=%s", "/api/agendamentos")
+
+
+def resetar_raiz():
+    logging_config.parar_logging()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+
+
+def medir(funcao, requisicoes):
+    log_mw = logging.getLogger("app.middleware.tenant_middleware")
+    log_wh = logging.getLogger("app.services.webhook.message_processor")
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        funcao(log_mw, log_wh, i)
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de logging")
+    parser.add_argument("--requisicoes", type=int, default=5000)
+    parser.add_argument("--json", action="store_true", help="LOG_FORMAT=json no cenário 'depois'")
+    args = parser.parse_args()
+
+    stdout_original = sys.stdout
+    resultados = []
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as nulo:
+        arquivo = os.path.join(tmp, "sistema.log")
+        sys.stdout = sys.stderr = nulo
+        try:
+            # Antes: handlers síncronos na thread do request
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                handlers=[logging.FileHandler(arquivo), logging.StreamHandler(nulo)],
+                force=True,
+            )
+            resultados.append(("antes (basicConfig, f-strings)", medir(requisicao_antes, args.requisicoes)))
+            resetar_raiz()
+
+            formato = "json" if args.json else "texto"
+            logging_config.configurar_logging("INFO", formato, arquivo, "")
+            resultados.append(("depois (fila, lazy)", medir(requisicao_depois, args.requisicoes)))
+            resetar_raiz()
+
+            logging_config.configurar_logging(
+                "INFO", formato, arquivo, "app.services.webhook=0.1",
+            )
+            resultados.append(("depois + sampling webhook=0.1", medir(requisicao_depois, args.requisicoes)))
+            resetar_raiz()
+        finally:
+            sys.stdout = stdout_original
+            sys.stderr = sys.__stderr__
+
+    base = resultados[0][1]
+    print(f"{'cenário':<34} {'µs/req':>10} {'vs antes':>10}")
+    for nome, us in resultados:
+        print(f"{nome:<34} {us:>10.1f} {base / us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
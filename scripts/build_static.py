@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Build dos arquivos estáticos (fingerprint + pré-compressão + manifest)
+
+Gera em build/static/ (STATIC_BUILD_DIR) uma camada sobre static/:
+- assets (JS, CSS, imagens, fontes) copiados com hash do conteúdo no nome:
+  js/components/toast.js -> js/components/toast.3f9a1c2b7d.js
+  (servidos com Cache-Control immutable de 1 ano)
+- HTML e CSS reescritos para apontar para os nomes com hash
+- service-worker.js com CACHE_VERSION e ESSENTIAL_FILES vindos do manifest
+- irmãos .br (brotli, se o pacote estiver instalado) e .gz de todo arquivo
+  de texto, servidos conforme Accept-Encoding sem comprimir por requisição
+- asset-manifest.json: nome lógico -> nome com hash, versão e essenciais
+
+Arquivos que não estão no build continuam sendo servidos de static/.
+
+Uso (no deploy, antes de reiniciar o serviço):
+    python scripts/build_static.py
+    python scripts/build_static.py --origem static --destino build/static
+"""
+
+import sys
+import os
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MANIFEST = "asset-manifest.json"
+SERVICE_WORKER = "service-worker.js"
+
+# Extensões que recebem hash no nome
+EXTENSOES_HASH = {".js", ".css", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".woff", ".woff2"}
+# Extensões de texto que ganham .br/.gz
+EXTENSOES_COMPRIMIR = {".html", ".js", ".css", ".svg", ".json", ".txt", ".xml", ".webmanifest"}
+# URLs que precisam ser estáveis (escopo do SW, manifest do PWA)
+SEM_HASH = {SERVICE_WORKER, "manifest.json"}
+# Abaixo disso a compressão não compensa o header extra
+TAMANHO_MINIMO = 1024
+
+# Cacheados na instalação do service worker (nomes lógicos)
+ESSENCIAIS = [
+    "login.html",
+    "calendario-unificado.html",
+    "minha-agenda.html",
+    "perfil.html",
+    "manifest.json",
+    "icons/icon-192x192.png",
+    "icons/icon-512x512.png",
+    "js/push-notifications.js",
+]
+
+# "/static/<caminho>" entre aspas ou em url(...) - HTML, JS inline e CSS
+RE_REF_STATIC = re.compile(r"""(?P<abre>["'(])/static/(?P<caminho>[^"'()?#\s]+)(?P<query>\?[^"'()#\s]*)?(?=["')])""")
+# url(...) relativo em CSS
+RE_URL_CSS = re.compile(r"""url\((?P<aspas>["']?)(?P<url>[^"')]+)(?P=aspas)\)""")
+
+
+def ignorado(rel: str) -> bool:
+    nome = rel.rsplit("/", 1)[-1]
+    return ".backup" in nome or nome.endswith(("~", ".orig", ".bak")) or nome.startswith(".")
+
+
+def com_hash(rel: str, conteudo: bytes) -> str:
+    digest = hashlib.sha256(conteudo).hexdigest()[:10]
+    base, ext = os.path.splitext(rel)
+    return f"{base}.{digest}{ext}"
+
+
+def reescrever_refs(texto: str, manifest: dict) -> str:
+    """Troca /static/<logico>[?v=...] por /static/<com hash>"""
+    def troca(m):
+        destino = manifest.get(m.group("caminho"))
+        if destino is None:
+            return m.group(0)
+        return f"{m.group('abre')}/static/{destino}"
+    return RE_REF_STATIC.sub(troca, texto)
+
+
+def reescrever_css(texto: str, rel: str, manifest: dict) -> str:
+    """url() relativos do CSS resolvidos a partir da pasta do arquivo"""
+    pasta = os.path.dirname(rel)
+
+    def troca(m):
+        url = m.group("url").strip()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return m.group(0)
+        caminho = url.split("?", 1)[0].split("#", 1)[0]
+        logico = os.path.normpath(os.path.join(pasta, caminho)).replace(os.sep, "/")
+        destino = manifest.get(logico)
+        if destino is None:
+            return m.group(0)
+        return f"url({m.group('aspas')}/static/{destino}{m.group('aspas')})"
+
+    return reescrever_refs(RE_URL_CSS.sub(troca, texto), manifest)
+
+
+def gerar_service_worker(texto: str, versao: str, essenciais: list) -> str:
+    texto = re.sub(
+        r"const CACHE_VERSION = '[^']*';",
+        f"const CACHE_VERSION = '{versao}';",
+        texto, count=1,
+    )
+    lista = ",\n".join(f"  '{url}'" for url in essenciais)
+    return re.sub(
+        r"const ESSENTIAL_FILES = \[[\s\S]*?\];",
+        lambda _: f"const ESSENTIAL_FILES = [\n{lista}\n];",
+        texto, count=1,
+    )
+
+
+def comprimir(caminho: Path, estatisticas: dict):
+    dados = caminho.read_bytes()
+    estatisticas["original"] += len(dados)
+    if len(dados) < TAMANHO_MINIMO:
+        estatisticas["gz"] += len(dados)
+        estatisticas["br"] += len(dados)
+        return
+
+    # mtime=0: build reproduzível (mesmo conteúdo = mesmo .gz)
+    gz = gzip.compress(dados, compresslevel=9, mtime=0)
+    if len(gz) < len(dados) * 0.9:
+        caminho.with_name(caminho.name + ".gz").write_bytes(gz)
+    estatisticas["gz"] += min(len(gz), len(dados))
+
+    if brotli is not None:
+        br = brotli.compress(dados, quality=11)
+        if len(br) < len(dados) * 0.9:
+            caminho.with_name(caminho.name + ".br").write_bytes(br)
+        estatisticas["br"] += min(len(br), len(dados))
+
+
+def build(origem: Path, destino: Path) -> dict:
+    arquivos = sorted(
+        p.relative_to(origem).as_posix()
+        for p in origem.rglob("*")
+        if p.is_file() and "__pycache__" not in p.parts
+    )
+    arquivos = [rel for rel in arquivos if not ignorado(rel)]
+
+    temporario = destino.with_name(destino.name + ".tmp")
+    if temporario.exists():
+        shutil.rmtree(temporario)
+    temporario.mkdir(parents=True)
+
+    def gravar(rel: str, conteudo: bytes):
+        alvo = temporario / rel
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        alvo.write_bytes(conteudo)
+
+    manifest = {}
+
+    # 1. Assets binários e JS: hash do conteúdo original
+    for rel in arquivos:
+        ext = os.path.splitext(rel)[1].lower()
+        if ext in EXTENSOES_HASH and ext != ".css" and rel not in SEM_HASH:
+            conteudo = (origem / rel).read_bytes()
+            manifest[rel] = com_hash(rel, conteudo)
+            gravar(manifest[rel], conteudo)
+
+    # 2. CSS: reescreve url() antes do hash (o hash cobre as referências)
+    for rel in arquivos:
+        if rel.lower().endswith(".css"):
+            texto = reescrever_css((origem / rel).read_text(encoding="utf-8"), rel, manifest)
+            conteudo = texto.encode("utf-8")
+            manifest[rel] = com_hash(rel, conteudo)
+            gravar(manifest[rel], conteudo)
+
+    # 3. HTML: mesmo nome, referências reescritas
+    for rel in arquivos:
+        if rel.lower().endswith((".html", ".htm")):
+            texto = reescrever_refs((origem / rel).read_text(encoding="utf-8"), manifest)
+            gravar(rel, texto.encode("utf-8"))
+
+    versao = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    essenciais = [f"/static/{manifest.get(rel, rel)}" for rel in ESSENCIAIS if (origem / rel).exists()]
+
+    # 4. Demais arquivos de texto com URL estável (manifest.json, service worker)
+    for rel in arquivos:
+        if rel in SEM_HASH:
+            texto = (origem / rel).read_text(encoding="utf-8")
+            if rel == SERVICE_WORKER:
+                texto = gerar_service_worker(texto, versao, essenciais)
+            gravar(rel, texto.encode("utf-8"))
+
+    dados_manifest = {
+        "versao": versao,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "arquivos": manifest,
+        "essenciais": essenciais,
+    }
+    gravar(MANIFEST, json.dumps(dados_manifest, indent=2, ensure_ascii=False).encode("utf-8"))
+
+    # 5. Irmãos pré-comprimidos
+    estatisticas = {"original": 0, "gz": 0, "br": 0}
+    for caminho in sorted(temporario.rglob("*")):
+        if caminho.is_file() and caminho.suffix.lower() in EXTENSOES_COMPRIMIR:
+            comprimir(caminho, estatisticas)
+
+    # Troca o build anterior de uma vez (workers em execução nunca veem build parcial)
+    antigo = destino.with_name(destino.name + ".old")
+    if antigo.exists():
+        shutil.rmtree(antigo)
+    if destino.exists():
+        destino.rename(antigo)
+    temporario.rename(destino)
+    if antigo.exists():
+        shutil.rmtree(antigo)
+
+    return {"versao": versao, "assets": len(manifest), **estatisticas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build dos arquivos estáticos")
+    parser.add_argument("--origem", default=str(RAIZ / "static"))
+    parser.add_argument("--destino", default=os.getenv("STATIC_BUILD_DIR", str(RAIZ / "build" / "static")))
+    args = parser.parse_args()
+
+    resultado = build(Path(args.origem), Path(args.destino))
+
+    kb = lambda n: f"{n / 1024:.0f} KB"
+    print(f"✅ Build {resultado['versao']}: {resultado['assets']} assets com hash em {args.destino}")
+    print(f"   Texto: {kb(resultado['original'])} -> gzip {kb(resultado['gz'])}"
+          + (f" / brotli {kb(resultado['br'])}" if brotli is not None else " (brotli não instalado)"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Cenários de carga ponta a ponta (req/s e latência p50/p95/p99)
+Horário Inteligente SaaS
+
+Cenários:
+  tempestade   POST /webhook/whatsapp-official em taxa fixa (loop aberto):
+               pacientes das clínicas de carga mandando texto/áudio; o
+               webhook responde ao entregar na caixa da conversa e o
+               pipeline (IA, envio, TTS) segue em segundo plano - tempo até
+               a resposta ao paciente em hi_mensagem_resposta_segundos (/metrics)
+  lembretes    janela de lembretes: N agendamentos movidos para +24h/+2h e
+               lembrete_service.processar_lembretes_pendentes() medido
+               (roda neste processo)
+  dashboard    secretárias fazendo polling do painel (conversas, stats,
+               agenda do dia, calendário)
+
+APIs externas respondem pelos serviços falsos (scripts/carga_servicos_falsos.py),
+com latência e erros injetados. Use um banco dedicado: o job de lembretes
+processa qualquer agendamento que estiver na janela.
+
+Uso:
+    python scripts/carga_dataset.py --execute --seed 42
+    python scripts/carga_cenarios.py --subir --workers 4 --seed 42 --saida antes.json
+    python scripts/carga_cenarios.py --subir --workers 4 --seed 42 --saida depois.json
+    python scripts/carga_cenarios.py --comparar antes.json depois.json
+
+Sem --subir, a aplicação (--url) e os serviços falsos (--url-falsos) já devem
+estar rodando, com a aplicação apontada para os falsos (ver carga_servicos_falsos.py)
+e WEBHOOK_RATE_LIMIT alto o bastante para a taxa do cenário.
+
+Mesma semente + mesmo manifesto = mesma sequência de requisições; o relatório
+guarda commit, parâmetros e máquina para comparar execuções entre commits.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import httpx
+
+from carga_endpoints import percentil
+
+HOST_RAIZ = "horariointeligente.com.br"
+
+MENSAGENS_PACIENTE = [
+    "Olá, gostaria de marcar uma consulta",
+    "Bom dia! Vocês atendem pelo convênio?",
+    "Qual o valor da consulta particular?",
+    "Preciso remarcar minha consulta de amanhã",
+    "Tem horário na próxima semana à tarde?",
+    "Quero confirmar minha consulta",
+    "Qual o endereço da clínica?",
+    "Obrigado!",
+]
+
+# Endpoint do painel -> peso no polling (proporção aproximada do uso real)
+ENDPOINTS_DASHBOARD = {
+    "conversas": ("/api/conversas?limit=50", 4),
+    "conversas_stats": ("/api/conversas/stats", 3),
+    "agenda_hoje": ("/api/dashboard/agenda/hoje", 2),
+    "dashboard_stats": ("/api/dashboard/stats", 1),
+    "calendario": ("/api/agendamentos/calendario", 1),
+}
+
+
+def resumir(latencias, erros: int, decorrido: float) -> dict:
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / decorrido, 1) if decorrido else None,
+        "p50_ms": round(percentil(latencias, 50), 1) if latencias else None,
+        "p95_ms": round(percentil(latencias, 95), 1) if latencias else None,
+        "p99_ms": round(percentil(latencias, 99), 1) if latencias else None,
+    }
+
+
+def imprimir(nome: str, r: dict):
+    print(f"{nome:<24} {r['req_s']!s:>8} req/s  p50 {r['p50_ms']!s:>7} ms  "
+          f"p95 {r['p95_ms']!s:>7} ms  p99 {r['p99_ms']!s:>7} ms  erros {r['erros']}")
+
+
+# ==================== PROCESSOS (--subir) ====================
+
+def ambiente_falsos(url_falsos: str) -> dict:
+    """Variáveis que apontam a aplicação para os serviços falsos"""
+    return {
+        "WHATSAPP_API_BASE_URL": f"{url_falsos}/meta",
+        "ANTHROPIC_BASE_URL": f"{url_falsos}/anthropic",
+        "OPENAI_BASE_URL": f"{url_falsos}/openai/v1",
+        "ASAAS_API_URL": f"{url_falsos}/asaas/v3",
+        # Chaves fictícias: sem elas os serviços caem nos fallbacks locais
+        "WHATSAPP_ACCESS_TOKEN": "carga",
+        "ANTHROPIC_API_KEY": "carga",
+        "OPENAI_API_KEY": "carga",
+        "ASAAS_API_KEY": "carga",
+    }
+
+
+def esperar_pronto(url: str, caminho: str, headers: dict = None, timeout: float = 60):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{url}{caminho}", headers=headers, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url}{caminho} não respondeu em {timeout:.0f}s")
+
+
+def subir_processos(args) -> list:
+    processos = []
+    falsos = [
+        sys.executable, os.path.join(RAIZ, "scripts", "carga_servicos_falsos.py"),
+        "--porta", str(args.porta_falsos), "--seed", str(args.seed),
+        "--latencia", args.latencia, "--erros", args.erros,
+    ]
+    processos.append(subprocess.Popen(falsos, cwd=RAIZ))
+    esperar_pronto(args.url_falsos, "/_stats")
+
+    env = {
+        **os.environ,
+        **ambiente_falsos(args.url_falsos),
+        "WEBHOOK_RATE_LIMIT": "1000000/minute",
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+    app = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(args.porta_app),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    processos.append(subprocess.Popen(app, cwd=RAIZ, env=env))
+    esperar_pronto(args.url, "/sistema/rotas", headers={"host": HOST_RAIZ})
+    print(f"🚀 Aplicação ({args.workers} workers) e serviços falsos no ar")
+    return processos
+
+
+def derrubar_processos(processos: list):
+    for processo in reversed(processos):
+        processo.terminate()
+    for processo in processos:
+        try:
+            processo.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+# ==================== TEMPESTADE DE MENSAGENS ====================
+
+def payload_webhook(rng: random.Random, clinica: dict, fracao_audio: float) -> dict:
+    telefone = rng.choice(clinica["telefones_pacientes"])
+    mensagem = {
+        "from": telefone,
+        "id": f"wamid.CARGA{uuid.UUID(int=rng.getrandbits(128)).hex}",
+        "timestamp": str(int(time.time())),
+    }
+    if rng.random() < fracao_audio:
+        mensagem.update({"type": "audio", "audio": {"id": f"audio{rng.getrandbits(48)}", "mime_type": "audio/ogg"}})
+    else:
+        mensagem.update({"type": "text", "text": {"body": rng.choice(MENSAGENS_PACIENTE)}})
+
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "carga",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "550000000000", "phone_number_id": clinica["phone_number_id"]},
+                    "contacts": [{"profile": {"name": "Paciente Carga"}, "wa_id": telefone}],
+                    "messages": [mensagem],
+                },
+            }],
+        }],
+    }
+
+
+async def cenario_tempestade(cliente: httpx.AsyncClient, manifesto: dict, args) -> dict:
+    """
+    Loop aberto: a requisição i sai em i/taxa segundos, responda o servidor ou
+    não (latência medida desde o horário previsto, sem omissão coordenada).
+    """
+    rng = random.Random(args.seed)
+    clinicas = manifesto["clinicas"]
+    total = int(args.taxa * args.duracao)
+    payloads = [payload_webhook(rng, rng.choice(clinicas), args.fracao_audio) for _ in range(total)]
+
+    latencias, status = [], {}
+    erros = 0
+    em_voo = asyncio.Semaphore(args.max_em_voo)
+    descartadas = 0
+
+    async def enviar(previsto: float, payload: dict):
+        nonlocal erros
+        try:
+            resposta = await cliente.post(
+                "/webhook/whatsapp-official", json=payload, headers={"host": HOST_RAIZ}
+            )
+            resultado = resposta.json().get("status", str(resposta.status_code)) if resposta.status_code == 200 else str(resposta.status_code)
+        except (httpx.HTTPError, ValueError) as e:
+            resultado = type(e).__name__
+        finally:
+            em_voo.release()
+        latencias.append((time.perf_counter() - previsto) * 1000)
+        status[resultado] = status.get(resultado, 0) + 1
+        if resultado not in ("queued", "processed"):
+            erros += 1
+
+    inicio = time.perf_counter()
+    tarefas = []
+    for i, payload in enumerate(payloads):
+        previsto = inicio + i / args.taxa
+        espera = previsto - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        if em_voo.locked():
+            # Servidor não acompanha a taxa: conta e segue (não atrasa as próximas)
+            descartadas += 1
+            continue
+        await em_voo.acquire()
+        tarefas.append(asyncio.create_task(enviar(previsto, payload)))
+    await asyncio.gather(*tarefas)
+    decorrido = time.perf_counter() - inicio
+
+    resultado = resumir(latencias, erros + descartadas, decorrido)
+    resultado.update({"taxa_alvo": args.taxa, "descartadas": descartadas, "status": status})
+    return resultado
+
+
+# ==================== POLLING DO PAINEL ====================
+
+def tokens_secretarias(manifesto: dict) -> list:
+    """JWT de cada secretária das clínicas de carga (mesmo SECRET_KEY do servidor)"""
+    from app.api.auth import create_unified_token
+
+    tokens = []
+    for clinica in manifesto["clinicas"]:
+        token = create_unified_token({
+            "id": clinica["secretaria_id"],
+            "email": f"secretaria.{clinica['subdomain']}@carga.invalid",
+            "nome": "Secretária Carga",
+            "user_type": "secretaria",
+            "source_table": "medicos",
+            "cliente_id": clinica["cliente_id"],
+            "is_secretaria": True,
+            "medico_vinculado_id": None,
+        })
+        tokens.append((clinica["subdomain"], token))
+    return tokens
+
+
+async def cenario_dashboard(cliente: httpx.AsyncClient, manifesto: dict, args) -> dict:
+    rng = random.Random(args.seed)
+    tokens = tokens_secretarias(manifesto)
+    nomes = list(ENDPOINTS_DASHBOARD)
+    pesos = [ENDPOINTS_DASHBOARD[n][1] for n in nomes]
+    latencias = {nome: [] for nome in nomes}
+    erros = {nome: 0 for nome in nomes}
+    fim = time.perf_counter() + args.duracao
+
+    async def secretaria(indice: int):
+        subdomain, token = tokens[indice % len(tokens)]
+        headers = {"host": f"{subdomain}.{HOST_RAIZ}", "Authorization": f"Bearer {token}"}
+        local = random.Random(rng.getrandbits(64))
+        while time.perf_counter() < fim:
+            nome = local.choices(nomes, pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.get(ENDPOINTS_DASHBOARD[nome][0], headers=headers)
+                if resposta.status_code >= 400:
+                    erros[nome] += 1
+            except httpx.HTTPError:
+                erros[nome] += 1
+            latencias[nome].append((time.perf_counter() - inicio) * 1000)
+            if args.intervalo:
+                await asyncio.sleep(args.intervalo)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(secretaria(i) for i in range(args.concorrencia)))
+    decorrido = time.perf_counter() - inicio
+
+    todas = [ms for valores in latencias.values() for ms in valores]
+    resultado = resumir(todas, sum(erros.values()), decorrido)
+    resultado["endpoints"] = {nome: resumir(latencias[nome], erros[nome], decorrido) for nome in nomes}
+    return resultado
+
+
+# ==================== JANELA DE LEMBRETES ====================
+
+async def cenario_lembretes(manifesto: dict, args) -> dict:
+    """Move N agendamentos de carga para dentro das janelas de 24h e 2h e roda o job"""
+    from sqlalchemy import text
+    from app.database import SessionLocal
+    from app.services.lembrete_service import lembrete_service
+    from app.utils.timezone_helper import now_brazil
+
+    rng = random.Random(args.seed)
+    ids = [i for clinica in manifesto["clinicas"] for i in clinica["agendamento_ids"]]
+    escolhidos = rng.sample(ids, min(args.lembretes, len(ids)))
+    metade = len(escolhidos) // 2
+    agora = now_brazil()
+    # Minutos aleatórios dentro das janelas (23h50-24h10 e 1h50-2h10), com folga
+    novas_datas = [
+        agora + timedelta(hours=24 if i < metade else 2, minutes=rng.uniform(-8, 8))
+        for i in range(len(escolhidos))
+    ]
+
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM lembretes WHERE agendamento_id = ANY(:ids)"), {"ids": escolhidos})
+        db.execute(text("""
+            UPDATE agendamentos AS a
+            SET data_hora = n.data_hora, status = 'agendado',
+                lembrete_24h_enviado = false, lembrete_3h_enviado = false
+            FROM unnest(CAST(:ids AS int[]), CAST(:datas AS timestamptz[])) AS n(id, data_hora)
+            WHERE a.id = n.id
+        """), {"ids": escolhidos, "datas": novas_datas})
+        db.commit()
+
+        # Latência por lembrete: cronômetro em volta do envio (só neste processo)
+        latencias = []
+        enviar_original = lembrete_service.enviar_lembrete
+
+        async def enviar_cronometrado(*a, **kw):
+            inicio = time.perf_counter()
+            try:
+                return await enviar_original(*a, **kw)
+            finally:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        lembrete_service.enviar_lembrete = enviar_cronometrado
+        try:
+            inicio = time.perf_counter()
+            stats = await lembrete_service.processar_lembretes_pendentes(db)
+            decorrido = time.perf_counter() - inicio
+        finally:
+            lembrete_service.enviar_lembrete = enviar_original
+
+        from app.services.whatsapp_envio_scheduler import whatsapp_envio_scheduler
+        await whatsapp_envio_scheduler.stop()
+    finally:
+        db.close()
+
+    erros = sum(s.get("erros", 0) for s in (stats["24h"], stats["3h"]))
+    resultado = resumir(latencias, erros, decorrido)
+    resultado.update({
+        "agendamentos_na_janela": len(escolhidos),
+        "enviados": sum(s.get("enviados", 0) for s in (stats["24h"], stats["3h"])),
+        "duracao_s": round(decorrido, 2),
+    })
+    return resultado
+
+
+# ==================== EXECUÇÃO ====================
+
+def metadados(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    parametros = {
+        k: v for k, v in vars(args).items()
+        if k not in ("comparar", "saida", "url", "url_falsos")
+    }
+    return {
+        "commit": commit,
+        "executado_em": datetime.now().isoformat(),
+        "parametros": parametros,
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+    }
+
+
+async def executar(args, manifesto: dict) -> dict:
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    resultados = {}
+
+    limites = httpx.Limits(max_connections=args.max_em_voo, max_keepalive_connections=args.max_em_voo)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=120) as cliente:
+        async with httpx.AsyncClient(base_url=args.url_falsos, timeout=10) as falsos:
+            for nome in cenarios:
+                await falsos.post("/_reset")
+                if nome == "tempestade":
+                    resultados[nome] = await cenario_tempestade(cliente, manifesto, args)
+                elif nome == "dashboard":
+                    resultados[nome] = await cenario_dashboard(cliente, manifesto, args)
+                elif nome == "lembretes":
+                    resultados[nome] = await cenario_lembretes(manifesto, args)
+                else:
+                    print(f"⚠️  Cenário desconhecido: {nome}")
+                    continue
+                resultados[nome]["servicos_falsos"] = (await falsos.get("/_stats")).json()["chamadas"]
+                imprimir(nome, resultados[nome])
+                for endpoint, r in resultados[nome].get("endpoints", {}).items():
+                    imprimir(f"  {endpoint}", r)
+    return resultados
+
+
+def comparar(antes_path: str, depois_path: str):
+    with open(antes_path) as f:
+        antes = json.load(f)
+    with open(depois_path) as f:
+        depois = json.load(f)
+
+    print(f"commit {antes['meta'].get('commit')} -> {depois['meta'].get('commit')}")
+    if antes["meta"]["parametros"] != depois["meta"]["parametros"]:
+        print("⚠️  Parâmetros diferentes entre as execuções: comparação não é direta")
+
+    def linhas(resultados):
+        for cenario, r in resultados.items():
+            yield cenario, r
+            for endpoint, r_endpoint in r.get("endpoints", {}).items():
+                yield f"  {endpoint}", r_endpoint
+
+    depois_por_nome = dict(linhas(depois["cenarios"]))
+    print(f"{'cenário':<24} {'req/s':>16} {'p95 ms':>16} {'p99 ms':>16}")
+    for nome, a in linhas(antes["cenarios"]):
+        d = depois_por_nome.get(nome)
+        if not d:
+            continue
+        colunas = []
+        for chave in ("req_s", "p95_ms", "p99_ms"):
+            if a.get(chave) and d.get(chave) is not None:
+                delta = (d[chave] - a[chave]) / a[chave] * 100
+                colunas.append(f"{a[chave]:>6}->{d[chave]:<6}{delta:+.0f}%")
+            else:
+                colunas.append(f"{a.get(chave)!s:>6}->{d.get(chave)!s:<6}")
+        print(f"{nome:<24} " + " ".join(f"{c:>16}" for c in colunas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cenários de carga ponta a ponta")
+    parser.add_argument("--manifesto", default="carga_dataset.json", help="Saída de scripts/carga_dataset.py")
+    parser.add_argument("--cenarios", default="tempestade,lembretes,dashboard")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", default=None, help="Aplicação já rodando (padrão: a de --subir)")
+    parser.add_argument("--url-falsos", default=None)
+    parser.add_argument("--subir", action="store_true", help="Sobe serviços falsos e a aplicação (uvicorn)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--porta-app", type=int, default=8100)
+    parser.add_argument("--porta-falsos", type=int, default=9100)
+    parser.add_argument("--latencia", default="", help="Repassado aos serviços falsos: meta=80,anthropic=1500")
+    parser.add_argument("--erros", default="", help="Repassado aos serviços falsos: meta=0.01")
+    parser.add_argument("--duracao", type=float, default=30, help="Segundos por cenário (tempestade/dashboard)")
+    parser.add_argument("--taxa", type=float, default=20, help="Mensagens/s na tempestade")
+    parser.add_argument("--fracao-audio", type=float, default=0.1)
+    parser.add_argument("--max-em-voo", type=int, default=500, help="Requisições simultâneas no máximo")
+    parser.add_argument("--concorrencia", type=int, default=50, help="Secretárias fazendo polling")
+    parser.add_argument("--intervalo", type=float, default=0, help="Pausa entre polls de cada secretária (s)")
+    parser.add_argument("--lembretes", type=int, default=500, help="Agendamentos colocados na janela")
+    parser.add_argument("--saida", help="Grava o relatório em JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    args.url = args.url or f"http://127.0.0.1:{args.porta_app}"
+    args.url_falsos = args.url_falsos or f"http://127.0.0.1:{args.porta_falsos}"
+
+    with open(args.manifesto) as f:
+        manifesto = json.load(f)
+
+    # Cenários que rodam neste processo (lembretes) nunca chamam as APIs reais
+    os.environ.update(ambiente_falsos(args.url_falsos))
+
+    processos = subir_processos(args) if args.subir else []
+    try:
+        resultados = asyncio.run(executar(args, manifesto))
+    finally:
+        derrubar_processos(processos)
+
+    relatorio = {"meta": metadados(args), "dataset": {"seed": manifesto["seed"], **manifesto["parametros"]},
+                 "cenarios": resultados}
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"💾 Relatório gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
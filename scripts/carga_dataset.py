@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Gerador de dataset multi-tenant para o teste de carga
+Horário Inteligente SaaS
+
+Cria clínicas (subdomínio carga-NNN), médicos, uma secretária por clínica,
+milhares de pacientes e agendamentos (30 dias para trás e para frente).
+A mesma semente gera sempre o mesmo dataset; os ids gerados vão para um
+manifesto JSON lido por scripts/carga_cenarios.py.
+
+Telefones e phone_number_ids usam faixas que não existem (DDD 00), então
+nenhum envio escapa para um paciente real mesmo sem os serviços falsos.
+
+Uso:
+    python scripts/carga_dataset.py                       # Dry-run (mostra o volume)
+    python scripts/carga_dataset.py --execute --clinicas 20 --medicos 5 \\
+        --pacientes 2000 --agendamentos 8000 --seed 42
+    python scripts/carga_dataset.py --limpar --execute    # Remove clínicas carga-*
+"""
+
+import sys
+import os
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, time
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+from sqlalchemy import text
+
+TZ = pytz.timezone("America/Sao_Paulo")
+PREFIXO = "carga-"
+
+ESPECIALIDADES = [
+    "Clínico Geral", "Cardiologia", "Dermatologia", "Pediatria",
+    "Ginecologia", "Ortopedia", "Endocrinologia", "Psiquiatria",
+]
+NOMES = [
+    "Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Hugo",
+    "Isabela", "João", "Karina", "Lucas", "Mariana", "Nelson", "Olívia", "Pedro",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa",
+    "Ferreira", "Almeida", "Ribeiro", "Carvalho", "Gomes",
+]
+CONVENIOS = ["particular", "unimed", "amil", "bradesco", "sulamerica"]
+
+# Agendamentos passados / futuros (status realistas para relatórios e lembretes)
+STATUS_PASSADO = ["realizado"] * 75 + ["faltou"] * 10 + ["cancelado"] * 10 + ["remarcado"] * 5
+STATUS_FUTURO = ["agendado"] * 55 + ["confirmado"] * 40 + ["cancelado"] * 5
+
+# Slots de 30 min das 8h às 18h, seg-sex
+HORAS_SLOTS = [time(h, m) for h in range(8, 18) for m in (0, 30)]
+
+
+def phone_number_id(clinica: int) -> str:
+    return f"9900000{clinica:04d}"
+
+
+def telefone_paciente(clinica: int, indice: int) -> str:
+    # 55 + DDD 00 (inexistente) + 9 + clínica + índice
+    return f"55009{clinica:02d}{indice:06d}"
+
+
+def nome_aleatorio(rng: random.Random) -> str:
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def slots_do_medico(rng: random.Random, hoje, dias: int, quantidade: int):
+    """Sorteia `quantidade` horários distintos (sem sobreposição) na janela ±dias"""
+    slots = []
+    for delta in range(-dias, dias + 1):
+        dia = hoje + timedelta(days=delta)
+        if dia.weekday() >= 5:
+            continue
+        slots.extend(TZ.localize(datetime.combine(dia, h)) for h in HORAS_SLOTS)
+    return rng.sample(slots, min(quantidade, len(slots)))
+
+
+def criar_clinica(db, rng: random.Random, numero: int, args, hoje) -> dict:
+    subdomain = f"{PREFIXO}{numero:03d}"
+
+    cliente_id = db.execute(text("""
+        INSERT INTO clientes
+            (nome, email, subdomain, whatsapp_numero, whatsapp_phone_number_id,
+             logo_icon, cor_primaria, cor_secundaria, plano, ativo, is_demo,
+             valor_mensalidade, status, criado_em, atualizado_em)
+        VALUES
+            (:nome, :email, :subdomain, :numero, :phone_number_id,
+             'fa-heartbeat', '#3b82f6', '#1e40af', 'profissional', true, false,
+             '150.00', 'ativo', NOW(), NOW())
+        RETURNING id
+    """), {
+        "nome": f"Clínica Carga {numero:03d}",
+        "email": f"{subdomain}@carga.invalid",
+        "subdomain": subdomain,
+        "numero": f"5500{numero:04d}0000",
+        "phone_number_id": phone_number_id(numero),
+    }).scalar()
+
+    # Médicos (horários seg-sex 8h-18h) + uma secretária
+    horarios = {
+        dia: {"inicio": "08:00", "fim": "18:00", "ativo": True}
+        for dia in ("segunda", "terca", "quarta", "quinta", "sexta")
+    }
+    medico_ids = []
+    for i in range(args.medicos):
+        medico_ids.append(db.execute(text("""
+            INSERT INTO medicos
+                (cliente_id, nome, crm, especialidade, email, horarios_atendimento,
+                 convenios_aceitos, valor_consulta_particular, ativo, is_secretaria,
+                 pode_ver_financeiro, criado_em, atualizado_em)
+            VALUES
+                (:cliente_id, :nome, :crm, :especialidade, :email, CAST(:horarios AS json),
+                 CAST(:convenios AS json), 250.00, true, false, true, NOW(), NOW())
+            RETURNING id
+        """), {
+            "cliente_id": cliente_id,
+            "nome": f"Dr(a). {nome_aleatorio(rng)}",
+            "crm": f"CRM-CG {numero:03d}{i:03d}",
+            "especialidade": ESPECIALIDADES[i % len(ESPECIALIDADES)],
+            "email": f"medico{i}.{subdomain}@carga.invalid",
+            "horarios": json.dumps(horarios),
+            "convenios": json.dumps(CONVENIOS),
+        }).scalar())
+
+    secretaria_id = db.execute(text("""
+        INSERT INTO medicos
+            (cliente_id, nome, crm, especialidade, email, ativo, is_secretaria,
+             pode_ver_financeiro, criado_em, atualizado_em)
+        VALUES
+            (:cliente_id, :nome, '-', 'Secretária', :email, true, true, true, NOW(), NOW())
+        RETURNING id
+    """), {
+        "cliente_id": cliente_id,
+        "nome": f"Secretária {nome_aleatorio(rng)}",
+        "email": f"secretaria.{subdomain}@carga.invalid",
+    }).scalar()
+
+    # Pacientes em um único INSERT (unnest de arrays)
+    telefones = [telefone_paciente(numero, i) for i in range(args.pacientes)]
+    linhas = db.execute(text("""
+        INSERT INTO pacientes
+            (cliente_id, nome, telefone, convenio, preferencia_audio, criado_em, atualizado_em)
+        SELECT :cliente_id, nome, telefone, convenio, 'auto', NOW(), NOW()
+        FROM unnest(CAST(:nomes AS text[]), CAST(:telefones AS text[]), CAST(:convenios AS text[]))
+            AS p(nome, telefone, convenio)
+        RETURNING id
+    """), {
+        "cliente_id": cliente_id,
+        "nomes": [nome_aleatorio(rng) for _ in telefones],
+        "telefones": telefones,
+        "convenios": [rng.choice(CONVENIOS) for _ in telefones],
+    }).fetchall()
+    paciente_ids = [linha[0] for linha in linhas]
+
+    # Agendamentos distribuídos entre os médicos, sem sobreposição por médico
+    por_medico = max(1, args.agendamentos // max(1, len(medico_ids)))
+    ag_medicos, ag_pacientes, ag_datas, ag_status, ag_tipos = [], [], [], [], []
+    agora = datetime.now(TZ)
+    for medico_id in medico_ids:
+        for data_hora in slots_do_medico(rng, hoje, args.dias, por_medico):
+            ag_medicos.append(medico_id)
+            ag_pacientes.append(rng.choice(paciente_ids))
+            ag_datas.append(data_hora)
+            ag_status.append(rng.choice(STATUS_PASSADO if data_hora < agora else STATUS_FUTURO))
+            ag_tipos.append(rng.choice(["particular", "convenio"]))
+
+    agendamento_ids = []
+    if ag_medicos:
+        linhas = db.execute(text("""
+            INSERT INTO agendamentos
+                (paciente_id, medico_id, data_hora, duracao_minutos, status, tipo_atendimento,
+                 lembrete_24h_enviado, lembrete_3h_enviado, lembrete_1h_enviado,
+                 criado_em, atualizado_em)
+            SELECT paciente_id, medico_id, data_hora, 30, status, tipo, false, false, false, NOW(), NOW()
+            FROM unnest(CAST(:pacientes AS int[]), CAST(:medicos AS int[]),
+                        CAST(:datas AS timestamptz[]), CAST(:status AS text[]), CAST(:tipos AS text[]))
+                AS a(paciente_id, medico_id, data_hora, status, tipo)
+            RETURNING id
+        """), {
+            "pacientes": ag_pacientes,
+            "medicos": ag_medicos,
+            "datas": ag_datas,
+            "status": ag_status,
+            "tipos": ag_tipos,
+        }).fetchall()
+        agendamento_ids = [linha[0] for linha in linhas]
+
+    return {
+        "numero": numero,
+        "cliente_id": cliente_id,
+        "subdomain": subdomain,
+        "phone_number_id": phone_number_id(numero),
+        "secretaria_id": secretaria_id,
+        "medico_ids": medico_ids,
+        "telefones_pacientes": telefones,
+        "agendamento_ids": agendamento_ids,
+    }
+
+
+def gerar(args):
+    total_pacientes = args.clinicas * args.pacientes
+    print("=" * 60)
+    print("DATASET DE CARGA")
+    print("=" * 60)
+    print(f"   Clínicas: {args.clinicas}  Médicos/clínica: {args.medicos}")
+    print(f"   Pacientes: {total_pacientes}  Agendamentos: ~{args.clinicas * args.agendamentos}")
+    print(f"   Semente: {args.seed}  Janela: ±{args.dias} dias")
+
+    if not args.execute:
+        print("\n(dry-run) Use --execute para gravar no banco")
+        return
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        existentes = db.execute(
+            text("SELECT COUNT(*) FROM clientes WHERE subdomain LIKE :prefixo"),
+            {"prefixo": f"{PREFIXO}%"},
+        ).scalar()
+        if existentes:
+            print(f"\n⚠️  Já existem {existentes} clínicas {PREFIXO}*. Rode --limpar --execute antes.")
+            return
+
+        rng = random.Random(args.seed)
+        hoje = datetime.now(TZ).date()
+        clinicas = []
+        for numero in range(1, args.clinicas + 1):
+            clinicas.append(criar_clinica(db, rng, numero, args, hoje))
+            db.commit()
+            print(f"  ✓ {clinicas[-1]['subdomain']}: cliente {clinicas[-1]['cliente_id']}, "
+                  f"{len(clinicas[-1]['agendamento_ids'])} agendamentos")
+
+        # Estatísticas atualizadas para o planner (tabelas cresceram de uma vez)
+        db.execute(text("ANALYZE clientes, medicos, pacientes, agendamentos"))
+        db.commit()
+    finally:
+        db.close()
+
+    manifesto = {
+        "seed": args.seed,
+        "gerado_em": datetime.now(TZ).isoformat(),
+        "parametros": {
+            "clinicas": args.clinicas, "medicos": args.medicos,
+            "pacientes": args.pacientes, "agendamentos": args.agendamentos, "dias": args.dias,
+        },
+        "clinicas": clinicas,
+    }
+    with open(args.manifesto, "w") as f:
+        json.dump(manifesto, f)
+    print(f"\n✅ Dataset criado. Manifesto: {args.manifesto}")
+
+
+def limpar(args):
+    print(f"🧹 Removendo clínicas {PREFIXO}* e tudo que pertence a elas")
+    if not args.execute:
+        print("(dry-run) Use --execute para remover")
+        return
+
+    from app.database import SessionLocal
+
+    # Ordem das chaves estrangeiras
+    comandos = [
+        "DELETE FROM mensagens WHERE conversa_id IN (SELECT id FROM conversas WHERE cliente_id = ANY(:ids))",
+        "DELETE FROM alertas_urgencia WHERE cliente_id = ANY(:ids)",
+        "DELETE FROM conversas WHERE cliente_id = ANY(:ids)",
+        "DELETE FROM lembretes WHERE agendamento_id IN (SELECT a.id FROM agendamentos a JOIN medicos m ON m.id = a.medico_id WHERE m.cliente_id = ANY(:ids))",
+        "DELETE FROM agendamentos WHERE medico_id IN (SELECT id FROM medicos WHERE cliente_id = ANY(:ids))",
+        "DELETE FROM pacientes WHERE cliente_id = ANY(:ids)",
+        "DELETE FROM medicos WHERE cliente_id = ANY(:ids)",
+        "DELETE FROM configuracoes WHERE cliente_id = ANY(:ids)",
+        "DELETE FROM clientes WHERE id = ANY(:ids)",
+    ]
+
+    db = SessionLocal()
+    try:
+        ids = [linha[0] for linha in db.execute(
+            text("SELECT id FROM clientes WHERE subdomain LIKE :prefixo"),
+            {"prefixo": f"{PREFIXO}%"},
+        ).fetchall()]
+        if not ids:
+            print("Nada a remover")
+            return
+        for comando in comandos:
+            removidas = db.execute(text(comando), {"ids": ids}).rowcount
+            print(f"  ✓ {comando.split(' WHERE')[0]}: {removidas}")
+        db.commit()
+        print(f"✅ {len(ids)} clínicas removidas")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao limpar (nada foi removido): {e}")
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset multi-tenant para teste de carga")
+    parser.add_argument("--clinicas", type=int, default=10)
+    parser.add_argument("--medicos", type=int, default=5, help="Médicos por clínica")
+    parser.add_argument("--pacientes", type=int, default=1000, help="Pacientes por clínica")
+    parser.add_argument("--agendamentos", type=int, default=4000, help="Agendamentos por clínica")
+    parser.add_argument("--dias", type=int, default=30, help="Janela de agendamentos: ±dias a partir de hoje")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--manifesto", default="carga_dataset.json")
+    parser.add_argument("--limpar", action="store_true", help="Remove o dataset de carga")
+    parser.add_argument("--execute", action="store_true", help="Executa de verdade")
+    args = parser.parse_args()
+
+    if args.limpar:
+        limpar(args)
+    else:
+        gerar(args)
+
+
+if __name__ == "__main__":
+    main()
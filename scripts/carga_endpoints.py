@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Teste de carga dos endpoints de alto volume (req/s e latência p50/p99)
+
+Mede os endpoints migrados para o engine assíncrono (asyncpg):
+  GET /api/conversas
+  GET /api/conversas/stats
+  GET /api/agendamentos/calendario
+  GET /api/horarios-disponiveis
+
+Uso (servidor rodando; rodar uma vez em cada versão e comparar):
+    python scripts/carga_endpoints.py --url http://127.0.0.1:8000 --token JWT \\
+        --medico-id 2 --duracao 30 --concorrencia 50 --saida antes.json
+    python scripts/carga_endpoints.py ... --saida depois.json
+    python scripts/carga_endpoints.py --comparar antes.json depois.json
+
+O token é o JWT de um usuário do painel (secretária vê todas as agendas).
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+
+def endpoints(medico_id: int):
+    amanha = (date.today() + timedelta(days=1)).isoformat()
+    return {
+        "conversas": "/api/conversas?limit=50",
+        "conversas_stats": "/api/conversas/stats",
+        "calendario": "/api/agendamentos/calendario",
+        "horarios_disponiveis": f"/api/horarios-disponiveis?medico_id={medico_id}&data={amanha}",
+    }
+
+
+async def medir_endpoint(cliente: httpx.AsyncClient, caminho: str, concorrencia: int, duracao: float):
+    latencias = []
+    erros = 0
+    fim = time.perf_counter() + duracao
+
+    async def trabalhador():
+        nonlocal erros
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.get(caminho)
+                if resposta.status_code >= 400:
+                    erros += 1
+            except httpx.HTTPError:
+                erros += 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    decorrido = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / decorrido, 1),
+        "p50_ms": round(percentil(latencias, 50), 1) if latencias else None,
+        "p99_ms": round(percentil(latencias, 99), 1) if latencias else None,
+    }
+
+
+async def executar(args):
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    resultados = {}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limites, timeout=30) as cliente:
+        for nome, caminho in endpoints(args.medico_id).items():
+            # Aquecimento (pools, caches de agenda)
+            await medir_endpoint(cliente, caminho, min(5, args.concorrencia), 2)
+            resultados[nome] = await medir_endpoint(cliente, caminho, args.concorrencia, args.duracao)
+            r = resultados[nome]
+            print(f"{nome:<22} {r['req_s']:>8} req/s  p50 {r['p50_ms']:>7} ms  p99 {r['p99_ms']:>7} ms  erros {r['erros']}")
+    return resultados
+
+
+def comparar(antes_path: str, depois_path: str):
+    with open(antes_path) as f:
+        antes = json.load(f)
+    with open(depois_path) as f:
+        depois = json.load(f)
+
+    print(f"{'endpoint':<22} {'req/s antes':>12} {'depois':>10} {'p99 antes':>11} {'depois':>10}")
+    for nome in antes:
+        a, d = antes[nome], depois.get(nome)
+        if not d:
+            continue
+        print(f"{nome:<22} {a['req_s']:>12} {d['req_s']:>10} {a['p99_ms']:>11} {d['p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints de alto volume")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=os.getenv("CARGA_TOKEN"))
+    parser.add_argument("--medico-id", type=int, default=1)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=30, help="Segundos por endpoint")
+    parser.add_argument("--saida", help="Grava o resultado em JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultados = asyncio.run(executar(args))
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"💾 Resultado gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
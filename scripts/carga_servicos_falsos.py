@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Serviços externos falsos para o teste de carga
+Horário Inteligente SaaS
+
+Um único servidor local responde no lugar de:
+  /meta       graph.facebook.com (mensagens, mídia, templates)
+  /anthropic  API da Anthropic (messages, com e sem streaming)
+  /openai     API da OpenAI (Whisper e TTS)
+  /asaas      API do Asaas (qualquer recurso)
+
+com latência e taxa de erro configuráveis por serviço. Os SDKs da Anthropic
+e da OpenAI já aceitam URL base por variável de ambiente; Meta e Asaas usam
+WHATSAPP_API_BASE_URL e ASAAS_API_URL:
+
+    WHATSAPP_API_BASE_URL=http://127.0.0.1:9100/meta
+    ANTHROPIC_BASE_URL=http://127.0.0.1:9100/anthropic
+    OPENAI_BASE_URL=http://127.0.0.1:9100/openai/v1
+    ASAAS_API_URL=http://127.0.0.1:9100/asaas/v3
+
+Uso:
+    python scripts/carga_servicos_falsos.py --porta 9100 \\
+        --latencia meta=80,anthropic=1500,openai=700,asaas=150 \\
+        --erros meta=0.01,anthropic=0.02 --seed 42
+
+GET /_stats devolve as chamadas e erros por serviço/operação; POST /_reset zera.
+"""
+
+import sys
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+# Latência mediana (ms) por serviço e dispersão (sigma da lognormal)
+LATENCIA_PADRAO_MS = {"meta": 80, "anthropic": 1500, "openai": 700, "asaas": 150}
+DISPERSAO_PADRAO = 0.35
+
+# Resposta no formato JSON que o AnthropicService espera do modelo
+RESPOSTA_IA = {
+    "resposta": "Olá! Posso ajudar com o agendamento. Qual especialidade você procura?",
+    "intencao": "agendamento",
+    "urgencia": {"nivel": "normal", "motivo": None},
+    "dados_coletados": {
+        "nome": None, "especialidade": None, "medico_id": None,
+        "convenio": None, "motivo_consulta": None, "data_preferida": None,
+    },
+    "proxima_acao": "solicitar_dados",
+}
+
+# Parte das respostas usa o marcador de pausa (trecho antecipado no streaming)
+RESPOSTA_IA_PAUSA = {
+    **RESPOSTA_IA,
+    "resposta": "Um momentinho, vou verificar na agenda...⏳Temos horários na próxima semana. Prefere manhã ou tarde?",
+    "proxima_acao": "verificar_agenda",
+}
+FRACAO_PAUSA = 0.3
+# Streaming: fração da latência até o primeiro token e tamanho dos deltas
+FRACAO_PRIMEIRO_TOKEN = 0.2
+CARACTERES_POR_DELTA = 12
+
+# ~1s de áudio "mp3" (bytes irrelevantes: nada decodifica o conteúdo)
+AUDIO_FALSO = b"ID3" + bytes(4096)
+
+
+class Injecao:
+    """Latência e falhas sorteadas por serviço (semente fixa = distribuição reproduzível)"""
+
+    def __init__(self, latencia_ms: Dict[str, float], erros: Dict[str, float], dispersao: float, seed: int):
+        self.latencia_ms = {**LATENCIA_PADRAO_MS, **latencia_ms}
+        self.erros = erros
+        self.dispersao = dispersao
+        self.rng = random.Random(seed)
+        self.chamadas: Counter = Counter()
+        self.falhas: Counter = Counter()
+        self.inicio = time.time()
+
+    async def aguardar(self, servico: str, operacao: str, fracao: float = 1.0) -> bool:
+        """
+        Dorme a latência sorteada (ou só uma fração dela); devolve True se
+        esta chamada deve falhar
+        """
+        self.chamadas[f"{servico}.{operacao}"] += 1
+        await asyncio.sleep(self.latencia(servico) * fracao)
+        falhar = self.rng.random() < self.erros.get(servico, 0.0)
+        if falhar:
+            self.falhas[f"{servico}.{operacao}"] += 1
+        return falhar
+
+    def latencia(self, servico: str) -> float:
+        """Latência sorteada em segundos"""
+        mediana = self.latencia_ms.get(servico, 0)
+        return mediana * self.rng.lognormvariate(0, self.dispersao) / 1000 if mediana > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "desde": self.inicio,
+            "chamadas": dict(self.chamadas),
+            "falhas": dict(self.falhas),
+            "latencia_ms": self.latencia_ms,
+            "erros": self.erros,
+        }
+
+    def reset(self):
+        self.chamadas.clear()
+        self.falhas.clear()
+        self.inicio = time.time()
+
+
+def criar_app(injecao: Injecao) -> FastAPI:
+    app = FastAPI(title="Serviços falsos (teste de carga)", docs_url=None, redoc_url=None)
+
+    @app.get("/_stats")
+    async def stats():
+        return injecao.stats()
+
+    @app.post("/_reset")
+    async def reset():
+        injecao.reset()
+        return {"status": "ok"}
+
+    # ==================== META (graph.facebook.com) ====================
+
+    def erro_meta():
+        # 130429 = limite de taxa da Cloud API (o scheduler de envios reenfileira)
+        return JSONResponse(status_code=429, content={"error": {
+            "message": "(#130429) Rate limit hit", "type": "OAuthException", "code": 130429,
+        }})
+
+    @app.post("/meta/{versao}/{phone_id}/messages")
+    async def meta_mensagem(phone_id: str, request: Request):
+        payload = await request.json()
+        if await injecao.aguardar("meta", f"messages.{payload.get('type', 'text')}"):
+            return erro_meta()
+        destino = payload.get("to", "")
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": destino, "wa_id": destino}],
+            "messages": [{"id": f"wamid.CARGA{uuid.uuid4().hex}"}],
+        }
+
+    @app.post("/meta/{versao}/{phone_id}/media")
+    async def meta_upload(phone_id: str):
+        if await injecao.aguardar("meta", "media_upload"):
+            return erro_meta()
+        return {"id": f"midia{uuid.uuid4().hex[:16]}"}
+
+    @app.get("/meta/{versao}/{waba_id}/message_templates")
+    async def meta_templates(waba_id: str):
+        await injecao.aguardar("meta", "templates")
+        return {"data": [], "paging": {}}
+
+    @app.get("/meta/midia/{media_id}")
+    async def meta_download(media_id: str):
+        if await injecao.aguardar("meta", "media_download"):
+            return Response(status_code=500)
+        return Response(content=AUDIO_FALSO, media_type="audio/ogg")
+
+    @app.get("/meta/{versao}/{objeto_id}")
+    async def meta_objeto(objeto_id: str, request: Request):
+        # Mesmo caminho para URL de mídia e status do número: responde os dois formatos
+        if await injecao.aguardar("meta", "objeto"):
+            return erro_meta()
+        return {
+            "id": objeto_id,
+            "url": str(request.base_url).rstrip("/") + f"/meta/midia/{objeto_id}",
+            "mime_type": "audio/ogg",
+            "display_phone_number": "+55 00 0000-0000",
+            "verified_name": "Clínica Carga",
+            "quality_rating": "GREEN",
+        }
+
+    # ==================== ANTHROPIC ====================
+
+    @app.post("/anthropic/v1/messages")
+    async def anthropic_messages(request: Request):
+        payload = await request.json()
+        streaming = bool(payload.get("stream"))
+        operacao = "messages_stream" if streaming else "messages"
+        if await injecao.aguardar("anthropic", operacao, FRACAO_PRIMEIRO_TOKEN if streaming else 1.0):
+            return JSONResponse(status_code=529, content={
+                "type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"},
+            })
+        prompt = json.dumps(payload.get("messages", []))
+        resposta = RESPOSTA_IA_PAUSA if injecao.rng.random() < FRACAO_PAUSA else RESPOSTA_IA
+        texto = json.dumps(resposta, ensure_ascii=False)
+        mensagem = {
+            "id": f"msg_carga{uuid.uuid4().hex[:20]}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "carga"),
+            "content": [{"type": "text", "text": texto}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": 80},
+        }
+        if not streaming:
+            return mensagem
+        restante = injecao.latencia("anthropic") * (1 - FRACAO_PRIMEIRO_TOKEN)
+        return StreamingResponse(eventos_anthropic(mensagem, texto, restante), media_type="text/event-stream")
+
+    # ==================== OPENAI ====================
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def openai_whisper():
+        if await injecao.aguardar("openai", "whisper"):
+            return JSONResponse(status_code=500, content={"error": {"message": "erro injetado", "type": "server_error"}})
+        return PlainTextResponse("Olá, gostaria de marcar uma consulta para a próxima semana.")
+
+    @app.post("/openai/v1/audio/speech")
+    async def openai_tts():
+        if await injecao.aguardar("openai", "tts"):
+            return JSONResponse(status_code=500, content={"error": {"message": "erro injetado", "type": "server_error"}})
+        return Response(content=AUDIO_FALSO, media_type="audio/mpeg")
+
+    # ==================== ASAAS ====================
+
+    @app.api_route("/asaas/v3/{caminho:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def asaas(caminho: str, request: Request):
+        recurso = caminho.split("/")[0]
+        if await injecao.aguardar("asaas", f"{request.method}.{recurso}"):
+            return JSONResponse(status_code=500, content={"errors": [{"code": "erro_injetado", "description": "erro injetado"}]})
+        if request.method == "GET" and "/" not in caminho:
+            return {"object": "list", "hasMore": False, "totalCount": 0, "limit": 100, "offset": 0, "data": []}
+        return {"object": recurso.rstrip("s"), "id": f"carga_{uuid.uuid4().hex[:12]}", "status": "PENDING", "deleted": False}
+
+    return app
+
+
+def evento_sse(tipo: str, dados: dict) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+async def eventos_anthropic(mensagem: dict, texto: str, duracao: float):
+    """Mesma sequência de eventos da API de streaming, com os deltas espaçados em `duracao`"""
+    inicio = {**mensagem, "content": [], "stop_reason": None, "usage": {**mensagem["usage"], "output_tokens": 1}}
+    yield evento_sse("message_start", {"type": "message_start", "message": inicio})
+    yield evento_sse("content_block_start", {
+        "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+    })
+    deltas = [texto[i:i + CARACTERES_POR_DELTA] for i in range(0, len(texto), CARACTERES_POR_DELTA)]
+    for delta in deltas:
+        await asyncio.sleep(duracao / len(deltas))
+        yield evento_sse("content_block_delta", {
+            "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": delta},
+        })
+    yield evento_sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield evento_sse("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": mensagem["usage"]["output_tokens"]},
+    })
+    yield evento_sse("message_stop", {"type": "message_stop"})
+
+
+def parse_mapa(valor: str) -> Dict[str, float]:
+    """'meta=80,anthropic=1500' -> {'meta': 80.0, 'anthropic': 1500.0}"""
+    mapa = {}
+    for item in filter(None, (valor or "").split(",")):
+        nome, _, numero = item.partition("=")
+        mapa[nome.strip()] = float(numero)
+    return mapa
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviços externos falsos para teste de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=9100)
+    parser.add_argument("--latencia", default="", help="Mediana em ms por serviço: meta=80,anthropic=1500")
+    parser.add_argument("--dispersao", type=float, default=DISPERSAO_PADRAO, help="Sigma da lognormal (0 = fixa)")
+    parser.add_argument("--erros", default="", help="Fração de falhas por serviço: meta=0.01,anthropic=0.02")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    injecao = Injecao(parse_mapa(args.latencia), parse_mapa(args.erros), args.dispersao, args.seed)
+    print(f"🎭 Serviços falsos em http://{args.host}:{args.porta} - latência {injecao.latencia_ms} erros {injecao.erros}")
+    uvicorn.run(criar_app(injecao), host=args.host, port=args.porta, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Reprocessamento de webhooks ASAAS gravados na inbox (webhook_asaas_eventos)
+
+Uso:
+    python scripts/replay_webhooks_asaas.py --desde 2026-02-01 --ate 2026-02-07
+    python scripts/replay_webhooks_asaas.py --desde 2026-02-01 --evento PAYMENT_OVERDUE --dry-run
+    python scripts/replay_webhooks_asaas.py --desde "2026-02-05 08:00" --forcar
+
+Por padrão reprocessa apenas eventos que não terminaram com sucesso
+(pendente/erro). Com --forcar, eventos já processados também são
+reaplicados - os handlers são idempotentes, então o replay não duplica
+histórico de inadimplência. Evento com evento posterior do mesmo pagamento
+já processado é sempre ignorado (um PAYMENT_CONFIRMED antigo não reativa um
+cliente estornado ou inadimplente depois dele).
+
+Os eventos são processados em ordem de recebimento (id), um por vez.
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.services.asaas_webhook_worker import asaas_webhook_worker
+
+
+def _parse_data(valor: str, fim_do_dia: bool = False) -> datetime:
+    """Aceita 'YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM'"""
+    data = datetime.fromisoformat(valor)
+    if fim_do_dia and len(valor) == 10:
+        data += timedelta(days=1)
+    return data
+
+
+def buscar_eventos(desde: datetime, ate: datetime, evento: str = None, forcar: bool = False):
+    db = SessionLocal()
+    try:
+        filtros = ["recebido_em >= :desde", "recebido_em < :ate"]
+        params = {"desde": desde, "ate": ate}
+        if evento:
+            filtros.append("evento = :evento")
+            params["evento"] = evento
+        if not forcar:
+            filtros.append("status IN ('pendente', 'erro')")
+
+        return db.execute(text(f"""
+            SELECT id, evento, asaas_payment_id, status, tentativas, recebido_em
+            FROM webhook_asaas_eventos
+            WHERE {' AND '.join(filtros)}
+            ORDER BY id
+        """), params).fetchall()
+    finally:
+        db.close()
+
+
+async def reprocessar(eventos, forcar: bool) -> dict:
+    resumo = {"processado": 0, "erro": 0, "ignorado": 0}
+    for ev in eventos:
+        resultado = await asaas_webhook_worker.processar(ev.id, forcar=forcar)
+        resumo[resultado] += 1
+        print(f"  {ev.id:>8}  {ev.evento:<28} {ev.asaas_payment_id or '-':<24} {resultado}")
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa webhooks ASAAS gravados na inbox")
+    parser.add_argument("--desde", required=True, help="Início do período (YYYY-MM-DD ou 'YYYY-MM-DD HH:MM')")
+    parser.add_argument("--ate", help="Fim do período (inclusivo para datas; padrão: agora)")
+    parser.add_argument("--evento", help="Filtrar por tipo de evento (ex: PAYMENT_OVERDUE)")
+    parser.add_argument("--forcar", action="store_true", help="Reaplicar também eventos já processados")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Apenas listar os eventos")
+    args = parser.parse_args()
+
+    desde = _parse_data(args.desde)
+    ate = _parse_data(args.ate, fim_do_dia=True) if args.ate else datetime.now()
+
+    eventos = buscar_eventos(desde, ate, args.evento, args.forcar)
+    print(f"🔁 {len(eventos)} evento(s) entre {desde} e {ate}")
+
+    if args.dry_run:
+        for ev in eventos:
+            print(f"  {ev.id:>8}  {ev.evento:<28} {ev.asaas_payment_id or '-':<24} {ev.status} ({ev.tentativas} tentativa(s))")
+        return
+
+    if not eventos:
+        return
+
+    resumo = asyncio.run(reprocessar(eventos, args.forcar))
+    print(
+        f"✅ Processados: {resumo['processado']} | "
+        f"Erros: {resumo['erro']} | "
+        f"Ignorados (em andamento, aguardando evento anterior ou superados por "
+        f"evento posterior): {resumo['ignorado']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,10 @@
         visitorKey: 'hi_visitor_id',
         startTime: Date.now(),
         maxScrollDepth: 0,
+        queue: [],
+        flushTimer: null,
+        flushDelay: 2000,
+        maxBatch: 20,
 
         /**
          * Gera um ID único (fingerprint simplificado)
@@ -170,19 +174,56 @@
                 scroll_depth: null
             };
 
+            this.enqueue(data);
+        },
+
+        /**
+         * Adiciona evento à fila (enviada em lote para o servidor)
+         */
+        enqueue: function(data) {
+            const self = this;
+            this.queue.push(data);
+
+            if (this.queue.length >= this.maxBatch) {
+                this.flush();
+            } else if (!this.flushTimer) {
+                this.flushTimer = setTimeout(function() {
+                    self.flush();
+                }, this.flushDelay);
+            }
+        },
+
+        /**
+         * Envia os eventos pendentes em uma única requisição
+         */
+        flush: function() {
+            if (this.flushTimer) {
+                clearTimeout(this.flushTimer);
+                this.flushTimer = null;
+            }
+            if (!this.queue.length) {
+                return;
+            }
+
+            const body = JSON.stringify({ eventos: this.queue.splice(0, this.maxBatch) });
+
             // Usar sendBeacon se disponível (mais confiável para eventos de saída)
             // Importante: usar Blob com tipo application/json para FastAPI aceitar
             if (navigator.sendBeacon) {
-                const blob = new Blob([JSON.stringify(data)], { type: 'application/json' });
+                const blob = new Blob([body], { type: 'application/json' });
                 navigator.sendBeacon(this.endpoint, blob);
             } else {
                 fetch(this.endpoint, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(data),
+                    body: body,
                     keepalive: true
                 }).catch(function() {});
             }
+
+            if (this.queue.length) {
+                this.flush();
+            }
         },
 
         /**
@@ -235,10 +276,8 @@
                 scroll_depth: this.maxScrollDepth
             };
 
-            if (navigator.sendBeacon) {
-                const blob = new Blob([JSON.stringify(data)], { type: 'application/json' });
-                navigator.sendBeacon(this.endpoint, blob);
-            }
+            this.queue.push(data);
+            this.flush();
         },
 
         /**
@@ -1,12 +1,14 @@
 // Horário Inteligente PWA Service Worker
 // ==================== VERSIONAMENTO ====================
-// IMPORTANTE: Incrementar a cada deploy para forçar atualização
+// Preenchido por scripts/build_static.py com a versão do asset-manifest.json
+// (muda sozinho a cada deploy com arquivos alterados); o valor abaixo só vale sem build
 const CACHE_VERSION = '1.2.0';
 const CACHE_PREFIX = 'horario-inteligente';
 const CACHE_NAME = `${CACHE_PREFIX}-v${CACHE_VERSION}`;
 const OFFLINE_URL = '/static/offline.html';
 
 // Arquivos essenciais para cachear
+// (substituída no build pela lista "essenciais" do manifest, com os nomes com hash)
 const ESSENTIAL_FILES = [
   '/static/login.html',
   '/static/calendario-unificado.html',
@@ -18,6 +20,9 @@ const ESSENTIAL_FILES = [
   '/static/js/push-notifications.js'
 ];
 
+// Assets gerados pelo build: nome.<hash de 10 hex>.ext (conteúdo imutável)
+const HASHED_ASSET = /\.[0-9a-f]{10}\.[a-z0-9]+$/;
+
 // ==================== INSTALAÇÃO ====================
 self.addEventListener('install', (event) => {
   console.log(`🔧 Service Worker v${CACHE_VERSION}: Instalando...`);
@@ -82,6 +87,25 @@ self.addEventListener('fetch', (event) => {
     return;
   }
 
+  // Assets com hash no nome nunca mudam: cache first (sem ida à rede)
+  if (HASHED_ASSET.test(new URL(event.request.url).pathname)) {
+    event.respondWith(
+      caches.match(event.request).then((cachedResponse) => {
+        if (cachedResponse) {
+          return cachedResponse;
+        }
+        return fetch(event.request).then((response) => {
+          if (response && response.status === 200) {
+            const responseClone = response.clone();
+            caches.open(CACHE_NAME).then((cache) => cache.put(event.request, responseClone));
+          }
+          return response;
+        });
+      })
+    );
+    return;
+  }
+
   event.respondWith(
     fetch(event.request)
       .then((response) => {
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks do núcleo de agendamento
+Sistema ProSaude - Horário Inteligente
+
+Caminhos Python puros mais quentes, com fixtures realistas (médico com agenda
+cheia, muitos bloqueios, conversa longa, clínica com vários médicos):
+- AgendamentoService.obter_horarios_disponiveis (grade do dia)
+- AgendamentoService._horario_bloqueado
+- AnthropicService._construir_prompt (calendário de 90 dias, laço por médico)
+- AnthropicService._extrair_data_e_horarios_disponiveis (datas por regex)
+- normalize_phone
+- WhatsAppOfficialService.parse_webhook
+
+Banco e APIs ficam fora da medição: consultas são substituídas por dados em
+memória, então os números refletem só o custo de CPU do código Python.
+
+Linha de base (rodar na branch principal, na máquina de referência, e
+versionar o diretório benchmarks/):
+    pip install pytest pytest-benchmark
+    pytest test_benchmarks.py --benchmark-only --benchmark-storage=benchmarks \\
+        --benchmark-save=baseline
+
+Em um PR (compara com a última linha de base gravada; falha se a mediana
+piorar mais de 20%):
+    pytest test_benchmarks.py --benchmark-only --benchmark-storage=benchmarks \\
+        --benchmark-compare --benchmark-compare-fail=median:20%
+
+Sem pytest-benchmark:
+    python test_benchmarks.py
+"""
+
+import sys
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    if __name__ != "__main__":
+        pytest.skip("pytest-benchmark não instalado", allow_module_level=True)
+
+# Adicionar diretório raiz ao path
+root_dir = Path(__file__).parent
+sys.path.insert(0, str(root_dir))
+
+import pytz
+
+from app.services.agenda_compilada_service import compilar_agenda
+from app.services.agendamento_service import AgendamentoService
+from app.services.anthropic_service import AnthropicService
+from app.services.whatsapp_official_service import WhatsAppOfficialService
+from app.utils.phone_utils import normalize_phone
+
+TZ = pytz.timezone("America/Sao_Paulo")
+SEMENTE = 42
+
+# Segunda-feira futura fixa: mesma grade em qualquer dia em que o benchmark rodar
+DATA_CONSULTA = date(2030, 3, 4)
+
+
+# ==================== FIXTURES EM MEMÓRIA ====================
+
+class _ConsultaFalsa:
+    def __init__(self, resultado, quantidade=0):
+        self._resultado = resultado
+        self._quantidade = quantidade
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def first(self):
+        return self._resultado
+
+    def count(self):
+        return self._quantidade
+
+
+class SessaoFalsa:
+    """Responde db.query(...).filter(...).first()/count() sem banco"""
+
+    def __init__(self, resultado=None, quantidade=0):
+        self.resultado = resultado
+        self.quantidade = quantidade
+
+    def query(self, *args):
+        return _ConsultaFalsa(self.resultado, self.quantidade)
+
+
+def agenda_medico_ocupado(medico_id: int = 1):
+    """07:00-20:00, consultas de 15 min, almoço 12:00-13:00, seg-sáb"""
+    horarios = {
+        str(dia): {"ativo": True, "inicio": "07:00", "fim": "20:00",
+                   "almoco_inicio": "12:00", "almoco_fim": "13:00"}
+        for dia in range(1, 7)
+    }
+    row = SimpleNamespace(
+        medico_id=medico_id, ativo=True, intervalo_consulta=15,
+        horario_inicio="07:00", horario_fim="20:00",
+        intervalo_almoco_inicio="12:00", intervalo_almoco_fim="13:00",
+        horarios_por_dia=horarios, dias_atendimento=None,
+    )
+    return compilar_agenda(row, versao="benchmark")
+
+
+def bloqueios_do_dia(quantidade: int = 40):
+    """Bloqueios curtos espalhados pelo dia (reuniões, procedimentos)"""
+    rng = random.Random(SEMENTE)
+    bloqueios = []
+    for _ in range(quantidade):
+        inicio = TZ.localize(datetime.combine(DATA_CONSULTA, datetime.min.time())) + timedelta(
+            minutes=rng.randrange(7 * 60, 20 * 60, 5)
+        )
+        bloqueios.append({
+            "inicio": inicio,
+            "fim": inicio + timedelta(minutes=rng.choice((5, 10, 20))),
+            "motivo": "Procedimento",
+            "tipo": "pontual",
+        })
+    return bloqueios
+
+
+def ocupados_do_dia(agenda, fracao: float = 0.7):
+    """Inícios de consultas já marcadas (70% da grade)"""
+    rng = random.Random(SEMENTE)
+    slots = [TZ.localize(s) for s in agenda.slots(DATA_CONSULTA)]
+    return set(rng.sample(slots, int(len(slots) * fracao)))
+
+
+def servico_agendamento(monkeypatch, agenda, bloqueios, ocupados):
+    """AgendamentoService com as consultas ao banco trocadas por dados em memória"""
+    from app.services import agendamento_service as modulo
+
+    monkeypatch.setattr(modulo.agenda_compilada_service, "obter", lambda db, medico_id: agenda)
+    medico = SimpleNamespace(id=agenda.medico_id, ativo=True, horarios_atendimento=None)
+    service = AgendamentoService(SessaoFalsa(medico))
+    service._obter_bloqueios_dia = lambda medico_id, data_consulta, tz: bloqueios
+    service.verificar_disponibilidade_medico = (
+        lambda medico_id, data_hora, duracao_minutos=30, excluir_agendamento_id=None: data_hora not in ocupados
+    )
+    return service
+
+
+def contexto_clinica(quantidade_medicos: int = 12):
+    agenda = agenda_medico_ocupado()
+    disponibilidade = {
+        "dias_atendimento": [dia.nome for dia in agenda.dias_ordenados()],
+        "horarios_por_dia": {dia.nome: dia.descricao() for dia in agenda.dias_ordenados()},
+    }
+    especialidades = ["Cardiologia", "Dermatologia", "Pediatria", "Ortopedia", "Ginecologia", "Clínico Geral"]
+    return {
+        "nome_clinica": "Clínica Benchmark",
+        "endereco_clinica": "Rua das Flores, 100 - Centro",
+        "medicos": [
+            {
+                "id": i,
+                "nome": f"Dr(a). Médico {i}",
+                "especialidade": especialidades[i % len(especialidades)],
+                "crm": f"CRM-RJ {10000 + i}",
+                "convenios": ["Unimed", "Amil", "Bradesco Saúde", "SulAmérica", "Particular"],
+                "disponibilidade": disponibilidade,
+                "valor_particular": 250.0,
+            }
+            for i in range(1, quantidade_medicos + 1)
+        ],
+        "convenios": ["Unimed", "Amil", "Bradesco Saúde", "SulAmérica"],
+        "medico_unico": quantidade_medicos == 1,
+        "quantidade_medicos": quantidade_medicos,
+    }
+
+
+def contexto_conversa(quantidade: int = 30):
+    """Histórico longo: mensagens alternadas com dados coletados aos poucos"""
+    textos_paciente = [
+        "Oi, boa tarde", "Meu nome é Maria da Silva", "Quero marcar com cardiologista",
+        "Tenho Unimed", "Pode ser na quinta-feira?", "De manhã seria melhor",
+    ]
+    mensagens = []
+    for i in range(quantidade):
+        if i % 2 == 0:
+            mensagens.append({"tipo": "user", "texto": textos_paciente[(i // 2) % len(textos_paciente)],
+                              "intencao": "", "dados_coletados": {}})
+        else:
+            mensagens.append({"tipo": "assistant", "texto": "Perfeito! Vou verificar a agenda para você.",
+                              "intencao": "agendamento",
+                              "dados_coletados": {"nome": "Maria da Silva", "especialidade": "Cardiologia",
+                                                  "medico_id": 1, "convenio": "Unimed"}})
+    return mensagens
+
+
+HORARIOS_LIVRES = ["07:15", "08:30", "09:45", "10:00", "13:15", "14:30", "16:00", "18:45"]
+
+
+def criar_servico_ia(monkeypatch):
+    """AnthropicService sem cliente de IA e sem banco (paciente com 3 consultas)"""
+    monkeypatch.setattr(AnthropicService, "__init__", lambda self, db, cliente_id: None)
+    monkeypatch.setattr(
+        AgendamentoService, "obter_horarios_disponiveis",
+        lambda self, medico_id, data_consulta, duracao_minutos=30: HORARIOS_LIVRES,
+    )
+    service = AnthropicService(None, 1)
+    service.db = SessaoFalsa(quantidade=3)
+    service.cliente_id = 1
+    service.anthropic = None
+    service.use_real_ai = False
+    return service
+
+
+@pytest.fixture
+def servico_ia(monkeypatch):
+    return criar_servico_ia(monkeypatch)
+
+
+def webhooks_meta():
+    base = {"messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "5521999990000", "phone_number_id": "123456789012345"},
+            "contacts": [{"profile": {"name": "Maria"}, "wa_id": "5521988887777"}]}
+    mensagens = [
+        {"type": "text", "text": {"body": "Olá, gostaria de marcar uma consulta para 15/03"}},
+        {"type": "audio", "audio": {"id": "1234567890", "mime_type": "audio/ogg; codecs=opus"}},
+        {"type": "interactive", "interactive": {"type": "button_reply",
+                                                "button_reply": {"id": "confirmar_123", "title": "Confirmar"}}},
+    ]
+    return [
+        {"object": "whatsapp_business_account", "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+            **base, "messages": [{"from": "5521988887777", "id": f"wamid.{i}", "timestamp": "1700000000", **m}],
+        }}]}]}
+        for i, m in enumerate(mensagens)
+    ]
+
+
+TELEFONES = [
+    "(24) 98849-3257", "24 98849-3257", "+55 24 98849-3257", "5524988493257",
+    "11999998888", "+55 (11) 3456-7890", "021 99876-5432", "988493257",
+]
+
+
+# ==================== BENCHMARKS ====================
+
+@pytest.fixture
+def benchmark_agenda(monkeypatch):
+    agenda = agenda_medico_ocupado()
+    return servico_agendamento(monkeypatch, agenda, bloqueios_do_dia(), ocupados_do_dia(agenda))
+
+
+def test_bench_obter_horarios_disponiveis(benchmark, benchmark_agenda):
+    benchmark.group = "agenda"
+    horarios = benchmark(benchmark_agenda.obter_horarios_disponiveis, 1, DATA_CONSULTA, 15)
+    # 48 slots no dia, 70% ocupados: sobram no máximo 14 (menos os bloqueados)
+    assert len(horarios) <= 15
+
+
+def test_bench_horario_bloqueado(benchmark):
+    benchmark.group = "agenda"
+    agenda = agenda_medico_ocupado()
+    bloqueios = bloqueios_do_dia(60)
+    slots = [TZ.localize(s) for s in agenda.slots(DATA_CONSULTA)]
+    service = AgendamentoService(SessaoFalsa())
+
+    def grade_inteira():
+        return sum(service._horario_bloqueado(slot, 15, bloqueios) for slot in slots)
+
+    bloqueados = benchmark(grade_inteira)
+    assert bloqueados <= len(slots)
+
+
+def test_bench_construir_prompt(benchmark, servico_ia):
+    benchmark.group = "prompt"
+    paciente = SimpleNamespace(id=1, nome="Maria da Silva", convenio="Unimed")
+    prompt = benchmark(
+        servico_ia._construir_prompt,
+        "Pode ser na quinta-feira de manhã?", contexto_clinica(), paciente, contexto_conversa(),
+    )
+    assert "CALENDÁRIO DOS PRÓXIMOS 90 DIAS" in prompt
+    assert "HORÁRIOS LIVRES" in prompt
+
+
+@pytest.mark.parametrize("mensagem", [
+    "Quero marcar para 15/03/2030 às 10h",
+    "Pode ser dia 5/4?",
+    "Tem horário na quinta-feira?",
+    "Qual o valor da consulta?",
+])
+def test_bench_extrair_data(benchmark, servico_ia, mensagem):
+    benchmark.group = "prompt"
+    benchmark(servico_ia._extrair_data_e_horarios_disponiveis, mensagem, contexto_conversa(), contexto_clinica())
+
+
+def test_bench_normalize_phone(benchmark):
+    benchmark.group = "webhook"
+    telefones = TELEFONES * 125  # 1000 números
+
+    resultado = benchmark(lambda: [normalize_phone(t) for t in telefones])
+    assert resultado[0] == "5524988493257"
+
+
+def test_bench_parse_webhook(benchmark):
+    benchmark.group = "webhook"
+    service = WhatsAppOfficialService()
+    payloads = webhooks_meta()
+
+    mensagens = benchmark(lambda: [service.parse_webhook(p) for p in payloads])
+    assert [m.message_type for m in mensagens] == ["text", "audio", "interactive"]
+
+
+if __name__ == "__main__":
+    # Medição rápida sem pytest-benchmark (mediana de 50 execuções)
+    class _Monkeypatch:
+        def setattr(self, alvo, nome, valor):
+            setattr(alvo, nome, valor)
+
+    class _Medidor:
+        group = None
+
+        def __call__(self, funcao, *args, **kwargs):
+            tempos = []
+            for _ in range(50):
+                inicio = time.perf_counter()
+                resultado = funcao(*args, **kwargs)
+                tempos.append((time.perf_counter() - inicio) * 1_000_000)
+            tempos.sort()
+            print(f"   mediana {tempos[len(tempos) // 2]:>10.1f} µs")
+            return resultado
+
+    print("\n" + "=" * 60)
+    print("MICRO-BENCHMARKS DO NÚCLEO DE AGENDAMENTO")
+    print("=" * 60)
+    mp = _Monkeypatch()
+    agenda = agenda_medico_ocupado()
+    casos = [
+        ("obter_horarios_disponiveis", lambda: test_bench_obter_horarios_disponiveis(
+            _Medidor(), servico_agendamento(mp, agenda, bloqueios_do_dia(), ocupados_do_dia(agenda)))),
+        ("_horario_bloqueado (grade x 60)", lambda: test_bench_horario_bloqueado(_Medidor())),
+        ("_construir_prompt", lambda: test_bench_construir_prompt(_Medidor(), criar_servico_ia(mp))),
+        ("_extrair_data (dd/mm/aaaa)", lambda: test_bench_extrair_data(
+            _Medidor(), criar_servico_ia(mp), "Quero marcar para 15/03/2030 às 10h")),
+        ("normalize_phone (x1000)", lambda: test_bench_normalize_phone(_Medidor())),
+        ("parse_webhook (x3)", lambda: test_bench_parse_webhook(_Medidor())),
+    ]
+    for nome, caso in casos:
+        print(f"⏱️  {nome}")
+        caso()
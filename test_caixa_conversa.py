@@ -0,0 +1,198 @@
+"""
+Testes da caixa de mensagens por conversa
+Horário Inteligente SaaS
+
+Mensagens seguidas do mesmo paciente viram um turno só; turnos da mesma
+conversa não se sobrepõem; conversas diferentes seguem em paralelo.
+"""
+
+import asyncio
+import time
+
+from app.services.whatsapp_interface import WhatsAppMessage
+from app.services.webhook.caixa_conversa import LUA_RENOVAR_TURNO, CaixaConversas
+
+
+class SessaoFalsa:
+    def close(self):
+        pass
+
+
+class RedisFalso:
+    """SET NX PX e os dois scripts da trava (liberar/renovar), com expiração"""
+
+    def __init__(self):
+        self.valores = {}
+
+    def _vivo(self, chave):
+        valor, expira = self.valores.get(chave, (None, 0))
+        return valor if expira > time.monotonic() else None
+
+    def set(self, chave, valor, nx=False, px=None):
+        if nx and self._vivo(chave) is not None:
+            return None
+        self.valores[chave] = (valor, time.monotonic() + px / 1000)
+        return True
+
+    def eval(self, script, _numkeys, chave, token, *args):
+        if self._vivo(chave) != token:
+            return 0
+        if script == LUA_RENOVAR_TURNO:
+            self.valores[chave] = (token, time.monotonic() + int(args[0]) / 1000)
+        else:
+            del self.valores[chave]
+        return 1
+
+
+def mensagem(texto: str, telefone: str = "5511999990001", tipo: str = "text", botao: str = None) -> WhatsAppMessage:
+    return WhatsAppMessage(
+        sender=telefone, text=texto, message_type=tipo, push_name="Paciente",
+        message_id=f"wamid.{texto}", timestamp=0, is_from_me=False,
+        button_reply_id=botao, phone_number_id="990000000001",
+    )
+
+
+def criar_caixa(duracao_turno: float = 0.0, debounce: float = 0.05, redis=None, ttl_turno: float = 60.0,
+                espera_trava: float = 300.0, turnos=None, em_andamento=None, sobreposicoes=None):
+    turnos = [] if turnos is None else turnos
+    em_andamento = set() if em_andamento is None else em_andamento
+    sobreposicoes = [] if sobreposicoes is None else sobreposicoes
+
+    async def processar(mensagens, db, cliente_id=None, etapas=None, **_):
+        chave = (cliente_id, mensagens[0].sender)
+        if chave in em_andamento:
+            sobreposicoes.append(chave)
+        em_andamento.add(chave)
+        turnos.append([m.text for m in mensagens])
+        await asyncio.sleep(duracao_turno)
+        em_andamento.discard(chave)
+
+    caixa = CaixaConversas(
+        debounce=debounce, debounce_max=1.0, ttl_turno=ttl_turno, espera_trava=espera_trava, processar=processar,
+        obter_redis=(lambda: redis) if redis else None, abrir_sessao=SessaoFalsa,
+    )
+    return caixa, turnos, sobreposicoes
+
+
+async def _aguardar(caixa: CaixaConversas):
+    await asyncio.sleep(0)
+    await caixa.stop(timeout=5)
+
+
+def test_mensagens_seguidas_viram_um_turno():
+    async def cenario():
+        caixa, turnos, _ = criar_caixa()
+        for texto in ("oi", "quero marcar", "com o cardiologista"):
+            caixa.entregar(mensagem(texto), cliente_id=1)
+            await asyncio.sleep(0.01)
+        await _aguardar(caixa)
+        return caixa, turnos
+
+    caixa, turnos = asyncio.run(cenario())
+    assert turnos == [["oi", "quero marcar", "com o cardiologista"]]
+    assert caixa.get_status()["chamadas_ia_poupadas"] == 2
+
+
+def test_botao_nao_e_agrupado():
+    async def cenario():
+        caixa, turnos, _ = criar_caixa()
+        caixa.entregar(mensagem("oi"), cliente_id=1)
+        caixa.entregar(mensagem("Confirmar presença", tipo="button"), cliente_id=1)
+        caixa.entregar(mensagem("obrigado"), cliente_id=1)
+        await _aguardar(caixa)
+        return turnos
+
+    assert asyncio.run(cenario()) == [["oi"], ["Confirmar presença"], ["obrigado"]]
+
+
+def test_mensagem_durante_turno_vai_para_o_proximo_em_ordem():
+    async def cenario():
+        caixa, turnos, sobreposicoes = criar_caixa(duracao_turno=0.1)
+        caixa.entregar(mensagem("primeira"), cliente_id=1)
+        await asyncio.sleep(0.08)  # debounce venceu, turno em andamento
+        caixa.entregar(mensagem("segunda"), cliente_id=1)
+        caixa.entregar(mensagem("terceira"), cliente_id=1)
+        await _aguardar(caixa)
+        return turnos, sobreposicoes
+
+    turnos, sobreposicoes = asyncio.run(cenario())
+    assert turnos == [["primeira"], ["segunda", "terceira"]]
+    assert sobreposicoes == []
+
+
+def test_conversas_diferentes_em_paralelo():
+    async def cenario():
+        caixa, turnos, _ = criar_caixa(duracao_turno=0.2)
+        inicio = time.perf_counter()
+        for i in range(5):
+            caixa.entregar(mensagem("oi", telefone=f"551199999000{i}"), cliente_id=1)
+        await _aguardar(caixa)
+        return turnos, time.perf_counter() - inicio
+
+    turnos, duracao = asyncio.run(cenario())
+    assert len(turnos) == 5
+    assert duracao < 0.6  # 5 turnos de 0.2s em sequência levariam 1s
+
+
+def test_mesmo_telefone_em_tenants_diferentes_nao_se_mistura():
+    async def cenario():
+        caixa, turnos, _ = criar_caixa()
+        caixa.entregar(mensagem("clinica 1"), cliente_id=1)
+        caixa.entregar(mensagem("clinica 2"), cliente_id=2)
+        await _aguardar(caixa)
+        return turnos
+
+    assert sorted(asyncio.run(cenario())) == [["clinica 1"], ["clinica 2"]]
+
+
+def test_trava_renovada_em_turno_mais_longo_que_o_ttl():
+    """Dois workers (caixas) com o mesmo Redis: o turno de 0.3s não perde a trava de TTL 0.15s"""
+    async def cenario():
+        redis = RedisFalso()
+        turnos, em_andamento, sobreposicoes = [], set(), []
+        workers = [
+            criar_caixa(duracao_turno=0.3, debounce=0.01, redis=redis, ttl_turno=0.15,
+                        turnos=turnos, em_andamento=em_andamento, sobreposicoes=sobreposicoes)[0]
+            for _ in range(2)
+        ]
+        workers[0].entregar(mensagem("worker 1"), cliente_id=1)
+        await asyncio.sleep(0.05)
+        workers[1].entregar(mensagem("worker 2"), cliente_id=1)
+        await asyncio.gather(*(_aguardar(w) for w in workers))
+        return workers, turnos, sobreposicoes, redis
+
+    workers, turnos, sobreposicoes, redis = asyncio.run(cenario())
+    assert turnos == [["worker 1"], ["worker 2"]]
+    assert sobreposicoes == []
+    assert workers[1].get_status()["turnos_sem_trava"] == 0
+    assert redis.valores == {}
+
+
+def test_espera_pela_trava_e_limitada():
+    async def cenario():
+        redis = RedisFalso()
+        redis.set("turno:cliente_1:5511999990001", "outro-worker", px=60_000)
+        caixa, turnos, _ = criar_caixa(debounce=0.01, redis=redis, espera_trava=0.1)
+        caixa.entregar(mensagem("oi"), cliente_id=1)
+        await _aguardar(caixa)
+        return caixa, turnos
+
+    caixa, turnos = asyncio.run(cenario())
+    assert turnos == [["oi"]]
+    assert caixa.get_status()["turnos_sem_trava"] == 1
+
+
+def test_turno_recebe_conversa_ja_registrada_pelo_webhook():
+    recebido = {}
+
+    async def processar(mensagens, db, cliente_id=None, etapas=None, **kwargs):
+        recebido.update(kwargs)
+
+    async def cenario():
+        caixa = CaixaConversas(debounce=0.02, processar=processar, abrir_sessao=SessaoFalsa)
+        caixa.entregar(mensagem("áudio"), cliente_id=1, conversa_id=7, foi_audio=True)
+        caixa.entregar(mensagem("texto"), cliente_id=1, conversa_id=7)
+        await _aguardar(caixa)
+
+    asyncio.run(cenario())
+    assert recebido == {"conversa_id": 7, "mensagem_foi_audio": True}
@@ -0,0 +1,69 @@
+"""
+Testes do limitador de taxa (GCRA)
+Horário Inteligente SaaS
+
+O algoritmo em memória é o mesmo do script Lua; com Redis fora do ar o
+limitador cai para ele sem recusar requisições.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.limite_taxa_service import (
+    GCRAMemoria,
+    IPS_META_PADRAO,
+    LimitadorTaxa,
+    parse_mapa_politicas,
+    parse_politica,
+    parse_redes,
+)
+
+
+def test_parse_politica():
+    assert (parse_politica("5/minute").limite, parse_politica("5/minute").periodo) == (5, 60)
+    assert parse_politica("200 per minute").limite == 200
+    assert parse_politica("1000/hour").periodo == 3600
+    assert parse_politica("10/2second").periodo == 2
+    with pytest.raises(ValueError):
+        parse_politica("cinco por minuto")
+
+
+def test_parse_mapa_politicas():
+    mapa = parse_mapa_politicas("POST /api/auth/login=10/minute, 12=600/minute")
+    assert mapa["POST /api/auth/login"].limite == 10
+    assert mapa["12"].limite == 600
+
+
+def test_gcra_rajada_e_recusa():
+    gcra = GCRAMemoria()
+    politica = parse_politica("5/minute")
+    permitidas = [gcra.verificar("ip:1", politica).permitida for _ in range(7)]
+    assert permitidas == [True] * 5 + [False] * 2
+
+    recusada = gcra.verificar("ip:1", politica)
+    # Próxima vaga em ~12s (60s / 5 requisições)
+    assert 11 < recusada.espera <= 12
+    # Outra chave tem orçamento próprio
+    assert gcra.verificar("ip:2", politica).permitida
+
+
+def test_fallback_memoria_sem_redis():
+    limitador = LimitadorTaxa(redis_url="redis://127.0.0.1:1/0", timeout=0.05)
+    politica = parse_politica("2/minute")
+
+    async def consumir():
+        return [await limitador.verificar("teste", politica) for _ in range(3)]
+
+    resultados = asyncio.run(consumir())
+    assert [r.permitida for r, _ in resultados] == [True, True, False]
+    assert {backend for _, backend in resultados} == {"memoria"}
+    assert limitador.falhas_redis == 1  # pausa: não tenta o Redis a cada requisição
+
+
+def test_ips_isentos():
+    limitador = LimitadorTaxa(ips_isentos=parse_redes(IPS_META_PADRAO + ",52.67.12.206"))
+    assert limitador.isento("157.240.12.35")
+    assert limitador.isento("52.67.12.206")
+    assert not limitador.isento("200.100.50.25")
+    assert not limitador.isento("nao-e-ip")
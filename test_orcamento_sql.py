@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Orçamento de consultas SQL dos endpoints de alto volume
+Sistema ProSaude - Horário Inteligente
+
+Cada endpoint tem um máximo de statements por requisição e nenhum statement
+pode se repetir SQL_N1_LIMIAR vezes (N+1). Um N+1 novo quebra o teste mesmo
+com poucos registros no banco de teste.
+
+Precisa de banco (DATABASE_URL) com ao menos um cliente e um médico:
+    TESTE_CLIENTE_ID=1 TESTE_MEDICO_ID=1 pytest -q test_orcamento_sql.py
+
+Ao alterar um endpoint, ajuste o orçamento aqui no mesmo commit.
+"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+CLIENTE_ID = int(os.getenv("TESTE_CLIENTE_ID", "1"))
+MEDICO_ID = int(os.getenv("TESTE_MEDICO_ID", "1"))
+
+# Domínio raiz: TenantMiddleware trata como admin (sem resolver subdomínio)
+HOST = "horariointeligente.com.br"
+
+# Próxima quarta-feira: dia útil fixo, para a grade de horários não depender de quando o teste roda
+QUARTA = date.today() + timedelta(days=(2 - date.today().weekday()) % 7 or 7)
+
+# endpoint -> máximo de consultas por requisição
+ORCAMENTOS = {
+    "/api/conversas?limit=50": 2,
+    "/api/conversas/stats": 4,
+    "/api/agendamentos/calendario": 8,
+    # médico + configuração + bloqueios do dia + agendamentos do dia (independe do nº de slots)
+    f"/api/horarios-disponiveis?medico_id={MEDICO_ID}&data={QUARTA.isoformat()}": 4,
+}
+
+
+def _usuario_secretaria():
+    return {
+        "id": MEDICO_ID,
+        "nome": "Teste",
+        "email": "teste@horariointeligente.com.br",
+        "tipo": "secretaria",
+        "cliente_id": CLIENTE_ID,
+        "is_secretaria": True,
+        "medico_vinculado_id": None,
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    try:
+        from fastapi.testclient import TestClient
+        from sqlalchemy import text
+        from app.main import app
+        from app.api.auth import get_current_user
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            db.close()
+    except Exception as e:
+        pytest.skip(f"Banco/app indisponível para o teste de orçamento SQL: {e}")
+
+    # Autenticação fora da conta: o orçamento mede só o endpoint
+    app.dependency_overrides[get_current_user] = _usuario_secretaria
+    try:
+        yield TestClient(app, headers={"host": HOST})
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.parametrize("caminho,maximo", list(ORCAMENTOS.items()))
+def test_orcamento_endpoint(client, orcamento_sql, caminho, maximo):
+    resposta = client.get(caminho)
+    assert resposta.status_code == 200, resposta.text[:500]
+    orcamento_sql.resposta(resposta, maximo)
+
+
+def test_orcamento_contexto_clinica(client, orcamento_sql):
+    """Contexto da IA: médicos e convênios em consultas fixas, não por médico"""
+    from app.database import SessionLocal
+    from app.services.anthropic_service import AnthropicService
+
+    db = SessionLocal()
+    try:
+        service = AnthropicService(db, CLIENTE_ID)
+        with orcamento_sql.bloco(maximo=6, nome="_obter_contexto_clinica"):
+            service._obter_contexto_clinica()
+    finally:
+        db.close()
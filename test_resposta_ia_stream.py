@@ -0,0 +1,79 @@
+"""
+Testes da leitura incremental da resposta da IA (streaming)
+Horário Inteligente SaaS
+
+O campo "resposta" do JSON é decodificado delta a delta; o trecho antes do
+⏳ é liberado uma única vez, antes do fim do stream.
+"""
+
+import json
+
+import pytest
+
+from app.services.resposta_ia_stream import ExtratorResposta, dividir_pausa
+
+RESPOSTA = {
+    "resposta": "Um momentinho, vou verificar na agenda... 😊⏳Você está com \"sorte\"!\nTivemos uma desistência às 11h.",
+    "intencao": "agendamento",
+    "proxima_acao": "verificar_agenda",
+}
+
+
+def alimentar_em_pedacos(texto: str, tamanho: int):
+    extrator = ExtratorResposta()
+    segmentos = []
+    posicao_segmento = None
+    for i in range(0, len(texto), tamanho):
+        segmento = extrator.alimentar(texto[i:i + tamanho])
+        if segmento:
+            segmentos.append(segmento)
+            posicao_segmento = i
+    return extrator, segmentos, posicao_segmento
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("tamanho", [1, 2, 3, 5, 12])
+def test_decodifica_resposta_em_qualquer_corte(ensure_ascii, tamanho):
+    """Escapes (\\n, \\", \\uXXXX, pares surrogate) cortados entre deltas"""
+    bruto = json.dumps(RESPOSTA, ensure_ascii=ensure_ascii)
+    extrator, segmentos, _ = alimentar_em_pedacos(bruto, tamanho)
+
+    assert extrator.texto == RESPOSTA["resposta"]
+    assert extrator.completo
+    assert extrator.bruto == bruto
+    assert segmentos == ["Um momentinho, vou verificar na agenda... 😊"]
+
+
+def test_segmento_sai_antes_do_fim():
+    bruto = json.dumps(RESPOSTA, ensure_ascii=False)
+    _, _, posicao = alimentar_em_pedacos(bruto, 1)
+    # Liberado logo depois do marcador, longe do fim do JSON
+    assert posicao < bruto.index("Tivemos")
+
+
+def test_sem_marcador_nao_antecipa():
+    bruto = json.dumps({"resposta": "Olá! Qual especialidade você procura?", "intencao": "saudacao"})
+    extrator, segmentos, _ = alimentar_em_pedacos(bruto, 4)
+    assert segmentos == []
+    assert extrator.segmento is None
+    assert extrator.texto == "Olá! Qual especialidade você procura?"
+
+
+def test_resposta_terminando_no_marcador_nao_antecipa():
+    bruto = json.dumps({"resposta": "Um momentinho...⏳", "intencao": "outros"})
+    _, segmentos, _ = alimentar_em_pedacos(bruto, 3)
+    assert segmentos == []
+
+
+def test_campo_resposta_depois_de_outros_campos():
+    bruto = '{"intencao": "agendamento", "resposta": "Vou ver...⏳Achei!"}'
+    extrator, segmentos, _ = alimentar_em_pedacos(bruto, 2)
+    assert segmentos == ["Vou ver..."]
+    assert extrator.texto == "Vou ver...⏳Achei!"
+
+
+def test_dividir_pausa():
+    assert dividir_pausa("Um momentinho...⏳Achei! ⏳ Posso confirmar?") == ("Um momentinho...", "Achei! \n Posso confirmar?")
+    assert dividir_pausa("Sem marcador") == (None, "Sem marcador")
+    assert dividir_pausa("Só o começo⏳") == (None, "Só o começo")
+    assert dividir_pausa("") == (None, "")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Teste de tempo de inicialização do worker
+Sistema ProSaude - Horário Inteligente
+
+Orçamento de startup de cada worker do Uvicorn:
+- import de app.main (processo novo, sem cache de módulos)
+- nenhum serviço compartilhado criado no import (Redis, Meta, Anthropic)
+- latência da primeira requisição
+
+Orçamentos ajustáveis por ambiente:
+    STARTUP_IMPORT_BUDGET_S=3.0  STARTUP_PRIMEIRA_REQ_BUDGET_MS=500
+
+Uso:
+    pytest -q test_startup.py
+    python test_startup.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+root_dir = Path(__file__).parent
+sys.path.insert(0, str(root_dir))
+
+IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "3.0"))
+PRIMEIRA_REQ_BUDGET_MS = float(os.getenv("STARTUP_PRIMEIRA_REQ_BUDGET_MS", "500"))
+
+# Host do domínio raiz: TenantMiddleware trata como admin, sem consulta ao banco
+HOST_ADMIN = "horariointeligente.com.br"
+
+SCRIPT_IMPORT = """
+import json, time
+inicio = time.perf_counter()
+import app.main
+duracao = time.perf_counter() - inicio
+from app.services.registry import registry
+print(json.dumps({"import_s": duracao, "criados": list(registry.get_status()["criados"])}))
+"""
+
+
+def medir_import():
+    """Importa app.main em um processo novo e devolve (segundos, serviços criados)"""
+    import json
+
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT_IMPORT],
+        cwd=str(root_dir),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+    dados = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return dados["import_s"], dados["criados"]
+
+
+def test_1_import_dentro_do_orcamento():
+    """Teste 1: import de app.main dentro do orçamento"""
+    import_s, _ = medir_import()
+    print(f"⏱️  import app.main: {import_s:.2f}s (orçamento {IMPORT_BUDGET_S}s)")
+    assert import_s < IMPORT_BUDGET_S
+
+
+def test_2_nenhum_servico_criado_no_import():
+    """Teste 2: serviços compartilhados só são criados no uso/aquecimento"""
+    _, criados = medir_import()
+    print(f"🧩 Serviços criados no import: {criados or 'nenhum'}")
+    assert criados == []
+
+
+def test_3_primeira_requisicao():
+    """Teste 3: latência da primeira requisição de um worker recém-importado"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    inicio = time.perf_counter()
+    resposta = client.get("/sistema/rotas", headers={"host": HOST_ADMIN})
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"⏱️  Primeira requisição: {duracao_ms:.0f}ms (orçamento {PRIMEIRA_REQ_BUDGET_MS:.0f}ms)")
+    assert resposta.status_code == 200
+    assert duracao_ms < PRIMEIRA_REQ_BUDGET_MS
+
+
+def test_4_registro_compartilha_instancias():
+    """Teste 4: o mesmo objeto é devolvido em todos os módulos"""
+    from app.services.registry import get_whatsapp_service
+    from app.services.whatsapp_interface import get_whatsapp_provider
+    from app.services.whatsapp_template_service import WhatsAppTemplateService
+
+    whatsapp = get_whatsapp_service()
+    assert get_whatsapp_provider() is whatsapp
+    assert WhatsAppTemplateService().whatsapp is whatsapp
+
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("TESTE DE STARTUP DO WORKER")
+    print("=" * 60)
+    test_1_import_dentro_do_orcamento()
+    test_2_nenhum_servico_criado_no_import()
+    test_3_primeira_requisicao()
+    test_4_registro_compartilha_instancias()
+    print("✅ Startup dentro do orçamento")